@@ -0,0 +1,3 @@
+"""
+Offline benchmarks of the API against a local mock node.
+"""
@@ -0,0 +1,268 @@
+"""
+Load scenarios driving the FastAPI app of `pyliquid.main` against a
+`MockNode`, at several concurrency levels. Requests are given straight to
+the ASGI app, so the numbers include routing, validation, the RPC client and
+encoding, but no HTTP server in front of the app.
+
+With `--loopback` the mock node answers in-process, without sockets, for
+numbers that only depend on the API itself. With `--replay` the answers come
+from a recording of `rpc_capture` instead, with its timings.
+
+Run it with `python -m benchmarks.load --concurrency 1,8,32`.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from benchmarks import report
+from benchmarks.mock_node import MockNode, parse_pairs
+from pyliquid.liquid.capture import ReplayHandler, read_capture
+from pyliquid.liquid.transport import LoopbackTransport
+
+DEFAULT_LEVELS = (1, 8, 32)
+DEFAULT_REQUESTS = 200
+DEFAULT_WALLETS = 10
+WALLET_PREFIX = "bench"
+TARGET_ADDRESS = "el1qqbench"
+
+
+class Scenario(NamedTuple):
+    """
+    Request repeated against an endpoint. `query` and `body` are built from
+    the index of the request, to spread it over the benchmark wallets.
+    """
+    name: str
+    method: str
+    path: str
+    query: Callable[[int], str] = lambda index: ''
+    body: Optional[Callable[[int], Any]] = None
+    expected: int = 200
+
+
+def _wallet(index: int) -> str:
+    return f"wallet_label={WALLET_PREFIX}-{index % DEFAULT_WALLETS}"
+
+
+SCENARIOS: Dict[str, Scenario] = {scenario.name: scenario for scenario in [
+    Scenario("wallet_list", "GET", "/operations/wallet"),
+    Scenario("wallet_info", "GET", "/operations/wallet/", _wallet),
+    Scenario("wallet_info_raw", "GET", "/operations/wallet/",
+             lambda index: _wallet(index) + "&amounts=raw"),
+    Scenario("wallet_utxos", "GET", "/operations/wallet/utxos", _wallet),
+    Scenario("wallet_transactions", "GET", "/operations/wallet/transactions",
+             _wallet),
+    Scenario("wallet_create", "POST", "/operations/wallet/create"),
+    Scenario("tx_send", "POST", "/operations/tx/send",
+             body=lambda index: {"target_address": TARGET_ADDRESS,
+                                 "total_amount": "0.0001"}),
+    Scenario("token_issue", "POST", "/operations/token/issue", _wallet,
+             lambda index: {"tokens": [{"amount": "10", "reissue": "1"}] * 2,
+                            "presplit": False}),
+    Scenario("batch", "POST", "/operations/batch",
+             body=lambda index: {"body": {
+                 "seq": 3,
+                 "cmd": [[0, "getblockcount"], [1, "getbalance"],
+                         [2, "getbestblockhash"]]}}),
+]}
+
+
+def configure(port: int, data_dir: str) -> None:
+    """
+    Point the API settings to the mock node, with local state in a
+    scratch directory.
+    """
+    os.environ.update({'rpc_port': str(port), 'rpc_user': 'bench',
+                       'rpc_password': 'bench', 'data_dir': data_dir,
+                       'node_managed': '0', 'rpc_nodes': '',
+                       'metrics_enabled': '0'})
+
+
+async def asgi_request(app, method: str, path: str, query: str = '',
+                       body: Any = None) -> Tuple[int, bytes]:
+    """
+    Make a request to an ASGI app and collect its whole response.
+
+    Returns
+    -------
+    tuple[int, bytes]
+        Status and body of the response.
+    """
+    payload = b'' if body is None else json.dumps(body).encode()
+    headers = [(b'host', b'bench')]
+    if body is not None:
+        headers += [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(payload)).encode())]
+    scope = {'type': 'http', 'asgi': {'version': '3.0'},
+             'http_version': '1.1', 'method': method, 'scheme': 'http',
+             'path': path, 'raw_path': path.encode(), 'root_path': '',
+             'query_string': query.encode(), 'headers': headers,
+             'client': ('127.0.0.1', 50000), 'server': ('bench', 80)}
+    sent = False
+    status, chunks = 0, []
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            # Only asked again once the response is over.
+            await asyncio.Event().wait()
+        sent = True
+        return {'type': 'http.request', 'body': payload, 'more_body': False}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+
+    await app(scope, receive, send)
+    return status, b''.join(chunks)
+
+
+async def run_scenario(app, scenario: Scenario, concurrency: int,
+                       requests: int) -> Dict:
+    """
+    Make `requests` requests of a scenario, `concurrency` at a time.
+
+    Returns
+    -------
+    dict
+        Summary from `report.summarize`.
+    """
+    latencies: List[float] = []
+    errors = 0
+    indexes = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for index in indexes:
+            started = time.perf_counter()
+            status, _ = await asgi_request(
+                app, scenario.method, scenario.path, scenario.query(index),
+                scenario.body(index) if scenario.body else None)
+            latencies.append(time.perf_counter() - started)
+            if status != scenario.expected:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return report.summarize(scenario.name, concurrency, latencies,
+                            time.perf_counter() - started, errors)
+
+
+async def run_load(scenarios: List[Scenario], levels: List[int],
+                   requests: int, node: MockNode,
+                   transport: Any = None) -> List[Dict]:
+    """
+    Run every scenario at every concurrency level against a mock node.
+
+    Parameters
+    ----------
+    scenarios: list[Scenario]
+        Scenarios to be run, in order.
+    levels: list[int]
+        Concurrency levels.
+    requests: int
+        Requests per scenario and level.
+    node: MockNode
+        Node to be started for the run, with the benchmark wallets.
+    transport: LoopbackTransport | None, default = None
+        Transport answering in place of the node, which is reached over TCP
+        if `None`.
+
+    Returns
+    -------
+    list[dict]
+        A summary per scenario and level.
+    """
+    from pyliquid.liquid import client
+    from pyliquid.main import app
+
+    rows = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        await node.start()
+        configure(node.port, data_dir)
+        client.use_transport(transport)
+        try:
+            # Routes printing their output would dominate the numbers.
+            with contextlib.redirect_stdout(io.StringIO()):
+                for scenario in scenarios:
+                    # Warm up loaded wallets and open connections first.
+                    await run_scenario(app, scenario, 1, 1)
+                    for level in levels:
+                        rows.append(await run_scenario(app, scenario, level,
+                                                       requests))
+        finally:
+            await client.close_async_pool()
+            # A later run in this process reaches its own node.
+            client.use_transport()
+            await node.stop()
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--concurrency', default=','.join(
+        str(level) for level in DEFAULT_LEVELS),
+        help="comma separated concurrency levels")
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS,
+                        help="requests per scenario and level")
+    parser.add_argument('--scenario', action='append', default=[],
+                        choices=sorted(SCENARIOS),
+                        help="scenario to be run, all by default")
+    parser.add_argument('--latency', type=float, default=0.0005,
+                        help="seconds waited by the node on every method")
+    parser.add_argument('--method-latency', action='append', default=[],
+                        metavar='METHOD=SECONDS')
+    parser.add_argument('--size', action='append', default=[],
+                        metavar='METHOD=ENTRIES')
+    parser.add_argument('--loopback', action='store_true',
+                        help="answer in-process instead of over TCP")
+    parser.add_argument('--replay', metavar='PATH',
+                        help="answer from a recording of rpc_capture")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="acceleration of the recorded timings, 0 to "
+                             "not wait")
+    parser.add_argument('--json', metavar='PATH',
+                        help="save the results to be used as a baseline")
+    parser.add_argument('--baseline', metavar='PATH',
+                        help="fail on regressions against a saved run")
+    parser.add_argument('--tolerance', type=float,
+                        default=report.DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    node = MockNode(parse_pairs(args.method_latency, float), args.latency,
+                    parse_pairs(args.size, int), DEFAULT_WALLETS,
+                    WALLET_PREFIX)
+    scenarios = [SCENARIOS[name] for name in args.scenario or SCENARIOS]
+    levels = [int(level) for level in args.concurrency.split(',')]
+    transport = None
+    if args.replay:
+        transport = LoopbackTransport(ReplayHandler(
+            read_capture(args.replay), args.speed))
+    elif args.loopback:
+        transport = LoopbackTransport(node.answer)
+    rows = asyncio.run(run_load(scenarios, levels, args.requests, node,
+                                transport))
+    print(report.format_table(rows))
+    if args.json:
+        report.save(rows, args.json)
+    if args.baseline:
+        regressions = report.compare(rows, report.load(args.baseline),
+                                     args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
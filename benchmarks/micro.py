@@ -0,0 +1,98 @@
+"""
+Micro-benchmarks of the hot helpers: Decimal parsing of node results,
+response encoding and validation of the request models.
+
+Run it with `python -m benchmarks.micro`.
+"""
+
+import argparse
+import timeit
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pyliquid.models.requests import (BulkWallets, Instructions,
+                                      IssuanceBatch, Message)
+from pyliquid.utils.data import parse_decimal_to_float
+from pyliquid.utils.encoding import encode_json
+
+DEFAULT_REPEAT = 5
+
+
+def wallet_info() -> dict:
+    return {"walletname": "bench-0", "walletversion": 169900,
+            "balance": {"bitcoin": Decimal("21.00000000"),
+                        "a" * 64: Decimal("0.00150000")},
+            "unconfirmed_balance": {"bitcoin": Decimal("0E-8")},
+            "immature_balance": {"bitcoin": Decimal("0E-8")},
+            "txcount": 1000, "keypoolsize": 1000, "paytxfee": Decimal("0"),
+            "private_keys_enabled": True, "descriptors": True}
+
+
+def transactions(count: int) -> list:
+    return [{"txid": f"{index:064x}", "category": "receive", "vout": 0,
+             "amount": {"bitcoin": Decimal("0.00150000")},
+             "confirmations": 10, "time": 1650000000 + index}
+            for index in range(count)]
+
+
+def instructions(count: int) -> dict:
+    return {"seq": count,
+            "cmd": [[index, "getbalance"] for index in range(count)],
+            "arg": [[index, None] for index in range(count)]}
+
+
+def cases() -> Dict[str, Tuple[Callable[[], object], int]]:
+    """
+    Benchmarked calls with the number of runs per measurement.
+    """
+    info, history = wallet_info(), transactions(500)
+    small, large = instructions(3), instructions(100)
+    tokens = {"tokens": [{"amount": "10", "reissue": "1"}] * 50,
+              "concurrency": 4}
+    return {
+        "parse_decimal_to_float[walletinfo]":
+            (lambda: parse_decimal_to_float(info), 20000),
+        "parse_decimal_to_float[500 txs]":
+            (lambda: parse_decimal_to_float(history), 50),
+        "encode_json[walletinfo]": (lambda: encode_json(info), 20000),
+        "encode_json[500 txs]": (lambda: encode_json(history), 50),
+        "Instructions[3 cmds]": (lambda: Instructions(**small), 10000),
+        "Instructions[100 cmds]": (lambda: Instructions(**large), 500),
+        "Message[3 cmds]": (lambda: Message(body=small), 10000),
+        "BulkWallets": (lambda: BulkWallets(count=100, prefix="bench"),
+                        20000),
+        "IssuanceBatch[50 tokens]": (lambda: IssuanceBatch(**tokens), 500),
+    }
+
+
+def run_micro(names: Optional[List[str]] = None,
+              repeat: int = DEFAULT_REPEAT) -> List[Dict]:
+    """
+    Time the benchmarked calls, keeping the best of `repeat` measurements.
+
+    Returns
+    -------
+    list[dict]
+        Name, runs and microseconds per call of each case.
+    """
+    rows = []
+    for name, (call, number) in cases().items():
+        if names and name not in names:
+            continue
+        best = min(timeit.repeat(call, number=number, repeat=repeat))
+        rows.append({"case": name, "runs": number,
+                     "us_per_call": best / number * 1e6})
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--case', action='append', default=[])
+    args = parser.parse_args(argv)
+    for row in run_micro(args.case, args.repeat):
+        print(f"{row['case']:<40}{row['us_per_call']:>12.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+"""
+Local stand-in for elementsd answering JSON-RPC over keep-alive HTTP, so the
+API can be measured without a node. Wallets and balances live in memory,
+every method waits its configured latency and list results have the
+configured number of entries.
+
+Run it alone with `python -m benchmarks.mock_node --port 7041`.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+POLICY_ASSET = "b2e15d0d7a0c94e4e2ce0fe6e8691b9e451377f6e46e8045a86f7c4b5d4f0f23"
+
+DEFAULT_LATENCY = 0.0
+DEFAULT_SIZES = {
+    'listtransactions': 1000,
+    'listunspent': 20,
+    'listwalletdir': 50,
+}
+
+RPC_METHOD_NOT_FOUND = -32601
+RPC_WALLET_ERROR = -4
+RPC_WALLET_NOT_FOUND = -18
+RPC_WALLET_ALREADY_LOADED = -35
+
+
+class MockRPCError(Exception):
+    """
+    Error answered in the `error` member of a JSON-RPC response.
+    """
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def amount(value: Decimal) -> float:
+    """
+    Amount as the node writes it, a JSON number with 8 decimals.
+    """
+    return float(value.quantize(Decimal("0.00000001")))
+
+
+def fake_hash(prefix: str, counter: int) -> str:
+    """
+    Deterministic 64 hex characters, for txids, assets and block hashes.
+    """
+    return f"{prefix}{counter:x}".rjust(64, '0')[-64:]
+
+
+class MockNode():
+    """
+    In-memory elementsd serving the subset of RPC methods used by the API.
+
+    Attributes
+    ----------
+    latency: dict[str, float]
+        Seconds waited before answering each method.
+    default_latency: float
+        Seconds waited by methods missing from `latency`.
+    sizes: dict[str, int]
+        Entries of list results, by method.
+    calls: dict[str, int]
+        Number of calls answered, by method.
+    """
+
+    latency: Dict[str, float]
+    default_latency: float
+    sizes: Dict[str, int]
+    calls: Dict[str, int]
+
+    def __init__(self, latency: Optional[Dict[str, float]] = None,
+                 default_latency: float = DEFAULT_LATENCY,
+                 sizes: Optional[Dict[str, int]] = None,
+                 wallets: int = 0, wallet_prefix: str = "bench") -> None:
+        """
+        Constructor for MockNode class.
+
+        Parameters
+        ----------
+        latency: dict[str, float] | None, default = None
+            Seconds waited before answering each method.
+        default_latency: float, default = 0.0
+            Seconds waited by methods missing from `latency`.
+        sizes: dict[str, int] | None, default = None
+            Entries of `listtransactions`, `listunspent` and `listwalletdir`.
+        wallets: int, default = 0
+            Wallets existing on disk from the start, named
+            `<wallet_prefix>-<index>`.
+        wallet_prefix: str, default = "bench"
+            Prefix of the names of the initial wallets.
+        """
+        self.latency = dict(latency or {})
+        self.default_latency = default_latency
+        self.sizes = {**DEFAULT_SIZES, **(sizes or {})}
+        self.calls = {}
+        # The unnamed default wallet is always loaded, like with `-wallet=`.
+        self._wallets = {'': Decimal("21")}
+        self._loaded = {''}
+        for index in range(wallets):
+            self._wallets[f"{wallet_prefix}-{index}"] = Decimal("21")
+        self._counter = itertools.count(1)
+        self._server = None
+
+    @property
+    def port(self) -> int:
+        """
+        Port the node listens on, once started.
+        """
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> None:
+        """
+        Start listening, on a free port unless one is given.
+        """
+        self._server = await asyncio.start_server(self._handle, host, port)
+
+    async def stop(self) -> None:
+        """
+        Stop listening, dropping the open connections.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self) -> None:
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _handle(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                request_line, *headers = head.decode('latin-1').split('\r\n')
+                path = request_line.split(' ')[1]
+                length = 0
+                for header in headers:
+                    name, _, value = header.partition(':')
+                    if name.strip().lower() == 'content-length':
+                        length = int(value)
+                body = await reader.readexactly(length)
+                reply = await self.answer(path, json.loads(body))
+                writer.write(b"HTTP/1.1 200 OK\r\n"
+                             b"Content-Type: application/json\r\n"
+                             + f"Content-Length: {len(reply)}\r\n\r\n"
+                             .encode() + reply)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def _wallet_of(self, path: str) -> Optional[str]:
+        if path.startswith('/wallet/'):
+            return unquote(path[len('/wallet/'):])
+        return None
+
+    async def answer(self, path: str, request: Any) -> bytes:
+        """
+        Answer a single or batch JSON-RPC request sent to the given path.
+
+        Parameters
+        ----------
+        path: str
+            URL path, `/wallet/<name>` for wallet-scoped calls.
+        request: dict | list
+            Decoded request body.
+
+        Returns
+        -------
+        bytes
+            Response body, compact like the node writes it.
+        """
+        wallet = self._wallet_of(path)
+        if isinstance(request, list):
+            replies = [await self._reply(wallet, item) for item in request]
+        else:
+            replies = await self._reply(wallet, request)
+        return json.dumps(replies, separators=(',', ':')).encode()
+
+    async def _reply(self, wallet: Optional[str], request: dict) -> dict:
+        method = request.get('method', '')
+        await asyncio.sleep(self.latency.get(method, self.default_latency))
+        self.calls[method] = self.calls.get(method, 0) + 1
+        try:
+            result = self.call(wallet, method, list(request.get('params')
+                                                    or []))
+        except MockRPCError as rpc_error:
+            return {"result": None, "error": {"code": rpc_error.code,
+                                              "message": rpc_error.message},
+                    "id": request.get('id')}
+        return {"result": result, "error": None, "id": request.get('id')}
+
+    def _scope(self, wallet: Optional[str]) -> str:
+        name = '' if wallet is None else wallet
+        if name not in self._loaded:
+            raise MockRPCError(RPC_WALLET_NOT_FOUND,
+                               f"Requested wallet does not exist or is not "
+                               f"loaded: {name}")
+        return name
+
+    def _spend(self, wallet: str, value: Decimal) -> str:
+        if value > self._wallets[wallet]:
+            raise MockRPCError(-6, "Insufficient funds")
+        self._wallets[wallet] -= value
+        return fake_hash('7', next(self._counter))
+
+    def call(self, wallet: Optional[str], method: str, params: list) -> Any:
+        """
+        Result of a single RPC method.
+
+        Raises
+        ------
+        MockRPCError
+            Like the node would, for unknown methods and wallets.
+        """
+        handler = getattr(self, f"rpc_{method}", None)
+        if handler is None:
+            raise MockRPCError(RPC_METHOD_NOT_FOUND, "Method not found")
+        return handler(wallet, *params)
+
+    def rpc_createwallet(self, wallet, name, *_):
+        if name in self._wallets:
+            raise MockRPCError(RPC_WALLET_ERROR,
+                               f"Wallet file verification failed. Failed to "
+                               f"create database path '{name}'. Database "
+                               f"already exists.")
+        self._wallets[name] = Decimal("0")
+        self._loaded.add(name)
+        return {"name": name, "warning": ""}
+
+    def rpc_loadwallet(self, wallet, name, *_):
+        if name not in self._wallets:
+            raise MockRPCError(RPC_WALLET_NOT_FOUND,
+                               f"Wallet file verification failed. Failed to "
+                               f"load database path '{name}'. Path does not "
+                               f"exist.")
+        if name in self._loaded:
+            raise MockRPCError(RPC_WALLET_ALREADY_LOADED,
+                               f"Wallet file verification failed. Refusing "
+                               f"to load database. Data file '{name}' is "
+                               f"already loaded.")
+        self._loaded.add(name)
+        return {"name": name, "warning": ""}
+
+    def rpc_unloadwallet(self, wallet, name=None, *_):
+        name = self._scope(wallet if name is None else name)
+        self._loaded.discard(name)
+        return {"warning": ""}
+
+    def rpc_listwallets(self, wallet):
+        return sorted(self._loaded)
+
+    def rpc_listwalletdir(self, wallet):
+        names = [name for name in self._wallets if name]
+        filler = [f"wallet-{index}" for index
+                  in range(max(self.sizes['listwalletdir'] - len(names), 0))]
+        return {"wallets": [{"name": name} for name in names + filler]}
+
+    def rpc_getwalletinfo(self, wallet):
+        name = self._scope(wallet)
+        return {"walletname": name, "walletversion": 169900,
+                "format": "sqlite",
+                "balance": {"bitcoin": amount(self._wallets[name])},
+                "unconfirmed_balance": {"bitcoin": 0.0},
+                "immature_balance": {"bitcoin": 0.0},
+                "txcount": self.sizes['listtransactions'],
+                "keypoolsize": 1000, "keypoolsize_hd_internal": 1000,
+                "paytxfee": 0.0, "private_keys_enabled": True,
+                "avoid_reuse": False, "scanning": False,
+                "descriptors": True}
+
+    def rpc_getbalance(self, wallet, *_):
+        return {"bitcoin": amount(self._wallets[self._scope(wallet)])}
+
+    def rpc_getnewaddress(self, wallet, *_):
+        self._scope(wallet)
+        return f"el1qq{next(self._counter):058x}"
+
+    def rpc_sendtoaddress(self, wallet, address, value, *_):
+        return self._spend(self._scope(wallet), Decimal(str(value)))
+
+    def rpc_sendmany(self, wallet, _, outputs, *__):
+        total = sum((Decimal(str(value)) for value in outputs.values()),
+                    Decimal("0"))
+        return self._spend(self._scope(wallet), total)
+
+    def rpc_issueasset(self, wallet, value, reissue, *_):
+        self._scope(wallet)
+        counter = next(self._counter)
+        return {"txid": fake_hash('7', counter), "vin": 0,
+                "entropy": fake_hash('e', counter),
+                "asset": fake_hash('a', counter),
+                "token": fake_hash('c', counter)}
+
+    def rpc_dumpassetlabels(self, wallet):
+        return {"bitcoin": POLICY_ASSET}
+
+    def rpc_listunspent(self, wallet, *_):
+        self._scope(wallet)
+        return [{"txid": fake_hash('5', index), "vout": 0,
+                 "address": f"el1qq{index:058x}", "scriptPubKey": "0014" +
+                 "00" * 20, "amount": 0.0001, "assetcommitment": "0a" * 33,
+                 "asset": POLICY_ASSET, "amountcommitment": "08" * 33,
+                 "confirmations": 6, "spendable": True, "solvable": True,
+                 "safe": True}
+                for index in range(self.sizes['listunspent'])]
+
+    def rpc_listtransactions(self, wallet, label="*", count=10, skip=0, *_):
+        self._scope(wallet)
+        total = self.sizes['listtransactions']
+        # Oldest first, like the node, counting back from the newest.
+        end = max(total - skip, 0)
+        return [self._transaction(index)
+                for index in range(max(end - count, 0), end)]
+
+    def rpc_listsinceblock(self, wallet, *_):
+        self._scope(wallet)
+        return {"transactions": [self._transaction(index) for index
+                                 in range(min(self.sizes['listtransactions'],
+                                              10))],
+                "removed": [], "lastblock": fake_hash('b', 1)}
+
+    def _transaction(self, index: int) -> dict:
+        return {"address": f"el1qq{index:058x}", "category": "receive",
+                "amount": {"bitcoin": 0.00150000}, "vout": 0,
+                "confirmations": 10, "blockhash": fake_hash('b', index),
+                "blockheight": index, "blockindex": 1,
+                "blocktime": 1650000000 + index,
+                "txid": fake_hash('7', index), "walletconflicts": [],
+                "time": 1650000000 + index,
+                "timereceived": 1650000000 + index,
+                "bip125-replaceable": "no"}
+
+    def rpc_getbestblockhash(self, wallet):
+        return fake_hash('b', 1)
+
+    def rpc_getblockcount(self, wallet):
+        return 1
+
+    def rpc_getblockchaininfo(self, wallet):
+        return {"chain": "liquidregtest", "blocks": 1, "headers": 1,
+                "bestblockhash": fake_hash('b', 1),
+                "initialblockdownload": False, "verificationprogress": 1}
+
+    def rpc_uptime(self, wallet):
+        return 1
+
+
+def parse_pairs(values: List[str], cast) -> Dict[str, Any]:
+    """
+    Parse `method=value` command line options.
+    """
+    pairs: List[Tuple[str, Any]] = []
+    for value in values:
+        method, _, number = value.partition('=')
+        if not number:
+            raise argparse.ArgumentTypeError(f"Expected method=value, got "
+                                             f"'{value}'")
+        pairs.append((method, cast(number)))
+    return dict(pairs)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7041)
+    parser.add_argument('--latency', type=float, default=DEFAULT_LATENCY,
+                        help="seconds waited by every method")
+    parser.add_argument('--method-latency', action='append', default=[],
+                        metavar='METHOD=SECONDS')
+    parser.add_argument('--size', action='append', default=[],
+                        metavar='METHOD=ENTRIES')
+    parser.add_argument('--wallets', type=int, default=10)
+    args = parser.parse_args(argv)
+    node = MockNode(parse_pairs(args.method_latency, float), args.latency,
+                    parse_pairs(args.size, int), args.wallets)
+
+    async def serve():
+        await node.start(args.host, args.port)
+        print(f"Mock node listening on {args.host}:{node.port}")
+        await node.serve_forever()
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Summaries of benchmark runs: throughput and latency percentiles, printed as
+a table or saved as JSON to be compared against a previous run.
+"""
+
+import json
+import math
+from typing import Dict, List, Sequence
+
+DEFAULT_TOLERANCE = 0.2
+
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of the samples.
+
+    Parameters
+    ----------
+    samples: Sequence[float]
+        Measured values, in any order.
+    fraction: float
+        Percentile as a fraction, like 0.99 for p99.
+
+    Returns
+    -------
+    float
+        The value below which `fraction` of the samples are, 0 without
+        samples.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(math.ceil(fraction * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(name: str, concurrency: int, latencies: List[float],
+              elapsed: float, errors: int = 0) -> Dict:
+    """
+    Summary of the requests made to an endpoint at a concurrency level.
+
+    Parameters
+    ----------
+    name: str
+        Name of the scenario.
+    concurrency: int
+        Requests in flight at the same time.
+    latencies: list[float]
+        Seconds taken by each request.
+    elapsed: float
+        Seconds taken by the whole run.
+    errors: int, default = 0
+        Requests answered with an unexpected status.
+
+    Returns
+    -------
+    dict
+        Requests, errors, throughput in requests per second and p50, p99
+        and max latencies in milliseconds.
+    """
+    return {"scenario": name, "concurrency": concurrency,
+            "requests": len(latencies), "errors": errors,
+            "throughput": len(latencies) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(latencies, 0.5) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "max_ms": max(latencies, default=0.0) * 1000}
+
+
+def format_table(rows: List[Dict]) -> str:
+    """
+    Align the summaries in a plain text table.
+    """
+    header = (f"{'scenario':<24}{'conc':>6}{'reqs':>8}{'errors':>8}"
+              f"{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    lines = [header, '-' * len(header)]
+    for row in rows:
+        lines.append(f"{row['scenario']:<24}{row['concurrency']:>6}"
+                     f"{row['requests']:>8}{row['errors']:>8}"
+                     f"{row['throughput']:>10.1f}{row['p50_ms']:>10.2f}"
+                     f"{row['p99_ms']:>10.2f}{row['max_ms']:>10.2f}")
+    return '\n'.join(lines)
+
+
+def save(rows: List[Dict], path: str) -> None:
+    with open(path, 'w') as output:
+        json.dump(rows, output, indent=2)
+
+
+def load(path: str) -> List[Dict]:
+    with open(path) as source:
+        return json.load(source)
+
+
+def compare(rows: List[Dict], baseline: List[Dict],
+            tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """
+    Find the scenarios slower than in a baseline run.
+
+    Parameters
+    ----------
+    rows: list[dict]
+        Summaries of the current run.
+    baseline: list[dict]
+        Summaries of a previous run, as saved by `save`.
+    tolerance: float, default = 0.2
+        Allowed fraction of throughput lost or p99 latency gained.
+
+    Returns
+    -------
+    list[str]
+        A line per regression, empty if there is none.
+    """
+    previous = {(row['scenario'], row['concurrency']): row
+                for row in baseline}
+    regressions = []
+    for row in rows:
+        before = previous.get((row['scenario'], row['concurrency']))
+        if before is None:
+            continue
+        label = f"{row['scenario']} at concurrency {row['concurrency']}"
+        if row['throughput'] < before['throughput'] * (1 - tolerance):
+            regressions.append(f"{label}: {row['throughput']:.1f} req/s, "
+                               f"was {before['throughput']:.1f}")
+        if row['p99_ms'] > before['p99_ms'] * (1 + tolerance):
+            regressions.append(f"{label}: p99 {row['p99_ms']:.2f} ms, "
+                               f"was {before['p99_ms']:.2f}")
+    return regressions
@@ -1,5 +1,29 @@
-__all__ = ["operations", "server", "wrappers"]
+__all__ = ["addresses", "admission", "batch", "cache", "capture", "client",
+           "connection", "coordination", "events", "health", "index",
+           "issuance", "jobs", "lifecycle", "nodes", "operations", "payouts",
+           "provisioning", "registry", "server", "sharding", "transport",
+           "wrappers"]
 
+from .addresses import *
+from .admission import *
+from .batch import *
+from .cache import *
+from .capture import *
+from .client import *
+from .connection import *
+from .coordination import *
+from .events import *
+from .health import *
+from .index import *
+from .issuance import *
+from .jobs import *
+from .lifecycle import *
+from .nodes import *
 from .operations import *
+from .payouts import *
+from .provisioning import *
+from .registry import *
 from .server import *
+from .sharding import *
+from .transport import *
 from .wrappers import *
@@ -0,0 +1,324 @@
+"""
+Pool of receive addresses derived ahead of time, so handing out a fresh
+address doesn't wait for the node.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Set, Tuple
+
+from pyliquid.liquid.registry import WalletRegistry, get_wallet_registry
+from pyliquid.utils.misc import get_optional_config
+from pyliquid.utils.storage import database_path, open_database
+
+DEFAULT_POOL_TARGET = 20
+DEFAULT_LOW_WATER = 5
+
+# Seconds between checks of the pools, when nobody asked for a refill.
+REFILL_INTERVAL = 30.0
+
+# Seconds a worker refilling a wallet keeps the others from doing the same,
+# in case it dies before releasing it.
+REFILL_LEASE = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS addresses (
+    address TEXT PRIMARY KEY,
+    wallet TEXT NOT NULL,
+    derived_at REAL NOT NULL,
+    issued_at REAL
+);
+CREATE INDEX IF NOT EXISTS addresses_available
+    ON addresses (wallet, issued_at);
+CREATE TABLE IF NOT EXISTS address_refills (
+    wallet TEXT PRIMARY KEY,
+    worker INTEGER NOT NULL,
+    until REAL NOT NULL
+);
+"""
+
+
+class AddressPool():
+    """
+    Per-wallet pools of unused addresses, shared by the workers trough
+    SQLite. Each address is claimed once, along with the moment it was
+    issued, so none is handed out twice even across restarts. A background
+    task derives new ones in batches whenever a pool goes under the
+    low-water mark, one worker at a time per wallet, so `target` holds for
+    the whole API rather than for each worker.
+
+    Attributes
+    ----------
+    _registry: WalletRegistry
+        Registry giving loaded handles of the wallets.
+    _database: sqlite3.Connection
+        Storage of derived and issued addresses.
+    _target: int
+        Number of unused addresses kept per wallet.
+    _low_water: int
+        Size under which a pool gets refilled.
+    _watched: set[str]
+        Wallets this worker keeps refilled.
+    _wake: asyncio.Event | None
+        Set when a pool needs a refill.
+    _task: asyncio.Task | None
+        Running refill loop.
+    """
+
+    _registry: WalletRegistry
+    _database: sqlite3.Connection
+    _target: int
+    _low_water: int
+    _watched: Set[str]
+    _lock: threading.Lock
+    _wake: Optional[asyncio.Event]
+    _task: Optional[asyncio.Task]
+
+    def __init__(self, registry: WalletRegistry,
+                 database: sqlite3.Connection,
+                 target: int = DEFAULT_POOL_TARGET,
+                 low_water: int = DEFAULT_LOW_WATER) -> None:
+        """
+        Constructor for AddressPool class.
+
+        Parameters
+        ----------
+        registry: WalletRegistry
+            Registry giving loaded handles of the wallets.
+        database: sqlite3.Connection
+            Connection opened with `SCHEMA`.
+        target: int, default = 20
+            Number of unused addresses kept per wallet.
+        low_water: int, default = 5
+            Size under which a pool gets refilled.
+        """
+        if not 0 <= low_water < target:
+            raise ValueError("Provide a low-water mark lower than the target")
+        self._registry = registry
+        self._database = database
+        self._target = target
+        self._low_water = low_water
+        self._watched = set()
+        self._lock = threading.Lock()
+        self._wake = None
+        self._task = None
+
+    def available(self, name: str) -> int:
+        """
+        Number of unused addresses ready for a wallet.
+        """
+        with self._lock:
+            return self._database.execute(
+                "SELECT COUNT(*) FROM addresses WHERE wallet = ? "
+                "AND issued_at IS NULL", (name,)).fetchone()[0]
+
+    def watch(self, name: str) -> None:
+        """
+        Start keeping addresses for a wallet.
+
+        Parameters
+        ----------
+        name: str
+            Name of the wallet at the node level.
+        """
+        if name not in self._watched:
+            self._watched.add(name)
+            self._request_refill(0)
+
+    def _request_refill(self, available: int) -> None:
+        if available < self._low_water and self._wake is not None:
+            self._wake.set()
+
+    def _claim(self, name: str) -> Tuple[Optional[str], int]:
+        """
+        Mark the oldest unused address of a wallet as issued.
+
+        Returns
+        -------
+        tuple[str | None, int]
+            The address, `None` if there's none, and how many are left.
+        """
+        with self._lock, self._database:
+            # Takes the write lock first, so two workers can't claim the same.
+            self._database.execute("BEGIN IMMEDIATE")
+            rows = self._database.execute(
+                "SELECT address FROM addresses WHERE wallet = ? "
+                "AND issued_at IS NULL ORDER BY derived_at",
+                (name,)).fetchall()
+            if not rows:
+                return None, 0
+            self._database.execute(
+                "UPDATE addresses SET issued_at = ? WHERE address = ?",
+                (time.time(), rows[0][0]))
+        return rows[0][0], len(rows) - 1
+
+    def _store(self, name: str, addresses: List[str],
+               issued: bool) -> None:
+        now = time.time()
+        with self._lock, self._database:
+            self._database.executemany(
+                "INSERT OR IGNORE INTO addresses VALUES (?, ?, ?, ?)",
+                [(address, name, now, now if issued else None)
+                 for address in addresses])
+
+    def _lease(self, name: str) -> bool:
+        """
+        Take the refill of a wallet, unless another worker has it.
+        """
+        now = time.time()
+        with self._lock, self._database:
+            self._database.execute("BEGIN IMMEDIATE")
+            row = self._database.execute(
+                "SELECT until FROM address_refills WHERE wallet = ?",
+                (name,)).fetchone()
+            if row is not None and row[0] > now:
+                return False
+            self._database.execute(
+                "INSERT OR REPLACE INTO address_refills VALUES (?, ?, ?)",
+                (name, os.getpid(), now + REFILL_LEASE))
+        return True
+
+    def _release(self, name: str) -> None:
+        with self._lock, self._database:
+            self._database.execute(
+                "DELETE FROM address_refills WHERE wallet = ? AND worker = ?",
+                (name, os.getpid()))
+
+    async def take(self, name: str) -> str:
+        """
+        Hand out an address that was never issued before. Only asks the node
+        when the pool of the wallet is empty.
+
+        Parameters
+        ----------
+        name: str
+            Name of the wallet at the node level.
+
+        Returns
+        -------
+        str
+        """
+        self.watch(name)
+        loop = asyncio.get_running_loop()
+        address, available = await loop.run_in_executor(None, self._claim,
+                                                        name)
+        self._request_refill(available)
+        if address is not None:
+            return address
+        wallet = await self._registry.get(name)
+        address = await wallet.proxy.getnewaddress()
+        await loop.run_in_executor(None, self._store, name, [address], True)
+        return address
+
+    async def refill(self, name: str) -> int:
+        """
+        Derive the addresses a wallet is missing, in a single batch. Nothing
+        is derived while another worker refills the same wallet.
+
+        Parameters
+        ----------
+        name: str
+            Name of the wallet at the node level.
+
+        Returns
+        -------
+        int
+            Number of derived addresses.
+        """
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, self._lease, name):
+            return 0
+        try:
+            missing = self._target - \
+                await loop.run_in_executor(None, self.available, name)
+            if missing <= 0:
+                return 0
+            wallet = await self._registry.get(name)
+            responses = await wallet.proxy.batch_(
+                [["getnewaddress"]] * missing)
+            derived = [response['result'] for response in responses
+                       if response.get('error') is None]
+            await loop.run_in_executor(None, self._store, name, derived,
+                                       False)
+        finally:
+            await loop.run_in_executor(None, self._release, name)
+        if len(derived) < missing:
+            logging.error(f"Derived {len(derived)} of {missing} addresses \
+                for wallet '{name}'\n")
+        return len(derived)
+
+    async def _run(self) -> None:
+        """
+        Refill loop, woken up by `take` or every `REFILL_INTERVAL`.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), REFILL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            for name in list(self._watched):
+                try:
+                    if await loop.run_in_executor(None, self.available,
+                                                  name) >= self._low_water:
+                        continue
+                    await self.refill(name)
+                except Exception as general_exception:
+                    logging.error(f"Could not refill addresses of wallet \
+                        '{name}': {general_exception}\n")
+
+    def start(self) -> None:
+        """
+        Start refilling in the running event loop.
+        """
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._wake.set()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop refilling. Unused addresses stay stored for the next start.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wake = None
+
+
+_ADDRESS_POOL: Optional[AddressPool] = None
+
+
+def get_address_pool() -> AddressPool:
+    """
+    FastAPI dependency returning the process-wide address pool, created on
+    first use with `address_pool_target` and `address_pool_low_water` from
+    .env file. Wallets listed in `address_pool_wallets`, separated by
+    commas, are filled from the start.
+
+    Returns
+    -------
+    AddressPool
+    """
+    global _ADDRESS_POOL
+    if _ADDRESS_POOL is None:
+        _ADDRESS_POOL = AddressPool(
+            get_wallet_registry(),
+            open_database(database_path('addresses'), SCHEMA),
+            int(get_optional_config('address_pool_target',
+                                    str(DEFAULT_POOL_TARGET))),
+            int(get_optional_config('address_pool_low_water',
+                                    str(DEFAULT_LOW_WATER))))
+        for name in get_optional_config('address_pool_wallets', '').split(','):
+            if name.strip():
+                _ADDRESS_POOL.watch(name.strip())
+    return _ADDRESS_POOL
@@ -0,0 +1,372 @@
+"""
+Admission control of the RPC calls sent to a node. elementsd serves calls
+with a fixed set of threads and a bounded work queue, so calls over capacity
+are refused. The number of calls in flight adapts to the observed latency
+(additive increase, multiplicative decrease), calls over the limit wait in a
+bounded queue by priority, and the rest are turned down right away with a
+`NodeSaturated` error telling when to retry.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, List, Optional
+
+from pyliquid.utils.exceptions import NodeSaturated
+from pyliquid.utils.metrics import record_rpc_rejected
+from pyliquid.utils.misc import get_optional_config
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+PRIORITIES = (PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW)
+
+# Calls moving funds or creating assets, served before anything else.
+HIGH_PRIORITY_METHODS = frozenset({
+    'sendtoaddress', 'sendmany', 'issueasset', 'reissueasset',
+    'destroyamount', 'sendrawtransaction', 'walletpassphrase',
+})
+
+# Calls creating addresses are part of sends and issuances, not dashboards.
+NORMAL_PRIORITY_METHODS = frozenset({'getnewaddress', 'getrawchangeaddress'})
+
+DEFAULT_QUEUE_SIZE = 128
+DEFAULT_QUEUE_TIMEOUT = 5.0
+DEFAULT_LATENCY_TOLERANCE = 2.0
+DEFAULT_BACKOFF = 0.5
+MAX_RETRY_AFTER = 60
+
+# Latencies under this are never taken as a sign of overload.
+LATENCY_FLOOR = 0.005
+# Weight of every new sample in the baselines and the average latency.
+SMOOTHING = 0.05
+
+
+def method_priority(method: str) -> int:
+    """
+    Priority of a RPC method. Sends and issuances come first, and the reads
+    behind dashboards (`get*` and `list*`) last.
+
+    Parameters
+    ----------
+    method: str
+        Name of the RPC method, `batch` for batches.
+
+    Returns
+    -------
+    int
+        One of `PRIORITIES`, lower goes first.
+    """
+    if method in HIGH_PRIORITY_METHODS:
+        return PRIORITY_HIGH
+    elif method in NORMAL_PRIORITY_METHODS:
+        return PRIORITY_NORMAL
+    elif method.startswith(('get', 'list')):
+        return PRIORITY_LOW
+    return PRIORITY_NORMAL
+
+
+class AdmissionController():
+    """
+    Adaptive limit of the calls in flight to a node, to be used from a
+    single event loop.
+
+    The limit grows by one every time a full window of calls is served in
+    time, and is cut by `backoff` at most once per round trip when a call is
+    slower than `tolerance` times the usual latency of its method, times out
+    or is refused by the node.
+
+    Attributes
+    ----------
+    _limit: float
+        Current limit of calls in flight.
+    _min_limit: int
+        Limit never gone under.
+    _max_limit: int
+        Limit never gone over, like the connections of the pool.
+    _max_queued: int
+        Calls allowed to wait, over which new ones are refused.
+    _queue_timeout: float
+        Seconds a call waits before being refused.
+    _tolerance: float
+        Times the usual latency of a method taken as overload.
+    _backoff: float
+        Factor applied to the limit on overload.
+    _in_flight: int
+        Calls being sent.
+    _queues: list[deque[asyncio.Future]]
+        Waiting calls, by priority.
+    _baselines: dict[str, float]
+        Usual latency of every method.
+    _latency: float
+        Average latency of every call.
+    """
+
+    _limit: float
+    _min_limit: int
+    _max_limit: int
+    _max_queued: int
+    _queue_timeout: float
+    _tolerance: float
+    _backoff: float
+    _in_flight: int
+    _queues: List[Deque[asyncio.Future]]
+    _baselines: Dict[str, float]
+    _latency: float
+    _last_decrease: float
+
+    def __init__(self, max_limit: int, min_limit: int = 1,
+                 initial_limit: Optional[int] = None,
+                 max_queued: int = DEFAULT_QUEUE_SIZE,
+                 queue_timeout: float = DEFAULT_QUEUE_TIMEOUT,
+                 tolerance: float = DEFAULT_LATENCY_TOLERANCE,
+                 backoff: float = DEFAULT_BACKOFF) -> None:
+        """
+        Constructor for AdmissionController class.
+
+        Parameters
+        ----------
+        max_limit: int
+            Limit never gone over, like the connections of the pool.
+        min_limit: int, default = 1
+            Limit never gone under.
+        initial_limit: int | None, default = None
+            Limit to start with, `max_limit` if `None`.
+        max_queued: int, default = 128
+            Calls allowed to wait, over which new ones are refused.
+        queue_timeout: float, default = 5.0
+            Seconds a call waits before being refused.
+        tolerance: float, default = 2.0
+            Times the usual latency of a method taken as overload.
+        backoff: float, default = 0.5
+            Factor applied to the limit on overload.
+        """
+        if not 0 < min_limit <= max_limit:
+            raise ValueError("Provide limits with 0 < min_limit <= max_limit")
+        if not 0 < backoff < 1:
+            raise ValueError("Provide a backoff between 0 and 1")
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._limit = float(min(max(initial_limit or max_limit, min_limit),
+                                max_limit))
+        self._max_queued = max_queued
+        self._queue_timeout = queue_timeout
+        self._tolerance = tolerance
+        self._backoff = backoff
+        self._in_flight = 0
+        self._queues = [deque() for _ in PRIORITIES]
+        self._baselines = {}
+        self._latency = 0.0
+        self._last_decrease = 0.0
+
+    @classmethod
+    def from_configs(cls, max_limit: int) -> Optional["AdmissionController"]:
+        """
+        Build a controller using the parameters from .env file, `None` if
+        `rpc_admission` is disabled.
+
+        Parameters
+        ----------
+        max_limit: int
+            Limit never gone over, like the connections of the pool.
+
+        Returns
+        -------
+        AdmissionController | None
+        """
+        if get_optional_config('rpc_admission', '1') != '1':
+            return None
+        return cls(max_limit,
+                   max_queued=int(get_optional_config(
+                       'rpc_queue_size', str(DEFAULT_QUEUE_SIZE))),
+                   queue_timeout=float(get_optional_config(
+                       'rpc_queue_timeout', str(DEFAULT_QUEUE_TIMEOUT))),
+                   tolerance=float(get_optional_config(
+                       'rpc_latency_tolerance',
+                       str(DEFAULT_LATENCY_TOLERANCE))))
+
+    @property
+    def limit(self) -> int:
+        """
+        Calls allowed in flight right now.
+        """
+        return max(int(self._limit), self._min_limit)
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Getter method for `in_flight` attribute.
+        """
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        """
+        Calls waiting for their turn.
+        """
+        return sum(len(queue) for queue in self._queues)
+
+    @property
+    def retry_after(self) -> int:
+        """
+        Seconds after which a refused call is worth retrying, from the time
+        the queue takes to drain.
+        """
+        drain = self._latency * (self.queued + 1) / self.limit
+        return min(max(math.ceil(drain), 1), MAX_RETRY_AFTER)
+
+    def status(self) -> dict:
+        """
+        Limit, calls in flight and waiting calls by priority.
+        """
+        return {'limit': self.limit, 'in_flight': self._in_flight,
+                'queued': [len(queue) for queue in self._queues],
+                'latency': self._latency}
+
+    def _refuse(self, priority: int, reason: str) -> NodeSaturated:
+        record_rpc_rejected(priority)
+        return NodeSaturated(reason, self.retry_after)
+
+    def _has_turn(self, priority: int) -> bool:
+        return self._in_flight < self.limit and \
+            not any(self._queues[level] for level in range(priority + 1))
+
+    def _make_room(self, priority: int) -> bool:
+        """
+        Refuse the newest waiting call of a lower priority, if any.
+        """
+        for level in reversed(PRIORITIES[priority + 1:]):
+            queue = self._queues[level]
+            while queue:
+                waiter = queue.pop()
+                if not waiter.done():
+                    waiter.set_exception(self._refuse(
+                        level, "Refused for calls of a higher priority"))
+                    return True
+        return False
+
+    def _wake(self) -> None:
+        """
+        Give the free slots to the waiting calls, by priority.
+        """
+        for queue in self._queues:
+            while queue and self._in_flight < self.limit:
+                waiter = queue.popleft()
+                if not waiter.done():
+                    self._in_flight += 1
+                    waiter.set_result(None)
+            if queue:
+                return
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL) -> None:
+        """
+        Wait for a slot to send a call.
+
+        Parameters
+        ----------
+        priority: int, default = PRIORITY_NORMAL
+            One of `PRIORITIES`, lower goes first.
+
+        Raises
+        ------
+        NodeSaturated
+            If the queue is full, or the call waited for too long.
+        """
+        if self._has_turn(priority):
+            self._in_flight += 1
+            return
+        if self.queued >= self._max_queued and not self._make_room(priority):
+            raise self._refuse(priority, "Too many RPC calls waiting for the "
+                                         "node")
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues[priority].append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self._queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(priority, waiter)
+            raise self._refuse(priority, "Timed out waiting for the node")
+        except asyncio.CancelledError:
+            self._discard(priority, waiter)
+            if waiter.done() and not waiter.cancelled() and \
+                    waiter.exception() is None:
+                # The slot was given right as the caller gave up.
+                self.release()
+            raise
+
+    def _discard(self, priority: int, waiter: asyncio.Future) -> None:
+        try:
+            self._queues[priority].remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, method: Optional[str] = None,
+                latency: Optional[float] = None,
+                overloaded: bool = False) -> None:
+        """
+        Free the slot of a call, adapting the limit to its outcome.
+
+        Parameters
+        ----------
+        method: str | None, default = None
+            Name of the RPC method, `None` if the call wasn't sent.
+        latency: float | None, default = None
+            Seconds taken by the call, `None` if it wasn't sent.
+        overloaded: bool, default = False
+            If the node refused the call or didn't answer in time.
+        """
+        self._in_flight -= 1
+        if latency is not None and method is not None:
+            baseline = self._baselines.get(method, latency)
+            slow = latency > max(baseline * self._tolerance, LATENCY_FLOOR)
+            # Fast to learn improvements, slow to accept degradations.
+            self._baselines[method] = latency if latency < baseline \
+                else baseline + (latency - baseline) * SMOOTHING
+            if self._latency:
+                self._latency += (latency - self._latency) * SMOOTHING
+            else:
+                self._latency = latency
+            overloaded = overloaded or slow
+        if overloaded:
+            now = time.monotonic()
+            # A single cut per round trip, for the calls sent together.
+            if now - self._last_decrease > (latency or self._latency):
+                self._limit = max(self._limit * self._backoff,
+                                  self._min_limit)
+                self._last_decrease = now
+        elif latency is not None:
+            self._limit = min(self._limit + 1 / self._limit, self._max_limit)
+        self._wake()
+
+    @asynccontextmanager
+    async def admit(self, method: str,
+                    priority: Optional[int] = None) -> AsyncIterator[None]:
+        """
+        Hold a slot while sending a call, see `acquire` and `release`.
+        Timeouts and `NodeSaturated` errors raised inside count as overload.
+
+        Parameters
+        ----------
+        method: str
+            Name of the RPC method.
+        priority: int | None, default = None
+            One of `PRIORITIES`, from `method_priority` if `None`.
+        """
+        await self.acquire(method_priority(method) if priority is None
+                           else priority)
+        started = time.perf_counter()
+        try:
+            yield
+        except asyncio.TimeoutError:
+            self.release(method, time.perf_counter() - started, True)
+            raise
+        except NodeSaturated as saturated:
+            self.release(method, time.perf_counter() - started, True)
+            saturated.retry_after = max(saturated.retry_after,
+                                        self.retry_after)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.release(method, time.perf_counter() - started)
@@ -0,0 +1,123 @@
+"""
+Execution of `Instructions` models as a single JSON-RPC batch, so a set of
+independent commands costs one round trip to the node. Only the methods of
+`BATCH_METHODS` can be sent this way.
+"""
+
+import json
+from typing import List, Optional
+
+from pyliquid.liquid.client import AsyncServiceProxy
+from pyliquid.liquid.nodes import READ_METHODS, WALLET_METHODS
+from pyliquid.liquid.sharding import LISTING_METHODS
+from pyliquid.models.requests import Instructions
+from pyliquid.models.responses import CommandResult
+
+# Reads of a wallet and new addresses, which don't move funds.
+WALLET_READ_METHODS = frozenset({
+    'dumpassetlabels', 'getaddressesbylabel', 'getaddressinfo', 'getbalance',
+    'getbalances', 'getnewaddress', 'getrawchangeaddress',
+    'getreceivedbyaddress', 'gettransaction', 'getwalletinfo',
+    'listissuances', 'listlabels', 'listsinceblock', 'listtransactions',
+    'listunspent',
+})
+
+# Methods that can be sent twice, like when a connection drops before
+# the response, without doing anything twice.
+IDEMPOTENT_METHODS = READ_METHODS | LISTING_METHODS | WALLET_READ_METHODS
+
+# Methods allowed in a batch. Others, like `stop`, `dumpprivkey` or
+# `sendtoaddress`, have their own endpoints or no place in the API.
+BATCH_METHODS = READ_METHODS | LISTING_METHODS | WALLET_METHODS | \
+    WALLET_READ_METHODS
+
+
+class MethodNotAllowed(ValueError):
+    """
+    A batch asked for a method outside `BATCH_METHODS`.
+    """
+
+
+def parse_arguments(arg: Optional[str]) -> list:
+    """
+    Turn the argument string of a command into its list of RPC params.
+
+    Parameters
+    ----------
+    arg: str | None
+        A JSON array is used as the whole list of params, any other JSON
+        value or plain string is used as the only param.
+
+    Returns
+    -------
+    list
+        Positional params for the RPC call.
+    """
+    if arg is None:
+        return []
+    try:
+        value = json.loads(arg)
+    except json.JSONDecodeError:
+        return [arg]
+    return value if isinstance(value, list) else [value]
+
+
+def build_batch(instructions: Instructions) -> List[list]:
+    """
+    Build the RPC calls for a set of instructions, keeping their order.
+
+    Parameters
+    ----------
+    instructions: Instructions
+        Already validated set of commands and arguments.
+
+    Returns
+    -------
+    list[list]
+        Array of arrays like `[["method", params...], ...]`.
+
+    Raises
+    ------
+    MethodNotAllowed
+        If a command is not one of `BATCH_METHODS`.
+    """
+    refused = sorted({cmd for _, cmd in instructions.cmd
+                      if cmd not in BATCH_METHODS})
+    if refused:
+        raise MethodNotAllowed(
+            f"Methods not allowed in a batch: {', '.join(refused)}")
+    arguments = dict(instructions.arg or [])
+    return [[cmd, *parse_arguments(arguments.get(index))]
+            for index, cmd in instructions.cmd]
+
+
+async def execute_instructions(proxy: AsyncServiceProxy,
+                               instructions: Instructions) \
+        -> List[CommandResult]:
+    """
+    Send every command of the instructions to the node in one batch.
+    A failing command is reported in its own result without aborting the
+    rest of the batch.
+
+    Parameters
+    ----------
+    proxy: AsyncServiceProxy
+        Asynchronous Proxy Service to reach the node.
+    instructions: Instructions
+        Already validated set of commands and arguments.
+
+    Returns
+    -------
+    list[CommandResult]
+        Outcome of every command, in the same order as `instructions.cmd`.
+
+    Raises
+    ------
+    MethodNotAllowed
+        If a command is not one of `BATCH_METHODS`, before sending any.
+    """
+    responses = await proxy.batch_(build_batch(instructions))
+    return [CommandResult(index=index, cmd=cmd,
+                          result=response.get('result'),
+                          error=response.get('error'))
+            for (index, cmd), response in zip(instructions.cmd, responses)]
@@ -0,0 +1,237 @@
+"""
+In-memory read-through cache for wallet data that only changes when a wallet
+transaction happens or a new block arrives.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Collection, Dict, Hashable, Optional, Tuple
+
+from pyliquid.utils.misc import get_optional_config
+
+DEFAULT_CACHE_SIZE = 1024
+
+# Seconds each RPC method result is kept. Zero disables caching.
+DEFAULT_TTLS = {
+    'listwalletdir': 10.0,
+    'getwalletinfo': 2.0,
+    'getbalance': 2.0,
+}
+
+# Methods whose results change with transactions entering the mempool, like
+# the unconfirmed balance, and not only with new blocks.
+MEMPOOL_METHODS = frozenset({'getwalletinfo', 'getbalance'})
+
+# Scope for entries that don't belong to any wallet.
+NODE_SCOPE = None
+NODE_METHODS = {'listwalletdir'}
+
+_MISSING = object()
+
+
+class WalletCache():
+    """
+    Thread-safe LRU cache with per-method time to live. Keys are tuples of
+    `(scope, method, args)`, where scope is the wallet name.
+
+    Attributes
+    ----------
+    _max_size: int
+        Maximum number of entries before evicting the least recently used.
+    _ttls: dict[str, float]
+        Time to live in seconds per RPC method.
+    _entries: OrderedDict
+        Values along with their expiration time, least recently used first.
+    _tip: str | None
+        Hash of the latest block seen.
+    """
+
+    _max_size: int
+    _ttls: Dict[str, float]
+    _entries: "OrderedDict[Tuple, Tuple[float, Any]]"
+    _tip: Optional[str]
+    _lock: threading.Lock
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE,
+                 ttls: Optional[Dict[str, float]] = None) -> None:
+        """
+        Constructor for WalletCache class.
+
+        Parameters
+        ----------
+        max_size: int, default = 1024
+            Maximum number of entries.
+        ttls: dict[str, float], default = None
+            Time to live per RPC method. Uses `DEFAULT_TTLS` if `None`.
+        """
+        self._max_size = max_size
+        self._ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self._entries = OrderedDict()
+        self._tip = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_configs(cls) -> "WalletCache":
+        """
+        Build a cache using `cache_size` and `cache_ttl_<method>` from .env
+        file.
+
+        Returns
+        -------
+        WalletCache
+        """
+        ttls = {method: float(get_optional_config(f"cache_ttl_{method}",
+                                                  str(ttl)))
+                for method, ttl in DEFAULT_TTLS.items()}
+        return cls(int(get_optional_config('cache_size',
+                                           str(DEFAULT_CACHE_SIZE))), ttls)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def ttl(self, method: str) -> float:
+        """
+        Time to live for the results of a method, zero if it's not cached.
+        """
+        return self._ttls.get(method, 0.0)
+
+    def get(self, key: Tuple[Optional[str], str, tuple]) -> Any:
+        """
+        Return the cached value for a key.
+
+        Parameters
+        ----------
+        key: tuple
+            Tuple of `(scope, method, args)`.
+
+        Returns
+        -------
+        Any
+            The value, or `_MISSING` when absent or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Tuple[Optional[str], str, tuple], value: Any) -> None:
+        """
+        Store a value with the time to live of its method.
+
+        Parameters
+        ----------
+        key: tuple
+            Tuple of `(scope, method, args)`.
+        value: Any
+            Result of the RPC call.
+        """
+        ttl = self.ttl(key[1])
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, scope: Hashable) -> None:
+        """
+        Drop every entry of a wallet.
+
+        Parameters
+        ----------
+        scope: str | None
+            Name of the wallet, or `NODE_SCOPE` for node level entries like
+            the wallet listings.
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == scope]:
+                del self._entries[key]
+
+    def invalidate_methods(self, methods: Collection[str]) -> None:
+        """
+        Drop every entry of the given methods, for all wallets.
+
+        Parameters
+        ----------
+        methods: Collection[str]
+            Names of the RPC methods.
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k[1] in methods]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """
+        Drop every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def observe_tip(self, block_hash: str) -> None:
+        """
+        Register the latest block hash, dropping every entry if it changed.
+
+        Parameters
+        ----------
+        block_hash: str
+            Hash of the chain tip.
+        """
+        if block_hash != self._tip:
+            self._tip = block_hash
+            self.clear()
+
+
+def cache_key(method: str, wallet_name: Optional[str], args: tuple) \
+        -> Tuple[Optional[str], str, tuple]:
+    """
+    Build the key for the result of a RPC method.
+
+    Parameters
+    ----------
+    method: str
+        Name of the RPC method.
+    wallet_name: str | None
+        Name of the wallet, `None` for the default one.
+    args: tuple
+        Params given to the RPC method.
+
+    Returns
+    -------
+    tuple
+        Tuple of `(scope, method, args)`.
+    """
+    scope = NODE_SCOPE if method in NODE_METHODS else (wallet_name or '')
+    return (scope, method, args)
+
+
+def is_missing(value: Any) -> bool:
+    """
+    Check if a value returned by `WalletCache.get` was a cache miss.
+    """
+    return value is _MISSING
+
+
+_CACHE: Optional[WalletCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_wallet_cache() -> WalletCache:
+    """
+    Return the process-wide wallet cache, creating it on first use.
+
+    Returns
+    -------
+    WalletCache
+    """
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = WalletCache.from_configs()
+        return _CACHE
@@ -0,0 +1,525 @@
+"""
+Capture of the RPC traffic with the node, to be replayed offline. When
+`rpc_capture` is set in .env file, every request and response body is
+appended to that file with its timing. A recording can then answer the API
+in place of the node, trough a `LoopbackTransport`, or have its requests sent
+again to a node, at their original pace or faster.
+
+Recordings start with `MAGIC`, followed by one record per call: a `RECORD`
+header with the wall time the call started, its duration in seconds and the
+lengths of the URL path, request and response, then those three as bytes.
+Each record is written with a single append, so the workers of a server can
+share the same file. Params and results of `SENSITIVE_METHODS`, which carry
+keys or passphrases, are left out of the recording.
+
+Summarize a recording with `python -m pyliquid.liquid.capture summary <path>`,
+or send its requests to the node of .env file with `replay` instead. Writes
+are sent too, so only replay against a regtest or mock node.
+"""
+
+import argparse
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import re
+import struct
+import threading
+import time
+from collections import defaultdict, deque
+from decimal import Decimal
+from typing import (Any, Deque, Dict, Hashable, Iterable, Iterator, List,
+                    NamedTuple, Optional, Tuple)
+
+from bitcoinrpc.authproxy import EncodeDecimal  # type: ignore
+from pyliquid.utils.misc import get_optional_config
+
+MAGIC = b"PLRPCAP1"
+RECORD = struct.Struct(">dfHII")
+
+# Code answered for requests missing from a recording.
+NOT_RECORDED_CODE = -32601
+
+# Methods whose params or results hold keys, seeds or passphrases. Their
+# calls are recorded without them.
+SENSITIVE_METHODS = frozenset({
+    'createwallet', 'dumpblindingkey', 'dumpissuanceblindingkey',
+    'dumpmasterblindingkey', 'dumpprivkey', 'dumpwallet', 'encryptwallet',
+    'importblindingkey', 'importdescriptors', 'importissuanceblindingkey',
+    'importmasterblindingkey', 'importprivkey', 'importwallet',
+    'listdescriptors', 'sethdseed', 'signrawtransactionwithkey',
+    'walletpassphrase', 'walletpassphrasechange',
+})
+
+_SENSITIVE = re.compile(rb'"method"\s*:\s*"(?:'
+                        + b'|'.join(method.encode()
+                                    for method in sorted(SENSITIVE_METHODS))
+                        + rb')"')
+
+_TRAILING_ID = re.compile(rb'"id"\s*:\s*(?:-?\d+|null|"[^"]*")\s*}\s*$')
+
+
+class CapturedCall(NamedTuple):
+    """
+    Single request sent to the node, with its response.
+    """
+    started: float
+    duration: float
+    path: str
+    request: bytes
+    response: bytes
+
+    @property
+    def method(self) -> str:
+        """
+        Name of the RPC method, `batch` for batches.
+        """
+        request = json.loads(self.request)
+        return request.get('method', '') if isinstance(request, dict) \
+            else 'batch'
+
+
+class CaptureWriter():
+    """
+    Appends calls to a recording, from any thread of a process.
+
+    Attributes
+    ----------
+    _path: str
+        File of the recording.
+    _fd: int | None
+        Descriptor opened for appending, on first use.
+    """
+
+    _path: str
+    _fd: Optional[int]
+    _lock: threading.Lock
+    _pid: int
+
+    def __init__(self, path: str) -> None:
+        """
+        Constructor for CaptureWriter class.
+
+        Parameters
+        ----------
+        path: str
+            File of the recording, created if needed.
+        """
+        self._path = path
+        self._fd = None
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @property
+    def path(self) -> str:
+        """
+        Getter method for `path` attribute.
+        """
+        return self._path
+
+    @property
+    def pid(self) -> int:
+        """
+        Getter method for the process id that created the writer.
+        """
+        return self._pid
+
+    def _open(self) -> int:
+        fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                     0o600)
+        try:
+            # Held while checking the size, so only the first of the workers
+            # opening a new file writes `MAGIC`.
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size == 0:
+                    os.write(fd, MAGIC)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        except OSError:
+            os.close(fd)
+            raise
+        return fd
+
+    def record(self, path: str, request: bytes, response: bytes,
+               started: float, duration: float) -> None:
+        """
+        Append a call to the recording. Errors are logged, so capturing
+        never breaks the call itself.
+
+        Parameters
+        ----------
+        path: str
+            URL path the request was sent to.
+        request: bytes
+            Body of the request.
+        response: bytes
+            Body of the response.
+        started: float
+            Wall time the call started.
+        duration: float
+            Seconds taken by the call.
+        """
+        if _SENSITIVE.search(request):
+            request, response = _redacted(request, response)
+        encoded = path.encode('utf8')
+        data = RECORD.pack(started, duration, len(encoded), len(request),
+                           len(response)) + encoded + request + response
+        try:
+            with self._lock:
+                if self._fd is None:
+                    self._fd = self._open()
+                os.write(self._fd, data)
+        except OSError as os_error:
+            logging.error(f"Could not capture RPC call: {os_error}\n")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+def _redacted(request: bytes, response: bytes) -> Tuple[bytes, bytes]:
+    """
+    Drop the params and results of the calls to `SENSITIVE_METHODS`, single
+    or in a batch, keeping their method, id and error.
+    """
+    try:
+        calls = json.loads(request)
+        answers = json.loads(response) if response else None
+    except ValueError:
+        # Can't tell what to keep, so nothing is.
+        return b'{}', b'{}'
+    if isinstance(calls, dict):
+        calls, answers = [calls], [answers]
+        single = True
+    else:
+        single = False
+    sensitive = set()
+    for call in calls:
+        if isinstance(call, dict) and call.get('method') in SENSITIVE_METHODS:
+            call['params'] = []
+            sensitive.add(json.dumps(call.get('id')))
+    for answer in answers if isinstance(answers, list) else []:
+        if isinstance(answer, dict) and (
+                single or json.dumps(answer.get('id')) in sensitive):
+            answer['result'] = None
+    if single:
+        return _encode(calls[0]), _encode(answers[0])
+    return _encode(calls), _encode(answers)
+
+
+def read_capture(path: str) -> Iterator[CapturedCall]:
+    """
+    Iterate the calls of a recording, in the order they were appended. A
+    truncated last record, from a process killed while writing, is skipped.
+
+    Parameters
+    ----------
+    path: str
+        File of the recording.
+
+    Returns
+    -------
+    Iterator[CapturedCall]
+
+    Raises
+    ------
+    ValueError
+        If the file is not a recording.
+    """
+    with open(path, 'rb') as source:
+        if source.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"'{path}' is not an RPC capture")
+        while True:
+            header = source.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            started, duration, path_size, request_size, response_size = \
+                RECORD.unpack(header)
+            body = source.read(path_size + request_size + response_size)
+            if len(body) < path_size + request_size + response_size:
+                return
+            yield CapturedCall(started, duration,
+                               body[:path_size].decode('utf8'),
+                               body[path_size:path_size + request_size],
+                               body[path_size + request_size:])
+
+
+def capture_call(path: str, method: str, params: Iterable, output: Any,
+                 error: Optional[dict], started: float,
+                 duration: float) -> None:
+    """
+    Record a call made trough `AuthServiceProxy`, whose bodies aren't
+    reachable, from its decoded request and outcome.
+
+    Parameters
+    ----------
+    path: str
+        URL path of the proxy.
+    method: str
+        Name of the RPC method.
+    params: Iterable
+        Params of the call.
+    output: Any
+        Result of the call, ignored if it failed.
+    error: dict | None
+        JSON-RPC error of the call, if any.
+    started: float
+        Wall time the call started.
+    duration: float
+        Seconds taken by the call.
+    """
+    writer = get_capture()
+    if writer is None:
+        return
+    request = {'method': method, 'params': list(params)}
+    response = {'result': None if error else output, 'error': error}
+    try:
+        writer.record(path, _encode(request), _encode(response), started,
+                      duration)
+    except TypeError as type_error:
+        logging.error(f"Could not capture RPC call: {type_error}\n")
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, default=EncodeDecimal,
+                      separators=(',', ':')).encode('utf8')
+
+
+def _request_key(path: str, request: dict) -> Hashable:
+    return (path, request.get('method'),
+            json.dumps(request.get('params') or [], sort_keys=True,
+                       default=str))
+
+
+def _with_id(response: bytes, request_id: Any) -> bytes:
+    """
+    Give a recorded response the id of the request it now answers.
+    """
+    value = json.dumps(request_id).encode('utf8')
+    replaced, count = _TRAILING_ID.subn(b'"id":' + value + b'}', response,
+                                        count=1)
+    if count:
+        return replaced
+    decoded = json.loads(response, parse_float=Decimal)
+    decoded['id'] = request_id
+    return _encode(decoded)
+
+
+class ReplayHandler():
+    """
+    Handler for `LoopbackTransport` answering from a recording. Requests are
+    matched by path, method and params, falling back to the same method on
+    the same path, and every match is answered in turn. Each answer waits
+    the recorded duration divided by `speed`.
+
+    Attributes
+    ----------
+    _exact: dict[Hashable, deque[CapturedCall]]
+        Recorded single calls by path, method and params.
+    _by_method: dict[tuple[str, str], deque[CapturedCall]]
+        Recorded single calls by path and method.
+    _speed: float
+        Acceleration of the recorded timings, 0 to not wait at all.
+    """
+
+    _exact: Dict[Hashable, Deque[CapturedCall]]
+    _by_method: Dict[Tuple[str, str], Deque[CapturedCall]]
+    _speed: float
+
+    def __init__(self, calls: Iterable[CapturedCall],
+                 speed: float = 1.0) -> None:
+        """
+        Constructor for ReplayHandler class.
+
+        Parameters
+        ----------
+        calls: Iterable[CapturedCall]
+            Recorded calls, like from `read_capture`.
+        speed: float, default = 1.0
+            Acceleration of the recorded timings, 0 to not wait at all.
+        """
+        if speed < 0:
+            raise ValueError("Provide a replay speed of 0 or higher")
+        self._exact = defaultdict(deque)
+        self._by_method = defaultdict(deque)
+        self._speed = speed
+        for call in calls:
+            # Parsed like the requests to be answered, to match their params.
+            request = json.loads(call.request, parse_float=Decimal)
+            if isinstance(request, list):
+                # Batches are answered item by item.
+                responses = {item.get('id'): item
+                             for item in json.loads(call.response,
+                                                    parse_float=Decimal)}
+                for item in request:
+                    self._add(CapturedCall(
+                        call.started, call.duration / max(len(request), 1),
+                        call.path, _encode(item),
+                        _encode(responses.get(item.get('id'), {}))), item)
+            else:
+                self._add(call, request)
+
+    def _add(self, call: CapturedCall, request: dict) -> None:
+        self._exact[_request_key(call.path, request)].append(call)
+        self._by_method[(call.path, request.get('method'))].append(call)
+
+    def _take(self, path: str, request: dict) -> Optional[CapturedCall]:
+        for calls in (self._exact.get(_request_key(path, request)),
+                      self._by_method.get((path, request.get('method')))):
+            if calls:
+                call = calls[0]
+                # Answered in turn, the last one repeats once exhausted.
+                calls.rotate(-1)
+                return call
+        return None
+
+    def _answer(self, path: str, request: dict) \
+            -> Tuple[Optional[CapturedCall], bytes]:
+        call = self._take(path, request)
+        if call is None:
+            return None, _encode({
+                'result': None, 'id': request.get('id'),
+                'error': {'code': NOT_RECORDED_CODE,
+                          'message': f"No recorded call of "
+                                     f"'{request.get('method')}'"}})
+        return call, _with_id(call.response, request.get('id'))
+
+    async def __call__(self, path: str, request: Any) -> bytes:
+        if isinstance(request, list):
+            answers = [self._answer(path, item) for item in request]
+            delay = sum(call.duration for call, _ in answers if call)
+            body = b'[' + b','.join(answer for _, answer in answers) + b']'
+        else:
+            call, body = self._answer(path, request)
+            delay = call.duration if call else 0.0
+        if self._speed:
+            await asyncio.sleep(delay / self._speed)
+        return body
+
+
+class ReplayedCall(NamedTuple):
+    """
+    Timing of a recorded request sent again.
+    """
+    method: str
+    recorded: float
+    replayed: float
+    error: Optional[str]
+
+
+async def replay_requests(calls: List[CapturedCall], transport,
+                          speed: float = 1.0) -> List[ReplayedCall]:
+    """
+    Send recorded requests again, keeping their original pace, so a traffic
+    shape can be reproduced against a node or a mock.
+
+    Parameters
+    ----------
+    calls: list[CapturedCall]
+        Recorded calls, in the order they started.
+    transport: AsyncConnectionPool | LoopbackTransport
+        Where the requests are sent.
+    speed: float, default = 1.0
+        Acceleration of the original pace, 0 to send them all at once.
+
+    Returns
+    -------
+    list[ReplayedCall]
+        Recorded and replayed duration of every call.
+    """
+    if not calls:
+        return []
+    first = calls[0].started
+    loop = asyncio.get_running_loop()
+    origin = loop.time()
+
+    async def send(call: CapturedCall) -> ReplayedCall:
+        if speed:
+            await asyncio.sleep(max(origin + (call.started - first) / speed
+                                    - loop.time(), 0))
+        started = time.perf_counter()
+        error = None
+        try:
+            await transport.request(call.path, call.request)
+        except Exception as general_exception:
+            error = type(general_exception).__name__
+        return ReplayedCall(call.method, call.duration,
+                            time.perf_counter() - started, error)
+
+    return list(await asyncio.gather(*[send(call) for call in calls]))
+
+
+def summarize(calls: Iterable[Tuple[str, float]]) -> Dict[str, Dict]:
+    """
+    Count and total duration of calls, by method.
+    """
+    summary: Dict[str, Dict] = {}
+    for method, duration in calls:
+        entry = summary.setdefault(method, {'calls': 0, 'seconds': 0.0})
+        entry['calls'] += 1
+        entry['seconds'] += duration
+    return summary
+
+
+_CAPTURE: Optional[CaptureWriter] = None
+_CAPTURE_LOCK = threading.Lock()
+
+
+def get_capture() -> Optional[CaptureWriter]:
+    """
+    Return the process-wide writer of `rpc_capture` from .env file, `None`
+    when capturing is disabled.
+
+    Returns
+    -------
+    CaptureWriter | None
+    """
+    global _CAPTURE
+    path = get_optional_config('rpc_capture', '')
+    if not path:
+        return None
+    writer = _CAPTURE
+    if writer is None or writer.path != path or writer.pid != os.getpid():
+        with _CAPTURE_LOCK:
+            if _CAPTURE is None or _CAPTURE.path != path or \
+                    _CAPTURE.pid != os.getpid():
+                _CAPTURE = CaptureWriter(path)
+            writer = _CAPTURE
+    return writer
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('command', choices=['summary', 'replay'],
+                        help="summarize a recording, or send its requests "
+                             "to the node of .env file again")
+    parser.add_argument('path')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="acceleration of the original pace")
+    args = parser.parse_args(argv)
+    calls = list(read_capture(args.path))
+    if args.command == 'summary':
+        summary = summarize((call.method, call.duration) for call in calls)
+    else:
+        # Imported here since the client records trough this module.
+        from pyliquid.liquid.client import AsyncConnectionPool
+
+        async def replay() -> List[ReplayedCall]:
+            pool = AsyncConnectionPool.from_configs()
+            try:
+                return await replay_requests(calls, pool, args.speed)
+            finally:
+                await pool.close()
+        summary = summarize((call.method, call.replayed)
+                            for call in asyncio.run(replay()))
+    for method, entry in sorted(summary.items(),
+                                key=lambda item: -item[1]['seconds']):
+        print(f"{method:<32}{entry['calls']:>8}{entry['seconds']:>12.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,708 @@
+"""
+Asynchronous JSON-RPC client for the Liquid node. Mirrors the call surface of
+`AuthServiceProxy`, so API endpoints can await node calls without blocking
+the event loop.
+"""
+
+import asyncio
+import base64
+import itertools
+import json
+import os
+import time
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlparse
+
+from bitcoinrpc.authproxy import EncodeDecimal, JSONRPCException  # type: ignore
+from pyliquid.liquid.admission import AdmissionController
+from pyliquid.liquid.capture import get_capture
+from pyliquid.liquid.connection import (DEFAULT_HEALTH_INTERVAL,
+                                        DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT,
+                                        NON_JSON_RESPONSE_CODE,
+                                        get_service_url)
+from pyliquid.liquid.transport import DEFAULT_RETRIES, get_socket_path
+from pyliquid.utils.exceptions import (DEFAULT_RETRY_AFTER,
+                                       HTTP_WORK_QUEUE_EXCEEDED, NodeSaturated)
+from pyliquid.utils.metrics import (record_rpc, record_rpc_bytes,
+                                    record_rpc_error)
+from pyliquid.utils.misc import get_optional_config
+
+USER_AGENT = "PyLiquid2EVM/1.0"
+
+# Errors meaning that the socket of a connection can't be used anymore.
+STREAM_ERRORS = (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError,
+                 asyncio.LimitOverrunError, ValueError)
+
+_REQUEST_IDS = itertools.count(1)
+
+# Start of the responses written by the node, with the result first.
+RESULT_PREFIX = b'{"result":'
+
+
+def _checked_result(response: dict) -> Any:
+    """
+    Return the `result` of a decoded JSON-RPC response, raising its error.
+    """
+    if response.get('error') is not None:
+        raise JSONRPCException(response['error'])
+    elif 'result' not in response:
+        raise JSONRPCException({
+            'code': -343, 'message': 'missing JSON-RPC result'})
+    return response['result']
+
+
+def _member_spans(text: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Start and end offsets of the values of a JSON object, by key.
+    """
+    decoder = json.JSONDecoder()
+    spans = {}
+    index = text.index('{') + 1
+    while True:
+        while text[index] in ' \t\r\n,':
+            index += 1
+        if text[index] == '}':
+            return spans
+        key, index = decoder.raw_decode(text, index)
+        index = text.index(':', index) + 1
+        while text[index] in ' \t\r\n':
+            index += 1
+        _, end = decoder.raw_decode(text, index)
+        spans[key] = (index, end)
+        index = end
+
+
+def raw_result(payload: bytes, request_id: int) -> bytes:
+    """
+    Slice the `result` out of a raw JSON-RPC response without decoding it.
+    The node writes `{"result":...,"error":null,"id":...}`, so successful
+    responses only need their envelope checked; others are parsed to raise
+    their error.
+
+    Parameters
+    ----------
+    payload: bytes
+        Raw body of the response.
+    request_id: int
+        Id of the request.
+
+    Returns
+    -------
+    bytes
+        JSON text of the result.
+
+    Raises
+    ------
+    JSONRPCException
+        If the node answered with an error or without a result.
+    """
+    payload = payload.rstrip()
+    suffix = f',"error":null,"id":{request_id}}}'.encode()
+    if payload.startswith(RESULT_PREFIX) and payload.endswith(suffix):
+        return payload[len(RESULT_PREFIX):-len(suffix)]
+    text = payload.decode('utf8')
+    spans = _member_spans(text)
+    if 'error' in spans and \
+            text[slice(*spans['error'])].strip() != 'null':
+        raise JSONRPCException(json.loads(text[slice(*spans['error'])],
+                                           parse_float=Decimal))
+    elif 'result' not in spans:
+        raise JSONRPCException({
+            'code': -343, 'message': 'missing JSON-RPC result'})
+    return text[slice(*spans['result'])].encode('utf8')
+
+
+def resendable(body: bytes, error: Exception) -> bool:
+    """
+    Tell if a request can be sent again after its connection dropped.
+
+    Parameters
+    ----------
+    body: bytes
+        Serialized JSON-RPC request.
+    error: Exception
+        Error raised while exchanging it.
+
+    Returns
+    -------
+    bool
+        True if the request never reached the node, or if it's a single
+        call to a method that doesn't change anything.
+    """
+    from pyliquid.liquid.batch import IDEMPOTENT_METHODS
+    if isinstance(error, BrokenPipeError):
+        # Raised while writing, so no response was read and the node
+        # never got the whole request.
+        return True
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return False
+    return isinstance(data, dict) and data.get('method') in IDEMPOTENT_METHODS
+
+
+class _Connection():
+    """
+    Single HTTP/1.1 connection to the node.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.last_used = time.monotonic()
+        self.reused = False
+
+    def is_stale(self, health_interval: float) -> bool:
+        """
+        Check if the node closed the connection or it was idle for too long.
+        """
+        return self.reader.at_eof() or self.writer.is_closing() or \
+            time.monotonic() - self.last_used > health_interval
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+    """
+    Read a body sent with `Transfer-Encoding: chunked`.
+    """
+    chunks = []
+    while True:
+        size = int((await reader.readline()).split(b';')[0].strip(), 16)
+        if size == 0:
+            # Skip trailers until the final empty line.
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            return b''.join(chunks)
+        chunks.append(await reader.readexactly(size))
+        await reader.readexactly(2)
+
+
+class AsyncConnectionPool():
+    """
+    Pool of persistent HTTP/1.1 connections to the node RPC interface, to be
+    used from a single event loop. Connections are made over TCP, or over a
+    Unix socket forwarding to the node when `socket_path` is given.
+
+    Attributes
+    ----------
+    _host: str
+        Host where the node is listening.
+    _port: int
+        RPC port of the node.
+    _socket_path: str | None
+        Unix socket used instead of `_host` and `_port`.
+    _auth_header: str
+        Basic authentication header built from the URL credentials.
+    _size: int
+        Maximum number of simultaneous connections.
+    _timeout: float
+        Timeout in seconds for every request.
+    _health_interval: float
+        Seconds a connection can stay idle before being recycled.
+    _retries: int
+        Times a request is sent again on a new connection, when a reused one
+        turns out to be closed by the node.
+    _admission: AdmissionController | None
+        Adaptive limit of the calls in flight, in front of the connections.
+    _idle: list[_Connection]
+        Connections ready to be used, most recent last.
+    """
+
+    _host: str
+    _port: int
+    _socket_path: Optional[str]
+    _auth_header: str
+    _size: int
+    _timeout: float
+    _health_interval: float
+    _retries: int
+    _admission: Optional[AdmissionController]
+    _idle: List[_Connection]
+    _slots: Optional[asyncio.Semaphore]
+    _pid: int
+
+    def __init__(self, service_url: str,
+                 size: int = DEFAULT_POOL_SIZE,
+                 timeout: float = DEFAULT_TIMEOUT,
+                 health_interval: float = DEFAULT_HEALTH_INTERVAL,
+                 socket_path: Optional[str] = None,
+                 retries: int = DEFAULT_RETRIES,
+                 admission: Optional[AdmissionController] = None) -> None:
+        """
+        Constructor for AsyncConnectionPool class.
+
+        Parameters
+        ----------
+        service_url: str
+            Authenticated URL of the node.
+        size: int, default = 8
+            Maximum number of simultaneous connections.
+        timeout: float, default = 30
+            Timeout in seconds for every request.
+        health_interval: float, default = 10.0
+            Seconds a connection can stay idle before being recycled.
+            Should be lower than the `rpcservertimeout` of the node.
+        socket_path: str | None, default = None
+            Unix socket forwarding to the node, used instead of the host and
+            port of the URL.
+        retries: int, default = 1
+            Times a request is sent again on a new connection, when a reused
+            one turns out to be closed by the node. Only reads are sent
+            again, unless writing the request already failed.
+        admission: AdmissionController | None, default = None
+            Adaptive limit of the calls in flight, none if `None`.
+        """
+        if size <= 0:
+            raise ValueError("Provide a pool size higher than 0")
+        url = urlparse(service_url)
+        self._host = url.hostname or '127.0.0.1'
+        self._port = url.port or 80
+        self._socket_path = socket_path
+        _cred = f"{url.username}:{url.password}".encode('utf8')
+        self._auth_header = f"Basic {base64.b64encode(_cred).decode()}"
+        self._size = size
+        self._timeout = timeout
+        self._health_interval = health_interval
+        self._retries = retries
+        self._admission = admission
+        self._idle = []
+        # Created on first use so it binds to the running event loop.
+        self._slots = None
+        self._pid = os.getpid()
+
+    @classmethod
+    def from_configs(cls, service_url: Optional[str] = None) \
+            -> "AsyncConnectionPool":
+        """
+        Build a pool using the parameters from .env file.
+
+        Parameters
+        ----------
+        service_url: str | None, default = None
+            Authenticated URL of the node, the one from .env file if `None`.
+            Only the node from .env file is reached trough `rpc_socket`.
+
+        Returns
+        -------
+        AsyncConnectionPool
+        """
+        size = int(get_optional_config('rpc_pool_size',
+                                       str(DEFAULT_POOL_SIZE)))
+        return cls(service_url or get_service_url(),
+                   size=size,
+                   timeout=float(get_optional_config('rpc_timeout',
+                                                     str(DEFAULT_TIMEOUT))),
+                   health_interval=float(get_optional_config(
+                       'rpc_health_interval', str(DEFAULT_HEALTH_INTERVAL))),
+                   socket_path=None if service_url else get_socket_path(),
+                   retries=int(get_optional_config('rpc_retries',
+                                                   str(DEFAULT_RETRIES))),
+                   admission=AdmissionController.from_configs(size))
+
+    @property
+    def pid(self) -> int:
+        """
+        Getter method for the process id that created the pool.
+        """
+        return self._pid
+
+    @property
+    def admission(self) -> Optional[AdmissionController]:
+        """
+        Getter method for `admission` attribute.
+        """
+        return self._admission
+
+    @property
+    def proxy(self) -> "AsyncServiceProxy":
+        """
+        Proxy object sending its calls trough this pool.
+        """
+        return AsyncServiceProxy(self)
+
+    async def _open(self) -> _Connection:
+        """
+        Open a new connection to the node.
+        """
+        if self._socket_path is not None:
+            reader, writer = await asyncio.open_unix_connection(
+                self._socket_path)
+        else:
+            reader, writer = await asyncio.open_connection(self._host,
+                                                           self._port)
+        return _Connection(reader, writer)
+
+    async def _acquire(self) -> _Connection:
+        """
+        Wait for a free slot and return an usable connection.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._size)
+        await self._slots.acquire()
+        try:
+            while self._idle:
+                conn = self._idle.pop()
+                if not conn.is_stale(self._health_interval):
+                    return conn
+                conn.close()
+            return await self._open()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, conn: _Connection, reusable: bool) -> None:
+        """
+        Give back a connection, closing it if it can't be reused.
+        """
+        if reusable:
+            conn.last_used = time.monotonic()
+            conn.reused = True
+            self._idle.append(conn)
+        else:
+            conn.close()
+        if self._slots is not None:
+            self._slots.release()
+
+    async def _exchange(self, conn: _Connection, path: str, body: bytes) \
+            -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Send a POST request and read the whole response.
+        """
+        head = (f"POST {path} HTTP/1.1\r\n"
+                f"Host: {self._host}\r\n"
+                f"User-Agent: {USER_AGENT}\r\n"
+                f"Authorization: {self._auth_header}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n")
+        conn.writer.write(head.encode('latin-1') + body)
+        await conn.writer.drain()
+
+        status_line = await conn.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Node closed the connection")
+        status = int(status_line.split(b' ', 2)[1])
+        headers = {}
+        while True:
+            line = await conn.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            payload = await _read_chunked(conn.reader)
+        elif 'content-length' in headers:
+            payload = await conn.reader.readexactly(
+                int(headers['content-length']))
+        else:
+            # Body is delimited by the end of the connection.
+            headers['connection'] = 'close'
+            payload = await conn.reader.read()
+        return status, headers, payload
+
+    async def request(self, path: str, body: bytes) \
+            -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Send a JSON-RPC request body trough a pooled connection.
+
+        Parameters
+        ----------
+        path: str
+            URL path of the endpoint, like `/` or `/wallet/<name>`.
+        body: bytes
+            Already serialized JSON-RPC request.
+
+        Returns
+        -------
+        tuple[int, dict[str, str], bytes]
+            Status code, lowercase headers and raw body of the response.
+        """
+        attempt = 0
+        while True:
+            conn = await self._acquire()
+            reusable = False
+            try:
+                status, headers, payload = await asyncio.wait_for(
+                    self._exchange(conn, path, body), self._timeout)
+                reusable = headers.get('connection', '').lower() != 'close'
+                return status, headers, payload
+            except (ConnectionResetError, BrokenPipeError,
+                    asyncio.IncompleteReadError) as error:
+                # The node may close idle connections right as they are
+                # reused, a new one gets the request instead.
+                if not conn.reused or attempt >= self._retries \
+                        or not resendable(body, error):
+                    raise
+                attempt += 1
+            finally:
+                self._release(conn, reusable)
+
+    async def close(self) -> None:
+        """
+        Close every idle connection of the pool.
+        """
+        while self._idle:
+            conn = self._idle.pop()
+            conn.close()
+            try:
+                await conn.writer.wait_closed()
+            except STREAM_ERRORS:
+                pass
+
+
+class AsyncServiceProxy():
+    """
+    Asynchronous replacement for `AuthServiceProxy`. Every attribute is a
+    remote method that must be awaited, like `await proxy.getwalletinfo()`.
+
+    Attributes
+    ----------
+    _pool: AsyncConnectionPool
+        Pool used to reach the node, or any transport with the same
+        `request` method like `LoopbackTransport`.
+    _service_name: str
+        Name of the RPC method to be called.
+    _path: str
+        URL path for the calls, `/wallet/<name>` for wallet-scoped ones.
+    """
+
+    _pool: AsyncConnectionPool
+    _service_name: Optional[str]
+    _path: str
+
+    def __init__(self, pool: AsyncConnectionPool,
+                 service_name: Optional[str] = None,
+                 path: str = '/') -> None:
+        """
+        Constructor for AsyncServiceProxy class.
+
+        Parameters
+        ----------
+        pool: AsyncConnectionPool
+            Pool used to reach the node.
+        service_name: str, default = None
+            Name of the RPC method to be called.
+        path: str, default = '/'
+            URL path for the calls.
+        """
+        self._pool = pool
+        self._service_name = service_name
+        self._path = path
+
+    @property
+    def service_name(self) -> Optional[str]:
+        """
+        Getter method for `service_name` attribute.
+        """
+        return self._service_name
+
+    @property
+    def path(self) -> str:
+        """
+        Getter method for `path` attribute.
+        """
+        return self._path
+
+    def for_wallet(self, name: str) -> "AsyncServiceProxy":
+        """
+        Proxy for the wallet-scoped endpoint `/wallet/<name>`, so calls don't
+        depend on which wallet is the default one.
+
+        Parameters
+        ----------
+        name: str
+            Name of a wallet loaded on the node.
+
+        Returns
+        -------
+        AsyncServiceProxy
+        """
+        return AsyncServiceProxy(self._pool, None,
+                                 f"/wallet/{quote(name, safe='')}")
+
+    def __getattr__(self, name: str) -> "AsyncServiceProxy":
+        if name.startswith('__') and name.endswith('__'):
+            # Python internal stuff
+            raise AttributeError(name)
+        if self._service_name is not None:
+            name = f"{self._service_name}.{name}"
+        return AsyncServiceProxy(self._pool, name, self._path)
+
+    async def _send(self, data: Any) -> bytes:
+        """
+        Send a serializable JSON-RPC payload and return its raw response,
+        once admitted by the admission control of the pool if it has one.
+
+        Raises
+        ------
+        NodeSaturated
+            If the call was refused by the admission control, or by the node
+            with a full work queue.
+        """
+        body = json.dumps(data, default=EncodeDecimal).encode('utf8')
+        method = data['method'] if isinstance(data, dict) else 'batch'
+        admission = getattr(self._pool, 'admission', None)
+        if admission is None:
+            return await self._exchange(method, body)
+        async with admission.admit(method):
+            return await self._exchange(method, body)
+
+    async def _exchange(self, method: str, body: bytes) -> bytes:
+        """
+        Send a request body trough the pool and check its response.
+        """
+        started_at = time.time()
+        started = time.perf_counter()
+        try:
+            status, headers, payload = await self._pool.request(self._path,
+                                                                body)
+        except Exception as general_exception:
+            record_rpc(method, time.perf_counter() - started,
+                       type(general_exception).__name__)
+            raise
+        duration = time.perf_counter() - started
+        record_rpc(method, duration)
+        record_rpc_bytes(method, len(body), len(payload))
+        capture = get_capture()
+        if capture is not None:
+            capture.record(self._path, body, payload, started_at, duration)
+        if status == HTTP_WORK_QUEUE_EXCEEDED and \
+                headers.get('content-type') != 'application/json':
+            record_rpc_error(method, NodeSaturated.__name__)
+            raise NodeSaturated("The node work queue is full",
+                                DEFAULT_RETRY_AFTER)
+        if headers.get('content-type') != 'application/json':
+            record_rpc_error(method, NON_JSON_RESPONSE_CODE)
+            raise JSONRPCException({
+                'code': NON_JSON_RESPONSE_CODE,
+                'message': f"non-JSON HTTP response with '{status}' "
+                           "from server"})
+        return payload
+
+    async def _post(self, data: Any) -> Any:
+        """
+        Send a serializable JSON-RPC payload and decode its response.
+        """
+        return json.loads(await self._send(data), parse_float=Decimal)
+
+    def _request(self, args: tuple) -> dict:
+        return {'version': '1.1', 'method': self._service_name,
+                'params': args, 'id': next(_REQUEST_IDS)}
+
+    async def __call__(self, *args) -> Any:
+        response = await self._post(self._request(args))
+        try:
+            return _checked_result(response)
+        except JSONRPCException as json_exception:
+            record_rpc_error(self._service_name, json_exception.code)
+            raise
+
+    async def raw_(self, *args) -> bytes:
+        """
+        Call the method and return its `result` as the raw JSON written by
+        the node, without decoding it, like `await proxy.getblock.raw_(h)`.
+
+        Returns
+        -------
+        bytes
+            JSON text of the result, with amounts as the node wrote them.
+        """
+        data = self._request(args)
+        payload = await self._send(data)
+        try:
+            return raw_result(payload, data['id'])
+        except JSONRPCException as json_exception:
+            record_rpc_error(self._service_name, json_exception.code)
+            raise
+
+    async def batch_(self, rpc_calls: List[list]) -> List[dict]:
+        """
+        Batch RPC call sent in a single HTTP round trip. Unlike
+        `AuthServiceProxy.batch_`, errors from single calls don't raise.
+
+        Parameters
+        ----------
+        rpc_calls: list[list]
+            Array of arrays like `[["method", params...], ...]`.
+
+        Returns
+        -------
+        list[dict]
+            Responses with their `result` and `error`, in the same order as
+            `rpc_calls`.
+        """
+        ids = [next(_REQUEST_IDS) for _ in rpc_calls]
+        data = [{'jsonrpc': '2.0', 'method': call[0],
+                 'params': list(call[1:]), 'id': _id}
+                for call, _id in zip(rpc_calls, ids)]
+        responses = await self._post(data)
+        if not isinstance(responses, list):
+            # The node rejected the whole batch.
+            raise JSONRPCException(responses.get('error') or {
+                'code': -343, 'message': 'missing JSON-RPC result'})
+        by_id = {response.get('id'): response for response in responses}
+        missing = {'result': None, 'error': {
+            'code': -343, 'message': 'missing JSON-RPC result'}}
+        return [by_id.get(_id, missing) for _id in ids]
+
+
+_POOL: Optional[AsyncConnectionPool] = None
+
+
+def get_async_pool() -> AsyncConnectionPool:
+    """
+    Return the process-wide asynchronous connection pool, creating it on
+    first use. When `rpc_nodes` is set in .env file, it's a `NodeRouter`
+    spreading the calls over those nodes instead.
+
+    Returns
+    -------
+    AsyncConnectionPool | NodeRouter
+    """
+    global _POOL
+    if _POOL is None or _POOL.pid != os.getpid():
+        if get_optional_config('rpc_nodes', ''):
+            # Imported here since the router is built on top of this module.
+            from pyliquid.liquid.nodes import NodeRouter
+            _POOL = NodeRouter.from_configs()
+        else:
+            _POOL = AsyncConnectionPool.from_configs()
+    return _POOL
+
+
+def use_transport(transport=None) -> None:
+    """
+    Replace the process-wide pool, like with a `LoopbackTransport` to run
+    without a node. The previous one is not closed.
+
+    Parameters
+    ----------
+    transport: AsyncConnectionPool | LoopbackTransport | None, default = None
+        Transport used from now on, `None` to build it again from .env file
+        on next use.
+    """
+    global _POOL
+    _POOL = transport
+
+
+def get_async_proxy() -> AsyncServiceProxy:
+    """
+    FastAPI dependency returning a proxy backed by the process-wide pool.
+
+    Returns
+    -------
+    AsyncServiceProxy
+    """
+    return get_async_pool().proxy
+
+
+async def close_async_pool() -> None:
+    """
+    Close the process-wide asynchronous pool if it was ever created.
+    """
+    if _POOL is not None:
+        await _POOL.close()
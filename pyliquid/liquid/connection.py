@@ -0,0 +1,385 @@
+"""
+Connection management for the RPC interface of a running Liquid node.
+Keeps a bounded set of persistent (keep-alive) connections per process, so
+requests don't pay for a new TCP connection and authentication every time.
+"""
+
+import http.client
+import os
+import queue
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from bitcoinrpc.authproxy import AuthServiceProxy, JSONRPCException  # type: ignore
+from pyliquid.liquid.transport import UnixHTTPConnection, get_socket_path
+from pyliquid.utils.misc import get_configs, get_optional_config
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_TIMEOUT = 30
+DEFAULT_HEALTH_INTERVAL = 10.0
+
+# Code used by `AuthServiceProxy` for non-JSON HTTP responses. The body of
+# those responses is never read, which leaves the connection unusable.
+NON_JSON_RESPONSE_CODE = -342
+
+# Errors raised by `http.client` when the underlying socket is broken.
+CONNECTION_ERRORS = (http.client.HTTPException, OSError)
+
+
+def get_service_url(auth_dict: Optional[dict] = None,
+                    host: str = '127.0.0.1') -> str:
+    """
+    Build the authenticated URL used to reach the node RPC interface.
+
+    Parameters
+    ----------
+    auth_dict: dict, default = None
+        Set of credentials with `rpc_user`, `rpc_password` and `rpc_port`.
+        If `None`, uses default parameters from .env file.
+    host: str, default = '127.0.0.1'
+        The host where the node is listening.
+
+    Returns
+    -------
+    str
+        Full URL including its credentials.
+    """
+    if not auth_dict:
+        auth_dict = get_configs(['rpc_port', 'rpc_user', 'rpc_password'])
+    _cred = f"{auth_dict['rpc_user']}:{auth_dict['rpc_password']}"
+    return f"http://{_cred}@{host}:{auth_dict['rpc_port']}"
+
+
+def _close_proxy(proxy: AuthServiceProxy) -> None:
+    """
+    Close the HTTP connection held by an `AuthServiceProxy`.
+    The library doesn't expose it, so it's reached trough its mangled name.
+    """
+    conn = getattr(proxy, '_AuthServiceProxy__conn', None)
+    if conn is not None:
+        conn.close()
+
+
+class ConnectionPool():
+    """
+    Thread-safe pool of persistent RPC connections to a Liquid node.
+
+    Attributes
+    ----------
+    _service_url: str
+        Authenticated URL of the node.
+    _size: int
+        Maximum number of connections to keep open.
+    _timeout: int
+        Timeout in seconds for every RPC call.
+    _health_interval: float
+        Seconds a connection can stay idle before being checked on reuse.
+    _socket_path: str | None
+        Unix socket forwarding to the node, used instead of TCP.
+    _idle: queue.LifoQueue
+        Connections ready to be used, along with the time they were released.
+    _created: int
+        Number of connections currently owned by the pool.
+    """
+
+    _service_url: str
+    _size: int
+    _timeout: int
+    _health_interval: float
+    _socket_path: Optional[str]
+    _idle: queue.LifoQueue
+    _created: int
+    _lock: threading.Lock
+    _pid: int
+
+    def __init__(self, service_url: str,
+                 size: int = DEFAULT_POOL_SIZE,
+                 timeout: int = DEFAULT_TIMEOUT,
+                 health_interval: float = DEFAULT_HEALTH_INTERVAL,
+                 socket_path: Optional[str] = None) -> None:
+        """
+        Constructor for ConnectionPool class.
+
+        Parameters
+        ----------
+        service_url: str
+            Authenticated URL of the node.
+        size: int, default = 8
+            Maximum number of connections to keep open.
+        timeout: int, default = 30
+            Timeout in seconds for every RPC call.
+        health_interval: float, default = 10.0
+            Seconds a connection can stay idle before being pinged on reuse.
+            Should be lower than the `rpcservertimeout` of the node.
+        socket_path: str | None, default = None
+            Unix socket forwarding to the node, used instead of TCP.
+        """
+        if size <= 0:
+            raise ValueError("Provide a pool size higher than 0")
+        self._service_url = service_url
+        self._size = size
+        self._timeout = timeout
+        self._health_interval = health_interval
+        self._socket_path = socket_path
+        # LIFO keeps the most recently used connections warm.
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @classmethod
+    def from_configs(cls) -> "ConnectionPool":
+        """
+        Build a pool using the parameters from .env file.
+
+        Returns
+        -------
+        ConnectionPool
+        """
+        return cls(get_service_url(),
+                   size=int(get_optional_config('rpc_pool_size',
+                                                str(DEFAULT_POOL_SIZE))),
+                   timeout=int(get_optional_config('rpc_timeout',
+                                                   str(DEFAULT_TIMEOUT))),
+                   health_interval=float(get_optional_config(
+                       'rpc_health_interval', str(DEFAULT_HEALTH_INTERVAL))),
+                   socket_path=get_socket_path())
+
+    @property
+    def size(self) -> int:
+        """
+        Getter method for `size` attribute.
+        """
+        return self._size
+
+    @property
+    def pid(self) -> int:
+        """
+        Getter method for the process id that created the pool.
+        """
+        return self._pid
+
+    @property
+    def proxy(self) -> "PooledProxy":
+        """
+        Proxy object borrowing connections from this pool on every call.
+        """
+        return PooledProxy(self)
+
+    def _connect(self) -> AuthServiceProxy:
+        """
+        Open a new connection to the node.
+        """
+        connection = None
+        if self._socket_path is not None:
+            connection = UnixHTTPConnection(self._socket_path, self._timeout)
+        return AuthServiceProxy(self._service_url, timeout=self._timeout,
+                                connection=connection)
+
+    def _is_healthy(self, proxy: AuthServiceProxy) -> bool:
+        """
+        Ping the node trough the given connection.
+        """
+        try:
+            proxy.uptime()
+            return True
+        except (JSONRPCException,) + CONNECTION_ERRORS:
+            return False
+
+    def acquire(self, timeout: Optional[float] = None) -> AuthServiceProxy:
+        """
+        Borrow a connection from the pool. Opens a new one while the pool is
+        under its size, else waits for one to be released.
+
+        Parameters
+        ----------
+        timeout: float, default = None
+            Seconds to wait for a connection. Waits forever if `None`.
+
+        Returns
+        -------
+        AuthServiceProxy
+            Connection to be given back with `release`.
+        """
+        try:
+            proxy, last_used = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self._size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                return self._connect()
+            try:
+                proxy, last_used = self._idle.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError("No RPC connection available in pool")
+        if time.monotonic() - last_used > self._health_interval \
+                and not self._is_healthy(proxy):
+            logging.info("Evicting broken RPC connection from pool\n")
+            _close_proxy(proxy)
+            proxy = self._connect()
+        return proxy
+
+    def release(self, proxy: AuthServiceProxy, broken: bool = False) -> None:
+        """
+        Give back a connection to the pool.
+
+        Parameters
+        ----------
+        proxy: AuthServiceProxy
+            Connection obtained from `acquire`.
+        broken: bool, default = False
+            If the connection failed and should be evicted.
+        """
+        if broken:
+            _close_proxy(proxy)
+            with self._lock:
+                self._created -= 1
+        else:
+            self._idle.put((proxy, time.monotonic()))
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) \
+            -> Iterator[AuthServiceProxy]:
+        """
+        Context manager borrowing a connection, evicting it from the pool if
+        its socket breaks while being used.
+
+        Parameters
+        ----------
+        timeout: float, default = None
+            Seconds to wait for a connection. Waits forever if `None`.
+        """
+        proxy = self.acquire(timeout)
+        broken = False
+        try:
+            yield proxy
+        except CONNECTION_ERRORS:
+            broken = True
+            raise
+        except JSONRPCException as json_exception:
+            broken = json_exception.code == NON_JSON_RESPONSE_CODE
+            raise
+        finally:
+            self.release(proxy, broken)
+
+    def close(self) -> None:
+        """
+        Close every idle connection of the pool.
+        """
+        closing: List[Tuple[AuthServiceProxy, float]] = []
+        while True:
+            try:
+                closing.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for proxy, _ in closing:
+            _close_proxy(proxy)
+        with self._lock:
+            self._created -= len(closing)
+
+
+class PooledProxy():
+    """
+    Drop-in replacement for `AuthServiceProxy` that borrows a connection from
+    a `ConnectionPool` for the duration of every call. Can be given to
+    `Wallet` as its proxy service.
+
+    Attributes
+    ----------
+    _pool: ConnectionPool
+        Pool to borrow connections from.
+    _service_name: str
+        Name of the RPC method to be called.
+    """
+
+    _pool: ConnectionPool
+    _service_name: Optional[str]
+
+    def __init__(self, pool: ConnectionPool,
+                 service_name: Optional[str] = None) -> None:
+        """
+        Constructor for PooledProxy class.
+
+        Parameters
+        ----------
+        pool: ConnectionPool
+            Pool to borrow connections from.
+        service_name: str, default = None
+            Name of the RPC method to be called.
+        """
+        self._pool = pool
+        self._service_name = service_name
+
+    def __getattr__(self, name: str) -> "PooledProxy":
+        if name.startswith('__') and name.endswith('__'):
+            # Python internal stuff
+            raise AttributeError(name)
+        if self._service_name is not None:
+            name = f"{self._service_name}.{name}"
+        return PooledProxy(self._pool, name)
+
+    def __call__(self, *args):
+        with self._pool.connection() as proxy:
+            return getattr(proxy, self._service_name)(*args)
+
+    def batch_(self, rpc_calls: list) -> list:
+        """
+        Batch RPC call trough a pooled connection.
+
+        Parameters
+        ----------
+        rpc_calls: list
+            Array of arrays like `[["method", params...], ...]`.
+
+        Returns
+        -------
+        list
+            Array of results.
+        """
+        with self._pool.connection() as proxy:
+            return proxy.batch_(rpc_calls)
+
+
+_POOL: Optional[ConnectionPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Return the process-wide connection pool. It's created on first use, so
+    every forked worker builds its own set of sockets.
+
+    Returns
+    -------
+    ConnectionPool
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None or _POOL.pid != os.getpid():
+            _POOL = ConnectionPool.from_configs()
+        return _POOL
+
+
+def get_pooled_proxy() -> PooledProxy:
+    """
+    FastAPI dependency returning a proxy backed by the process-wide pool.
+
+    Returns
+    -------
+    PooledProxy
+    """
+    return get_pool().proxy
+
+
+def close_pool() -> None:
+    """
+    Close the process-wide connection pool if it was ever created.
+    """
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.close()
@@ -0,0 +1,165 @@
+"""
+Coordination of the calls made for each wallet. Identical reads in flight
+share a single node call, and writes wait in a bounded queue per wallet, so
+the node gets them in order instead of contending on the wallet lock.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, \
+    Optional
+
+from pyliquid.utils.exceptions import SaturationError
+from pyliquid.utils.misc import get_optional_config
+
+DEFAULT_WRITE_CONCURRENCY = 1
+DEFAULT_WRITE_QUEUE = 64
+
+
+class WalletBusy(SaturationError):
+    """
+    Too many writes are already waiting for a wallet.
+    """
+
+
+class _WriteSlot():
+    """
+    Writes running and waiting for a single wallet.
+    """
+
+    def __init__(self, concurrency: int) -> None:
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.users = 0
+
+
+class WalletCoordinator():
+    """
+    Singleflight of reads and bounded write queues, by wallet. Used from a
+    single event loop.
+
+    Attributes
+    ----------
+    _write_concurrency: int
+        Writes sent at the same time for a wallet.
+    _max_queued: int
+        Writes allowed to wait for a wallet before rejecting new ones.
+    _flights: dict[Hashable, asyncio.Future]
+        Reads in flight by key.
+    _slots: dict[str, _WriteSlot]
+        Write queue of each wallet with pending writes.
+    """
+
+    _write_concurrency: int
+    _max_queued: int
+    _flights: Dict[Hashable, asyncio.Future]
+    _slots: Dict[str, _WriteSlot]
+
+    def __init__(self, write_concurrency: int = DEFAULT_WRITE_CONCURRENCY,
+                 max_queued: int = DEFAULT_WRITE_QUEUE) -> None:
+        """
+        Constructor for WalletCoordinator class.
+
+        Parameters
+        ----------
+        write_concurrency: int, default = 1
+            Writes sent at the same time for a wallet.
+        max_queued: int, default = 64
+            Writes allowed to wait for a wallet before rejecting new ones.
+        """
+        if write_concurrency <= 0:
+            raise ValueError("Provide a write concurrency higher than 0")
+        self._write_concurrency = write_concurrency
+        self._max_queued = max_queued
+        self._flights = {}
+        self._slots = {}
+
+    def queued(self, wallet: Optional[str]) -> int:
+        """
+        Writes running or waiting for a wallet.
+        """
+        slot = self._slots.get(wallet or '')
+        return 0 if slot is None else slot.users
+
+    def _landed(self, key: Hashable, future: asyncio.Future) -> None:
+        self._flights.pop(key, None)
+        # Retrieved here in case every caller gave up waiting.
+        if not future.cancelled():
+            future.exception()
+
+    async def coalesce(self, key: Hashable,
+                       call: Callable[[], Awaitable]) -> Any:
+        """
+        Run a read, or join the identical one already in flight.
+
+        Parameters
+        ----------
+        key: Hashable
+            Identity of the read, like its cache key.
+        call: Callable
+            Coroutine function making the read.
+
+        Returns
+        -------
+        Any
+            Output of the read, shared by every caller. Callers should not
+            modify it.
+        """
+        future = self._flights.get(key)
+        if future is None:
+            future = asyncio.ensure_future(call())
+            self._flights[key] = future
+            future.add_done_callback(lambda done: self._landed(key, done))
+        # Callers giving up don't cancel the read for the others.
+        return await asyncio.shield(future)
+
+    @asynccontextmanager
+    async def writing(self, wallet: Optional[str]) -> AsyncIterator[None]:
+        """
+        Wait for the turn of a write to a wallet, in arrival order.
+
+        Parameters
+        ----------
+        wallet: str | None
+            Name of the wallet, `None` for the default one.
+
+        Raises
+        ------
+        WalletBusy
+            If the queue of the wallet is full.
+        """
+        name = wallet or ''
+        slot = self._slots.get(name)
+        if slot is None:
+            slot = self._slots[name] = _WriteSlot(self._write_concurrency)
+        if slot.users >= self._write_concurrency + self._max_queued:
+            raise WalletBusy(f"Too many pending writes for wallet '{name}'")
+        slot.users += 1
+        try:
+            async with slot.semaphore:
+                yield
+        finally:
+            slot.users -= 1
+            if slot.users == 0:
+                del self._slots[name]
+
+
+_COORDINATOR: Optional[WalletCoordinator] = None
+
+
+def get_wallet_coordinator() -> WalletCoordinator:
+    """
+    Return the process-wide coordinator, created on first use with
+    `wallet_write_concurrency` and `wallet_write_queue` from .env file.
+
+    Returns
+    -------
+    WalletCoordinator
+    """
+    global _COORDINATOR
+    if _COORDINATOR is None:
+        _COORDINATOR = WalletCoordinator(
+            int(get_optional_config('wallet_write_concurrency',
+                                    str(DEFAULT_WRITE_CONCURRENCY))),
+            int(get_optional_config('wallet_write_queue',
+                                    str(DEFAULT_WRITE_QUEUE))))
+    return _COORDINATOR
@@ -0,0 +1,335 @@
+"""
+Event subsystem fed by the ZMQ notifications of the node. Decoded events are
+fanned out to in-process subscribers and to WebSocket clients, replacing the
+need of polling the API for new blocks or transactions.
+
+Requires the node to run with `zmqpub<topic>=<address>` options, and the same
+addresses set as `zmq_pub_<topic>` in the .env file.
+"""
+
+import asyncio
+import inspect
+import logging
+import struct
+from typing import Callable, Dict, List, Optional, Set
+
+try:
+    import zmq  # type: ignore
+    import zmq.asyncio  # type: ignore
+except ImportError:
+    zmq = None
+
+from pyliquid.liquid.cache import (MEMPOOL_METHODS, WalletCache,
+                                   get_wallet_cache)
+from pyliquid.models.responses import NodeEvent
+from pyliquid.utils.misc import get_optional_config
+
+TOPICS = ('hashblock', 'hashtx', 'rawblock', 'rawtx')
+DEFAULT_QUEUE_SIZE = 256
+
+# Shortest and longest waits in seconds before subscribing again after the
+# feeds failed.
+MIN_RECONNECT_DELAY = 1.0
+MAX_RECONNECT_DELAY = 60.0
+
+
+def decode_message(frames: List[bytes]) -> NodeEvent:
+    """
+    Decode a multipart ZMQ notification from the node.
+
+    Parameters
+    ----------
+    frames: list[bytes]
+        Topic, payload and the little endian sequence number.
+
+    Returns
+    -------
+    NodeEvent
+    """
+    sequence = None
+    if len(frames) > 2 and len(frames[2]) == 4:
+        sequence = struct.unpack('<I', frames[2])[0]
+    # Hashes are already published in the same byte order shown by RPC.
+    return NodeEvent(topic=frames[0].decode(), body=frames[1].hex(),
+                     sequence=sequence)
+
+
+class EventBus():
+    """
+    In-process fan-out of node events, to callbacks subscribed by topic and
+    to bounded queues used by WebSocket clients.
+
+    Attributes
+    ----------
+    _subscribers: dict[str, list[Callable]]
+        Callbacks by topic. They can be plain functions or coroutines.
+    _queues: set[asyncio.Queue]
+        Queues receiving every event.
+    """
+
+    _subscribers: Dict[str, List[Callable]]
+    _queues: Set[asyncio.Queue]
+
+    def __init__(self) -> None:
+        """
+        Constructor for EventBus class.
+        """
+        self._subscribers = {}
+        self._queues = set()
+
+    def subscribe(self, topic: str, callback: Callable) -> None:
+        """
+        Call `callback` with every event of the given topic.
+
+        Parameters
+        ----------
+        topic: str
+            One of `TOPICS`.
+        callback: Callable
+            Function or coroutine function receiving a `NodeEvent`.
+        """
+        self._subscribers.setdefault(topic, []).append(callback)
+
+    def unsubscribe(self, topic: str, callback: Callable) -> None:
+        """
+        Stop calling `callback` for the given topic.
+        """
+        if callback in self._subscribers.get(topic, []):
+            self._subscribers[topic].remove(callback)
+
+    def listen(self, maxsize: int = DEFAULT_QUEUE_SIZE) -> asyncio.Queue:
+        """
+        Return a queue receiving every event. If the consumer falls behind
+        the oldest events are dropped.
+
+        Parameters
+        ----------
+        maxsize: int, default = 256
+            Maximum number of pending events.
+
+        Returns
+        -------
+        asyncio.Queue
+            Queue to be given back with `forget` when done.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._queues.add(queue)
+        return queue
+
+    def forget(self, queue: asyncio.Queue) -> None:
+        """
+        Stop feeding a queue obtained from `listen`.
+        """
+        self._queues.discard(queue)
+
+    async def publish(self, event: NodeEvent) -> None:
+        """
+        Deliver an event to every subscriber of its topic and every queue.
+        Errors from subscribers are logged without stopping the delivery.
+
+        Parameters
+        ----------
+        event: NodeEvent
+        """
+        for callback in list(self._subscribers.get(event.topic, [])):
+            try:
+                output = callback(event)
+                if inspect.isawaitable(output):
+                    await output
+            except Exception as general_exception:
+                logging.exception(f"Event subscriber failed: \
+                    {general_exception}\n")
+        for queue in list(self._queues):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+def subscribe_cache(bus: EventBus, cache: WalletCache) -> None:
+    """
+    Invalidate the wallet cache from node events. New blocks change the tip
+    and drop every entry. A new transaction only drops the results that
+    depend on the mempool, of every wallet, since the event doesn't tell
+    which wallets it belongs to. Wallet listings and other cached reads are
+    kept, and writes made trough the API drop the entries of their wallet
+    on their own.
+
+    Parameters
+    ----------
+    bus: EventBus
+    cache: WalletCache
+    """
+    bus.subscribe('hashblock', lambda event: cache.observe_tip(event.body))
+    for topic in ('hashtx', 'rawtx'):
+        bus.subscribe(topic,
+                      lambda event: cache.invalidate_methods(MEMPOOL_METHODS))
+
+
+class ZMQListener():
+    """
+    Subscriber to the ZMQ feeds of the node, publishing decoded events to
+    an `EventBus`.
+
+    Attributes
+    ----------
+    _bus: EventBus
+        Bus receiving the events.
+    _endpoints: dict[str, str]
+        ZMQ address by topic.
+    _task: asyncio.Task | None
+        Running receive loop.
+    """
+
+    _bus: EventBus
+    _endpoints: Dict[str, str]
+    _task: Optional[asyncio.Task]
+
+    def __init__(self, bus: EventBus, endpoints: Dict[str, str]) -> None:
+        """
+        Constructor for ZMQListener class.
+
+        Parameters
+        ----------
+        bus: EventBus
+            Bus receiving the events.
+        endpoints: dict[str, str]
+            ZMQ address by topic, like `{"hashblock": "tcp://127.0.0.1:28332"}`.
+        """
+        if zmq is None:
+            raise RuntimeError("Install `pyzmq` to listen to node events")
+        self._bus = bus
+        self._endpoints = endpoints
+        self._task = None
+
+    @classmethod
+    def from_configs(cls, bus: EventBus) -> Optional["ZMQListener"]:
+        """
+        Build a listener from the `zmq_pub_<topic>` keys of .env file.
+
+        Returns
+        -------
+        ZMQListener | None
+            `None` if no topic is configured.
+        """
+        endpoints = {topic: get_optional_config(f"zmq_pub_{topic}", '')
+                     for topic in TOPICS}
+        endpoints = {k: v for k, v in endpoints.items() if v}
+        return cls(bus, endpoints) if endpoints else None
+
+    async def _run(self) -> None:
+        """
+        Receive loop, subscribing again with exponential backoff after any
+        error, so the events never stop for good.
+        """
+        loop = asyncio.get_running_loop()
+        backoff = MIN_RECONNECT_DELAY
+        while True:
+            started = loop.time()
+            try:
+                await self._receive()
+            except Exception as general_exception:
+                if loop.time() - started > MAX_RECONNECT_DELAY:
+                    backoff = MIN_RECONNECT_DELAY
+                logging.error(f"Node events failed, subscribing again in \
+                    {backoff:g} s: {general_exception!r}\n")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_RECONNECT_DELAY)
+
+    async def _receive(self) -> None:
+        """
+        Receive events until an error, one SUB socket per distinct address.
+        """
+        context = zmq.asyncio.Context.instance()
+        poller = zmq.asyncio.Poller()
+        sockets = {}
+        for topic, address in self._endpoints.items():
+            if address not in sockets:
+                sockets[address] = context.socket(zmq.SUB)
+                sockets[address].connect(address)
+                poller.register(sockets[address], zmq.POLLIN)
+            sockets[address].setsockopt(zmq.SUBSCRIBE, topic.encode())
+        try:
+            while True:
+                for socket, _ in await poller.poll():
+                    frames = await socket.recv_multipart()
+                    try:
+                        event = decode_message(frames)
+                    except (UnicodeDecodeError, IndexError):
+                        logging.warning("Skipping malformed ZMQ message\n")
+                        continue
+                    await self._bus.publish(event)
+        finally:
+            for socket in sockets.values():
+                socket.close(linger=0)
+
+    def start(self) -> None:
+        """
+        Start receiving events in the running event loop.
+        """
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            self._task.add_done_callback(_log_stopped)
+            logging.info(f"Listening to node events: {list(self._endpoints)}\n")
+
+    async def stop(self) -> None:
+        """
+        Stop receiving events.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def _log_stopped(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logging.error(f"Stopped listening to node events: \
+            {task.exception()!r}\n")
+
+
+_BUS: Optional[EventBus] = None
+
+
+def get_event_bus() -> EventBus:
+    """
+    Return the process-wide event bus, creating it on first use.
+
+    Returns
+    -------
+    EventBus
+    """
+    global _BUS
+    if _BUS is None:
+        _BUS = EventBus()
+    return _BUS
+
+
+_LISTENER: Optional[ZMQListener] = None
+
+
+def start_listener() -> None:
+    """
+    Start the process-wide listener if any feed is configured, keeping the
+    wallet cache up to date with it.
+    """
+    global _LISTENER
+    if _LISTENER is not None:
+        return
+    bus = get_event_bus()
+    _LISTENER = ZMQListener.from_configs(bus)
+    if _LISTENER is not None:
+        subscribe_cache(bus, get_wallet_cache())
+        _LISTENER.start()
+
+
+async def stop_listener() -> None:
+    """
+    Stop the process-wide listener if it was started.
+    """
+    global _LISTENER
+    if _LISTENER is not None:
+        await _LISTENER.stop()
+        _LISTENER = None
@@ -0,0 +1,160 @@
+"""
+Liveness and readiness checks of the node trough RPC. A background task keeps
+the latest result, so health endpoints answer without touching the node.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pyliquid.liquid.cache import get_wallet_cache
+from pyliquid.liquid.client import AsyncServiceProxy, get_async_proxy
+from pyliquid.models.responses import NodeStatus
+from pyliquid.utils.misc import get_optional_config
+
+DEFAULT_PROBE_INTERVAL = 5.0
+
+# Checks older than this many intervals mean the probe itself is stuck.
+STALE_INTERVALS = 3
+
+
+class NodeProbe():
+    """
+    Periodic check of the node with `getblockchaininfo` and `uptime`, sent
+    as a single batch.
+
+    Attributes
+    ----------
+    _proxy: AsyncServiceProxy
+        Node-level proxy used for the checks.
+    _interval: float
+        Seconds between checks.
+    _status: NodeStatus | None
+        Result of the latest check.
+    _task: asyncio.Task | None
+        Running probe loop.
+    """
+
+    _proxy: AsyncServiceProxy
+    _interval: float
+    _status: Optional[NodeStatus]
+    _task: Optional[asyncio.Task]
+
+    def __init__(self, proxy_service: AsyncServiceProxy,
+                 interval: float = DEFAULT_PROBE_INTERVAL) -> None:
+        """
+        Constructor for NodeProbe class.
+
+        Parameters
+        ----------
+        proxy_service: AsyncServiceProxy
+            Node-level proxy used for the checks.
+        interval: float, default = 5.0
+            Seconds between checks.
+        """
+        self._proxy = proxy_service
+        self._interval = interval
+        self._status = None
+        self._task = None
+
+    @property
+    def status(self) -> NodeStatus:
+        """
+        Latest check result. Reported as not alive if there wasn't any check
+        yet or it's too old.
+        """
+        if self._status is None:
+            return NodeStatus(alive=False, error="Node was not checked yet")
+        max_age = timedelta(seconds=self._interval * STALE_INTERVALS)
+        if datetime.now() - self._status.checked_at > max_age:
+            return NodeStatus(alive=False, error="Latest check is outdated")
+        return self._status
+
+    async def probe(self) -> NodeStatus:
+        """
+        Check the node now and keep the result.
+
+        Returns
+        -------
+        NodeStatus
+        """
+        started = time.perf_counter()
+        try:
+            info, uptime = await self._proxy.batch_([["getblockchaininfo"],
+                                                     ["uptime"]])
+            latency = (time.perf_counter() - started) * 1000
+            if info.get('error') is not None:
+                # The node is answering but still loading (warming up).
+                status = NodeStatus(alive=True, latency_ms=latency,
+                                    error=str(info['error'].get('message')))
+            else:
+                chain = info['result']
+                status = NodeStatus(
+                    alive=True,
+                    ready=not chain.get('initialblockdownload', False)
+                    and chain['blocks'] == chain['headers'],
+                    chain=chain.get('chain'),
+                    blocks=chain['blocks'],
+                    headers=chain['headers'],
+                    verification_progress=chain.get('verificationprogress'),
+                    best_block_hash=chain.get('bestblockhash'),
+                    uptime=uptime.get('result'),
+                    latency_ms=latency)
+                if status.best_block_hash:
+                    get_wallet_cache().observe_tip(status.best_block_hash)
+        except Exception as general_exception:
+            status = NodeStatus(alive=False, error=str(general_exception)
+                                or type(general_exception).__name__)
+        if self._status is not None and \
+                self._status.alive and not status.alive:
+            logging.error(f"Node stopped answering: {status.error}\n")
+        self._status = status
+        return status
+
+    async def _run(self) -> None:
+        """
+        Probe loop.
+        """
+        while True:
+            await self.probe()
+            await asyncio.sleep(self._interval)
+
+    def start(self) -> None:
+        """
+        Start checking the node in the running event loop.
+        """
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop checking the node.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_PROBE: Optional[NodeProbe] = None
+
+
+def get_node_probe() -> NodeProbe:
+    """
+    FastAPI dependency returning the process-wide probe, created on first
+    use with `node_probe_interval` from .env file.
+
+    Returns
+    -------
+    NodeProbe
+    """
+    global _PROBE
+    if _PROBE is None:
+        _PROBE = NodeProbe(get_async_proxy(), float(get_optional_config(
+            'node_probe_interval', str(DEFAULT_PROBE_INTERVAL))))
+    return _PROBE
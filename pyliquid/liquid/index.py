@@ -0,0 +1,454 @@
+"""
+Local index of wallet transactions, unspent outputs and issuances, so
+reporting queries are answered from SQLite instead of the node.
+"""
+
+import asyncio
+import fcntl
+import logging
+import sqlite3
+import threading
+import time
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from bitcoinrpc.authproxy import JSONRPCException  # type: ignore
+from pyliquid.liquid.events import EventBus
+from pyliquid.liquid.registry import WalletRegistry, get_wallet_registry
+from pyliquid.utils.exceptions import RPC_INVALID_ADDRESS_OR_KEY
+from pyliquid.utils.misc import get_optional_config
+from pyliquid.utils.storage import database_path, open_database
+
+# Seconds between syncs when no new block was notified.
+SYNC_INTERVAL = 60.0
+DEFAULT_QUERY_LIMIT = 1000
+
+# Amounts are kept as text to preserve their exact decimal value.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    wallet TEXT NOT NULL,
+    txid TEXT NOT NULL,
+    vout INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    address TEXT,
+    asset TEXT,
+    amount TEXT,
+    fee TEXT,
+    blockhash TEXT,
+    blockheight INTEGER,
+    time INTEGER,
+    PRIMARY KEY (wallet, txid, vout, category)
+);
+CREATE INDEX IF NOT EXISTS transactions_address
+    ON transactions (wallet, address);
+CREATE INDEX IF NOT EXISTS transactions_asset
+    ON transactions (wallet, asset);
+CREATE INDEX IF NOT EXISTS transactions_height
+    ON transactions (wallet, blockheight);
+CREATE TABLE IF NOT EXISTS utxos (
+    wallet TEXT NOT NULL,
+    txid TEXT NOT NULL,
+    vout INTEGER NOT NULL,
+    address TEXT,
+    asset TEXT,
+    amount TEXT,
+    PRIMARY KEY (wallet, txid, vout)
+);
+CREATE INDEX IF NOT EXISTS utxos_address ON utxos (wallet, address);
+CREATE INDEX IF NOT EXISTS utxos_asset ON utxos (wallet, asset);
+CREATE TABLE IF NOT EXISTS issuances (
+    wallet TEXT NOT NULL,
+    txid TEXT NOT NULL,
+    vin INTEGER NOT NULL,
+    asset TEXT,
+    token TEXT,
+    assetamount TEXT,
+    tokenamount TEXT,
+    entropy TEXT,
+    isreissuance INTEGER,
+    PRIMARY KEY (wallet, txid, vin)
+);
+CREATE INDEX IF NOT EXISTS issuances_asset ON issuances (wallet, asset);
+CREATE TABLE IF NOT EXISTS sync_state (
+    wallet TEXT PRIMARY KEY,
+    lastblock TEXT,
+    synced_at REAL
+);
+"""
+
+
+def _amount(value) -> Optional[str]:
+    # Plain notation, `str` would write small amounts like `1E-8`.
+    return None if value is None else format(Decimal(str(value)), 'f')
+
+
+class WalletIndex():
+    """
+    Mirror of the watched wallets in SQLite. Each sync only reads the
+    transactions after the last synced block, trough `listsinceblock`, and
+    replaces the unspent outputs and issuances of the wallet. Transactions
+    of blocks dropped by a reorganization are removed, and a wallet whose
+    last synced block is unknown to the node is synced again from scratch.
+
+    Attributes
+    ----------
+    _registry: WalletRegistry
+        Registry giving loaded handles of the wallets.
+    _database: sqlite3.Connection
+        Connection opened with `SCHEMA`.
+    _wake: asyncio.Event | None
+        Set when a new block arrives.
+    _task: asyncio.Task | None
+        Running sync loop.
+    """
+
+    _registry: WalletRegistry
+    _database: sqlite3.Connection
+    _lock: threading.Lock
+    _wake: Optional[asyncio.Event]
+    _task: Optional[asyncio.Task]
+
+    def __init__(self, registry: WalletRegistry,
+                 database: sqlite3.Connection) -> None:
+        """
+        Constructor for WalletIndex class.
+
+        Parameters
+        ----------
+        registry: WalletRegistry
+            Registry giving loaded handles of the wallets.
+        database: sqlite3.Connection
+            Connection opened with `SCHEMA`.
+        """
+        self._registry = registry
+        self._database = database
+        self._lock = threading.Lock()
+        self._wake = None
+        self._task = None
+
+    @property
+    def watched(self) -> List[str]:
+        """
+        Names of the wallets kept in sync, by any worker.
+        """
+        with self._lock:
+            rows = self._database.execute(
+                "SELECT wallet FROM sync_state ORDER BY wallet")
+            return [row[0] for row in rows]
+
+    def is_synced(self, name: str) -> bool:
+        """
+        If the wallet was synced at least once.
+        """
+        return self.last_block(name) is not None
+
+    def last_block(self, name: str) -> Optional[str]:
+        """
+        Hash of the tip at the latest sync of a wallet.
+        """
+        with self._lock:
+            row = self._database.execute(
+                "SELECT lastblock FROM sync_state WHERE wallet = ?",
+                (name,)).fetchone()
+        return row[0] if row else None
+
+    def watch(self, name: str) -> None:
+        """
+        Start keeping a wallet in sync, on the next run of the sync loop.
+
+        Parameters
+        ----------
+        name: str
+            Name of the wallet at the node level.
+        """
+        with self._lock, self._database:
+            cursor = self._database.execute(
+                "INSERT OR IGNORE INTO sync_state (wallet) VALUES (?)",
+                (name,))
+        if cursor.rowcount:
+            self.notify()
+
+    def notify(self, *args) -> None:
+        """
+        Wake the sync loop up, usable as an `EventBus` callback.
+        """
+        if self._wake is not None:
+            self._wake.set()
+
+    async def sync(self, name: str) -> int:
+        """
+        Bring the index of a wallet up to date with the node.
+
+        Parameters
+        ----------
+        name: str
+            Name of the wallet at the node level.
+
+        Returns
+        -------
+        int
+            Number of transaction entries written.
+        """
+        since_block = self.last_block(name)
+        wallet = await self._registry.get(name)
+        # Read before the history, so the next sync covers anything newer.
+        tip = await self._registry.proxy.getbestblockhash()
+        if since_block is not None and \
+                not await self._is_known(since_block):
+            logging.warning(f"Last synced block of wallet '{name}' is \
+                unknown to the node, syncing it again\n")
+            since_block = None
+        if since_block is None:
+            history = [t async for t in wallet.iter_transactions()]
+            removed: List[dict] = []
+        else:
+            # A block no longer in the active chain is walked back to the
+            # fork, and the transactions only in dropped blocks are listed
+            # as removed.
+            output = await wallet.proxy.listsinceblock(since_block, 1, True,
+                                                       True)
+            history = output['transactions']
+            removed = output.get('removed', [])
+        entries = [(name, t['txid'], t.get('vout', 0), t['category'],
+                    t.get('address'), t.get('asset'), _amount(t.get('amount')),
+                    _amount(t.get('fee')), t.get('blockhash'),
+                    t.get('blockheight'), t.get('time'))
+                   for t in history]
+        unspent = await wallet.proxy.listunspent(0)
+        issuances = await wallet.proxy.listissuances()
+        with self._lock, self._database:
+            if since_block is None:
+                self._database.execute(
+                    "DELETE FROM transactions WHERE wallet = ?", (name,))
+            # Transactions also found in the new chain are written again.
+            self._database.executemany(
+                "DELETE FROM transactions WHERE wallet = ? AND txid = ?",
+                {(name, t['txid']) for t in removed})
+            # Replacing keeps heights of transactions confirmed since.
+            self._database.executemany(
+                "INSERT OR REPLACE INTO transactions "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", entries)
+            self._database.execute("DELETE FROM utxos WHERE wallet = ?",
+                                   (name,))
+            self._database.executemany(
+                "INSERT INTO utxos VALUES (?, ?, ?, ?, ?, ?)",
+                [(name, u['txid'], u['vout'], u.get('address'),
+                  u.get('asset'), _amount(u.get('amount')))
+                 for u in unspent])
+            self._database.execute("DELETE FROM issuances WHERE wallet = ?",
+                                   (name,))
+            self._database.executemany(
+                "INSERT INTO issuances VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(name, i['txid'], i['vin'], i.get('asset'), i.get('token'),
+                  _amount(i.get('assetamount')),
+                  _amount(i.get('tokenamount')),
+                  i.get('entropy'), int(bool(i.get('isreissuance'))))
+                 for i in issuances])
+            self._database.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)",
+                (name, tip, time.time()))
+        return len(entries)
+
+    async def _is_known(self, block_hash: str) -> bool:
+        """
+        If the node has a block, in the active chain or not.
+        """
+        try:
+            await self._registry.proxy.getblockheader(block_hash)
+        except JSONRPCException as json_exception:
+            if json_exception.code == RPC_INVALID_ADDRESS_OR_KEY:
+                return False
+            raise
+        return True
+
+    def _rows(self, query: str, params: tuple) -> List[dict]:
+        with self._lock:
+            cursor = self._database.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor]
+
+    def transactions(self, name: str, asset: Optional[str] = None,
+                     address: Optional[str] = None,
+                     min_height: Optional[int] = None,
+                     max_height: Optional[int] = None,
+                     limit: int = DEFAULT_QUERY_LIMIT,
+                     offset: int = 0) -> List[dict]:
+        """
+        Indexed transaction entries of a wallet, newest first.
+
+        Parameters
+        ----------
+        name: str
+            Name of the wallet at the node level.
+        asset: str | None, default = None
+            Only entries of this asset id.
+        address: str | None, default = None
+            Only entries of this address.
+        min_height: int | None, default = None
+            Only entries confirmed at this height or above.
+        max_height: int | None, default = None
+            Only entries confirmed at this height or below.
+        limit: int, default = 1000
+        offset: int, default = 0
+
+        Returns
+        -------
+        list[dict]
+        """
+        clauses, params = ["wallet = ?"], [name]
+        for clause, value in (("asset = ?", asset),
+                              ("address = ?", address),
+                              ("blockheight >= ?", min_height),
+                              ("blockheight <= ?", max_height)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        return self._rows(
+            f"SELECT * FROM transactions WHERE {' AND '.join(clauses)} "
+            "ORDER BY blockheight IS NOT NULL, blockheight DESC, time DESC "
+            "LIMIT ? OFFSET ?", tuple(params + [limit, offset]))
+
+    def utxos(self, name: str, asset: Optional[str] = None,
+              address: Optional[str] = None) -> List[dict]:
+        """
+        Indexed unspent outputs of a wallet.
+
+        Parameters
+        ----------
+        name: str
+            Name of the wallet at the node level.
+        asset: str | None, default = None
+            Only outputs of this asset id.
+        address: str | None, default = None
+            Only outputs of this address.
+
+        Returns
+        -------
+        list[dict]
+        """
+        clauses, params = ["wallet = ?"], [name]
+        for clause, value in (("asset = ?", asset), ("address = ?", address)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        return self._rows(
+            f"SELECT * FROM utxos WHERE {' AND '.join(clauses)}",
+            tuple(params))
+
+    def issuances(self, name: str,
+                  asset: Optional[str] = None) -> List[dict]:
+        """
+        Indexed issuances and reissuances made by a wallet.
+
+        Parameters
+        ----------
+        name: str
+            Name of the wallet at the node level.
+        asset: str | None, default = None
+            Only issuances of this asset id.
+
+        Returns
+        -------
+        list[dict]
+        """
+        if asset is None:
+            return self._rows("SELECT * FROM issuances WHERE wallet = ?",
+                              (name,))
+        return self._rows(
+            "SELECT * FROM issuances WHERE wallet = ? AND asset = ?",
+            (name, asset))
+
+    def balance(self, name: str) -> Dict[str, Decimal]:
+        """
+        Sum of the indexed unspent outputs of a wallet, by asset id.
+
+        Parameters
+        ----------
+        name: str
+            Name of the wallet at the node level.
+
+        Returns
+        -------
+        dict[str, Decimal]
+        """
+        totals: Dict[str, Decimal] = {}
+        for utxo in self.utxos(name):
+            totals[utxo['asset']] = totals.get(utxo['asset'], Decimal(0)) + \
+                Decimal(utxo['amount'])
+        return totals
+
+    async def _run(self) -> None:
+        """
+        Sync loop, woken up by new blocks or every `SYNC_INTERVAL`.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), SYNC_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            with open(f"{database_path('index')}.lock", 'a') as lock_file:
+                try:
+                    # Workers share the database, a single one syncs.
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue
+                for name in self.watched:
+                    try:
+                        await self.sync(name)
+                    except Exception as general_exception:
+                        logging.error(f"Could not sync index of wallet \
+                            '{name}': {general_exception}\n")
+
+    def start(self, bus: Optional[EventBus] = None) -> None:
+        """
+        Start syncing in the running event loop.
+
+        Parameters
+        ----------
+        bus: EventBus | None, default = None
+            Bus notifying new blocks, otherwise wallets are only synced
+            every `SYNC_INTERVAL`.
+        """
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._wake.set()
+            if bus is not None:
+                bus.subscribe('hashblock', self.notify)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop syncing.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wake = None
+
+
+_INDEX: Optional[WalletIndex] = None
+
+
+def get_wallet_index() -> WalletIndex:
+    """
+    FastAPI dependency returning the process-wide index, created on first
+    use. Wallets listed in `index_wallets` from .env file, separated by
+    commas, are watched from the start.
+
+    Returns
+    -------
+    WalletIndex
+    """
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = WalletIndex(get_wallet_registry(),
+                             open_database(database_path('index'), SCHEMA))
+        for name in get_optional_config('index_wallets', '').split(','):
+            if name.strip():
+                _INDEX.watch(name.strip())
+    return _INDEX
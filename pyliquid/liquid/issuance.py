@@ -0,0 +1,175 @@
+"""
+Registry of the assets issued by the pools, and helpers to prepare a wallet
+for issuing many assets at once.
+"""
+
+import sqlite3
+import threading
+import time
+from decimal import Decimal
+from typing import List, Optional
+
+from pyliquid.utils.storage import database_path, open_database
+
+DEFAULT_ISSUE_CONCURRENCY = 4
+
+# Policy asset kept in each pre-split output, to pay the fee of one issuance.
+DEFAULT_FEE_RESERVE = Decimal('0.0001')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issued_assets (
+    asset TEXT PRIMARY KEY,
+    wallet TEXT,
+    token TEXT,
+    entropy TEXT NOT NULL,
+    txid TEXT NOT NULL,
+    vin INTEGER NOT NULL,
+    amount TEXT,
+    token_amount TEXT,
+    issued_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS issued_assets_wallet ON issued_assets (wallet);
+CREATE INDEX IF NOT EXISTS issued_assets_token ON issued_assets (token);
+"""
+
+
+def missing_outputs(unspent: List[dict], policy_asset: str, count: int,
+                    reserve: Decimal) -> int:
+    """
+    Number of outputs to create, so each of `count` issuances can be funded
+    from its own output instead of chaining on the change of the previous
+    one.
+
+    Parameters
+    ----------
+    unspent: list[dict]
+        Output of `listunspent`.
+    policy_asset: str
+        Asset id used to pay fees.
+    count: int
+        Number of issuances to be made.
+    reserve: Decimal
+        Minimum amount of an output to fund one issuance.
+
+    Returns
+    -------
+    int
+    """
+    usable = sum(1 for utxo in unspent
+                 if utxo.get('asset') == policy_asset
+                 and Decimal(str(utxo['amount'])) >= reserve
+                 and utxo.get('spendable', True))
+    return max(count - usable, 0)
+
+
+class IssuanceRegistry():
+    """
+    Local record of every issued asset, with the entropy and reissuance
+    token needed to reissue it, queryable without the node.
+
+    Attributes
+    ----------
+    _database: sqlite3.Connection
+        Connection opened with `SCHEMA`.
+    """
+
+    _database: sqlite3.Connection
+    _lock: threading.Lock
+
+    def __init__(self, database: sqlite3.Connection) -> None:
+        """
+        Constructor for IssuanceRegistry class.
+
+        Parameters
+        ----------
+        database: sqlite3.Connection
+            Connection opened with `SCHEMA`.
+        """
+        self._database = database
+        self._lock = threading.Lock()
+
+    def record(self, wallet: Optional[str], issuance: dict,
+               amount: Optional[str] = None,
+               token_amount: Optional[str] = None) -> None:
+        """
+        Save the outcome of an `issueasset` call.
+
+        Parameters
+        ----------
+        wallet: str | None
+            Name of the issuing wallet, `None` for the default one.
+        issuance: dict
+            Output of `issueasset`.
+        amount: str | None, default = None
+            Issued amount of the asset.
+        token_amount: str | None, default = None
+            Issued amount of reissuance tokens.
+        """
+        with self._lock, self._database:
+            self._database.execute(
+                "INSERT OR REPLACE INTO issued_assets "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (issuance['asset'], wallet, issuance.get('token'),
+                 issuance['entropy'], issuance['txid'], issuance['vin'],
+                 amount, token_amount, time.time()))
+
+    def _rows(self, query: str, params: tuple) -> List[dict]:
+        with self._lock:
+            cursor = self._database.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor]
+
+    def get(self, asset: str) -> Optional[dict]:
+        """
+        Return the record of an asset, by its id or reissuance token id.
+
+        Parameters
+        ----------
+        asset: str
+
+        Returns
+        -------
+        dict | None
+        """
+        rows = self._rows("SELECT * FROM issued_assets "
+                          "WHERE asset = ? OR token = ?", (asset, asset))
+        return rows[0] if rows else None
+
+    def list(self, wallet: Optional[str] = None) -> List[dict]:
+        """
+        Records of the issued assets, newest first.
+
+        Parameters
+        ----------
+        wallet: str | None, default = None
+            Only the assets issued by this wallet.
+
+        Returns
+        -------
+        list[dict]
+        """
+        if wallet is None:
+            return self._rows("SELECT * FROM issued_assets "
+                              "ORDER BY issued_at DESC", ())
+        return self._rows("SELECT * FROM issued_assets WHERE wallet = ? "
+                          "ORDER BY issued_at DESC", (wallet,))
+
+
+_ISSUANCE_REGISTRY: Optional[IssuanceRegistry] = None
+_ISSUANCE_LOCK = threading.Lock()
+
+
+def get_issuance_registry() -> IssuanceRegistry:
+    """
+    FastAPI dependency returning the process-wide issuance registry.
+
+    Returns
+    -------
+    IssuanceRegistry
+    """
+    global _ISSUANCE_REGISTRY
+    with _ISSUANCE_LOCK:
+        if _ISSUANCE_REGISTRY is None:
+            _ISSUANCE_REGISTRY = IssuanceRegistry(
+                open_database(database_path('issuances'), SCHEMA))
+        return _ISSUANCE_REGISTRY
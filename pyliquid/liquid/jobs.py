@@ -0,0 +1,404 @@
+"""
+Persistent queue of long-running node operations, executed in background by
+the API workers, so HTTP requests only submit them and poll their status.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from pyliquid.liquid.cache import NODE_SCOPE, get_wallet_cache
+from pyliquid.liquid.coordination import get_wallet_coordinator
+from pyliquid.liquid.operations import AsyncPool, AsyncWallet
+from pyliquid.liquid.registry import get_wallet_registry
+from pyliquid.utils.misc import get_optional_config, pid_alive
+from pyliquid.utils.storage import database_path, open_database
+
+DEFAULT_JOB_WORKERS = 4
+
+# Seconds between looks for new jobs submitted by other workers.
+POLL_INTERVAL = 0.5
+
+# Seconds finished jobs are kept, 7 days.
+JOB_RETENTION = 7 * 24 * 3600.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    idempotency_key TEXT UNIQUE,
+    worker INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, created_at);
+"""
+
+JobHandler = Callable[[dict], Awaitable]
+
+
+class IdempotencyConflict(ValueError):
+    """
+    An idempotency key was reused for a different operation.
+    """
+
+
+class JobQueue():
+    """
+    Job table shared by the workers trough SQLite. Each worker runs up to
+    `workers` jobs at a time, only of the kinds it has a handler for, so
+    jobs like restarting the node are only taken by the worker in control.
+
+    Attributes
+    ----------
+    _database: sqlite3.Connection
+        Connection opened with `SCHEMA`.
+    _workers: int
+        Jobs run at the same time by this worker.
+    _handlers: dict[str, Callable]
+        Coroutine function per job kind, receiving the job params.
+    _wake: asyncio.Event | None
+        Set when a job is submitted from this worker.
+    _loop: asyncio.AbstractEventLoop | None
+        Loop running the jobs, owning `_wake`.
+    _tasks: list[asyncio.Task]
+        Running worker loops.
+    """
+
+    _database: sqlite3.Connection
+    _workers: int
+    _handlers: Dict[str, JobHandler]
+    _lock: threading.Lock
+    _wake: Optional[asyncio.Event]
+    _loop: Optional[asyncio.AbstractEventLoop]
+    _tasks: List[asyncio.Task]
+
+    def __init__(self, database: sqlite3.Connection,
+                 workers: int = DEFAULT_JOB_WORKERS) -> None:
+        """
+        Constructor for JobQueue class.
+
+        Parameters
+        ----------
+        database: sqlite3.Connection
+            Connection opened with `SCHEMA`.
+        workers: int, default = 4
+            Jobs run at the same time by this worker.
+        """
+        if workers <= 0:
+            raise ValueError("Provide a number of workers higher than 0")
+        self._database = database
+        self._workers = workers
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._wake = None
+        self._loop = None
+        self._tasks = []
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        """
+        Run the jobs of a kind with the given coroutine function, which
+        returns a JSON serializable result.
+        """
+        self._handlers[kind] = handler
+        self._notify()
+
+    def unregister(self, kind: str) -> None:
+        """
+        Stop taking jobs of a kind.
+        """
+        self._handlers.pop(kind, None)
+
+    def _notify(self) -> None:
+        # Jobs may be submitted from other threads, while the event can
+        # only be set from its loop.
+        if self._wake is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def _rows(self, query: str, params: tuple) -> List[dict]:
+        with self._lock, self._database:
+            cursor = self._database.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor]
+        for row in rows:
+            row['params'] = json.loads(row['params'])
+            if row['result'] is not None:
+                row['result'] = json.loads(row['result'])
+        return rows
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """
+        Return a job with its status, and result once done.
+
+        Parameters
+        ----------
+        job_id: str
+
+        Returns
+        -------
+        dict | None
+            `None` if there's no such job.
+        """
+        rows = self._rows("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return rows[0] if rows else None
+
+    def submit(self, kind: str, params: Optional[dict] = None,
+               idempotency_key: Optional[str] = None) -> dict:
+        """
+        Add a job to the queue. Submitting again with the same idempotency
+        key returns the existing job instead of creating a new one.
+
+        Parameters
+        ----------
+        kind: str
+            Kind of job, as registered by the handlers.
+        params: dict | None, default = None
+            JSON serializable params given to the handler.
+        idempotency_key: str | None, default = None
+            Unique key chosen by the client for this operation.
+
+        Returns
+        -------
+        dict
+            The job, with its `id` and `status`.
+
+        Raises
+        ------
+        IdempotencyConflict
+            If the key was used for a different operation.
+        """
+        params = params or {}
+        encoded = json.dumps(params, sort_keys=True, default=str)
+        job_id = str(uuid4())
+        try:
+            with self._lock, self._database:
+                self._database.execute(
+                    "INSERT INTO jobs (id, kind, params, status, "
+                    "idempotency_key, created_at) "
+                    "VALUES (?, ?, ?, 'pending', ?, ?)",
+                    (job_id, kind, encoded, idempotency_key, time.time()))
+        except sqlite3.IntegrityError:
+            if idempotency_key is None:
+                raise
+            job = self._rows("SELECT * FROM jobs WHERE idempotency_key = ?",
+                             (idempotency_key,))[0]
+            if job['kind'] != kind or \
+                    json.dumps(job['params'], sort_keys=True) != encoded:
+                raise IdempotencyConflict(
+                    "Idempotency key was used for another job")
+            return job
+        self._notify()
+        return self.get(job_id)
+
+    def _claim(self) -> Optional[dict]:
+        """
+        Take the oldest pending job this worker can run, atomically across
+        workers.
+        """
+        kinds = list(self._handlers)
+        if not kinds:
+            return None
+        with self._lock, self._database:
+            # Takes the write lock first, so two workers can't pick the same.
+            self._database.execute("BEGIN IMMEDIATE")
+            row = self._database.execute(
+                "SELECT id FROM jobs WHERE status = 'pending' "
+                f"AND kind IN ({', '.join('?' * len(kinds))}) "
+                "ORDER BY created_at LIMIT 1", kinds).fetchone()
+            if row is not None:
+                self._database.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, "
+                    "started_at = ? WHERE id = ?",
+                    (os.getpid(), time.time(), row[0]))
+        return None if row is None else self.get(row[0])
+
+    def _finish(self, job_id: str, result=None,
+                error: Optional[str] = None) -> None:
+        with self._lock, self._database:
+            self._database.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, "
+                "finished_at = ? WHERE id = ?",
+                ('failed' if error is not None else 'done',
+                 None if error is not None else json.dumps(result,
+                                                           default=str),
+                 error, time.time(), job_id))
+
+    async def run_next(self) -> bool:
+        """
+        Run the oldest pending job this worker can run.
+
+        Returns
+        -------
+        bool
+            If there was a job to run.
+        """
+        job = self._claim()
+        if job is None:
+            return False
+        handler = self._handlers.get(job['kind'])
+        try:
+            if handler is None:
+                raise RuntimeError(f"No handler for '{job['kind']}' jobs")
+            result = await handler(job['params'])
+        except Exception as general_exception:
+            logging.error(f"Job {job['id']} ({job['kind']}) failed: \
+                {general_exception}\n")
+            self._finish(job['id'], error=str(general_exception)
+                         or type(general_exception).__name__)
+        else:
+            self._finish(job['id'], result)
+        return True
+
+    def recover(self) -> int:
+        """
+        Fail the jobs left running by workers that died, and forget old
+        finished jobs. Interrupted jobs are not run again, since operations
+        like sending funds may have reached the node.
+
+        Returns
+        -------
+        int
+            Number of interrupted jobs.
+        """
+        interrupted = [job['id'] for job in self._rows(
+            "SELECT * FROM jobs WHERE status = 'running'", ())
+            if not pid_alive(job['worker'])]
+        for job_id in interrupted:
+            self._finish(job_id, error="Interrupted by a worker restart")
+        with self._lock, self._database:
+            self._database.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') "
+                "AND finished_at < ?", (time.time() - JOB_RETENTION,))
+        return len(interrupted)
+
+    async def _work(self) -> None:
+        """
+        Worker loop.
+        """
+        while True:
+            try:
+                if await self.run_next():
+                    continue
+            except Exception as general_exception:
+                logging.exception(f"Job queue failed: {general_exception}\n")
+            try:
+                await asyncio.wait_for(self._wake.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def start(self) -> None:
+        """
+        Start running jobs in the running event loop.
+        """
+        if not self._tasks:
+            self.recover()
+            self._wake = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
+            self._tasks = [self._loop.create_task(self._work())
+                           for _ in range(self._workers)]
+
+    async def stop(self) -> None:
+        """
+        Stop running jobs. Jobs cut in the middle are failed by `recover`
+        on the next start.
+        """
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._wake = None
+        self._loop = None
+
+
+async def _create_wallet(params: dict) -> dict:
+    registry = get_wallet_registry()
+    label = params.get('label') or str(uuid4())
+    await registry.proxy.createwallet(label, False, False)
+    get_wallet_cache().invalidate(NODE_SCOPE)
+    wallet = AsyncWallet(registry.proxy, label)
+    registry.register(wallet)
+    return {'name': label,
+            'address': await wallet.proxy.getnewaddress()
+            if params.get('with_address', True) else None}
+
+
+async def _load_wallet(params: dict) -> dict:
+    wallet = await get_wallet_registry().get(params['name'])
+    return {'name': wallet.name}
+
+
+async def _rescan_wallet(params: dict) -> dict:
+    wallet = await get_wallet_registry().get(params['name'])
+    async with get_wallet_coordinator().writing(wallet.name):
+        output = await wallet.proxy.rescanblockchain(
+            *([params['start_height']] if 'start_height' in params else []))
+    wallet.invalidate_cache()
+    return output
+
+
+async def _issue_tokens(params: dict) -> list:
+    pool = AsyncPool(await get_wallet_registry().get(params['wallet']))
+    results = await pool.issue_tokens(
+        [(token['amount'], token['reissue']) for token in params['tokens']],
+        params.get('concurrency', DEFAULT_JOB_WORKERS),
+        params.get('presplit', True))
+    return [result.dict() for result in results]
+
+
+async def _send_to_address(params: dict) -> str:
+    wallet = await get_wallet_registry().get(params.get('wallet', ''))
+    async with get_wallet_coordinator().writing(wallet.name):
+        output = await wallet.proxy.sendtoaddress(params['address'],
+                                                  params['amount'])
+    wallet.invalidate_cache()
+    return output
+
+
+# Handlers of the operations every worker can run.
+OPERATION_HANDLERS: Dict[str, JobHandler] = {
+    'wallet.create': _create_wallet,
+    'wallet.load': _load_wallet,
+    'wallet.rescan': _rescan_wallet,
+    'token.issue': _issue_tokens,
+    'tx.send': _send_to_address,
+}
+
+RESTART_JOB = 'node.restart'
+JOB_KINDS = sorted([*OPERATION_HANDLERS, RESTART_JOB])
+
+_JOB_QUEUE: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """
+    FastAPI dependency returning the process-wide job queue, created on
+    first use with `job_workers` from .env file and the operation handlers.
+
+    Returns
+    -------
+    JobQueue
+    """
+    global _JOB_QUEUE
+    if _JOB_QUEUE is None:
+        _JOB_QUEUE = JobQueue(open_database(database_path('jobs'), SCHEMA),
+                              int(get_optional_config(
+                                  'job_workers', str(DEFAULT_JOB_WORKERS))))
+        for kind, handler in OPERATION_HANDLERS.items():
+            _JOB_QUEUE.register(kind, handler)
+    return _JOB_QUEUE
@@ -0,0 +1,361 @@
+"""
+Lifecycle management of the node for the API workers. A single worker, the
+one holding the control lock, runs `elementsd` as a supervised child process
+and takes the restart jobs submitted to the job queue by any worker.
+"""
+
+import asyncio
+import fcntl
+import logging
+import os
+import time
+from typing import IO, Optional
+
+from bitcoinrpc.authproxy import JSONRPCException  # type: ignore
+from pyliquid.liquid.client import AsyncServiceProxy, get_async_proxy
+from pyliquid.liquid.jobs import RESTART_JOB, JobQueue, get_job_queue
+from pyliquid.liquid.server import DEFAULT_LOCATION
+from pyliquid.utils.misc import get_optional_config
+
+DEFAULT_READY_TIMEOUT = 120.0
+DEFAULT_STOP_TIMEOUT = 60.0
+
+# Seconds between attempts to take control, and between liveness checks of
+# a node that is not our child.
+CONTROL_INTERVAL = 5.0
+SUPERVISE_INTERVAL = 0.5
+MAX_BACKOFF = 60.0
+
+
+async def wait_for_rpc(proxy_service: AsyncServiceProxy, running: bool,
+                       timeout: float) -> bool:
+    """
+    Poll the node with exponential backoff until it's ready to answer calls,
+    or until it stopped answering.
+
+    Parameters
+    ----------
+    proxy_service: AsyncServiceProxy
+        Node-level proxy.
+    running: bool
+        Either to wait for the node to be ready or to be stopped.
+    timeout: float
+        Maximum seconds to wait.
+
+    Returns
+    -------
+    bool
+        If the expected state was reached in time.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = 0.1
+    while True:
+        try:
+            await proxy_service.uptime()
+            up, ready = True, True
+        except JSONRPCException:
+            # Answering but still warming up or shutting down.
+            up, ready = True, False
+        except Exception:
+            up, ready = False, False
+        if (running and ready) or (not running and not up):
+            return True
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, 2.0)
+
+
+class NodeSupervisor():
+    """
+    Supervisor of the node for a single API worker. Workers compete for a
+    file lock in the data directory and only the winner starts, adopts or
+    restarts the node. Only the winner handles the restart jobs of the job
+    queue, while any worker can submit them and poll their status.
+
+    Attributes
+    ----------
+    _proxy: AsyncServiceProxy
+        Node-level proxy used for readiness checks and graceful stops.
+    _working_dir: str
+        Data directory of the node, containing `elements.conf`.
+    _binary: str
+        Path or name of the `elementsd` executable.
+    _state_dir: str
+        Directory for the control lock.
+    _jobs: JobQueue | None
+        Queue receiving the restart jobs.
+    _lock_file: IO | None
+        Open lock file while this worker is in control.
+    _process: asyncio.subprocess.Process | None
+        The node, when it was started by this worker.
+    _task: asyncio.Task | None
+        Running supervision loop.
+    _changing: asyncio.Lock | None
+        Held while the node is being started, stopped or checked, so the
+        supervision loop never acts on a node in the middle of a restart.
+    """
+
+    _proxy: AsyncServiceProxy
+    _working_dir: str
+    _binary: str
+    _ready_timeout: float
+    _state_dir: str
+    _jobs: Optional[JobQueue]
+    _lock_file: Optional[IO]
+    _process: Optional[asyncio.subprocess.Process]
+    _task: Optional[asyncio.Task]
+    _changing: Optional[asyncio.Lock]
+
+    def __init__(self, proxy_service: AsyncServiceProxy,
+                 working_dir: str = DEFAULT_LOCATION,
+                 binary: str = 'elementsd',
+                 ready_timeout: float = DEFAULT_READY_TIMEOUT,
+                 jobs: Optional[JobQueue] = None) -> None:
+        """
+        Constructor for NodeSupervisor class.
+
+        Parameters
+        ----------
+        proxy_service: AsyncServiceProxy
+            Node-level proxy used for readiness checks and graceful stops.
+        working_dir: str, default = `$HOME/.elements`
+            Data directory of the node, containing `elements.conf`.
+        binary: str, default = 'elementsd'
+            Path or name of the `elementsd` executable.
+        ready_timeout: float, default = 120.0
+            Maximum seconds to wait for the node to answer after starting.
+        jobs: JobQueue | None, default = None
+            Queue to take the restart jobs from while in control.
+        """
+        self._proxy = proxy_service
+        self._working_dir = working_dir
+        self._binary = binary
+        self._ready_timeout = ready_timeout
+        self._state_dir = f"{working_dir}/pyliquid"
+        self._jobs = jobs
+        self._lock_file = None
+        self._process = None
+        self._task = None
+        self._changing = None
+
+    @property
+    def is_controller(self) -> bool:
+        """
+        If this worker is the one in control of the node.
+        """
+        return self._lock_file is not None
+
+    @property
+    def child_pid(self) -> Optional[int]:
+        """
+        Process id of the node, when it was started by this worker.
+        """
+        if self._process is not None and self._process.returncode is None:
+            return self._process.pid
+        return None
+
+    def _try_control(self) -> bool:
+        """
+        Take the control lock without waiting. It's released by the OS if
+        the worker dies, so another worker can take over.
+        """
+        if self._lock_file is not None:
+            return True
+        os.makedirs(self._state_dir, exist_ok=True)
+        lock_file = open(f"{self._state_dir}/control.lock", 'a+')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._lock_file = lock_file
+        logging.info(f"Worker {os.getpid()} is in control of the node\n")
+        if self._jobs is not None:
+            self._jobs.register(RESTART_JOB, self._restart_job)
+        return True
+
+    def _release_control(self) -> None:
+        if self._jobs is not None:
+            self._jobs.unregister(RESTART_JOB)
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _changing_lock(self) -> asyncio.Lock:
+        # Created on first use, inside the event loop running the node.
+        if self._changing is None:
+            self._changing = asyncio.Lock()
+        return self._changing
+
+    async def _is_responding(self) -> bool:
+        try:
+            await self._proxy.uptime()
+        except JSONRPCException:
+            pass
+        except Exception:
+            return False
+        return True
+
+    async def start_node(self) -> None:
+        """
+        Adopt a node that is already answering, or start one as a child
+        process, and wait until it's ready.
+        """
+        async with self._changing_lock():
+            await self._start()
+
+    async def _start(self) -> None:
+        if await self._is_responding():
+            logging.info("Node is already running, adopting it\n")
+        else:
+            self._process = await asyncio.create_subprocess_exec(
+                self._binary, f"-datadir={self._working_dir}", "-daemon=0",
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+                # Keeps the node alive across restarts of the API.
+                start_new_session=True)
+            logging.info(f"Node started with pid {self._process.pid}\n")
+        if not await wait_for_rpc(self._proxy, True, self._ready_timeout):
+            raise RuntimeError("Node did not become ready in time")
+        logging.info("Elements Core up and running!\n")
+
+    async def stop_node(self, timeout: float = DEFAULT_STOP_TIMEOUT) -> None:
+        """
+        Stop the node gracefully trough RPC, killing the child process if
+        it doesn't exit in time.
+
+        Parameters
+        ----------
+        timeout: float, default = 60.0
+            Maximum seconds to wait for the node to stop.
+        """
+        async with self._changing_lock():
+            await self._stop(timeout)
+
+    async def _stop(self, timeout: float = DEFAULT_STOP_TIMEOUT) -> None:
+        try:
+            await self._proxy.stop()
+        except Exception:
+            pass
+        if self.child_pid is not None:
+            try:
+                await asyncio.wait_for(self._process.wait(), timeout)
+            except asyncio.TimeoutError:
+                logging.error("Node did not stop in time, killing it\n")
+                self._process.kill()
+                await self._process.wait()
+        elif not await wait_for_rpc(self._proxy, False, timeout):
+            raise RuntimeError("Node did not stop in time")
+        self._process = None
+
+    async def restart_node(self) -> None:
+        """
+        Stop the node and start it again, as a single change the supervision
+        loop waits for.
+        """
+        async with self._changing_lock():
+            await self._stop()
+            await self._start()
+
+    async def _restart_job(self, params: dict) -> dict:
+        """
+        Handler of the restart jobs.
+        """
+        await self.restart_node()
+        return {'pid': self.child_pid}
+
+    async def _supervise(self) -> None:
+        """
+        Supervision loop: take control when possible, and keep the node
+        running with backoff between failed starts.
+        """
+        started = False
+        backoff = 1.0
+        last_check = time.monotonic()
+        while True:
+            if not self._try_control():
+                await asyncio.sleep(CONTROL_INTERVAL)
+                continue
+            failed = False
+            # A restart in progress holds the lock, and the node it leaves
+            # running is the one checked afterwards.
+            async with self._changing_lock():
+                if not started:
+                    try:
+                        await self._start()
+                        started, backoff = True, 1.0
+                    except (RuntimeError, OSError) as start_exception:
+                        logging.error(f"Could not start the node: \
+                            {start_exception}\n")
+                        failed = True
+                elif self._process is not None and \
+                        self._process.returncode is not None:
+                    logging.error(f"Node exited unexpectedly with code \
+                        {self._process.returncode}\n")
+                    self._process, started = None, False
+                    continue
+                elif self._process is None and \
+                        time.monotonic() - last_check > CONTROL_INTERVAL:
+                    # Adopted nodes can't be waited on, so they are polled.
+                    last_check = time.monotonic()
+                    started = await self._is_responding()
+                    if not started:
+                        continue
+            if failed:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                continue
+            await asyncio.sleep(SUPERVISE_INTERVAL)
+
+    def start(self) -> None:
+        """
+        Start supervising in the running event loop without blocking.
+        """
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(
+                self._supervise())
+
+    async def stop(self) -> None:
+        """
+        Stop supervising and release control. The node keeps running, so
+        another worker or the next API start can adopt it.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._release_control()
+
+
+_SUPERVISOR: Optional[NodeSupervisor] = None
+
+
+def get_supervisor() -> NodeSupervisor:
+    """
+    FastAPI dependency returning the supervisor of this worker, created on
+    first use with `node_datadir` and `node_binary` from .env file. Restart
+    jobs come from the process-wide job queue.
+
+    Returns
+    -------
+    NodeSupervisor
+    """
+    global _SUPERVISOR
+    if _SUPERVISOR is None:
+        _SUPERVISOR = NodeSupervisor(
+            get_async_proxy(),
+            working_dir=get_optional_config('node_datadir', DEFAULT_LOCATION),
+            binary=get_optional_config('node_binary', 'elementsd'),
+            jobs=get_job_queue())
+    return _SUPERVISOR
@@ -1,12 +1,55 @@
 """
 Core components that represent objects inside Liquid node like a Wallet.
 """
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
 from uuid import uuid4
-from typing import Optional, Callable, Union
+from typing import (AsyncIterator, Iterator, List, Optional, Callable,
+                    Tuple, Union)
 
-from bitcoinrpc.authproxy import AuthServiceProxy  # type: ignore
+from bitcoinrpc.authproxy import AuthServiceProxy, JSONRPCException  # type: ignore
 from mnemonic import Mnemonic  # type: ignore
-from pyliquid.liquid.wrappers import rpc_exec
+from pyliquid.liquid.cache import (NODE_SCOPE, cache_key, get_wallet_cache,
+                                   is_missing)
+from pyliquid.liquid.client import AsyncServiceProxy
+from pyliquid.liquid.connection import PooledProxy
+from pyliquid.liquid.coordination import get_wallet_coordinator
+from pyliquid.liquid.issuance import (DEFAULT_FEE_RESERVE,
+                                      DEFAULT_ISSUE_CONCURRENCY,
+                                      get_issuance_registry, missing_outputs)
+from pyliquid.liquid.wrappers import async_rpc_exec, rpc_exec
+from pyliquid.models.responses import IssuedAsset
+
+# Transactions per `listtransactions` call when iterating a wallet history.
+DEFAULT_PAGE_SIZE = 500
+
+
+def _transaction_key(transaction: dict) -> tuple:
+    """
+    Identity of a `listtransactions` entry, a transaction may have several.
+    """
+    return (transaction.get('txid'), transaction.get('vout'),
+            transaction.get('category'), transaction.get('address'))
+
+
+def _issued_asset(index: int, issuance: dict) -> IssuedAsset:
+    return IssuedAsset(index=index, asset=issuance.get('asset'),
+                       token=issuance.get('token'),
+                       entropy=issuance.get('entropy'),
+                       txid=issuance.get('txid'), vin=issuance.get('vin'))
+
+
+def _unseen(page: list, previous: set) -> Iterator[dict]:
+    """
+    Entries of a page newest first, without the ones already given by the
+    previous page. New transactions shift the pages while iterating, moving
+    already seen entries to the next page.
+    """
+    for transaction in reversed(page):
+        if _transaction_key(transaction) not in previous:
+            yield transaction
 
 
 class Wallet():
@@ -15,16 +58,19 @@ class Wallet():
 
     Attributes
     --------
-    _proxy: AuthServiceProxy
+    _proxy: AuthServiceProxy | PooledProxy
         Authenticated Proxy Service to be used by the classmethods.
+    _name: str | None
+        Name of the wallet at the node level, `None` for the default one.
     _wallet: Dict
         Resulting metadata of the wallet at the node level.
     """
 
-    _proxy: AuthServiceProxy
+    _proxy: Union[AuthServiceProxy, PooledProxy]
+    _name: Optional[str]
     _wallet: dict
 
-    def __init__(self, proxy_service: AuthServiceProxy,
+    def __init__(self, proxy_service: Union[AuthServiceProxy, PooledProxy],
                  mode: Optional[str] = 'r',
                  wallet_label: Optional[str] = None,
                  with_address: bool = True) -> None:
@@ -33,12 +79,15 @@ class Wallet():
 
         Parameters
         ---------
-        proxy: AuthServiceProxy
+        proxy: AuthServiceProxy | PooledProxy
             Authenticated Proxy Service to be used by troughout the class.
+            A `PooledProxy` reuses the connections of the process-wide pool,
+            and a `ShardedProxy` reaches the node holding the wallet.
         with_address: bool, default = True
             If your wallet should have at least one address.
         """
         self._proxy = proxy_service
+        self._name = None
         if mode == 'c':
             self._wallet = self._create_wallet(label=wallet_label,
                                                address=with_address)
@@ -46,16 +95,24 @@ class Wallet():
             self._wallet = {}
         elif mode == 'l':
             self._wallet = self.load_wallet(wallet_label)
+            self._bind(wallet_label)
         else:
             raise NotImplementedError("Provide a valid Wallet mode!")
 
     @property
-    def proxy(self) -> AuthServiceProxy:
+    def proxy(self) -> Union[AuthServiceProxy, PooledProxy]:
         """
         Getter method for `proxy` attribute.
         """
         return self._proxy
 
+    @property
+    def name(self) -> Optional[str]:
+        """
+        Getter method for `name` attribute.
+        """
+        return self._name
+
     @property
     def wallet(self) -> dict:
         """
@@ -63,6 +120,15 @@ class Wallet():
         """
         return self._wallet
 
+    def _bind(self, name: str) -> None:
+        """
+        Name the wallet, scoping every following call to it when the proxy
+        routes wallets, like a `ShardedProxy`.
+        """
+        self._name = name
+        if hasattr(self._proxy, 'for_wallet'):
+            self._proxy = self._proxy.for_wallet(name)
+
     @classmethod
     @rpc_exec
     def _wrapper_executor(cls, _inst_func: Callable, *args):
@@ -87,6 +153,38 @@ class Wallet():
         else:
             return _inst_func()
 
+    def _cached_read(self, method: str, *args):
+        """
+        Execute a read-only method trough the process-wide wallet cache.
+
+        Parameters
+        ----------
+        method: str
+            Name of the RPC method.
+        *args:
+            Set of parameters to be passed down to the method.
+
+        Returns
+        -------
+        Any
+            Output of the method, possibly from the cache. Callers should
+            not modify it.
+        """
+        cache = get_wallet_cache()
+        key = cache_key(method, self._name, args)
+        output = cache.get(key)
+        if is_missing(output):
+            output = self._wrapper_executor(getattr(self.proxy, method), *args)
+            if output is not None:
+                cache.set(key, output)
+        return output
+
+    def invalidate_cache(self) -> None:
+        """
+        Drop the cached reads of this wallet, after it changed.
+        """
+        get_wallet_cache().invalidate(self._name or '')
+
     def _create_wallet(self, address: bool, 
                        label: Optional[str] = None) -> dict:
         """
@@ -108,6 +206,8 @@ class Wallet():
             label = str(uuid4())
         creation = self._wrapper_executor(self.proxy.createwallet, label,
                                           False, False)
+        self._bind(label)
+        get_wallet_cache().invalidate(NODE_SCOPE)
         if address:
             output = self._wrapper_executor(self.proxy.getnewaddress)
             return output
@@ -143,7 +243,7 @@ class Wallet():
         dict
             Dictionary with a lists of wallets.
         """
-        return self._wrapper_executor(self.proxy.listwalletdir)
+        return self._cached_read('listwalletdir')
 
     def load_wallet(self, name: str) -> dict:
         """
@@ -170,7 +270,7 @@ class Wallet():
         dict
             Dictionary with a lists of wallets
         """
-        return self._wrapper_executor(self.proxy.getbalance)
+        return self._cached_read('getbalance')
 
     def get_address(self) -> str:
         """
@@ -214,7 +314,7 @@ class Wallet():
         dict
             Current wallet information.
         """
-        return self._wrapper_executor(self.proxy.getwalletinfo)
+        return self._cached_read('getwalletinfo')
 
     def send_to_address(self, address: str, amount: float) -> str:
         """
@@ -233,8 +333,44 @@ class Wallet():
         str
             Transaction ID.
         """
-        return self._wrapper_executor(self.proxy.sendtoaddress, 
-            address, amount)
+        output = self._wrapper_executor(self.proxy.sendtoaddress,
+                                        address, amount)
+        self.invalidate_cache()
+        return output
+
+    def iter_transactions(self, page_size: int = DEFAULT_PAGE_SIZE,
+                          since_block: Optional[str] = None) \
+            -> Iterator[dict]:
+        """
+        Iterate the wallet history newest first, asking the node for one page
+        at a time. Unlike other methods, RPC errors are raised, so a partial
+        history is never mistaken for a complete one.
+
+        Parameters
+        ----------
+        page_size: int, default = 500
+            Transactions per `listtransactions` call.
+        since_block: str | None, default = None
+            Only iterate the transactions after this block hash, trough
+            `listsinceblock`, for incremental syncs.
+
+        Returns
+        -------
+        Iterator[dict]
+            Entries as returned by `listtransactions`.
+        """
+        if since_block is not None:
+            output = self.proxy.listsinceblock(since_block, 1, True)
+            yield from reversed(output['transactions'])
+            return
+        skip, previous = 0, set()
+        while True:
+            page = self.proxy.listtransactions("*", page_size, skip, True)
+            yield from _unseen(page, previous)
+            if len(page) < page_size:
+                return
+            skip += page_size
+            previous = {_transaction_key(t) for t in page}
 
 
 class Pool:
@@ -286,5 +422,627 @@ class Pool:
         dict
             Token metadata result.
         """
-        return self._vault_wallet._wrapper_executor(
+        output = self._vault_wallet._wrapper_executor(
             self._vault_wallet.proxy.issueasset, amount, reissue)
+        self._vault_wallet.invalidate_cache()
+        if output is not None:
+            get_issuance_registry().record(self._vault_wallet.name, output,
+                                           str(amount), str(reissue))
+        return output
+
+    def split_utxos(self, count: int,
+                    reserve: Decimal = DEFAULT_FEE_RESERVE) -> Optional[str]:
+        """
+        Make sure the wallet has one output of the policy asset per
+        issuance, so concurrent issuances don't compete for the same coins
+        or chain on each other change. Missing outputs are created with a
+        single `sendmany` to the wallet itself.
+
+        Parameters
+        ----------
+        count: int
+            Number of issuances to be made.
+        reserve: Decimal, default = 0.0001
+            Amount of each created output.
+
+        Returns
+        -------
+        str | None
+            Transaction ID of the split, `None` if it wasn't needed.
+        """
+        proxy = self._vault_wallet.proxy
+        policy_asset = proxy.dumpassetlabels()['bitcoin']
+        missing = missing_outputs(proxy.listunspent(0), policy_asset, count,
+                                  reserve)
+        if not missing:
+            return None
+        # `AuthServiceProxy.batch_` pops the method of every call, so they
+        # can't share a list. It strips the JSON-RPC envelopes, returning
+        # only the result values, and raises on the first error.
+        addresses = proxy.batch_([["getnewaddress"] for _ in range(missing)])
+        output = proxy.sendmany("", {address: reserve
+                                     for address in addresses})
+        self._vault_wallet.invalidate_cache()
+        return output
+
+    def issue_tokens(self, tokens: List[Tuple[Union[str, float],
+                                              Union[str, float]]],
+                     max_workers: int = DEFAULT_ISSUE_CONCURRENCY,
+                     presplit: bool = True) -> List[IssuedAsset]:
+        """
+        Issue many tokens from the pool wallet, with up to `max_workers`
+        calls in flight. Every issued asset is saved to the issuance
+        registry.
+
+        Parameters
+        ----------
+        tokens: list[tuple]
+            Pairs of `(amount, reissue)` as given to `issue_token`.
+        max_workers: int, default = 4
+            Maximum number of concurrent calls. Only a wallet using a
+            `PooledProxy` is called concurrently, others one at a time.
+        presplit: bool, default = True
+            Call `split_utxos` before issuing.
+
+        Returns
+        -------
+        list[IssuedAsset]
+            Outcome of every issuance, in the same order as `tokens`.
+        """
+        wallet = self._vault_wallet
+        registry = get_issuance_registry()
+        if presplit:
+            try:
+                self.split_utxos(len(tokens))
+            except Exception as general_exception:
+                logging.error(f"Could not split outputs before issuing: \
+                    {general_exception}\n")
+
+        def issue(index: int, token: tuple) -> IssuedAsset:
+            amount, reissue = token
+            try:
+                output = wallet.proxy.issueasset(amount, reissue)
+            except Exception as general_exception:
+                logging.error(f"Issuance {index} failed: \
+                    {general_exception}\n")
+                return IssuedAsset(index=index, error=str(general_exception))
+            registry.record(wallet.name, output, str(amount), str(reissue))
+            return _issued_asset(index, output)
+
+        workers = max_workers if isinstance(wallet.proxy, PooledProxy) else 1
+        with ThreadPoolExecutor(workers) as executor:
+            results = list(executor.map(issue, range(len(tokens)), tokens))
+        wallet.invalidate_cache()
+        return results
+
+
+class AsyncWallet():
+    """
+    Asynchronous counterpart of `Wallet`, to be used inside the event loop.
+    Instances that need to create or load a wallet are built with
+    `AsyncWallet.from_mode`, since constructors can't be awaited.
+
+    Attributes
+    --------
+    _proxy: AsyncServiceProxy
+        Asynchronous Proxy Service to be used by the classmethods. Scoped to
+        `/wallet/<name>` once the wallet is created or loaded.
+    _name: str | None
+        Name of the wallet at the node level, `None` for the default one.
+    _wallet: Dict
+        Resulting metadata of the wallet at the node level.
+    """
+
+    _proxy: AsyncServiceProxy
+    _name: Optional[str]
+    _wallet: dict
+
+    def __init__(self, proxy_service: AsyncServiceProxy,
+                 wallet_name: Optional[str] = None) -> None:
+        """
+        Constructor for AsyncWallet class.
+
+        Parameters
+        ---------
+        proxy_service: AsyncServiceProxy
+            Asynchronous Proxy Service to be used by troughout the class.
+        wallet_name: str, default = None
+            Name of an already loaded wallet. Calls are then sent to its
+            wallet-scoped endpoint.
+        """
+        self._proxy = proxy_service
+        self._name = None
+        self._wallet = {}
+        if wallet_name is not None:
+            self._bind(wallet_name)
+
+    @classmethod
+    async def from_mode(cls, proxy_service: AsyncServiceProxy,
+                        mode: Optional[str] = 'r',
+                        wallet_label: Optional[str] = None,
+                        with_address: bool = True) -> "AsyncWallet":
+        """
+        Build a wallet the same way `Wallet` constructor does.
+
+        Parameters
+        ---------
+        proxy_service: AsyncServiceProxy
+            Asynchronous Proxy Service to be used by troughout the class.
+        mode: str, default = 'r'
+            Either `c` to create, `l` to load or `r` to just read.
+        wallet_label: str, default = None
+            Name of the wallet to be created or loaded.
+        with_address: bool, default = True
+            If your wallet should have at least one address.
+
+        Returns
+        -------
+        AsyncWallet
+        """
+        instance = cls(proxy_service)
+        if mode == 'c':
+            instance._wallet = await instance._create_wallet(
+                label=wallet_label, address=with_address)
+        elif mode == 'l':
+            instance._wallet = await instance.load_wallet(wallet_label)
+            instance._bind(wallet_label)
+        elif mode != 'r':
+            raise NotImplementedError("Provide a valid Wallet mode!")
+        return instance
+
+    @property
+    def proxy(self) -> AsyncServiceProxy:
+        """
+        Getter method for `proxy` attribute.
+        """
+        return self._proxy
+
+    @property
+    def name(self) -> Optional[str]:
+        """
+        Getter method for `name` attribute.
+        """
+        return self._name
+
+    @property
+    def wallet(self) -> dict:
+        """
+        Getter method for `wallet` attribute.
+        """
+        return self._wallet
+
+    def _bind(self, name: str) -> None:
+        """
+        Scope every following call to the given wallet.
+        """
+        self._name = name
+        self._proxy = self._proxy.for_wallet(name)
+
+    @classmethod
+    @async_rpc_exec
+    async def _wrapper_executor(cls, _inst_func: Callable, *args):
+        """
+        Executor for wrapper coroutines to work withing instance methods.
+
+        Parameters
+        ---------
+        _inst_func: Callable
+            Instance coroutine to be awaited.
+        *args:
+            Set of parameters to be passed down to the function.
+
+        Returns
+        -------
+        dict
+            Output of function execution.
+        """
+        if args:
+            # Unpacks and unnest args before passing it down to function.
+            return await _inst_func(*args[0])
+        else:
+            return await _inst_func()
+
+    async def _cached_read(self, method: str, *args, raw: bool = False):
+        """
+        Execute a read-only method trough the process-wide wallet cache.
+
+        Parameters
+        ----------
+        method: str
+            Name of the RPC method.
+        *args:
+            Set of parameters to be passed down to the method.
+        raw: bool, default = False
+            Return the result as the raw JSON written by the node.
+
+        Returns
+        -------
+        Any
+            Output of the method, possibly from the cache. Callers should
+            not modify it.
+        """
+        cache = get_wallet_cache()
+        key = cache_key(method, self._name, ('raw_',) + args if raw else args)
+        output = cache.get(key)
+        if is_missing(output):
+            caller = getattr(self.proxy, method)
+            # Concurrent misses for the same key share a single node call.
+            output = await get_wallet_coordinator().coalesce(
+                key, lambda: self._wrapper_executor(
+                    caller.raw_ if raw else caller, *args))
+            if output is not None:
+                cache.set(key, output)
+        return output
+
+    def invalidate_cache(self) -> None:
+        """
+        Drop the cached reads of this wallet, after it changed.
+        """
+        get_wallet_cache().invalidate(self._name or '')
+
+    async def _write(self, method: str, *args):
+        """
+        Execute a method changing the wallet, once the writes queued before
+        it for the same wallet are done.
+
+        Parameters
+        ----------
+        method: str
+            Name of the RPC method.
+        *args:
+            Set of parameters to be passed down to the method.
+
+        Returns
+        -------
+        Any
+            Output of the method.
+
+        Raises
+        ------
+        WalletBusy
+            If too many writes are waiting for the wallet.
+        """
+        async with get_wallet_coordinator().writing(self._name):
+            output = await self._wrapper_executor(getattr(self.proxy, method),
+                                                  *args)
+        self.invalidate_cache()
+        return output
+
+    async def _create_wallet(self, address: bool,
+                             label: Optional[str] = None) -> dict:
+        """
+        Create a wallet from a random name.
+
+        Parameters
+        ----------
+        label: str
+            Name for the wallet
+        address: bool
+            Either to create or not an address for this wallet.
+
+        Returns
+        ------
+        dict
+            Resulting metadata from Wallet creation process.
+        """
+        if not label:
+            label = str(uuid4())
+        creation = await self._wrapper_executor(self.proxy.createwallet,
+                                                label, False, False)
+        self._bind(label)
+        get_wallet_cache().invalidate(NODE_SCOPE)
+        if address:
+            return await self._wrapper_executor(self.proxy.getnewaddress)
+        else:
+            return creation
+
+    async def list_wallets(self) -> list:
+        """
+        Get all saved wallets at node directory.
+
+        Returns
+        -------
+        dict
+            Dictionary with a lists of wallets.
+        """
+        return await self._cached_read('listwalletdir')
+
+    async def load_wallet(self, name: str) -> dict:
+        """
+        Load a wallet with a given filename.
+
+        Parameters
+        ----------
+        label: str
+            Label of the wallet to be loaded.
+
+        Returns
+        -------
+        dict
+            Dictionary with the wallet details
+        """
+        return await self._wrapper_executor(self.proxy.loadwallet, name)
+
+    async def get_balance(self) -> dict:
+        """
+        Get the balance of the current wallet.
+
+        Returns
+        -------
+        dict
+            Dictionary with a lists of wallets
+        """
+        return await self._cached_read('getbalance')
+
+    async def get_address(self) -> str:
+        """
+        Get the current address of the wallet.
+
+        Returns
+        -------
+        str
+            Current address of the wallet.
+        """
+        return await self._wrapper_executor(self.proxy.getaddress)
+
+    async def get_private_key(self) -> str:
+        """
+        Get the current private key of the wallet.
+
+        Returns
+        -------
+        str
+            Current private key of the wallet.
+        """
+        return await self._wrapper_executor(self.proxy.dumpprivkey)
+
+    async def get_public_key(self) -> str:
+        """
+        Get the current public key of the wallet.
+
+        Returns
+        -------
+        str
+            Current public key of the wallet.
+        """
+        return await self._wrapper_executor(self.proxy.getpubkey)
+
+    async def get_wallet_info(self, raw: bool = False) -> Union[dict, bytes]:
+        """
+        Get the current wallet information.
+
+        Parameters
+        ----------
+        raw: bool, default = False
+            Return the raw JSON written by the node.
+
+        Returns
+        -------
+        dict | bytes
+            Current wallet information.
+        """
+        return await self._cached_read('getwalletinfo', raw=raw)
+
+    async def list_unspent(self, min_conf: int = 1,
+                           raw: bool = False) -> Union[list, bytes]:
+        """
+        Get the unspent outputs of the wallet.
+
+        Parameters
+        ----------
+        min_conf: int, default = 1
+            Minimum confirmations of the outputs.
+        raw: bool, default = False
+            Return the raw JSON written by the node.
+
+        Returns
+        -------
+        list | bytes
+            Unspent outputs with their amount and asset.
+        """
+        return await self._wrapper_executor(
+            self.proxy.listunspent.raw_ if raw else self.proxy.listunspent,
+            min_conf)
+
+    async def send_to_address(self, address: str, amount: float) -> str:
+        """
+        Send a transaction to a given address.
+        TODO: Validate the input address.
+
+        Parameters
+        ---------
+        address: str
+            Address to send the transaction to.
+        amount: float
+            Amount to send.
+
+        Returns
+        -------
+        str
+            Transaction ID.
+        """
+        return await self._write('sendtoaddress', address, amount)
+
+    async def iter_transactions(self, page_size: int = DEFAULT_PAGE_SIZE,
+                                since_block: Optional[str] = None) \
+            -> AsyncIterator[dict]:
+        """
+        Asynchronous counterpart of `Wallet.iter_transactions`.
+
+        Parameters
+        ----------
+        page_size: int, default = 500
+            Transactions per `listtransactions` call.
+        since_block: str | None, default = None
+            Only iterate the transactions after this block hash.
+
+        Returns
+        -------
+        AsyncIterator[dict]
+            Entries as returned by `listtransactions`.
+        """
+        if since_block is not None:
+            output = await self.proxy.listsinceblock(since_block, 1, True)
+            for transaction in reversed(output['transactions']):
+                yield transaction
+            return
+        skip, previous = 0, set()
+        while True:
+            page = await self.proxy.listtransactions("*", page_size, skip,
+                                                     True)
+            for transaction in _unseen(page, previous):
+                yield transaction
+            if len(page) < page_size:
+                return
+            skip += page_size
+            previous = {_transaction_key(t) for t in page}
+
+
+class AsyncPool:
+    """
+    Asynchronous counterpart of `Pool`.
+
+    Attributes
+    ----------
+    _vault_wallet: AsyncWallet
+        Wallet owner of this Pool.
+    """
+
+    _vault_wallet: AsyncWallet
+
+    def __init__(self, input_wallet: AsyncWallet):
+        """
+        Constructor for AsyncPool class.
+
+        Parameters
+        ----------
+        input_wallet: AsyncWallet
+            Wallet to own the Pool and safeguard the tokens.
+        """
+        self._vault_wallet = input_wallet
+
+    @property
+    def vaul_wallet(self) -> AsyncWallet:
+        """
+        Getter method for `vault_wallet` attribute.
+        """
+        return self._vault_wallet
+
+    async def issue_token(self, amount: Union[str, float],
+                          reissue: Union[str, float]) -> dict:
+        """
+        Issue a token from the pool wallet.
+
+        Parameters
+        ----------
+        amount: Union[str, float]
+            Initial amount of tokens to be available.
+        reissue: Union[str, float]
+            Amount of reissuance tokens to generate.
+
+        Returns
+        -------
+        dict
+            Token metadata result.
+        """
+        output = await self._vault_wallet._write('issueasset', amount,
+                                                 reissue)
+        if output is not None:
+            get_issuance_registry().record(self._vault_wallet.name, output,
+                                           str(amount), str(reissue))
+        return output
+
+    async def split_utxos(self, count: int,
+                          reserve: Decimal = DEFAULT_FEE_RESERVE) \
+            -> Optional[str]:
+        """
+        Asynchronous counterpart of `Pool.split_utxos`.
+
+        Parameters
+        ----------
+        count: int
+            Number of issuances to be made.
+        reserve: Decimal, default = 0.0001
+            Amount of each created output.
+
+        Returns
+        -------
+        str | None
+            Transaction ID of the split, `None` if it wasn't needed.
+        """
+        proxy = self._vault_wallet.proxy
+        labels, unspent = await proxy.batch_([["dumpassetlabels"],
+                                              ["listunspent", 0]])
+        for response in (labels, unspent):
+            if response.get('error') is not None:
+                raise JSONRPCException(response['error'])
+        missing = missing_outputs(unspent['result'],
+                                  labels['result']['bitcoin'], count, reserve)
+        if not missing:
+            return None
+        addresses = [response['result'] for response
+                     in await proxy.batch_([["getnewaddress"]] * missing)]
+        async with get_wallet_coordinator().writing(self._vault_wallet.name):
+            output = await proxy.sendmany("", {address: reserve
+                                               for address in addresses})
+        self._vault_wallet.invalidate_cache()
+        return output
+
+    async def issue_tokens(self, tokens: List[Tuple[Union[str, float],
+                                                    Union[str, float]]],
+                           max_concurrency: int = DEFAULT_ISSUE_CONCURRENCY,
+                           presplit: bool = True) -> List[IssuedAsset]:
+        """
+        Asynchronous counterpart of `Pool.issue_tokens`.
+
+        Parameters
+        ----------
+        tokens: list[tuple]
+            Pairs of `(amount, reissue)` as given to `issue_token`.
+        max_concurrency: int, default = 4
+            Maximum number of calls in flight. The whole batch takes a
+            single turn of the write queue of the wallet, so it's not
+            limited by the writes allowed per wallet.
+        presplit: bool, default = True
+            Call `split_utxos` before issuing.
+
+        Returns
+        -------
+        list[IssuedAsset]
+            Outcome of every issuance, in the same order as `tokens`.
+
+        Raises
+        ------
+        WalletBusy
+            If the write queue of the wallet is full.
+        """
+        wallet = self._vault_wallet
+        registry = get_issuance_registry()
+        if presplit:
+            try:
+                await self.split_utxos(len(tokens))
+            except Exception as general_exception:
+                logging.error(f"Could not split outputs before issuing: \
+                    {general_exception}\n")
+        slots = asyncio.Semaphore(max_concurrency)
+
+        async def issue(index: int, token: tuple) -> IssuedAsset:
+            amount, reissue = token
+            async with slots:
+                try:
+                    output = await wallet.proxy.issueasset(amount, reissue)
+                except Exception as general_exception:
+                    logging.error(f"Issuance {index} failed: \
+                        {general_exception}\n")
+                    return IssuedAsset(index=index,
+                                       error=str(general_exception))
+            registry.record(wallet.name, output, str(amount), str(reissue))
+            return _issued_asset(index, output)
+
+        try:
+            async with get_wallet_coordinator().writing(wallet.name):
+                results = await asyncio.gather(*[
+                    issue(index, token) for index, token in enumerate(tokens)])
+        finally:
+            wallet.invalidate_cache()
+        return list(results)
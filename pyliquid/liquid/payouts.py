@@ -0,0 +1,476 @@
+"""
+Batching of payouts into `sendmany` transactions, so many payouts share a
+single transaction, fee and wallet lock. Payouts are stored as soon as they
+are accepted, so the ones not sent yet survive a restart of the API.
+
+A payout is `pending` until its batch is flushed, then `sending`, and ends
+`sent` or `failed`. When the node can't tell, like on a timeout, it's
+`unknown` until the transaction is looked up in the wallet by the comment
+of its `sendmany`.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional, Tuple, Union
+from uuid import uuid4
+
+from bitcoinrpc.authproxy import JSONRPCException  # type: ignore
+from pyliquid.liquid.client import get_async_pool
+from pyliquid.liquid.coordination import get_wallet_coordinator
+from pyliquid.liquid.operations import AsyncWallet
+from pyliquid.utils.exceptions import (RPC_IN_WARMUP,
+                                       RPC_INVALID_ADDRESS_OR_KEY,
+                                       RPC_INVALID_PARAMETER,
+                                       RPC_METHOD_NOT_FOUND, RPC_TYPE_ERROR,
+                                       RPC_WALLET_INSUFFICIENT_FUNDS,
+                                       RPC_WALLET_NOT_FOUND,
+                                       RPC_WALLET_NOT_SPECIFIED,
+                                       RPC_WALLET_UNLOCK_NEEDED)
+from pyliquid.utils.misc import get_optional_config, pid_alive
+from pyliquid.utils.storage import database_path, open_database
+
+DEFAULT_MAX_OUTPUTS = 100
+DEFAULT_MAX_DELAY = 0.5
+
+# Seconds sent and failed payouts are kept for `status` lookups, 7 days.
+PAYOUT_RETENTION = 7 * 24 * 3600.0
+
+# Smallest unit of an amount, 1 satoshi.
+AMOUNT_UNIT = Decimal('0.00000001')
+
+# Errors of `sendmany` caused by a single output, like an invalid address.
+# The batch is split to send the other payouts without it.
+REJECTED_OUTPUT_CODES = frozenset({RPC_TYPE_ERROR, RPC_INVALID_ADDRESS_OR_KEY,
+                                   RPC_INVALID_PARAMETER})
+
+# Errors of `sendmany` raised before the transaction is committed, so the
+# payouts of the batch surely weren't sent. Others leave them `unknown`.
+NOT_SENT_CODES = REJECTED_OUTPUT_CODES | {
+    RPC_WALLET_INSUFFICIENT_FUNDS, RPC_WALLET_UNLOCK_NEEDED,
+    RPC_WALLET_NOT_FOUND, RPC_WALLET_NOT_SPECIFIED, RPC_IN_WARMUP,
+    RPC_METHOD_NOT_FOUND}
+
+# Seconds before `unknown` payouts are looked up in the wallet.
+RECONCILE_DELAY = 30.0
+
+# Seconds after which an `unknown` payout missing from the wallet is failed,
+# once the node surely finished the call.
+RECONCILE_GRACE = 600.0
+
+# Latest wallet transactions searched for `unknown` payouts.
+RECONCILE_WINDOW = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS payouts (
+    id TEXT PRIMARY KEY,
+    address TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    asset TEXT,
+    status TEXT NOT NULL,
+    txid TEXT,
+    error TEXT,
+    batch TEXT,
+    worker INTEGER,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS payouts_status ON payouts (status, worker);
+"""
+
+_Pending = Tuple[str, str, Decimal, asyncio.Future]
+
+
+def payout_amount(amount: Union[str, float, Decimal]) -> Decimal:
+    """
+    Check an amount can be paid out, so it can't fail the batch it joins.
+
+    Parameters
+    ----------
+    amount: str | float | Decimal
+
+    Returns
+    -------
+    Decimal
+
+    Raises
+    ------
+    ValueError
+        If it's not a positive amount with at most 8 decimals.
+    """
+    try:
+        value = Decimal(str(amount))
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount '{amount}'")
+    if not value.is_finite() or value <= 0 or \
+            value != value.quantize(AMOUNT_UNIT):
+        raise ValueError(f"Invalid amount '{amount}'")
+    return value
+
+
+class PayoutBatcher():
+    """
+    Queue of payouts flushed as one `sendmany` per asset, every `max_delay`
+    seconds or as soon as `max_outputs` payouts are waiting, whichever comes
+    first. Payouts are kept in a table shared by the workers, so any of them
+    can report their status.
+
+    Attributes
+    ----------
+    _wallet: AsyncWallet
+        Wallet paying out.
+    _database: sqlite3.Connection
+        Connection opened with `SCHEMA`.
+    _max_outputs: int
+        Payouts that trigger an immediate flush.
+    _max_delay: float
+        Seconds a payout waits at most before its batch is flushed.
+    _pending: dict[str | None, list]
+        Waiting payouts by asset, `None` for the policy asset.
+    _timers: dict[str | None, asyncio.TimerHandle]
+        Scheduled flush per asset.
+    _reconciling: asyncio.TimerHandle | None
+        Scheduled lookup of the `unknown` payouts.
+    """
+
+    _wallet: AsyncWallet
+    _database: sqlite3.Connection
+    _lock: threading.Lock
+    _max_outputs: int
+    _max_delay: float
+    _pending: Dict[Optional[str], List[_Pending]]
+    _timers: Dict[Optional[str], asyncio.TimerHandle]
+    _flushes: set
+    _reconciling: Optional[asyncio.TimerHandle]
+
+    def __init__(self, wallet: AsyncWallet, database: sqlite3.Connection,
+                 max_outputs: int = DEFAULT_MAX_OUTPUTS,
+                 max_delay: float = DEFAULT_MAX_DELAY) -> None:
+        """
+        Constructor for PayoutBatcher class.
+
+        Parameters
+        ----------
+        wallet: AsyncWallet
+            Wallet paying out.
+        database: sqlite3.Connection
+            Connection opened with `SCHEMA`.
+        max_outputs: int, default = 100
+            Payouts that trigger an immediate flush.
+        max_delay: float, default = 0.5
+            Seconds a payout waits at most before its batch is flushed.
+        """
+        if max_outputs <= 0:
+            raise ValueError("Provide a maximum of outputs higher than 0")
+        self._wallet = wallet
+        self._database = database
+        self._lock = threading.Lock()
+        self._max_outputs = max_outputs
+        self._max_delay = max_delay
+        self._pending = {}
+        self._timers = {}
+        self._flushes = set()
+        self._reconciling = None
+
+    def _update(self, payout_ids: List[str], status: str,
+                txid: Optional[str] = None, error: Optional[str] = None,
+                batch: Optional[str] = None) -> None:
+        finished = time.time() \
+            if status in ('sent', 'failed', 'unknown') else None
+        with self._lock, self._database:
+            self._database.executemany(
+                "UPDATE payouts SET status = ?, txid = ?, error = ?, "
+                "batch = COALESCE(?, batch), finished_at = ? WHERE id = ?",
+                [(status, txid, error, batch, finished, payout_id)
+                 for payout_id in payout_ids])
+
+    def status(self, payout_id: str) -> Optional[dict]:
+        """
+        Return the status of a payout, with its `txid` once sent. An
+        `unknown` payout may have been sent, and is never sent again.
+
+        Parameters
+        ----------
+        payout_id: str
+
+        Returns
+        -------
+        dict | None
+            `None` if the payout is unknown or too old.
+        """
+        with self._lock, self._database:
+            row = self._database.execute(
+                "SELECT id, status, txid, error FROM payouts WHERE id = ?",
+                (payout_id,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('id', 'status', 'txid', 'error'), row))
+
+    def submit(self, address: str, amount: Union[str, float, Decimal],
+               asset: Optional[str] = None) -> Tuple[str, asyncio.Future]:
+        """
+        Queue a payout for the next batch of its asset.
+
+        Parameters
+        ----------
+        address: str
+            Address to send the payout to.
+        amount: str | float | Decimal
+            Amount to send.
+        asset: str | None, default = None
+            Asset id or label, `None` for the policy asset.
+
+        Returns
+        -------
+        tuple[str, asyncio.Future]
+            Id of the payout and a future resolving to the shared txid.
+
+        Raises
+        ------
+        ValueError
+            If the amount can't be paid out.
+        """
+        value = payout_amount(amount)
+        payout_id = str(uuid4())
+        with self._lock, self._database:
+            self._database.execute(
+                "INSERT INTO payouts (id, address, amount, asset, status, "
+                "worker, created_at) VALUES (?, ?, ?, ?, 'pending', ?, ?)",
+                (payout_id, address, format(value, 'f'), asset, os.getpid(),
+                 time.time()))
+        return payout_id, self._queue(payout_id, address, value, asset)
+
+    def _queue(self, payout_id: str, address: str, amount: Decimal,
+               asset: Optional[str]) -> asyncio.Future:
+        """
+        Add a stored payout to the next batch of its asset.
+        """
+        future = asyncio.get_running_loop().create_future()
+        # Callers using the payout id may never await the future.
+        future.add_done_callback(
+            lambda done: done.cancelled() or done.exception())
+        queue = self._pending.setdefault(asset, [])
+        queue.append((payout_id, address, amount, future))
+        if len(queue) >= self._max_outputs:
+            self._start_flush(asset)
+        elif asset not in self._timers:
+            self._timers[asset] = asyncio.get_running_loop().call_later(
+                self._max_delay, self._start_flush, asset)
+        return future
+
+    async def send(self, address: str, amount: Union[str, float, Decimal],
+                   asset: Optional[str] = None) -> str:
+        """
+        Queue a payout and wait for its batch to be sent.
+
+        Returns
+        -------
+        str
+            Transaction ID shared by the whole batch.
+        """
+        _, future = self.submit(address, amount, asset)
+        return await future
+
+    def _start_flush(self, asset: Optional[str]) -> None:
+        timer = self._timers.pop(asset, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(asset, [])
+        if batch:
+            task = asyncio.get_running_loop().create_task(
+                self._flush(asset, batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, asset: Optional[str],
+                     batch: List[_Pending]) -> None:
+        """
+        Send a batch, resolving the futures of all its payouts.
+        """
+        try:
+            await self._send(asset, batch)
+        finally:
+            self._wallet.invalidate_cache()
+
+    async def _send(self, asset: Optional[str],
+                    batch: List[_Pending]) -> None:
+        """
+        Send a batch as a single `sendmany`. When the node rejects one of
+        its outputs, each half is sent on its own, so only the payouts at
+        fault fail. Errors that don't prove the batch wasn't sent leave it
+        `unknown`, to be reconciled later.
+        """
+        payout_ids = [payout_id for payout_id, _, _, _ in batch]
+        # Payouts that may have reached the node are never sent again. The
+        # batch id is the comment of the transaction, to find it again.
+        batch_id = uuid4().hex
+        self._update(payout_ids, 'sending', batch=batch_id)
+        amounts: Dict[str, Decimal] = {}
+        for _, address, amount, _ in batch:
+            # Payouts to the same address are merged into a single output.
+            amounts[address] = amounts.get(address, Decimal(0)) + amount
+        # Optional params left as null keep the node defaults.
+        params: list = ["", amounts, None, batch_id]
+        if asset is not None:
+            params += [None] * 4 + [{address: asset for address in amounts}]
+        try:
+            async with get_wallet_coordinator().writing(self._wallet.name):
+                txid = await self._wallet.proxy.sendmany(*params)
+        except Exception as general_exception:
+            if len(batch) > 1 and isinstance(general_exception,
+                                             JSONRPCException) and \
+                    general_exception.code in REJECTED_OUTPUT_CODES:
+                middle = len(batch) // 2
+                await self._send(asset, batch[:middle])
+                await self._send(asset, batch[middle:])
+                return
+            if isinstance(general_exception, JSONRPCException) and \
+                    general_exception.code in NOT_SENT_CODES:
+                logging.error(f"Payout batch of {len(batch)} failed: \
+                    {general_exception}\n")
+                self._update(payout_ids, 'failed',
+                             error=str(general_exception))
+            else:
+                logging.error(f"Payout batch of {len(batch)} may have been \
+                    sent: {general_exception!r}\n")
+                self._update(payout_ids, 'unknown',
+                             error=repr(general_exception))
+                self._schedule_reconcile()
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(general_exception)
+            return
+        self._update(payout_ids, 'sent', txid=txid)
+        for _, _, _, future in batch:
+            if not future.done():
+                future.set_result(txid)
+
+    def _schedule_reconcile(self) -> None:
+        if self._reconciling is None:
+            self._reconciling = asyncio.get_running_loop().call_later(
+                RECONCILE_DELAY, self._start_reconcile)
+
+    def _start_reconcile(self) -> None:
+        self._reconciling = None
+        task = asyncio.get_running_loop().create_task(self.reconcile())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def reconcile(self) -> int:
+        """
+        Look up the `unknown` payouts in the latest wallet transactions, by
+        the comment of their batch. Found ones are `sent`, and the ones
+        still missing after `RECONCILE_GRACE` seconds are `failed`. The
+        others are looked up again later.
+
+        Returns
+        -------
+        int
+            Number of payouts still `unknown`.
+        """
+        with self._lock, self._database:
+            rows = self._database.execute(
+                "SELECT id, batch, finished_at FROM payouts "
+                "WHERE status = 'unknown'").fetchall()
+        if not rows:
+            return 0
+        try:
+            transactions = await self._wallet.proxy.listtransactions(
+                "*", RECONCILE_WINDOW)
+        except Exception as general_exception:
+            logging.error(f"Could not reconcile payouts: \
+                {general_exception!r}\n")
+            self._schedule_reconcile()
+            return len(rows)
+        sent = {entry['comment']: entry['txid'] for entry in transactions
+                if entry.get('category') == 'send' and entry.get('comment')}
+        found: Dict[str, List[str]] = {}
+        missing = []
+        for payout_id, batch_id, finished in rows:
+            if batch_id in sent:
+                found.setdefault(sent[batch_id], []).append(payout_id)
+            elif (finished or 0) < time.time() - RECONCILE_GRACE:
+                missing.append(payout_id)
+        for txid, payout_ids in found.items():
+            self._update(payout_ids, 'sent', txid=txid)
+        self._update(missing, 'failed', error="Not found in the wallet")
+        left = len(rows) - len(missing) - sum(map(len, found.values()))
+        if left:
+            self._schedule_reconcile()
+        return left
+
+    def recover(self) -> int:
+        """
+        Queue again the payouts accepted by workers that died before sending
+        them, and forget old finished payouts. Payouts that were being sent
+        are `unknown` instead, since they may have reached the node.
+
+        Returns
+        -------
+        int
+            Number of payouts queued again.
+        """
+        with self._lock, self._database:
+            # Takes the write lock first, so two workers can't take the same.
+            self._database.execute("BEGIN IMMEDIATE")
+            rows = [row for row in self._database.execute(
+                "SELECT id, address, amount, asset, status, worker "
+                "FROM payouts WHERE status IN ('pending', 'sending')")
+                if not pid_alive(row[5])]
+            self._database.executemany(
+                "UPDATE payouts SET worker = ? WHERE id = ?",
+                [(os.getpid(), row[0]) for row in rows
+                 if row[4] == 'pending'])
+            self._database.execute(
+                "DELETE FROM payouts WHERE status IN ('sent', 'failed') "
+                "AND finished_at < ?", (time.time() - PAYOUT_RETENTION,))
+        interrupted = [row[0] for row in rows if row[4] == 'sending']
+        if interrupted:
+            self._update(interrupted, 'unknown', error="Interrupted by a "
+                         "worker restart, it may have been sent")
+            self._schedule_reconcile()
+        pending = [row for row in rows if row[4] == 'pending']
+        for payout_id, address, amount, asset, _, _ in pending:
+            self._queue(payout_id, address, Decimal(amount), asset)
+        return len(pending)
+
+    async def flush(self) -> None:
+        """
+        Send every waiting batch now and wait for them, like on shutdown.
+        """
+        for asset in list(self._pending):
+            self._start_flush(asset)
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+
+_BATCHER: Optional[PayoutBatcher] = None
+_BATCHER_POOL = None
+
+
+def get_payout_batcher() -> PayoutBatcher:
+    """
+    FastAPI dependency returning the batcher of the node wallet, configured
+    with `payout_max_outputs` and `payout_max_delay_ms` from .env file and
+    storing the payouts in `data_dir`.
+
+    Returns
+    -------
+    PayoutBatcher
+    """
+    global _BATCHER, _BATCHER_POOL
+    pool = get_async_pool()
+    if _BATCHER is None or _BATCHER_POOL is not pool:
+        _BATCHER = PayoutBatcher(
+            AsyncWallet(pool.proxy),
+            open_database(database_path('payouts'), SCHEMA),
+            int(get_optional_config('payout_max_outputs',
+                                    str(DEFAULT_MAX_OUTPUTS))),
+            float(get_optional_config('payout_max_delay_ms',
+                                      str(DEFAULT_MAX_DELAY * 1000))) / 1000)
+        _BATCHER_POOL = pool
+    return _BATCHER
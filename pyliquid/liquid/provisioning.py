@@ -0,0 +1,171 @@
+"""
+Bulk provisioning of wallets, creating them with bounded concurrency and
+pre-generating their addresses in batched RPC calls.
+"""
+
+import asyncio
+from typing import AsyncIterator, List, Set
+
+from bitcoinrpc.authproxy import JSONRPCException  # type: ignore
+from pyliquid.liquid.cache import NODE_SCOPE, get_wallet_cache
+from pyliquid.liquid.client import AsyncServiceProxy
+from pyliquid.liquid.registry import is_already_loaded
+from pyliquid.models.requests import BulkWallets
+from pyliquid.models.responses import WalletProvision
+from pyliquid.utils.exceptions import RPC_WALLET_INVALID_LABEL_NAME
+
+# Label given to pre-generated addresses, so they can be counted on resume.
+PROVISION_LABEL = 'provisioned'
+
+
+def wallet_names(prefix: str, count: int) -> List[str]:
+    """
+    Deterministic names for a bulk request.
+
+    Parameters
+    ----------
+    prefix: str
+    count: int
+
+    Returns
+    -------
+    list[str]
+        Names `<prefix>-000000` to `<prefix>-<count - 1>`, indexes padded
+        to 6 digits.
+    """
+    return [f"{prefix}-{index:06d}" for index in range(count)]
+
+
+async def _generate_addresses(wallet_proxy: AsyncServiceProxy,
+                              addresses: int, existing: bool) -> List[str]:
+    """
+    Top up the provisioned addresses of a wallet in a single batch.
+    """
+    generated: List[str] = []
+    if existing:
+        try:
+            generated = list(await wallet_proxy.getaddressesbylabel(
+                PROVISION_LABEL))
+        except JSONRPCException as json_exception:
+            if json_exception.code != RPC_WALLET_INVALID_LABEL_NAME:
+                raise
+    missing = addresses - len(generated)
+    if missing > 0:
+        responses = await wallet_proxy.batch_(
+            [["getnewaddress", PROVISION_LABEL]] * missing)
+        for response in responses:
+            if response.get('error') is not None:
+                raise JSONRPCException(response['error'])
+            generated.append(response['result'])
+    return generated
+
+
+async def provision_wallet(proxy_service: AsyncServiceProxy, name: str,
+                           addresses: int, existing: bool,
+                           unload: bool = True) -> WalletProvision:
+    """
+    Create a wallet, or load an existing one, and generate the addresses it
+    is still missing.
+
+    Parameters
+    ----------
+    proxy_service: AsyncServiceProxy
+        Node-level proxy.
+    name: str
+        Name of the wallet.
+    addresses: int
+        Number of addresses the wallet should have.
+    existing: bool
+        If the wallet is already at the node directory.
+    unload: bool, default = True
+        Unload the wallet once provisioned, unless it was already loaded.
+
+    Returns
+    -------
+    WalletProvision
+    """
+    if existing:
+        try:
+            await proxy_service.loadwallet(name)
+        except JSONRPCException as json_exception:
+            if not is_already_loaded(json_exception):
+                raise
+            # Wallets in use elsewhere are left loaded.
+            unload = False
+    else:
+        await proxy_service.createwallet(name, False, False)
+    try:
+        generated = await _generate_addresses(
+            proxy_service.for_wallet(name), addresses, existing)
+    finally:
+        if unload:
+            await proxy_service.unloadwallet(name)
+    return WalletProvision(name=name,
+                           status='existing' if existing else 'created',
+                           addresses=generated[:addresses])
+
+
+async def existing_wallets(proxy_service: AsyncServiceProxy) -> Set[str]:
+    """
+    Names of every wallet at the node directory, loaded or not.
+
+    Parameters
+    ----------
+    proxy_service: AsyncServiceProxy
+        Node-level proxy.
+
+    Returns
+    -------
+    set[str]
+    """
+    listing = await proxy_service.listwalletdir()
+    return {wallet['name'] for wallet in listing['wallets']}
+
+
+async def provision_wallets(proxy_service: AsyncServiceProxy,
+                            request: BulkWallets,
+                            existing: Set[str]) \
+        -> AsyncIterator[WalletProvision]:
+    """
+    Provision every wallet of a bulk request, yielding results as they
+    complete. Failures are reported per wallet, and repeating the request
+    only creates the wallets that are still missing.
+
+    Parameters
+    ----------
+    proxy_service: AsyncServiceProxy
+        Node-level proxy.
+    request: BulkWallets
+    existing: set[str]
+        Wallets already at the node, as returned by `existing_wallets`.
+
+    Returns
+    -------
+    AsyncIterator[WalletProvision]
+    """
+    names = iter(wallet_names(request.prefix, request.count))
+    # Bounded, so workers wait for slow consumers of the results.
+    results: asyncio.Queue = asyncio.Queue(request.concurrency)
+
+    async def work() -> None:
+        # Workers share the iterator, each takes the next name when free.
+        for name in names:
+            try:
+                result = await provision_wallet(proxy_service, name,
+                                                request.addresses,
+                                                name in existing,
+                                                request.unload)
+            except Exception as general_exception:
+                result = WalletProvision(name=name, status='failed',
+                                         error=str(general_exception))
+            await results.put(result)
+
+    workers = [asyncio.ensure_future(work())
+               for _ in range(min(request.concurrency, request.count))]
+    try:
+        for _ in range(request.count):
+            yield await results.get()
+    finally:
+        for worker in workers:
+            worker.cancel()
+        get_wallet_cache().invalidate(NODE_SCOPE)
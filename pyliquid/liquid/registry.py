@@ -0,0 +1,301 @@
+"""
+Registry of the wallets loaded on a node, so requests reuse wallet handles
+instead of calling `loadwallet` every time. Every worker has its own, so a
+wallet can be unloaded by another worker while this one holds a handle: its
+calls then load it again and are retried once.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from bitcoinrpc.authproxy import JSONRPCException  # type: ignore
+from pyliquid.liquid.client import AsyncServiceProxy, get_async_pool
+from pyliquid.liquid.operations import AsyncWallet
+from pyliquid.utils.exceptions import (RPC_WALLET_ALREADY_LOADED,
+                                       RPC_WALLET_ERROR, RPC_WALLET_NOT_FOUND)
+from pyliquid.utils.misc import get_optional_config
+
+DEFAULT_REGISTRY_SIZE = 32
+
+
+def is_already_loaded(json_exception: JSONRPCException) -> bool:
+    """
+    Check if a `loadwallet` error only means the wallet was loaded already.
+    Older nodes report it as a generic wallet error.
+    """
+    if json_exception.code == RPC_WALLET_ALREADY_LOADED:
+        return True
+    message = (json_exception.message or '').lower()
+    return json_exception.code == RPC_WALLET_ERROR and \
+        ('already loaded' in message or 'duplicate -wallet' in message)
+
+
+class ReloadingProxy():
+    """
+    Proxy of a registered wallet, loading the wallet again when the node
+    answers that it's not loaded, and then retrying the call once. Calls to
+    a wallet that is not loaded are not run, so retrying them is safe.
+
+    Attributes
+    ----------
+    _proxy: AsyncServiceProxy
+        Wrapped proxy, node-level until `for_wallet` is called.
+    _reload: Callable[[], Awaitable[None]] | None
+        Coroutine function loading the wallet, once scoped to one.
+    """
+
+    _proxy: AsyncServiceProxy
+    _reload: Optional[Callable[[], Awaitable[None]]]
+
+    def __init__(self, proxy_service: AsyncServiceProxy,
+                 reload: Optional[Callable[[], Awaitable[None]]] = None
+                 ) -> None:
+        self._proxy = proxy_service
+        self._reload = reload
+
+    @property
+    def path(self) -> str:
+        """
+        URL path of the wrapped proxy.
+        """
+        return self._proxy.path
+
+    @property
+    def service_name(self) -> Optional[str]:
+        """
+        Name of the RPC method of the wrapped proxy.
+        """
+        return self._proxy.service_name
+
+    def for_wallet(self, name: str) -> "ReloadingProxy":
+        """
+        Proxy for the wallet-scoped endpoint, loading the wallet trough the
+        reload function given instead, if any.
+        """
+        return ReloadingProxy(self._proxy.for_wallet(name), self._reload)
+
+    def __getattr__(self, name: str) -> "ReloadingProxy":
+        if name.startswith('__') and name.endswith('__'):
+            # Python internal stuff
+            raise AttributeError(name)
+        return ReloadingProxy(getattr(self._proxy, name), self._reload)
+
+    async def _retry(self, call: Callable[[], Awaitable]):
+        try:
+            return await call()
+        except JSONRPCException as json_exception:
+            if self._reload is None or \
+                    json_exception.code != RPC_WALLET_NOT_FOUND:
+                raise
+        logging.warning("Wallet was unloaded by another worker, loading it \
+            again\n")
+        await self._reload()
+        return await call()
+
+    async def __call__(self, *args):
+        return await self._retry(lambda: self._proxy(*args))
+
+    async def raw_(self, *args) -> bytes:
+        return await self._retry(lambda: self._proxy.raw_(*args))
+
+    async def batch_(self, rpc_calls: List[list]) -> List[dict]:
+        responses = await self._proxy.batch_(rpc_calls)
+        if self._reload is not None and any(
+                (response.get('error') or {}).get('code') ==
+                RPC_WALLET_NOT_FOUND for response in responses):
+            await self._reload()
+            responses = await self._proxy.batch_(rpc_calls)
+        return responses
+
+
+class WalletRegistry():
+    """
+    Loaded wallets of a single node, unloading the least recently used ones
+    when going over capacity. The default wallet is never unloaded. Handles
+    load their wallet again if another worker unloaded it.
+
+    Attributes
+    ----------
+    _proxy: AsyncServiceProxy
+        Node-level proxy used for loading and unloading wallets.
+    _capacity: int
+        Maximum number of named wallets kept loaded.
+    _loaded: OrderedDict[str, AsyncWallet]
+        Wallet handles, least recently used first.
+    _seeded: bool
+        If the loaded wallets were already read from `listwallets`.
+    """
+
+    _proxy: AsyncServiceProxy
+    _capacity: int
+    _loaded: "OrderedDict[str, AsyncWallet]"
+    _seeded: bool
+    _seed_lock: Optional[asyncio.Lock]
+    _locks: Dict[str, asyncio.Lock]
+
+    def __init__(self, proxy_service: AsyncServiceProxy,
+                 capacity: int = DEFAULT_REGISTRY_SIZE) -> None:
+        """
+        Constructor for WalletRegistry class.
+
+        Parameters
+        ----------
+        proxy_service: AsyncServiceProxy
+            Node-level proxy used for loading and unloading wallets.
+        capacity: int, default = 32
+            Maximum number of named wallets kept loaded.
+        """
+        if capacity <= 0:
+            raise ValueError("Provide a registry capacity higher than 0")
+        self._proxy = proxy_service
+        self._capacity = capacity
+        self._loaded = OrderedDict()
+        self._seeded = False
+        self._seed_lock = None
+        self._locks = {}
+
+    @property
+    def proxy(self) -> AsyncServiceProxy:
+        """
+        Getter method for `proxy` attribute.
+        """
+        return self._proxy
+
+    @property
+    def loaded(self) -> List[str]:
+        """
+        Names of the loaded wallets, least recently used first.
+        """
+        return list(self._loaded)
+
+    def _lock(self, name: str) -> asyncio.Lock:
+        """
+        Lock serializing the loads of a given wallet.
+        """
+        if name not in self._locks:
+            self._locks[name] = asyncio.Lock()
+        return self._locks[name]
+
+    def _handle(self, name: str) -> AsyncWallet:
+        async def reload() -> None:
+            await self._reload(name)
+        return AsyncWallet(ReloadingProxy(self._proxy, reload), name)
+
+    async def _load(self, name: str) -> None:
+        try:
+            await self._proxy.loadwallet(name)
+        except JSONRPCException as json_exception:
+            if not is_already_loaded(json_exception):
+                raise
+
+    async def _reload(self, name: str) -> None:
+        """
+        Load again a wallet that a handle found unloaded, keeping its handle.
+        """
+        async with self._lock(name):
+            await self._load(name)
+            if name not in self._loaded:
+                self._loaded[name] = self._handle(name)
+        self._locks.pop(name, None)
+        self._loaded.move_to_end(name)
+
+    async def _seed(self) -> None:
+        """
+        Register the wallets that the node already has loaded.
+        """
+        if self._seed_lock is None:
+            self._seed_lock = asyncio.Lock()
+        async with self._seed_lock:
+            if self._seeded:
+                return
+            for name in await self._proxy.listwallets():
+                self._loaded.setdefault(name, self._handle(name))
+            self._seeded = True
+
+    async def get(self, name: str) -> AsyncWallet:
+        """
+        Return a handle for the given wallet, loading it only if needed.
+
+        Parameters
+        ----------
+        name: str
+            Name of the wallet at the node level.
+
+        Returns
+        -------
+        AsyncWallet
+            Wallet bound to its wallet-scoped endpoint.
+        """
+        if not self._seeded:
+            await self._seed()
+        if name in self._loaded:
+            self._loaded.move_to_end(name)
+            return self._loaded[name]
+        async with self._lock(name):
+            if name not in self._loaded:
+                await self._load(name)
+                self._loaded[name] = self._handle(name)
+        self._locks.pop(name, None)
+        await self._evict()
+        return self._loaded.get(name) or self._handle(name)
+
+    def register(self, wallet: AsyncWallet) -> None:
+        """
+        Track a wallet that was loaded outside the registry, like a freshly
+        created one. Later `get` calls return a handle of its own.
+
+        Parameters
+        ----------
+        wallet: AsyncWallet
+            Wallet bound to its name.
+        """
+        if wallet.name is not None:
+            self._loaded[wallet.name] = self._handle(wallet.name)
+            self._loaded.move_to_end(wallet.name)
+
+    async def unload(self, name: str) -> None:
+        """
+        Unload a wallet from the node and forget its handle.
+
+        Parameters
+        ----------
+        name: str
+            Name of the wallet at the node level.
+        """
+        self._loaded.pop(name, None)
+        try:
+            await self._proxy.unloadwallet(name)
+        except JSONRPCException as json_exception:
+            logging.error(f"Could not unload wallet '{name}': \
+                {json_exception}\n")
+
+    async def _evict(self) -> None:
+        """
+        Unload the least recently used wallets while over capacity.
+        """
+        named = [name for name in self._loaded if name != '']
+        for name in named[:max(len(named) - self._capacity, 0)]:
+            await self.unload(name)
+
+
+_REGISTRY: Optional[WalletRegistry] = None
+_REGISTRY_POOL = None
+
+
+def get_wallet_registry() -> WalletRegistry:
+    """
+    FastAPI dependency returning the registry for the configured node.
+
+    Returns
+    -------
+    WalletRegistry
+    """
+    global _REGISTRY, _REGISTRY_POOL
+    pool = get_async_pool()
+    if _REGISTRY is None or _REGISTRY_POOL is not pool:
+        _REGISTRY = WalletRegistry(pool.proxy, int(get_optional_config(
+            'wallet_registry_size', str(DEFAULT_REGISTRY_SIZE))))
+        _REGISTRY_POOL = pool
+    return _REGISTRY
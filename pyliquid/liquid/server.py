@@ -11,11 +11,14 @@ from datetime import datetime
 import logging
 from typing import Optional
 
-from bitcoinrpc.authproxy import AuthServiceProxy  # type: ignore
+from bitcoinrpc.authproxy import AuthServiceProxy, JSONRPCException  # type: ignore
+from pyliquid.liquid.connection import (CONNECTION_ERRORS, DEFAULT_TIMEOUT,
+                                        get_service_url)
+from pyliquid.liquid.transport import make_connection
 from pyliquid.liquid.wrappers import cli_exec
-from pyliquid.utils.misc import get_configs
 
 DEFAULT_LOCATION = f"{os.environ['HOME']}/.elements"
+DEFAULT_WAIT_TIMEOUT = 120.0
 
 
 class Service():
@@ -47,12 +50,14 @@ class Service():
                     _ = self._stop_daemon()
                     logging.info("A daemon is already running...\n\
                         Stopping service...\n")
-                    time.sleep(1)  # Wait for process to be killed
+                    self._wait_for_rpc(running=False)
                 if working_dir != DEFAULT_LOCATION:
                     _ = self._start_daemon(working_dir)
                 else:
                     _ = self._start_daemon()
-                time.sleep(1)  # Wait for daemon to start
+                if not self._wait_for_rpc(running=True):
+                    logging.error("Daemon did not answer in time\n")
+                    raise RuntimeError
                 logging.info("Elements Core up and running!\n")
             except RuntimeError:
                 sys.exit()
@@ -86,6 +91,47 @@ class Service():
             logging.error("Verify that there's a `.conf` file at the specified\
                             path\n")
 
+    @staticmethod
+    def _wait_for_rpc(running: bool,
+                      timeout: float = DEFAULT_WAIT_TIMEOUT) -> bool:
+        """
+        Poll the node with exponential backoff until it's ready to answer
+        calls, or until it stopped answering.
+
+        Parameters
+        ----------
+        running: bool
+            Either to wait for the node to be ready or to be stopped.
+        timeout: float, default = 120.0
+            Maximum seconds to wait.
+
+        Returns
+        -------
+        bool
+            If the expected state was reached in time.
+        """
+        proxy = AuthServiceProxy(get_service_url(), timeout=5)
+        deadline = time.monotonic() + timeout
+        delay = 0.1
+        while True:
+            try:
+                proxy.uptime()
+                up, ready = True, True
+            except JSONRPCException:
+                # Answering but still warming up or shutting down.
+                up, ready = True, False
+            except CONNECTION_ERRORS:
+                # A failed request leaves the connection unusable.
+                proxy = AuthServiceProxy(get_service_url(), timeout=5)
+                up, ready = False, False
+            if (running and ready) or (not running and not up):
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 2.0)
+
     @classmethod
     @cli_exec
     def _is_running(cls) -> subprocess.CompletedProcess:
@@ -147,29 +193,31 @@ class Service():
         Parameters
         ----------
         host: str, default = 'localhost'
-            The target host to use for the connection. Expects a full URL with
-            its own credentials.
-            Default 'localhost' targets `127.0.0.1`.
+            The target host to use for the connection. Either a host name,
+            using the credentials from `auth_dict`, or a full URL with its
+            own credentials.
+            Default 'localhost' targets `127.0.0.1`, or `rpc_socket` from .env
+            file when set and no `auth_dict` is given.
         auth_dict: Config, default = None
             Set of credentials to be used by proxy service. If `None`, uses
             default parameters from .env file.
-            NOTICE: Only works when host is the default one.
 
         Returns
         -------
         AuthServiceProxy
             Authenticated Proxy Service object.
         """
-        if (host != 'localhost') and (auth_dict):
-            raise ValueError(
-                'Either provide a custom host or parameters to be used by \
-                `localhost`\n')
-        else:
+        connection = None
+        if '://' in host:
+            if auth_dict:
+                raise ValueError('Credentials are already part of the URL, \
+                    provide either a host name or no credentials\n')
+        elif host == 'localhost':
+            host = get_service_url(auth_dict)
             if not auth_dict:
-                auth_dict = get_configs(['rpc_port', 'rpc_user',
-                                              'rpc_password'])
-            _cred = f"{auth_dict['rpc_user']}:{auth_dict['rpc_password']}"
-            host = f"http://{_cred}@127.0.0.1:{auth_dict['rpc_port']}"
-        asp = AuthServiceProxy(host)
+                connection = make_connection(DEFAULT_TIMEOUT)
+        else:
+            host = get_service_url(auth_dict, host)
+        asp = AuthServiceProxy(host, connection=connection)
         logging.info(f"[{datetime.now()}] Proxy service created at: {host}\n")
         return asp
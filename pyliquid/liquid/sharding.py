@@ -0,0 +1,582 @@
+"""
+Placement of the wallets over several primary nodes, so wallet count and
+write throughput grow with the nodes instead of contending on the locks and
+memory of a single one. Wallets are placed by consistent hashing on their
+name, placements are kept in `data_dir` so they survive changes of the
+nodes, and wallets are moved between nodes by copying their descriptors.
+
+Run it with `python -m pyliquid.liquid.sharding plan`.
+"""
+
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from bitcoinrpc.authproxy import JSONRPCException  # type: ignore
+from pyliquid.liquid.client import AsyncConnectionPool, AsyncServiceProxy
+from pyliquid.liquid.registry import is_already_loaded
+from pyliquid.utils.exceptions import RPC_WALLET_ERROR
+from pyliquid.utils.misc import get_optional_config
+from pyliquid.utils.storage import database_path, open_database
+
+# Points of every node on the ring, more spread the wallets more evenly.
+DEFAULT_POINTS = 128
+
+# Seconds allowed to the node-level calls of a migration, since importing
+# descriptors rescans the chain from their creation.
+MIGRATION_TIMEOUT = 3600.0
+
+# Node-level methods listing the wallets, answered by every node.
+LISTING_METHODS = frozenset({'listwallets', 'listwalletdir'})
+
+# Methods after which the wallet they name is on its node, and placed there.
+PLACING_METHODS = frozenset({'createwallet', 'loadwallet'})
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS wallet_placements (
+    wallet TEXT PRIMARY KEY,
+    node TEXT NOT NULL,
+    placed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS wallet_placements_node
+    ON wallet_placements (node);
+"""
+
+
+def _point(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode('utf8')).digest()[:8], 'big')
+
+
+def merge_listings(method: str, outputs: List[Any]) -> Any:
+    """
+    Join the wallet listings of several nodes, keeping the first entry of
+    wallets found on more than one, like the copy left by a migration.
+
+    Parameters
+    ----------
+    method: str
+        One of `LISTING_METHODS`.
+    outputs: list
+        Output of the method on every node.
+
+    Returns
+    -------
+    Any
+        Output shaped like the one of a single node.
+    """
+    seen = set()
+    if method == 'listwallets':
+        names = []
+        for output in outputs:
+            for name in output:
+                if name not in seen:
+                    seen.add(name)
+                    names.append(name)
+        return names
+    wallets = []
+    for output in outputs:
+        for wallet in output['wallets']:
+            if wallet['name'] not in seen:
+                seen.add(wallet['name'])
+                wallets.append(wallet)
+    return {'wallets': wallets}
+
+
+class HashRing():
+    """
+    Consistent hashing of wallet names over a set of nodes. Adding or
+    removing a node only moves the wallets landing on its points.
+
+    Attributes
+    ----------
+    _nodes: list[str]
+        Names of the nodes, sorted.
+    _points: list[int]
+        Points of every node on the ring, sorted.
+    _owners: list[str]
+        Node owning each point.
+    """
+
+    _nodes: List[str]
+    _points: List[int]
+    _owners: List[str]
+
+    def __init__(self, nodes: List[str],
+                 points: int = DEFAULT_POINTS) -> None:
+        """
+        Constructor for HashRing class.
+
+        Parameters
+        ----------
+        nodes: list[str]
+            Names of the nodes, in any order.
+        points: int, default = 128
+            Points of every node on the ring.
+        """
+        if not nodes:
+            raise ValueError("Provide at least one node")
+        self._nodes = sorted(set(nodes))
+        ring = sorted((_point(f"{node}#{index}"), node)
+                      for node in self._nodes for index in range(points))
+        self._points = [point for point, _ in ring]
+        self._owners = [node for _, node in ring]
+
+    @property
+    def nodes(self) -> List[str]:
+        """
+        Getter method for `nodes` attribute.
+        """
+        return list(self._nodes)
+
+    def node_for(self, key: str) -> str:
+        """
+        Node owning a key, the first one clockwise from its point.
+
+        Parameters
+        ----------
+        key: str
+            Name of the wallet, empty for the default one.
+
+        Returns
+        -------
+        str
+        """
+        index = bisect.bisect(self._points, _point(key))
+        return self._owners[index % len(self._owners)]
+
+
+class PlacementMap():
+    """
+    Node holding every placed wallet, shared by the API workers.
+
+    Attributes
+    ----------
+    _database: sqlite3.Connection
+        Connection opened with `SCHEMA`.
+    """
+
+    _database: sqlite3.Connection
+    _lock: threading.Lock
+
+    def __init__(self, database: sqlite3.Connection) -> None:
+        """
+        Constructor for PlacementMap class.
+
+        Parameters
+        ----------
+        database: sqlite3.Connection
+            Connection opened with `SCHEMA`.
+        """
+        self._database = database
+        self._lock = threading.Lock()
+
+    def get(self, wallet: str) -> Optional[str]:
+        """
+        Node holding a wallet, `None` if not placed yet.
+        """
+        with self._lock:
+            row = self._database.execute(
+                "SELECT node FROM wallet_placements WHERE wallet = ?",
+                (wallet,)).fetchone()
+        return row[0] if row else None
+
+    def place(self, wallet: str, node: str) -> str:
+        """
+        Place a wallet on a node, unless a worker placed it first.
+
+        Returns
+        -------
+        str
+            Node holding the wallet.
+        """
+        with self._lock, self._database:
+            self._database.execute(
+                "INSERT OR IGNORE INTO wallet_placements VALUES (?, ?, ?)",
+                (wallet, node, time.time()))
+            return self._database.execute(
+                "SELECT node FROM wallet_placements WHERE wallet = ?",
+                (wallet,)).fetchone()[0]
+
+    def move(self, wallet: str, node: str) -> None:
+        """
+        Record that a wallet is now held by another node.
+        """
+        with self._lock, self._database:
+            self._database.execute(
+                "INSERT OR REPLACE INTO wallet_placements VALUES (?, ?, ?)",
+                (wallet, node, time.time()))
+
+    def all(self) -> Dict[str, str]:
+        """
+        Node holding every placed wallet.
+        """
+        with self._lock:
+            return dict(self._database.execute(
+                "SELECT wallet, node FROM wallet_placements ORDER BY wallet"))
+
+
+class WalletPlacement():
+    """
+    Node of every wallet. A wallet stays on the node it was first placed
+    on, picked by the ring, until `rebalance` moves it, so changing the nodes
+    never strands a wallet.
+
+    Attributes
+    ----------
+    _ring: HashRing
+        Node picked for wallets not placed yet.
+    _store: PlacementMap
+        Placements shared by the workers.
+    _cache: dict[str, str]
+        Placements already read by this worker.
+    """
+
+    _ring: HashRing
+    _store: PlacementMap
+    _cache: Dict[str, str]
+
+    def __init__(self, ring: HashRing, store: PlacementMap) -> None:
+        """
+        Constructor for WalletPlacement class.
+
+        Parameters
+        ----------
+        ring: HashRing
+            Node picked for wallets not placed yet.
+        store: PlacementMap
+            Placements shared by the workers.
+        """
+        self._ring = ring
+        self._store = store
+        self._cache = {}
+
+    @property
+    def ring(self) -> HashRing:
+        """
+        Getter method for `ring` attribute.
+        """
+        return self._ring
+
+    def node_for(self, wallet: str) -> str:
+        """
+        Node holding a wallet, the one picked by the ring if not placed yet.
+        Nothing is stored, so calls to wallets that don't exist never place
+        them.
+
+        Parameters
+        ----------
+        wallet: str
+            Name of the wallet, empty for the default one.
+
+        Returns
+        -------
+        str
+        """
+        node = self._cache.get(wallet)
+        if node is None:
+            node = self._store.get(wallet)
+            if node is None:
+                return self._ring.node_for(wallet)
+            self._cache[wallet] = node
+        return node
+
+    def place(self, wallet: str) -> str:
+        """
+        Place a wallet on the node picked for it, once `createwallet` or
+        `loadwallet` succeeded there, unless it was placed before.
+
+        Returns
+        -------
+        str
+            Node holding the wallet.
+        """
+        return self.adopt(wallet, self.node_for(wallet))
+
+    def current(self, wallet: str) -> str:
+        """
+        Node holding a wallet read from the map, not from this worker, for
+        calls that must not reach an old copy of a moved wallet, like
+        `loadwallet`.
+        """
+        self._cache.pop(wallet, None)
+        return self.node_for(wallet)
+
+    def refresh(self, wallet: str) -> bool:
+        """
+        Read the placement of a wallet again, after it was not found where
+        this worker expected, since another process may have moved it.
+
+        Returns
+        -------
+        bool
+            If the wallet moved to another node.
+        """
+        previous = self._cache.get(wallet)
+        return self.current(wallet) != previous
+
+    def adopt(self, wallet: str, node: str) -> str:
+        """
+        Place a wallet on the node already holding it, unless it was placed
+        before.
+
+        Returns
+        -------
+        str
+            Node holding the wallet.
+        """
+        node = self._store.place(wallet, node)
+        self._cache[wallet] = node
+        return node
+
+    def move(self, wallet: str, node: str) -> None:
+        """
+        Record that a wallet is now held by another node.
+        """
+        self._store.move(wallet, node)
+        self._cache[wallet] = node
+
+    def plan(self) -> List[Tuple[str, str, str]]:
+        """
+        Wallets not on the node picked by the ring, like after a node was
+        added.
+
+        Returns
+        -------
+        list[tuple[str, str, str]]
+            Wallet, current node and target node of every move.
+        """
+        return [(wallet, node, self._ring.node_for(wallet))
+                for wallet, node in self._store.all().items()
+                if node != self._ring.node_for(wallet)]
+
+
+async def migrate_wallet(source: AsyncServiceProxy,
+                         target: AsyncServiceProxy, wallet: str) -> int:
+    """
+    Copy a descriptor wallet to another node, with its keys, master
+    blinding key and history, checking both copies end with the same
+    balance. The wallet must be loaded and unlocked on `source`. Addresses
+    handed out while copying are still watched, since the whole keypool
+    range is imported.
+
+    Parameters
+    ----------
+    source: AsyncServiceProxy
+        Node-level proxy of the node holding the wallet.
+    target: AsyncServiceProxy
+        Node-level proxy of the node receiving it.
+    wallet: str
+        Name of the wallet.
+
+    Returns
+    -------
+    int
+        Number of imported descriptors.
+
+    Raises
+    ------
+    JSONRPCException
+        If the wallet has no descriptors, any of them failed to import, or
+        the balances of both copies differ.
+    """
+    source_wallet = source.for_wallet(wallet)
+    target_wallet = target.for_wallet(wallet)
+    listing = await source_wallet.listdescriptors(True)
+    # Without it the copy can't unblind its outputs nor derive the same
+    # confidential addresses.
+    blinding_key = await source_wallet.dumpmasterblindingkey()
+    requests = []
+    for descriptor in listing['descriptors']:
+        request = {'desc': descriptor['desc'],
+                   'timestamp': descriptor.get('timestamp', 0),
+                   'active': descriptor.get('active', False)}
+        if descriptor.get('active'):
+            request['internal'] = descriptor.get('internal', False)
+        if 'range' in descriptor:
+            request['range'] = descriptor['range']
+            request['next_index'] = descriptor.get('next', 0)
+        requests.append(request)
+    try:
+        # Blank descriptor wallet, keys come from the import.
+        await target.createwallet(wallet, False, True, "", False, True)
+    except JSONRPCException as json_exception:
+        if json_exception.code != RPC_WALLET_ERROR:
+            raise
+        # Left by an earlier attempt, importing again is harmless.
+        try:
+            await target.loadwallet(wallet)
+        except JSONRPCException as load_exception:
+            if not is_already_loaded(load_exception):
+                raise
+    await target_wallet.importmasterblindingkey(blinding_key)
+    outcomes = await target_wallet.importdescriptors(requests)
+    failed = [outcome.get('error') for outcome in outcomes
+              if not outcome.get('success')]
+    if failed:
+        raise JSONRPCException({'code': RPC_WALLET_ERROR,
+                                'message': f"Could not import {len(failed)} "
+                                           f"descriptors: {failed[0]}"})
+    # The import rescans before answering, so both copies see the same
+    # outputs by now.
+    expected, copied = await asyncio.gather(source_wallet.getbalance(),
+                                            target_wallet.getbalance())
+    if expected != copied:
+        raise JSONRPCException({'code': RPC_WALLET_ERROR,
+                                'message': f"Balance of the copy {copied} "
+                                           f"differs from {expected}"})
+    return len(requests)
+
+
+async def adopt_wallets(proxies: Dict[str, AsyncServiceProxy],
+                        placement: WalletPlacement) -> Dict[str, int]:
+    """
+    Place the wallets already at the nodes directories on the node holding
+    them, before sharding is enabled on existing nodes.
+
+    Parameters
+    ----------
+    proxies: dict[str, AsyncServiceProxy]
+        Node-level proxy of every node, by name.
+    placement: WalletPlacement
+
+    Returns
+    -------
+    dict[str, int]
+        Wallets adopted by every node.
+    """
+    adopted = {}
+    for node, proxy in proxies.items():
+        listing = await proxy.listwalletdir()
+        adopted[node] = sum(
+            placement.adopt(wallet['name'], node) == node
+            for wallet in listing['wallets'])
+    return adopted
+
+
+async def rebalance(proxies: Dict[str, AsyncServiceProxy],
+                    placement: WalletPlacement,
+                    limit: Optional[int] = None) -> List[dict]:
+    """
+    Move the wallets to the node picked by the ring, one at a time. A
+    wallet is only placed on its new node once copied, and then unloaded
+    from the old one, whose wallet file is kept as a backup. Workers still
+    sending its calls to the old node find it there no more, and read its
+    placement again. Loads of a wallet always read its placement from the
+    map, so a worker with a stale placement never loads the old copy.
+
+    Parameters
+    ----------
+    proxies: dict[str, AsyncServiceProxy]
+        Node-level proxy of every node, by name.
+    placement: WalletPlacement
+    limit: int | None, default = None
+        Most wallets to be moved, all of them if `None`.
+
+    Returns
+    -------
+    list[dict]
+        Outcome of every move, with its `error` if it failed.
+    """
+    outcomes = []
+    for wallet, source, target in placement.plan()[:limit]:
+        outcome = {'wallet': wallet, 'source': source, 'target': target}
+        try:
+            try:
+                await proxies[source].loadwallet(wallet)
+            except JSONRPCException as json_exception:
+                if not is_already_loaded(json_exception):
+                    raise
+            outcome['descriptors'] = await migrate_wallet(
+                proxies[source], proxies[target], wallet)
+            placement.move(wallet, target)
+            await proxies[source].unloadwallet(wallet)
+        except Exception as general_exception:
+            logging.error(f"Could not move wallet '{wallet}': \
+                {general_exception}\n")
+            outcome['error'] = str(general_exception)
+        outcomes.append(outcome)
+    return outcomes
+
+
+def sharding_enabled() -> bool:
+    """
+    Check if wallets are sharded over the primary nodes of `rpc_nodes`,
+    following `rpc_sharding` from .env file.
+    """
+    return get_optional_config('rpc_sharding', '0') == '1'
+
+
+_PLACEMENT: Optional[WalletPlacement] = None
+_PLACEMENT_NODES: List[str] = []
+_PLACEMENT_LOCK = threading.Lock()
+
+
+def get_wallet_placement(nodes: List[str]) -> WalletPlacement:
+    """
+    Return the process-wide placement of the wallets over the given nodes.
+
+    Parameters
+    ----------
+    nodes: list[str]
+        Names of the primary nodes.
+
+    Returns
+    -------
+    WalletPlacement
+    """
+    global _PLACEMENT, _PLACEMENT_NODES
+    with _PLACEMENT_LOCK:
+        if _PLACEMENT is None or _PLACEMENT_NODES != sorted(nodes):
+            _PLACEMENT = WalletPlacement(
+                HashRing(nodes), PlacementMap(open_database(
+                    database_path('placements'), SCHEMA)))
+            _PLACEMENT_NODES = sorted(nodes)
+        return _PLACEMENT
+
+
+async def _run(command: str, limit: Optional[int],
+               timeout: float) -> Any:
+    # Imported here since the router is built on top of this module.
+    from pyliquid.liquid.nodes import PRIMARY, parse_nodes
+
+    primaries = [(name, url) for name, role, url in parse_nodes(
+        get_optional_config('rpc_nodes', '')) if role == PRIMARY]
+    placement = get_wallet_placement([name for name, _ in primaries])
+    if command == 'plan':
+        return [{'wallet': wallet, 'source': source, 'target': target}
+                for wallet, source, target in placement.plan()]
+    pools = {name: AsyncConnectionPool(url, timeout=timeout)
+             for name, url in primaries}
+    proxies = {name: pool.proxy for name, pool in pools.items()}
+    try:
+        if command == 'adopt':
+            return await adopt_wallets(proxies, placement)
+        return await rebalance(proxies, placement, limit)
+    finally:
+        for pool in pools.values():
+            await pool.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('command', choices=['adopt', 'plan', 'rebalance'],
+                        help="place the existing wallets where they are, "
+                             "list the pending moves or make them")
+    parser.add_argument('--limit', type=int,
+                        help="most wallets to be moved")
+    parser.add_argument('--timeout', type=float, default=MIGRATION_TIMEOUT,
+                        help="seconds allowed to every node call")
+    args = parser.parse_args(argv)
+    print(json.dumps(asyncio.run(_run(args.command, args.limit,
+                                      args.timeout)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
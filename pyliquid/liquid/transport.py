@@ -0,0 +1,297 @@
+"""
+Transports carrying the JSON-RPC requests to the node, besides plain TCP.
+A Unix domain socket skips the loopback TCP stack when the API shares the
+host with the node (trough a forwarder, since elementsd only listens on TCP),
+and a loopback transport answers in-process, from canned results or any
+handler, so the whole stack can run without a node.
+"""
+
+import asyncio
+import http.client
+import inspect
+import json
+import os
+import socket
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from bitcoinrpc.authproxy import EncodeDecimal, JSONRPCException  # type: ignore
+from pyliquid.utils.misc import get_optional_config
+
+DEFAULT_RETRIES = 1
+
+# Code answered by the node for unknown methods.
+RPC_METHOD_NOT_FOUND = -32601
+
+# Takes the URL path and the decoded request, returns the response as bytes
+# or a decodable object. May be a coroutine function.
+LoopbackHandler = Callable[[str, Any], Any]
+
+
+def get_socket_path() -> Optional[str]:
+    """
+    Path of the Unix socket forwarding to the local node, from `rpc_socket`
+    in .env file.
+
+    Returns
+    -------
+    str | None
+        `None` when the node is reached over TCP.
+    """
+    return get_optional_config('rpc_socket', '') or None
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    `http.client` connection over a Unix domain socket, to be given to
+    `AuthServiceProxy` as its `connection`.
+    """
+
+    def __init__(self, socket_path: str,
+                 timeout: Optional[float] = None) -> None:
+        """
+        Constructor for UnixHTTPConnection class.
+
+        Parameters
+        ----------
+        socket_path: str
+            Path of the socket forwarding to the node.
+        timeout: float | None, default = None
+            Timeout in seconds of the socket operations.
+        """
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def make_connection(timeout: Optional[float] = None) \
+        -> Optional[http.client.HTTPConnection]:
+    """
+    Connection for `AuthServiceProxy` reaching the local node, following
+    `rpc_socket` from .env file.
+
+    Parameters
+    ----------
+    timeout: float | None, default = None
+        Timeout in seconds of the socket operations.
+
+    Returns
+    -------
+    http.client.HTTPConnection | None
+        `None` for the default TCP connection of `AuthServiceProxy`.
+    """
+    socket_path = get_socket_path()
+    if socket_path is None:
+        return None
+    return UnixHTTPConnection(socket_path, timeout)
+
+
+def canned_handler(results: Dict[str, Any]) -> LoopbackHandler:
+    """
+    Handler answering every method from a fixed set of results.
+
+    Parameters
+    ----------
+    results: dict[str, Any]
+        Result by method. Callables are called with the params of the
+        request, and `JSONRPCException` values are answered as errors.
+        Missing methods are answered with "Method not found".
+
+    Returns
+    -------
+    LoopbackHandler
+    """
+    def answer(request: dict) -> dict:
+        reply = {"result": None, "error": None, "id": request.get('id')}
+        method = request.get('method')
+        if method not in results:
+            reply["error"] = {"code": RPC_METHOD_NOT_FOUND,
+                              "message": "Method not found"}
+            return reply
+        try:
+            value = results[method]
+            if isinstance(value, JSONRPCException):
+                raise value
+            reply["result"] = value(*request.get('params', [])) \
+                if callable(value) else value
+        except JSONRPCException as json_exception:
+            reply["error"] = json_exception.error
+        return reply
+
+    def handler(path: str, request: Any) -> Any:
+        if isinstance(request, list):
+            return [answer(item) for item in request]
+        return answer(request)
+    return handler
+
+
+def _encode(output: Any) -> bytes:
+    if isinstance(output, bytes):
+        return output
+    return json.dumps(output, default=EncodeDecimal,
+                      separators=(',', ':')).encode('utf8')
+
+
+class _NullSocket():
+    """
+    Socket settings ignored by the loopback, set by `AuthServiceProxy`.
+    """
+
+    def settimeout(self, timeout: Optional[float]) -> None:
+        pass
+
+
+class _LoopbackResponse():
+    """
+    Answer of a `LoopbackConnection`, read like `http.client.HTTPResponse`.
+    """
+
+    status = 200
+    reason = "OK"
+
+    def __init__(self, payload: bytes) -> None:
+        self._payload = payload
+
+    def getheader(self, name: str, default: Optional[str] = None) \
+            -> Optional[str]:
+        if name.lower() == 'content-type':
+            return 'application/json'
+        return default
+
+    def read(self) -> bytes:
+        return self._payload
+
+
+class LoopbackConnection():
+    """
+    Stand-in for the `http.client` connection of `AuthServiceProxy`,
+    answering in the calling thread. The handler can't be a coroutine.
+
+    Attributes
+    ----------
+    handler: LoopbackHandler
+        Builds the response of every request.
+    """
+
+    handler: LoopbackHandler
+
+    def __init__(self, handler: LoopbackHandler) -> None:
+        self.handler = handler
+        self.sock = _NullSocket()
+        self._response: Optional[_LoopbackResponse] = None
+
+    def request(self, method: str, url: str, body: Any = None,
+                headers: Optional[dict] = None) -> None:
+        request = json.loads(body, parse_float=Decimal)
+        self._response = _LoopbackResponse(_encode(self.handler(url or '/',
+                                                                request)))
+
+    def getresponse(self) -> Optional[_LoopbackResponse]:
+        response, self._response = self._response, None
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+class LoopbackTransport():
+    """
+    In-process replacement for `AsyncConnectionPool`, answering trough a
+    handler instead of a node. Install it with `use_transport` to run the
+    API without a node.
+
+    Attributes
+    ----------
+    _handler: LoopbackHandler
+        Builds the response of every request.
+    _latency: float
+        Seconds waited before every answer, to mimic a node.
+    """
+
+    _handler: LoopbackHandler
+    _latency: float
+    _pid: int
+
+    def __init__(self, handler: LoopbackHandler,
+                 latency: float = 0.0) -> None:
+        """
+        Constructor for LoopbackTransport class.
+
+        Parameters
+        ----------
+        handler: LoopbackHandler
+            Takes the URL path and the decoded request, returns the response
+            as bytes or a decodable object. May be a coroutine function.
+        latency: float, default = 0.0
+            Seconds waited before every answer.
+        """
+        self._handler = handler
+        self._latency = latency
+        self._pid = os.getpid()
+
+    @classmethod
+    def from_results(cls, results: Dict[str, Any],
+                     latency: float = 0.0) -> "LoopbackTransport":
+        """
+        Build a transport answering from a fixed set of results, as described
+        in `canned_handler`.
+
+        Returns
+        -------
+        LoopbackTransport
+        """
+        return cls(canned_handler(results), latency)
+
+    @property
+    def pid(self) -> int:
+        """
+        Getter method for the process id that created the transport.
+        """
+        return self._pid
+
+    @property
+    def proxy(self):
+        """
+        Proxy object sending its calls trough this transport.
+        """
+        # Imported here since the client is built on top of this module.
+        from pyliquid.liquid.client import AsyncServiceProxy
+        return AsyncServiceProxy(self)
+
+    def connection(self) -> LoopbackConnection:
+        """
+        Connection for `AuthServiceProxy` sharing the same handler, so a
+        synchronous `Wallet` can use it too.
+        """
+        return LoopbackConnection(self._handler)
+
+    async def request(self, path: str, body: bytes) \
+            -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Answer a JSON-RPC request body.
+
+        Parameters
+        ----------
+        path: str
+            URL path of the endpoint, like `/` or `/wallet/<name>`.
+        body: bytes
+            Already serialized JSON-RPC request.
+
+        Returns
+        -------
+        tuple[int, dict[str, str], bytes]
+            Status code, lowercase headers and raw body of the response.
+        """
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        output = self._handler(path, json.loads(body, parse_float=Decimal))
+        if inspect.isawaitable(output):
+            output = await output
+        return 200, {'content-type': 'application/json'}, _encode(output)
+
+    async def close(self) -> None:
+        pass
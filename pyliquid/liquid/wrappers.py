@@ -1,14 +1,74 @@
 import subprocess
 import json
+import time
 from typing import Callable, Optional, Union
 import logging
 
 from bitcoinrpc.authproxy import JSONRPCException  # type: ignore
+from pyliquid.liquid.capture import capture_call
+from pyliquid.liquid.connection import NON_JSON_RESPONSE_CODE
+from pyliquid.utils.exceptions import (HTTP_WORK_QUEUE_EXCEEDED,
+                                       NodeSaturated, SaturationError)
+from pyliquid.utils.metrics import record_cli, record_rpc
+
+
+def rpc_method_name(_caller: Callable) -> str:
+    """
+    Name of the RPC method called by a proxy object, like `getbalance`.
+    Batches are reported as `batch`.
+
+    Parameters
+    ----------
+    _caller: Callable
+        Proxy object bound to a method, or one of its methods.
+
+    Returns
+    -------
+    str
+    """
+    owner = getattr(_caller, '__self__', _caller)
+    if owner is not _caller:
+        if getattr(_caller, '__name__', '') == 'batch_':
+            return 'batch'
+    attributes = getattr(owner, '__dict__', {})
+    # `AuthServiceProxy` keeps the name in a mangled attribute.
+    return attributes.get('_service_name') or \
+        attributes.get('_AuthServiceProxy__service_name') or \
+        getattr(_caller, '__name__', 'unknown')
+
+
+def rpc_path(_caller: Callable) -> str:
+    """
+    URL path a proxy object sends its calls to, `/` if unknown.
+
+    Parameters
+    ----------
+    _caller: Callable
+        Proxy object bound to a method, or one of its methods.
+
+    Returns
+    -------
+    str
+    """
+    owner = getattr(_caller, '__self__', _caller)
+    url = getattr(owner, '__dict__', {}).get('_AuthServiceProxy__url')
+    return getattr(url, 'path', '') or '/'
+
+
+def is_work_queue_exceeded(json_exception: JSONRPCException) -> bool:
+    """
+    Check if `AuthServiceProxy` failed because the node work queue is full,
+    which it reports as a non-JSON response.
+    """
+    return json_exception.code == NON_JSON_RESPONSE_CODE and \
+        f"'{HTTP_WORK_QUEUE_EXCEEDED} " in json_exception.message
 
 
 def rpc_exec(_func: Callable) -> Callable:
     """
-    Wrapper for RPC functions calling, simplifying error management.
+    Wrapper for RPC functions calling, simplifying error management. Errors
+    are logged and turn into `None`, except for a saturated node, raised as
+    `NodeSaturated` so it can be retried later.
 
     Parameters
     ----------
@@ -38,12 +98,83 @@ def rpc_exec(_func: Callable) -> Callable:
         Any
             Output from RPC call.
         """
+        started = time.perf_counter()
+        started_at = time.time()
+        error_code, error, output = None, None, None
+        try:
+            output = _func(obj, _caller, args)
+            return output
+        except JSONRPCException as json_exception:
+            error_code = json_exception.code
+            error = json_exception.error
+            if is_work_queue_exceeded(json_exception):
+                raise NodeSaturated("The node work queue is full") \
+                    from json_exception
+            logging.error(f"A JSON RPC Exception occured: {json_exception}\n")
+        except Exception as general_exception:
+            error_code = type(general_exception).__name__
+            logging.exception(f"An Exception occured: {general_exception}\n")
+        finally:
+            duration = time.perf_counter() - started
+            record_rpc(rpc_method_name(_caller), duration, error_code)
+            if error_code is None or error is not None:
+                # Only calls answered by the node can be replayed.
+                capture_call(rpc_path(_caller), rpc_method_name(_caller),
+                             args, output, error, started_at, duration)
+    return wrap
+
+
+def async_rpc_exec(_func: Callable) -> Callable:
+    """
+    Wrapper for asynchronous RPC functions calling. Errors are logged and
+    raised again, so callers can answer them instead of taking `None` as
+    the result, like a `JSONRPCException` with the error of the node.
+
+    Parameters
+    ----------
+    _func: Callable
+        Coroutine function to be wrapped.
+
+    Returns
+    -------
+    Callable
+        Original function already wrapped.
+    """
+    async def wrap(obj, _caller: Callable, *args):
+        """
+        Internal coroutine that handles RPC errors.
+
+        Parameters
+        ----------
+        obj: cls
+            Class object from which the method is being call.
+        _caller: Callable
+            The actual instance method to await for execution.
+        args:
+            Parameter for `_caller` function.
+
+        Returns
+        -------
+        Any
+            Output from RPC call.
+
+        Raises
+        ------
+        JSONRPCException
+            If the node answered the call with an error.
+        SaturationError
+            If the call was refused by admission control.
+        """
         try:
-            return _func(obj, _caller, args)
+            return await _func(obj, _caller, args)
+        except SaturationError:
+            raise
         except JSONRPCException as json_exception:
             logging.error(f"A JSON RPC Exception occured: {json_exception}\n")
+            raise
         except Exception as general_exception:
             logging.exception(f"An Exception occured: {general_exception}\n")
+            raise
     return wrap
 
 
@@ -70,6 +201,8 @@ def cli_exec(_func: Callable) -> Callable:
         Optional[Union[str, bytes]]
             Output from STDOUT.
         """
+        started = time.perf_counter()
+        return_code = None
         try:
             cp = _func(obj)
             try:
@@ -82,6 +215,7 @@ def cli_exec(_func: Callable) -> Callable:
                 output = result
             return output
         except subprocess.CalledProcessError as stderr:
+            return_code = stderr.returncode
             if stderr.output:
                 logging.error(f"Command '{stderr.cmd}' return with error \
                     (code {stderr.returncode}): {stderr.output}\n")
@@ -89,4 +223,7 @@ def cli_exec(_func: Callable) -> Callable:
             else:
                 logging.warning(f"Skipping exception code \
                     ({stderr.returncode}) with no output error...\n")
+        finally:
+            record_cli(command, time.perf_counter() - started, return_code)
+    command = _func.__name__.lstrip('_')
     return wrap
@@ -1,11 +1,26 @@
 from pathlib import Path
 import logging
 from typing import Dict
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
 from dotenv import load_dotenv  # type: ignore
 
-from pyliquid.routers import health, node, operations
-from pyliquid.liquid import server
+from pyliquid.routers import (events, health, index, jobs, metrics, node,
+                              operations)
+from pyliquid.routers.share import unavailable
+from pyliquid.liquid.addresses import get_address_pool
+from pyliquid.liquid.client import close_async_pool
+from pyliquid.liquid.connection import close_pool
+from pyliquid.liquid.events import (get_event_bus, start_listener,
+                                    stop_listener)
+from pyliquid.liquid.health import get_node_probe
+from pyliquid.liquid.index import get_wallet_index
+from pyliquid.liquid.jobs import get_job_queue
+from pyliquid.liquid.lifecycle import get_supervisor
+from pyliquid.liquid.payouts import get_payout_batcher
+from pyliquid.utils.encoding import DecimalJSONResponse, set_amount_format
+from pyliquid.utils.exceptions import SaturationError
+from pyliquid.utils.metrics import MetricsMiddleware, get_metrics
+from pyliquid.utils.misc import get_optional_config
 
 PROJECT_PATH = "PyLiquid2EVM"
 
@@ -15,11 +30,28 @@ _filter_path = ['/'.join(_base_path[:i]) for i in range(1, len(_base_path))
 
 BACKEND_PATH = f"{_filter_path}/{PROJECT_PATH}"
 
-app = FastAPI()
+app = FastAPI(default_response_class=DecimalJSONResponse,
+              dependencies=[Depends(set_amount_format)])
 
 app.include_router(health.router)
 app.include_router(operations.router)
 app.include_router(node.router)
+app.include_router(events.router)
+app.include_router(index.router)
+app.include_router(jobs.router)
+app.include_router(metrics.router)
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(SaturationError)
+async def saturation_handler(request: Request, saturated: SaturationError):
+    """
+    Answer 503 with `Retry-After` for calls refused at capacity, that a
+    route didn't handle itself.
+    """
+    error = unavailable(saturated)
+    return DecimalJSONResponse({"detail": error.detail}, status_code=503,
+                               headers=error.headers)
 
 
 @app.on_event('startup')
@@ -29,7 +61,35 @@ async def startup_event():
     """
     logging.basicConfig(level=logging.INFO)
     load_dotenv(f"{BACKEND_PATH}/.env")
-    server.Service()
+    if get_optional_config('node_managed', '1') == '1':
+        # Doesn't block, the node is started or adopted in background.
+        get_supervisor().start()
+    start_listener()
+    get_node_probe().start()
+    get_address_pool().start()
+    get_wallet_index().start(get_event_bus())
+    get_job_queue().start()
+    # Payouts accepted before a crash are sent now.
+    get_payout_batcher().recover()
+    get_metrics().start()
+
+
+@app.on_event('shutdown')
+async def shutdown_event():
+    """
+    Shutdown script to be executed when API is stopped.
+    """
+    # Waiting payouts are sent before closing the connections.
+    await get_payout_batcher().flush()
+    await get_job_queue().stop()
+    await get_address_pool().stop()
+    await get_wallet_index().stop()
+    await stop_listener()
+    await get_node_probe().stop()
+    await get_supervisor().stop()
+    close_pool()
+    await close_async_pool()
+    await get_metrics().stop()
 
 
 @app.get('/')
@@ -4,7 +4,7 @@ execution.
 """
 
 from datetime import datetime
-from typing import Tuple, List, Optional
+from typing import Any, Dict, Tuple, List, Optional, Union
 from pydantic import BaseModel, Field, validator
 
 from pyliquid.utils.data import check_sorted_index_tuple
@@ -48,7 +48,7 @@ class Instructions(BaseModel):
 
     seq: int
     cmd: List[Tuple[int, str]]
-    arg: Optional[Optional[List[Tuple[int, str]]]] = None
+    arg: Optional[List[Tuple[int, Optional[str]]]] = None
 
     @validator('seq', pre=True, always=True)
     def seq_higher_than_zero(cls, v):
@@ -97,4 +97,79 @@ class Message(BaseModel):
         payload.
     """
     body: Instructions
-    creation_date: datetime = Field(default_factory=datetime.now())
+    creation_date: datetime = Field(default_factory=datetime.now)
+
+
+class BulkWallets(BaseModel):
+    """
+    Request for provisioning many wallets at once. Wallets are named
+    `<prefix>-<index>` from `<prefix>-000000`, so repeating a request
+    resumes it after a failure.
+
+    Attributes
+    ----------
+    count: int
+        Number of wallets to provision.
+    prefix: str
+        Prefix for the wallet names, made of letters, digits, `-` or `_`.
+    addresses: int, default = 1
+        Number of addresses to pre-generate per wallet.
+    concurrency: int, default = 8
+        Maximum number of wallets being provisioned at the same time.
+    unload: bool, default = True
+        Unload wallets once provisioned, to bound the node memory. They are
+        loaded again on demand.
+    """
+    count: int = Field(..., gt=0, le=10000)
+    prefix: str = Field(..., regex=r'^[A-Za-z0-9_-]+$', max_length=64)
+    addresses: int = Field(1, ge=0, le=1000)
+    concurrency: int = Field(8, gt=0, le=64)
+    unload: bool = True
+
+
+class TokenIssuance(BaseModel):
+    """
+    Amounts of a single asset issuance.
+
+    Attributes
+    ----------
+    amount: str | float
+        Initial amount of tokens to be available.
+    reissue: str | float
+        Amount of reissuance tokens to generate.
+    """
+    amount: Union[str, float]
+    reissue: Union[str, float]
+
+
+class IssuanceBatch(BaseModel):
+    """
+    Set of issuances to be made by the same pool.
+
+    Attributes
+    ----------
+    tokens: list[TokenIssuance]
+        Issuances to make, results keep this order.
+    concurrency: int, default = 4
+        Maximum number of issuances in flight at the same time.
+    presplit: bool, default = True
+        Create one funding output per issuance beforehand if needed.
+    """
+    tokens: List[TokenIssuance] = Field(..., min_items=1, max_items=500)
+    concurrency: int = Field(4, gt=0, le=32)
+    presplit: bool = True
+
+
+class JobRequest(BaseModel):
+    """
+    Long-running operation to be executed in background.
+
+    Attributes
+    ----------
+    kind: str
+        Kind of operation, like `wallet.create` or `tx.send`.
+    params: dict, default = {}
+        Params of the operation.
+    """
+    kind: str
+    params: Dict[str, Any] = {}
@@ -3,20 +3,151 @@ Defines models for server responses.
 """
 
 # General imports
-from typing import Optional, Union
-import json
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, List, Optional, Union
+from pydantic import BaseModel, Field
 
 class SuccessGet(BaseModel):
     """
     Model for successful `get` requests.
     """
     status: int
-    payload: Optional[str] = json.dumps({"description": "Successful request!"})
+    payload: Any = {"description": "Successful request!"}
 
 class SuccessPost(BaseModel):
     """
     Model for successful `post` requests
     """
     status: int
-    payload: Optional[str] = json.dumps({"description": "Request fulfilled!"})
+    payload: Any = {"description": "Request fulfilled!"}
+
+class CommandResult(BaseModel):
+    """
+    Model for the outcome of a single command from a batch of `Instructions`.
+
+    Attributes
+    ----------
+    index: int
+        Index given to the command in the `Instructions` model.
+    cmd: str
+        Name of the executed command.
+    result: Any, default = None
+        Output from the node, if the command succeeded.
+    error: dict | None, default = None
+        JSON-RPC error with its `code` and `message`, if the command failed.
+    """
+    index: int
+    cmd: str
+    result: Optional[Any] = None
+    error: Optional[dict] = None
+
+class NodeEvent(BaseModel):
+    """
+    Model for notifications published by the node trough ZMQ.
+
+    Attributes
+    ----------
+    topic: str
+        Feed of the notification, like `hashblock` or `rawtx`.
+    body: str
+        Hex encoded payload. A hash for `hash*` topics, else the raw data.
+    sequence: int | None, default = None
+        Message counter of the feed, to detect missed notifications.
+    received_at: datetime.datetime, default = datetime.datetime.now()
+        Time at which the notification was received.
+    """
+    topic: str
+    body: str
+    sequence: Optional[int] = None
+    received_at: datetime = Field(default_factory=datetime.now)
+
+class NodeStatus(BaseModel):
+    """
+    Model for the latest liveness and readiness check of the node.
+
+    Attributes
+    ----------
+    alive: bool
+        If the node answered trough RPC.
+    ready: bool
+        If the node is alive and synced with its best known headers.
+    chain: str | None
+        Name of the chain the node is running.
+    blocks: int | None
+        Height of the validated chain.
+    headers: int | None
+        Height of the best known headers.
+    verification_progress: float | None
+        Estimate of the sync progress, from 0 to 1.
+    best_block_hash: str | None
+        Hash of the chain tip.
+    uptime: int | None
+        Seconds since the node started.
+    latency_ms: float | None
+        Round trip of the RPC check.
+    checked_at: datetime.datetime
+        Time of the check.
+    error: str | None
+        Reason for the node not being alive.
+    """
+    alive: bool
+    ready: bool = False
+    chain: Optional[str] = None
+    blocks: Optional[int] = None
+    headers: Optional[int] = None
+    verification_progress: Optional[float] = None
+    best_block_hash: Optional[str] = None
+    uptime: Optional[int] = None
+    latency_ms: Optional[float] = None
+    checked_at: datetime = Field(default_factory=datetime.now)
+    error: Optional[str] = None
+
+class WalletProvision(BaseModel):
+    """
+    Model for the outcome of provisioning a single wallet.
+
+    Attributes
+    ----------
+    name: str
+        Name of the wallet at the node level.
+    status: str
+        Either `created`, `existing` when it was provisioned by a previous
+        request, or `failed`.
+    addresses: list[str]
+        Pre-generated addresses of the wallet.
+    error: str | None, default = None
+        Reason of the failure.
+    """
+    name: str
+    status: str
+    addresses: List[str] = []
+    error: Optional[str] = None
+
+class IssuedAsset(BaseModel):
+    """
+    Model for the outcome of a single issuance in a batch.
+
+    Attributes
+    ----------
+    index: int
+        Position of the issuance in the batch.
+    asset: str | None
+        Id of the issued asset.
+    token: str | None
+        Id of the reissuance token.
+    entropy: str | None
+        Entropy of the issuance, needed to reissue.
+    txid: str | None
+        Transaction of the issuance.
+    vin: int | None
+        Input of the transaction holding the issuance.
+    error: str | None, default = None
+        Reason of the failure.
+    """
+    index: int
+    asset: Optional[str] = None
+    token: Optional[str] = None
+    entropy: Optional[str] = None
+    txid: Optional[str] = None
+    vin: Optional[int] = None
+    error: Optional[str] = None
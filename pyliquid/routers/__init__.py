@@ -1,6 +1,10 @@
-__all__ = ["health", "node", "operations", "share"]
+__all__ = ["events", "health", "index", "jobs", "metrics", "node", "operations", "share"]
 
+from .events import *
 from .health import *
+from .index import *
+from .jobs import *
+from .metrics import *
 from .node import *
 from .operations import *
 from .share import *
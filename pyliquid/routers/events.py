@@ -0,0 +1,62 @@
+"""
+Set of endpoints for receiving node events.
+"""
+
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from pyliquid.routers.share import RESPONSES
+from pyliquid.liquid.events import TOPICS, get_event_bus
+
+router = APIRouter(
+    prefix="/events",
+    tags=["events"],
+    responses=RESPONSES
+)
+
+
+async def wait_disconnect(websocket: WebSocket) -> None:
+    """
+    Read from the client until it disconnects.
+    """
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+
+@router.websocket("/ws")
+async def events_websocket(websocket: WebSocket,
+                           topics: Optional[str] = None):
+    """
+    Push node events to the client as JSON messages.
+
+    Parameters
+    ----------
+    topics: str, default = None
+        Comma separated list of topics to receive. All of them if `None`.
+    """
+    wanted = set(topics.split(',')) if topics else set(TOPICS)
+    await websocket.accept()
+    bus = get_event_bus()
+    queue = bus.listen()
+    # Incoming messages are ignored, it's only read to notice disconnects.
+    closed = asyncio.ensure_future(wait_disconnect(websocket))
+    try:
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, closed},
+                               return_when=asyncio.FIRST_COMPLETED)
+            if closed.done():
+                getter.cancel()
+                break
+            event = getter.result()
+            if event.topic in wanted:
+                await websocket.send_text(event.json())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        closed.cancel()
+        bus.forget(queue)
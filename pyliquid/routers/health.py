@@ -2,10 +2,13 @@
 Set of endpoints for healtchecks.
 """
 
-from fastapi import APIRouter, HTTPException, status
+import json
+from fastapi import APIRouter, Depends, HTTPException, status
 
-from pyliquid.routers.share import RESPONSES
-from pyliquid.liquid.server import Service
+from pyliquid.routers.share import RESPONSES, respond
+from pyliquid.liquid.client import get_async_pool
+from pyliquid.liquid.health import NodeProbe, get_node_probe
+from pyliquid.liquid.nodes import NodeRouter
 from pyliquid.models.responses import SuccessGet
 
 router = APIRouter(
@@ -16,16 +19,80 @@ router = APIRouter(
 
 
 @router.get("/", tags=["node"])
-async def node_health_status():
+async def node_health_status(probe: NodeProbe = Depends(get_node_probe)):
     """
-    Check if there's any Liquid node running.
+    Check if there's any Liquid node running. Answers from the latest
+    background check, without reaching the node.
 
     Returns
     -------
-    AuthServiceProxy
-        Latest Proxy Service instance.
+    SuccessGet
+        Successful response if the node is alive.
     """
-    if Service._is_running():
+    if probe.status.alive:
         return SuccessGet(status=status.HTTP_200_OK)
     else:
         raise HTTPException(status_code=400, detail="Node is not running")
+
+
+@router.get("/ready", tags=["node"])
+async def node_readiness_status(probe: NodeProbe = Depends(get_node_probe)):
+    """
+    Check if the node is synced and ready to serve requests.
+
+    Returns
+    -------
+    SuccessGet
+        Sync progress and RPC latency of the latest check.
+    """
+    node_status = probe.status
+    if node_status.ready:
+        return respond(SuccessGet(status=status.HTTP_200_OK,
+                                  payload=node_status))
+    else:
+        raise HTTPException(status_code=503,
+                            detail=json.loads(node_status.json()))
+
+
+@router.get("/nodes", tags=["node"])
+async def node_pool_status():
+    """
+    State of the circuit breaker and outstanding calls of every node, when
+    `rpc_nodes` is configured.
+
+    Returns
+    -------
+    SuccessGet
+        Nodes in configuration order.
+    """
+    pool = get_async_pool()
+    if not isinstance(pool, NodeRouter):
+        raise HTTPException(status_code=404,
+                            detail="No node pool is configured")
+    return respond(SuccessGet(status=status.HTTP_200_OK,
+                              payload=pool.status()))
+
+
+@router.get("/admission", tags=["node"])
+async def admission_status():
+    """
+    Limit, calls in flight and waiting calls of the admission control of
+    the node, when `rpc_admission` is enabled.
+
+    Returns
+    -------
+    SuccessGet
+        Admission state, by node when `rpc_nodes` is configured.
+    """
+    pool = get_async_pool()
+    if isinstance(pool, NodeRouter):
+        payload = {node['name']: node['admission'] for node in pool.status()}
+        enabled = any(payload.values())
+    else:
+        admission = getattr(pool, 'admission', None)
+        payload = admission.status() if admission is not None else None
+        enabled = payload is not None
+    if not enabled:
+        raise HTTPException(status_code=404,
+                            detail="Admission control is disabled")
+    return respond(SuccessGet(status=status.HTTP_200_OK, payload=payload))
@@ -0,0 +1,94 @@
+"""
+Set of endpoints for wallet queries answered from the local index.
+"""
+
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from pyliquid.routers.share import RESPONSES, respond
+from pyliquid.liquid.index import DEFAULT_QUERY_LIMIT, WalletIndex, \
+    get_wallet_index
+from pyliquid.models.responses import SuccessGet, SuccessPost
+from pyliquid.utils.encoding import Amounts
+
+router = APIRouter(
+    prefix="/index",
+    tags=["index"],
+    responses=RESPONSES
+)
+
+
+def get_synced_index(wallet_label: str,
+                     index: WalletIndex = Depends(get_wallet_index)) \
+        -> WalletIndex:
+    """
+    Return the index, if the given wallet was already synced.
+    """
+    if not index.is_synced(wallet_label):
+        raise HTTPException(404, detail="Wallet is not indexed")
+    return index
+
+@router.post("/watch")
+async def post_watch_wallet(wallet_label: str,
+                            index: WalletIndex = Depends(get_wallet_index)):
+    """
+    Start indexing a wallet. Its queries are available after the first
+    sync, and kept current on every new block.
+
+    TODO: Only callable by admin.
+    """
+    index.watch(wallet_label)
+    return respond(SuccessPost(status=status.HTTP_200_OK,
+                               payload={"synced":
+                                        index.is_synced(wallet_label)}))
+
+@router.get("/transactions")
+async def get_transactions(wallet_label: str,
+                           asset: Optional[str] = None,
+                           address: Optional[str] = None,
+                           min_height: Optional[int] = None,
+                           max_height: Optional[int] = None,
+                           limit: int = Query(DEFAULT_QUERY_LIMIT, gt=0,
+                                              le=10000),
+                           offset: int = Query(0, ge=0),
+                           index: WalletIndex = Depends(get_synced_index)):
+    """
+    Transaction entries of a wallet newest first, by asset, address or
+    block height range.
+    """
+    return respond(SuccessGet(status=status.HTTP_200_OK,
+                              payload=index.transactions(
+                                  wallet_label, asset, address, min_height,
+                                  max_height, limit, offset)))
+
+@router.get("/utxos")
+async def get_utxos(wallet_label: str,
+                    asset: Optional[str] = None,
+                    address: Optional[str] = None,
+                    index: WalletIndex = Depends(get_synced_index)):
+    """
+    Unspent outputs of a wallet, by asset or address.
+    """
+    return respond(SuccessGet(status=status.HTTP_200_OK,
+                              payload=index.utxos(wallet_label, asset,
+                                                  address)))
+
+@router.get("/issuances")
+async def get_issuances(wallet_label: str,
+                        asset: Optional[str] = None,
+                        index: WalletIndex = Depends(get_synced_index)):
+    """
+    Issuances and reissuances made by a wallet.
+    """
+    return respond(SuccessGet(status=status.HTTP_200_OK,
+                              payload=index.issuances(wallet_label, asset)))
+
+@router.get("/balance")
+async def get_balance(wallet_label: str,
+                      index: WalletIndex = Depends(get_synced_index)):
+    """
+    Sum of the unspent outputs of a wallet by asset, including unconfirmed
+    ones.
+    """
+    return respond(SuccessGet(status=status.HTTP_200_OK,
+                              payload=Amounts(index.balance(wallet_label))))
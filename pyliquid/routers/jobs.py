@@ -0,0 +1,59 @@
+"""
+Set of endpoints for submitting long-running operations and polling them.
+"""
+
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from pyliquid.routers.share import RESPONSES, respond
+from pyliquid.liquid.jobs import (JOB_KINDS, IdempotencyConflict, JobQueue,
+                                  get_job_queue)
+from pyliquid.models import requests, responses
+from pyliquid.utils.encoding import DecimalJSONResponse
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["jobs"],
+    responses=RESPONSES
+)
+
+
+def submit_job(queue: JobQueue, kind: str, params: dict,
+               idempotency_key: Optional[str]) -> DecimalJSONResponse:
+    """
+    Submit a job, answering `409` if its idempotency key was already used
+    for a different operation.
+    """
+    try:
+        job = queue.submit(kind, params, idempotency_key)
+    except IdempotencyConflict as conflict:
+        raise HTTPException(409, detail=str(conflict))
+    return respond(responses.SuccessPost(status=status.HTTP_202_ACCEPTED,
+                                         payload=job))
+
+@router.post("/", status_code=status.HTTP_202_ACCEPTED)
+async def post_job(job: requests.JobRequest,
+                   idempotency_key: Optional[str] = Header(None),
+                   queue: JobQueue = Depends(get_job_queue)):
+    """
+    Submit an operation to be executed in background, poll its status with
+    the returned job id. Retrying with the same `Idempotency-Key` header
+    returns the original job instead of running the operation twice.
+
+    TODO: Only callable by admin.
+    """
+    if job.kind not in JOB_KINDS:
+        raise HTTPException(400, detail=f"Kind must be one of {JOB_KINDS}")
+    return submit_job(queue, job.kind, job.params, idempotency_key)
+
+@router.get("/{job_id}")
+def get_job(job_id: str, queue: JobQueue = Depends(get_job_queue)):
+    """
+    Status of a job, either `pending`, `running`, `done` or `failed`, with
+    its result once done.
+    """
+    job = queue.get(job_id)
+    if job is None:
+        raise HTTPException(404, detail="Job not found")
+    return respond(responses.SuccessGet(status=status.HTTP_200_OK,
+                                        payload=job))
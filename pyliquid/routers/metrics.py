@@ -0,0 +1,21 @@
+"""
+Endpoint for scraping the metrics of every worker.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from pyliquid.utils.metrics import CONTENT_TYPE, get_metrics
+
+router = APIRouter(
+    tags=["health"]
+)
+
+
+@router.get("/metrics")
+def get_prometheus_metrics():
+    """
+    RPC, node command and HTTP metrics of every worker, in Prometheus text
+    format.
+    """
+    return Response(get_metrics().render(), media_type=CONTENT_TYPE)
@@ -2,11 +2,18 @@
 Set of endpoints for managing the Liquid node.
 """
 
-from fastapi import APIRouter, HTTPException, status
+import logging
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from bitcoinrpc.authproxy import JSONRPCException  # type: ignore
 
-from pyliquid.routers.share import RESPONSES
-from pyliquid.liquid.server import Service
-from pyliquid.models import requests, responses
+from pyliquid.routers.share import RESPONSES, respond, respond_raw
+from pyliquid.routers.jobs import submit_job
+from pyliquid.liquid.client import AsyncServiceProxy, get_async_proxy
+from pyliquid.liquid.jobs import RESTART_JOB, JobQueue, get_job_queue
+from pyliquid.models import responses
+from pyliquid.utils.encoding import wants_raw
+from pyliquid.utils.exceptions import RPC_INVALID_ADDRESS_OR_KEY
 
 router = APIRouter(
     prefix="/node",
@@ -14,10 +21,46 @@ router = APIRouter(
     responses=RESPONSES
 )
 
-@router.post("/restart")
-def restart_node():
+@router.post("/restart", status_code=status.HTTP_202_ACCEPTED)
+async def restart_node(idempotency_key: Optional[str] = Header(None),
+                       queue: JobQueue = Depends(get_job_queue)):
     """
-    Restart the running instance of Liquid node.
+    Restart the running instance of Liquid node. The restart runs in
+    background on the worker in control of the node, poll its status with
+    the returned job id.
     """
-    _ = Service()
-    return responses.SuccessPost(status.HTTP_201_CREATED)
\ No newline at end of file
+    return submit_job(queue, RESTART_JOB, {}, idempotency_key)
+
+@router.get("/restart/{job_id}")
+def get_restart_status(job_id: str,
+                       queue: JobQueue = Depends(get_job_queue)):
+    """
+    Status of a restart job, either `pending`, `running`, `done` or `failed`.
+    """
+    job = queue.get(job_id)
+    if job is None or job['kind'] != RESTART_JOB:
+        raise HTTPException(404, detail="Job not found")
+    return respond(responses.SuccessGet(status=status.HTTP_200_OK,
+                                        payload=job))
+
+@router.get("/block/{block_hash}")
+async def get_block(block_hash: str,
+                    verbosity: int = Query(1, ge=0, le=2),
+                    proxy: AsyncServiceProxy = Depends(get_async_proxy)):
+    """
+    Block with the given hash, as returned by `getblock`. With
+    `amounts=raw` the node output is forwarded without being decoded.
+    """
+    try:
+        if wants_raw():
+            return respond_raw(status.HTTP_200_OK,
+                               await proxy.getblock.raw_(block_hash,
+                                                         verbosity))
+        return respond(responses.SuccessGet(
+            status=status.HTTP_200_OK,
+            payload=await proxy.getblock(block_hash, verbosity)))
+    except JSONRPCException as json_exception:
+        logging.error(json_exception)
+        if json_exception.code == RPC_INVALID_ADDRESS_OR_KEY:
+            raise HTTPException(404, detail="Block not found")
+        raise HTTPException(500)
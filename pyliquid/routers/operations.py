@@ -2,17 +2,26 @@
 Set of endpoints for operations with Liquid.
 """
 
-import json
 import logging
 from typing import Optional, Union
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from bitcoinrpc.authproxy import JSONRPCException  # type: ignore
 
-from pyliquid.routers.share import RESPONSES
-from pyliquid.liquid.server import Service
-from pyliquid.liquid.operations import Wallet
-from pyliquid.models import responses
-from pyliquid.utils.data import parse_decimal_to_float
+from pyliquid.routers.share import (RESPONSES, respond, respond_raw,
+                                    rpc_failure, unavailable)
+from pyliquid.liquid.addresses import AddressPool, get_address_pool
+from pyliquid.liquid.batch import MethodNotAllowed, execute_instructions
+from pyliquid.liquid.client import AsyncServiceProxy, get_async_proxy
+from pyliquid.liquid.issuance import IssuanceRegistry, get_issuance_registry
+from pyliquid.liquid.operations import DEFAULT_PAGE_SIZE, AsyncPool, AsyncWallet
+from pyliquid.liquid.payouts import PayoutBatcher, get_payout_batcher
+from pyliquid.liquid.provisioning import existing_wallets, provision_wallets
+from pyliquid.liquid.registry import WalletRegistry, get_wallet_registry
+from pyliquid.models import requests, responses
+from pyliquid.utils.encoding import encode_json, wants_raw
+from pyliquid.utils.exceptions import SaturationError
 
 router = APIRouter(
     prefix="/operations",
@@ -22,79 +31,327 @@ router = APIRouter(
 class SendTx(BaseModel):
     target_address: str
     total_amount: Union[str, float]
+    batch: bool = False
+    asset: Optional[str] = None
+    wait: bool = True
 
 
-def get_wallet_instance(wallet_mode: str, 
-                        target_label: Optional[str] = None) -> Wallet:
+async def get_wallet_instance(proxy_service: AsyncServiceProxy,
+                              wallet_mode: str,
+                              target_label: Optional[str] = None) \
+        -> AsyncWallet:
     """
     Return wallet instance depending on specified mode.
     """
-    _proxy = Service.get_proxy()
     if target_label:
-        return Wallet(_proxy, wallet_mode, target_label)
+        return await AsyncWallet.from_mode(proxy_service, wallet_mode,
+                                           target_label)
     else:
-        return Wallet(_proxy, wallet_mode)
+        return await AsyncWallet.from_mode(proxy_service, wallet_mode)
 
 @router.get("/wallet", tags=["wallet"])
-async def get_wallet():
+async def get_wallet(proxy: AsyncServiceProxy = Depends(get_async_proxy)):
     """
     List active wallets on the node.
 
     TODO: This should only be callable by admin.
     """
     try:
-        _instance = get_wallet_instance('r')
-        output = _instance.list_wallets()
+        _instance = await get_wallet_instance(proxy, 'r')
+        output = await _instance.list_wallets()
         print(f"The output is: {output}\n")
-        return responses.SuccessGet(status=status.HTTP_200_OK, 
-                                    payload=json.dumps(output))
+        return respond(responses.SuccessGet(status=status.HTTP_200_OK, 
+                                            payload=output))
+    except SaturationError as saturated:
+        raise unavailable(saturated)
+    except JSONRPCException as json_exception:
+        logging.error(json_exception)
+        raise rpc_failure(json_exception)
     except Exception as exp:
         logging.error(exp)
         raise HTTPException(500)
 
 @router.get("/wallet/", tags=["wallet"])
-async def get_labeled_wallet(wallet_label: str):
+async def get_labeled_wallet(wallet_label: str,
+                             registry: WalletRegistry = Depends(get_wallet_registry)):
     """
     Returns an specific wallet metadata.
     """
     try:
-        _instance = get_wallet_instance('l', wallet_label)
-        return responses.SuccessGet(status=status.HTTP_200_OK,
-                        payload=json.dumps(parse_decimal_to_float(
-                                                _instance.get_wallet_info())))
+        _instance = await registry.get(wallet_label)
+    except SaturationError as saturated:
+        raise unavailable(saturated)
+    except JSONRPCException as json_exception:
+        logging.error(json_exception)
+        raise rpc_failure(json_exception)
+    try:
+        if wants_raw():
+            return respond_raw(status.HTTP_200_OK,
+                               await _instance.get_wallet_info(raw=True))
+        return respond(responses.SuccessGet(status=status.HTTP_200_OK,
+                        payload=await _instance.get_wallet_info()))
+    except SaturationError as saturated:
+        raise unavailable(saturated)
+    except JSONRPCException as json_exception:
+        logging.error(json_exception)
+        raise rpc_failure(json_exception)
+    except Exception as exp:
+        logging.error(exp)
+        raise HTTPException(500)
+
+@router.get("/wallet/utxos", tags=["wallet"])
+async def get_wallet_utxos(wallet_label: str,
+                           min_conf: int = Query(1, ge=0),
+                           registry: WalletRegistry = Depends(get_wallet_registry)):
+    """
+    Unspent outputs of a wallet. With `amounts=raw` the node output is
+    forwarded without being decoded.
+    """
+    try:
+        _instance = await registry.get(wallet_label)
+    except SaturationError as saturated:
+        raise unavailable(saturated)
+    except JSONRPCException as json_exception:
+        logging.error(json_exception)
+        raise rpc_failure(json_exception)
+    try:
+        if wants_raw():
+            return respond_raw(status.HTTP_200_OK,
+                               await _instance.list_unspent(min_conf, True))
+        return respond(responses.SuccessGet(status=status.HTTP_200_OK,
+                        payload=await _instance.list_unspent(min_conf)))
+    except SaturationError as saturated:
+        raise unavailable(saturated)
+    except JSONRPCException as json_exception:
+        logging.error(json_exception)
+        raise rpc_failure(json_exception)
+    except Exception as exp:
+        logging.error(exp)
+        raise HTTPException(500)
+
+@router.get("/wallet/transactions", tags=["wallet"])
+async def get_wallet_transactions(wallet_label: str,
+                                  since_block: Optional[str] = None,
+                                  page_size: int = Query(DEFAULT_PAGE_SIZE,
+                                                         gt=0, le=5000),
+                                  registry: WalletRegistry = Depends(get_wallet_registry)):
+    """
+    Streams the wallet history newest first, one JSON line per entry. The
+    last line holds `lastblock`, to be given as `since_block` on the next
+    call to only get newer entries. Entries may repeat between calls, so
+    clients should dedupe them by `txid`.
+    """
+    try:
+        _instance = await registry.get(wallet_label)
+        last_block = await registry.proxy.getbestblockhash()
+    except SaturationError as saturated:
+        raise unavailable(saturated)
+    except JSONRPCException as json_exception:
+        logging.error(json_exception)
+        raise rpc_failure(json_exception)
     except Exception as exp:
         logging.error(exp)
         raise HTTPException(500)
 
+    async def lines():
+        try:
+            async for transaction in _instance.iter_transactions(page_size,
+                                                                 since_block):
+                yield encode_json(transaction) + b"\n"
+        except Exception as exp:
+            # Headers are already sent, the error ends the stream instead.
+            logging.error(exp)
+            yield encode_json({"error": str(exp)}) + b"\n"
+            return
+        yield encode_json({"lastblock": last_block}) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @router.post("/wallet/create", tags=["wallet"])
-async def post_create_wallet():
+async def post_create_wallet(proxy: AsyncServiceProxy = Depends(get_async_proxy),
+                             registry: WalletRegistry = Depends(get_wallet_registry)):
     """
     Creates a new Wallet instance
 
     TODO: Only callable by admin.
     """
     try:
-        _instance = get_wallet_instance('c')
-        return responses.SuccessPost(status=status.HTTP_200_OK,
-                                payload=json.dumps(
-                                    parse_decimal_to_float(
-                                        _instance.get_wallet_info())))
+        _instance = await get_wallet_instance(proxy, 'c')
+        registry.register(_instance)
+        return respond(responses.SuccessPost(status=status.HTTP_200_OK,
+                                payload=await _instance.get_wallet_info()))
+    except SaturationError as saturated:
+        raise unavailable(saturated)
+    except JSONRPCException as json_exception:
+        logging.error(json_exception)
+        raise rpc_failure(json_exception)
+    except Exception as exp:
+        logging.error(exp)
+        raise HTTPException(500)
+
+@router.post("/wallet/address", tags=["wallet"])
+async def post_wallet_address(wallet_label: str,
+                              pool: AddressPool = Depends(get_address_pool)):
+    """
+    Hands out a receive address that was never issued before, taken from the
+    pre-derived addresses of the wallet.
+    """
+    try:
+        address = await pool.take(wallet_label)
+    except SaturationError as saturated:
+        raise unavailable(saturated)
+    except JSONRPCException as json_exception:
+        logging.error(json_exception)
+        raise rpc_failure(json_exception)
+    except Exception as exp:
+        logging.error(exp)
+        raise HTTPException(500)
+    return respond(responses.SuccessPost(status=status.HTTP_200_OK,
+                                         payload={"address": address}))
+
+@router.post("/wallet/bulk", tags=["wallet"])
+async def post_bulk_wallets(bulk: requests.BulkWallets,
+                            proxy: AsyncServiceProxy = Depends(get_async_proxy)):
+    """
+    Creates many wallets with pre-generated addresses, streaming one JSON line
+    per wallet as they complete. Repeating a request resumes it.
+
+    TODO: Only callable by admin.
+    """
+    try:
+        existing = await existing_wallets(proxy)
+    except SaturationError as saturated:
+        raise unavailable(saturated)
+    except JSONRPCException as json_exception:
+        logging.error(json_exception)
+        raise rpc_failure(json_exception)
     except Exception as exp:
         logging.error(exp)
         raise HTTPException(500)
 
+    async def lines():
+        async for provision in provision_wallets(proxy, bulk, existing):
+            yield encode_json(provision) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @router.post("/tx/send", tags=["tx"])
-async def post_send_transaction(incoming_body: SendTx):
+async def post_send_transaction(incoming_body: SendTx,
+                                proxy: AsyncServiceProxy = Depends(get_async_proxy),
+                                batcher: PayoutBatcher = Depends(get_payout_batcher)):
     """
     Send tokens from the node Wallet to given address.
+
+    With `batch`, the payout is sent along with others in a single
+    `sendmany` of its `asset`, and the shared txid is returned. Without
+    `wait`, only the id of the payout is returned, to be polled at
+    `/operations/tx/payout/{payout_id}`.
     """
     try:
-        _instance = get_wallet_instance('r')
-        return responses.SuccessPost(status=status.HTTP_200_OK,
-                                payload=json.dumps(
-                                    _instance.send_to_address(
+        if incoming_body.batch:
+            payout_id, txid = batcher.submit(incoming_body.target_address,
+                                             incoming_body.total_amount,
+                                             incoming_body.asset)
+            if incoming_body.wait:
+                return respond(responses.SuccessPost(
+                    status=status.HTTP_200_OK, payload=await txid))
+            return respond(responses.SuccessPost(
+                status=status.HTTP_202_ACCEPTED,
+                payload={"payout_id": payout_id}))
+        _instance = await get_wallet_instance(proxy, 'r')
+        return respond(responses.SuccessPost(status=status.HTTP_200_OK,
+                                payload=await _instance.send_to_address(
                                         incoming_body.target_address, 
                                         incoming_body.total_amount)))
+    except SaturationError as saturated:
+        raise unavailable(saturated)
+    except ValueError as invalid:
+        raise HTTPException(400, detail=str(invalid))
+    except JSONRPCException as json_exception:
+        logging.error(json_exception)
+        raise rpc_failure(json_exception)
     except Exception as exp:
         logging.error(exp)
         raise HTTPException
+
+@router.get("/tx/payout/{payout_id}", tags=["tx"])
+async def get_payout(payout_id: str,
+                     batcher: PayoutBatcher = Depends(get_payout_batcher)):
+    """
+    Returns the status of a batched payout, with its txid once sent. An
+    `unknown` payout may have been sent, and is reconciled with the wallet.
+    """
+    outcome = batcher.status(payout_id)
+    if outcome is None:
+        raise HTTPException(404, detail="Payout not found")
+    return respond(responses.SuccessGet(status=status.HTTP_200_OK,
+                                        payload=outcome))
+
+@router.post("/token/issue", tags=["token"])
+async def post_issue_tokens(wallet_label: str, batch: requests.IssuanceBatch,
+                            registry: WalletRegistry = Depends(get_wallet_registry)):
+    """
+    Issue a batch of tokens from the given pool wallet, reporting the
+    outcome of each one in the same order.
+
+    TODO: Only callable by admin.
+    """
+    try:
+        _pool = AsyncPool(await registry.get(wallet_label))
+        results = await _pool.issue_tokens(
+            [(token.amount, token.reissue) for token in batch.tokens],
+            batch.concurrency, batch.presplit)
+        return respond(responses.SuccessPost(status=status.HTTP_200_OK,
+                                             payload=results))
+    except SaturationError as saturated:
+        raise unavailable(saturated)
+    except JSONRPCException as json_exception:
+        logging.error(json_exception)
+        raise rpc_failure(json_exception)
+    except Exception as exp:
+        logging.error(exp)
+        raise HTTPException(500)
+
+@router.get("/token", tags=["token"])
+async def get_issued_tokens(wallet_label: Optional[str] = None,
+                            issuances: IssuanceRegistry = Depends(get_issuance_registry)):
+    """
+    List the issued tokens, newest first, without reaching the node.
+    """
+    return respond(responses.SuccessGet(status=status.HTTP_200_OK,
+                                        payload=issuances.list(wallet_label)))
+
+@router.get("/token/{asset}", tags=["token"])
+async def get_issued_token(asset: str,
+                           issuances: IssuanceRegistry = Depends(get_issuance_registry)):
+    """
+    Returns the issuance record of a token, by asset or reissuance token id.
+    """
+    record = issuances.get(asset)
+    if record is None:
+        raise HTTPException(404, detail="Token not found")
+    return respond(responses.SuccessGet(status=status.HTTP_200_OK,
+                                        payload=record))
+
+@router.post("/batch", tags=["batch"])
+async def post_batch(message: requests.Message,
+                     proxy: AsyncServiceProxy = Depends(get_async_proxy)):
+    """
+    Execute a set of independent instructions in a single round trip to the
+    node. Failing commands are reported by index with their own error. Only
+    reads and wallet management methods are allowed.
+    """
+    try:
+        results = await execute_instructions(proxy, message.body)
+        return respond(responses.SuccessPost(status=status.HTTP_200_OK,
+                                             payload=results))
+    except MethodNotAllowed as refused:
+        raise HTTPException(400, detail=str(refused))
+    except SaturationError as saturated:
+        raise unavailable(saturated)
+    except JSONRPCException as json_exception:
+        logging.error(json_exception)
+        raise rpc_failure(json_exception)
+    except Exception as exp:
+        logging.error(exp)
+        raise HTTPException(500)
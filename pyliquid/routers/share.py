@@ -2,8 +2,57 @@
 Set of elements being shared by more than one Router
 """
 
+from typing import Optional, Union
+from fastapi import HTTPException
+from fastapi.responses import Response
+from bitcoinrpc.authproxy import JSONRPCException  # type: ignore
+
+from pyliquid.models.responses import SuccessGet, SuccessPost
+from pyliquid.utils.encoding import DecimalJSONResponse, wrap_raw
+from pyliquid.utils.exceptions import RPC_WALLET_NOT_FOUND, SaturationError
+
 RESPONSES = {
     404: {"description": "Resource not found"},
+    502: {"description": "The node answered the call with an error"},
     500: {"description": "There was an error processing your request. \
-        Please try again!"}
-}
\ No newline at end of file
+        Please try again!"},
+    503: {"description": "The node is at capacity, retry after the seconds \
+        in the `Retry-After` header"}
+}
+
+
+def respond(model: Union[SuccessGet, SuccessPost]) -> DecimalJSONResponse:
+    """
+    Encode a successful response in a single pass, with its `status` as the
+    HTTP status code. Amounts in the payload keep their exact value.
+    """
+    return DecimalJSONResponse({"status": model.status,
+                                "payload": model.payload},
+                               status_code=model.status)
+
+
+def respond_raw(status: int, raw: Optional[bytes]) -> Response:
+    """
+    Forward the raw JSON of a node result as the payload of a successful
+    response, for requests made with `amounts=raw`.
+    """
+    return Response(wrap_raw(status, raw), status_code=status,
+                    media_type="application/json")
+
+
+def unavailable(saturated: SaturationError) -> HTTPException:
+    """
+    Answer for a request turned down at capacity, telling when to retry.
+    """
+    return HTTPException(503, detail=str(saturated),
+                         headers={"Retry-After": str(saturated.retry_after)})
+
+
+def rpc_failure(json_exception: JSONRPCException) -> HTTPException:
+    """
+    Answer for a call the node failed, as 404 for a wallet it doesn't have
+    and 502 with the message of the node otherwise.
+    """
+    if json_exception.code == RPC_WALLET_NOT_FOUND:
+        return HTTPException(404, detail="Wallet not found")
+    return HTTPException(502, detail=json_exception.message)
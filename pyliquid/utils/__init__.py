@@ -1,5 +1,8 @@
-__all__ = ["data", "exceptions", "misc"]
+__all__ = ["data", "encoding", "exceptions", "metrics", "misc", "storage"]
 
 from .data import *
+from .encoding import *
 from .exceptions import *
+from .metrics import *
 from .misc import *
+from .storage import *
@@ -3,7 +3,7 @@ Utilities for data manipulation and validation
 """
 
 import logging
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Union
 from decimal import Decimal
 
 
@@ -29,27 +29,30 @@ def check_sorted_index_tuple(input_list: List[Tuple]) -> Optional[bool]:
         logging.error('It was not posisble to sort the list. \
             Review the given tuples.')
 
-def parse_decimal_to_float(input_dict: dict) -> dict:
+def parse_decimal_to_float(input_dict: Union[dict, list]) \
+        -> Union[dict, list]:
     """
-    Cast any decimal type to floats or integer. 
+    Cast any decimal type to floats, including the ones inside lists.
     This enables `json` package to dumps responses from rpc response.
+    Responses of the API keep exact amounts with `encoding.encode_json`
+    instead, floats are lossy.
 
     Paramaters
     ----------
-    input_dict: dict
+    input_dict: dict | list
         The raw data to be casted and formatted.
 
     Returns
     -------
-    dict
-        The resulting dictionary with compatible types.
+    dict | list
+        The resulting data with compatible types.
     """
-    to_return = {}
-    for k, v in input_dict.items():
-        if type(v) == Decimal:
-            to_return[k] = float(v)
-        elif type(v) == dict:
-            to_return.update({k: parse_decimal_to_float(v)})
-        else:
-            to_return[k] = v
-    return to_return
+    def cast(value):
+        if isinstance(value, Decimal):
+            return float(value)
+        elif isinstance(value, (dict, list)):
+            return parse_decimal_to_float(value)
+        return value
+    if isinstance(input_dict, list):
+        return [cast(v) for v in input_dict]
+    return {k: cast(v) for k, v in input_dict.items()}
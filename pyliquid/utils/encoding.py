@@ -0,0 +1,192 @@
+"""
+Single-pass JSON encoding of responses, keeping the amounts returned by the
+node exact instead of turning them into floats.
+"""
+
+import json
+from contextvars import ContextVar
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Optional
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+from fastapi import Query
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from pyliquid.utils.misc import get_optional_config
+
+# Amounts as exact decimal strings like "0.00010000", integer satoshis, or
+# the JSON numbers written by the node, forwarded without decoding them.
+# Responses that can't forward the node output keep `raw` amounts as exact
+# strings, never floats.
+AMOUNT_FORMATS = ('string', 'sats', 'raw')
+RAW_FORMAT = 'raw'
+SATS_PER_COIN = Decimal(100_000_000)
+
+# Keys holding amounts in node results, at any depth below them, like the
+# balances by asset of `getwalletinfo`. Only those become satoshis, so other
+# decimals like a fee rate or the verification progress keep their value.
+AMOUNT_KEYS = frozenset({
+    'amount', 'amounts', 'assetamount', 'balance', 'balances', 'fee',
+    'immature', 'immature_balance', 'mine', 'tokenamount', 'trusted',
+    'unconfirmed_balance', 'untrusted_pending', 'value', 'watchonly',
+})
+
+_AMOUNT_FORMAT: ContextVar[Optional[str]] = ContextVar('amount_format',
+                                                       default=None)
+
+
+def get_amount_format() -> str:
+    """
+    Format of amounts for the current request, or `amount_format` from .env
+    file when the request didn't choose one.
+
+    Returns
+    -------
+    str
+        One of `AMOUNT_FORMATS`.
+    """
+    return _AMOUNT_FORMAT.get() or \
+        get_optional_config('amount_format', AMOUNT_FORMATS[0])
+
+
+async def set_amount_format(amounts: Optional[str] = Query(
+        None, regex=f"^({'|'.join(AMOUNT_FORMATS)})$")) -> None:
+    """
+    FastAPI dependency choosing the format of amounts for the request with
+    the `amounts` query param.
+    """
+    _AMOUNT_FORMAT.set(amounts)
+
+
+def wants_raw() -> bool:
+    """
+    Check if the current request asked for the node JSON to be forwarded
+    as is.
+    """
+    return get_amount_format() == RAW_FORMAT
+
+
+class Amounts(dict):
+    """
+    Mapping whose values are all amounts, for results without an amount key
+    like the balance of a wallet by asset.
+    """
+
+
+def encode_decimal(value: Decimal, amount_format: str) -> Any:
+    """
+    Encode a decimal number returned by the node.
+
+    Parameters
+    ----------
+    value: Decimal
+    amount_format: str
+        One of `AMOUNT_FORMATS`. Satoshis are only used for numbers with up
+        to 8 decimals, others like the verification progress stay strings.
+        Responses that can't be forwarded raw use exact strings for `raw`.
+
+    Returns
+    -------
+    str | int
+    """
+    if amount_format == 'sats' and value.as_tuple().exponent >= -8:
+        return int(value * SATS_PER_COIN)
+    return format(value, 'f')
+
+
+def _to_sats(value: Any, amount: bool = False) -> Any:
+    """
+    Turn the amounts found under `AMOUNT_KEYS` into satoshis, leaving every
+    other value as it is.
+    """
+    if isinstance(value, Decimal):
+        return encode_decimal(value, 'sats') if amount else value
+    if isinstance(value, BaseModel):
+        return _to_sats(value.dict(), amount)
+    if isinstance(value, dict):
+        amount = amount or isinstance(value, Amounts)
+        return {key: _to_sats(item, amount or key in AMOUNT_KEYS)
+                for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_sats(item, amount) for item in value]
+    return value
+
+
+def _default_for(amount_format: str) -> Callable[[Any], Any]:
+    def default(value: Any) -> Any:
+        if isinstance(value, Decimal):
+            # Amounts were already turned into satoshis.
+            return encode_decimal(value, 'string' if amount_format == 'sats'
+                                  else amount_format)
+        if isinstance(value, BaseModel):
+            return value.dict()
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, (set, tuple)):
+            return list(value)
+        raise TypeError(f"Type {type(value).__name__} is not serializable")
+    return default
+
+
+def encode_json(content: Any, amount_format: Optional[str] = None) -> bytes:
+    """
+    Encode content to JSON in a single pass, using `orjson` if available.
+
+    Parameters
+    ----------
+    content: Any
+        JSON compatible data, decimals, datetimes and pydantic models.
+    amount_format: str | None, default = None
+        One of `AMOUNT_FORMATS`, the one of the request if `None`. With
+        `sats`, only decimals under `AMOUNT_KEYS` or in `Amounts` are
+        amounts, found in a first pass over the content.
+
+    Returns
+    -------
+    bytes
+    """
+    amount_format = amount_format or get_amount_format()
+    if amount_format == 'sats':
+        content = _to_sats(content)
+    default = _default_for(amount_format)
+    if orjson is not None:
+        return orjson.dumps(content, default=default,
+                            option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=default, ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def wrap_raw(status: int, raw: Optional[bytes]) -> bytes:
+    """
+    Wrap the raw JSON of a node result in the response envelope, without
+    decoding it.
+
+    Parameters
+    ----------
+    status: int
+        Status code of the response.
+    raw: bytes | None
+        JSON text of the result, `None` for a null payload.
+
+    Returns
+    -------
+    bytes
+    """
+    return b''.join((b'{"status":', str(status).encode(), b',"payload":',
+                     b'null' if raw is None else raw, b'}'))
+
+
+class DecimalJSONResponse(JSONResponse):
+    """
+    JSON response encoded with `encode_json`, in the amount format of the
+    request.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
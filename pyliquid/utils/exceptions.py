@@ -1,3 +1,44 @@
 """
 This file will defined custom Error Types
 """
+
+# JSON-RPC error codes returned by the node, see `rpc/protocol.h` on
+# Elements Core.
+RPC_MISC_ERROR = -1
+RPC_TYPE_ERROR = -3
+RPC_WALLET_ERROR = -4
+RPC_INVALID_ADDRESS_OR_KEY = -5
+RPC_WALLET_INSUFFICIENT_FUNDS = -6
+RPC_INVALID_PARAMETER = -8
+RPC_WALLET_INVALID_LABEL_NAME = -11
+RPC_WALLET_UNLOCK_NEEDED = -13
+RPC_WALLET_NOT_FOUND = -18
+RPC_WALLET_NOT_SPECIFIED = -19
+RPC_IN_WARMUP = -28
+RPC_WALLET_ALREADY_LOADED = -35
+RPC_METHOD_NOT_FOUND = -32601
+
+# HTTP status answered by the node when its `rpcworkqueue` is full, with a
+# "Work queue depth exceeded" text body instead of JSON.
+HTTP_WORK_QUEUE_EXCEEDED = 503
+
+DEFAULT_RETRY_AFTER = 1
+
+
+class SaturationError(RuntimeError):
+    """
+    A request was turned down because the API or the node is at capacity.
+    It's safe to retry after `retry_after` seconds.
+    """
+
+    def __init__(self, message: str,
+                 retry_after: int = DEFAULT_RETRY_AFTER) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class NodeSaturated(SaturationError):
+    """
+    The RPC calls waiting for the node are over their limit, or the node
+    refused the call with a full work queue.
+    """
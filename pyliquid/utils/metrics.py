@@ -0,0 +1,494 @@
+"""
+Counters and latency histograms of the RPC calls, node commands and HTTP
+requests, exposed in Prometheus text format. Each worker keeps its samples in
+memory and flushes them to a SQLite database shared by every worker, so any
+of them can answer a scrape with the totals of all.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pyliquid.utils.misc import get_optional_config, pid_alive
+from pyliquid.utils.storage import database_path, open_database
+
+# Seconds between flushes of the samples of a worker.
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Name, type and help of every metric.
+METRICS = {
+    'pyliquid_rpc_calls_total':
+        ('counter', "RPC calls sent to the node, by method."),
+    'pyliquid_rpc_errors_total':
+        ('counter', "Failed RPC calls, by method and JSON-RPC error code."),
+    'pyliquid_rpc_duration_seconds':
+        ('histogram', "Latency of the RPC calls, by method."),
+    'pyliquid_rpc_sent_bytes_total':
+        ('counter', "Bytes of the RPC requests, by method."),
+    'pyliquid_rpc_received_bytes_total':
+        ('counter', "Bytes of the RPC responses, by method."),
+    'pyliquid_rpc_rejected_total':
+        ('counter', "RPC calls refused before reaching the node, by "
+                    "priority."),
+    'pyliquid_cli_calls_total':
+        ('counter', "Node commands run trough the console, by command."),
+    'pyliquid_cli_errors_total':
+        ('counter', "Failed node commands, by command and return code."),
+    'pyliquid_cli_duration_seconds':
+        ('histogram', "Duration of the node commands, by command."),
+    'pyliquid_http_requests_total':
+        ('counter', "HTTP requests served, by method, route and status."),
+    'pyliquid_http_request_duration_seconds':
+        ('histogram', "Latency of the HTTP requests, by method and route."),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    pid INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (pid, name, labels)
+);
+"""
+
+# Pid holding the totals of the workers that exited.
+RETIRED_PID = 0
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"') \
+        .replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    """
+    Labels as written inside the braces of a sample, like `method="uptime"`.
+    """
+    return ','.join(f'{key}="{_escape(str(value))}"' for key, value in labels)
+
+
+class _Histogram():
+    """
+    Cumulative samples of a single histogram series.
+    """
+
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def samples(self, name: str, labels: Labels) -> List[tuple]:
+        rows, cumulative = [], 0
+        bounds = [str(bound) for bound in LATENCY_BUCKETS] + ['+Inf']
+        for bound, count in zip(bounds, self.counts):
+            cumulative += count
+            rows.append((f"{name}_bucket",
+                         format_labels(labels + (('le', bound),)),
+                         cumulative))
+        rows.append((f"{name}_sum", format_labels(labels), self.total))
+        rows.append((f"{name}_count", format_labels(labels), self.count))
+        return rows
+
+
+class MetricsRegistry():
+    """
+    Samples of a worker, recorded in memory and flushed to the shared
+    database. Recording only takes a lock and a few dict operations, so it
+    can be done on every call.
+
+    Attributes
+    ----------
+    _path: str | None
+        Location of the shared database, `None` to keep samples local.
+    _database: sqlite3.Connection | None
+        Connection to the shared database, opened on the first flush.
+    _pid: int
+        Process id the samples are flushed under.
+    _counters: dict[tuple, float]
+        Value of each counter series, by name and labels.
+    _histograms: dict[tuple, _Histogram]
+        Samples of each histogram series, by name and labels.
+    _dirty: set[tuple]
+        Series changed since the latest flush.
+    _task: asyncio.Task | None
+        Running flush loop.
+    """
+
+    _path: Optional[str]
+    _database: Optional[sqlite3.Connection]
+    _pid: int
+    _counters: Dict[Tuple[str, Labels], float]
+    _histograms: Dict[Tuple[str, Labels], _Histogram]
+    _dirty: set
+    _lock: threading.Lock
+    _database_lock: threading.Lock
+    _task: Optional[asyncio.Task]
+
+    def __init__(self, path: Optional[str] = None,
+                 pid: Optional[int] = None) -> None:
+        """
+        Constructor for MetricsRegistry class.
+
+        Parameters
+        ----------
+        path: str | None, default = None
+            Location of the shared database, `None` to keep samples local.
+        pid: int | None, default = None
+            Process id the samples are flushed under, the current one if
+            `None`.
+        """
+        self._path = path
+        self._database = None
+        self._pid = os.getpid() if pid is None else pid
+        self._counters = {}
+        self._histograms = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._database_lock = threading.Lock()
+        self._task = None
+
+    @property
+    def pid(self) -> int:
+        """
+        Getter method for `pid` attribute.
+        """
+        return self._pid
+
+    def inc(self, name: str, labels: Labels, value: float = 1) -> None:
+        """
+        Increase a counter series.
+
+        Parameters
+        ----------
+        name: str
+            One of `METRICS`.
+        labels: tuple[tuple[str, str], ...]
+            Pairs of label name and value.
+        value: float, default = 1
+        """
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._dirty.add(key)
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        """
+        Add a sample to a histogram series.
+
+        Parameters
+        ----------
+        name: str
+            One of `METRICS`.
+        labels: tuple[tuple[str, str], ...]
+            Pairs of label name and value.
+        value: float
+            Observed value, in seconds for latencies.
+        """
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram()
+            histogram.observe(value)
+            self._dirty.add(key)
+
+    def _rows(self, keys: Iterable[tuple]) -> List[tuple]:
+        rows = []
+        for key in keys:
+            name, labels = key
+            if key in self._counters:
+                rows.append((name, format_labels(labels),
+                             self._counters[key]))
+            else:
+                rows += self._histograms[key].samples(name, labels)
+        return rows
+
+    def local_samples(self) -> List[tuple]:
+        """
+        Samples of this worker only, as `(name, labels, value)`.
+        """
+        with self._lock:
+            return self._rows(list(self._counters) + list(self._histograms))
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Shared database, opened on first use. Callers hold the database
+        lock.
+        """
+        if self._database is None:
+            self._database = open_database(self._path, SCHEMA)
+        return self._database
+
+    def flush(self) -> None:
+        """
+        Write the series changed since the latest flush to the database.
+        """
+        if self._path is None:
+            return
+        with self._lock:
+            rows = self._rows(self._dirty)
+            self._dirty = set()
+        if not rows:
+            return
+        with self._database_lock, self._connection():
+            self._database.executemany(
+                "INSERT OR REPLACE INTO samples VALUES (?, ?, ?, ?)",
+                [(self._pid, name, labels, value)
+                 for name, labels, value in rows])
+
+    def _retire(self) -> None:
+        """
+        Fold the samples of workers that exited into `RETIRED_PID`, so
+        counters keep growing while the table doesn't.
+        """
+        pids = [row[0] for row in self._database.execute(
+            "SELECT DISTINCT pid FROM samples WHERE pid != ?",
+            (RETIRED_PID,))]
+        dead = [pid for pid in pids
+                if pid != self._pid and not pid_alive(pid)]
+        if not dead:
+            return
+        marks = ', '.join('?' * len(dead))
+        with self._database:
+            self._database.execute(
+                "INSERT INTO samples (pid, name, labels, value) "
+                f"SELECT ?, name, labels, SUM(value) FROM samples "
+                f"WHERE pid IN ({marks}) GROUP BY name, labels "
+                "ON CONFLICT (pid, name, labels) "
+                "DO UPDATE SET value = value + excluded.value",
+                [RETIRED_PID, *dead])
+            self._database.execute(
+                f"DELETE FROM samples WHERE pid IN ({marks})", dead)
+
+    def samples(self) -> List[tuple]:
+        """
+        Totals of every worker, as `(name, labels, value)` sorted by name.
+        """
+        if self._path is None:
+            return sorted(self.local_samples())
+        self.flush()
+        with self._database_lock:
+            self._connection()
+            self._retire()
+            return list(self._database.execute(
+                "SELECT name, labels, SUM(value) FROM samples "
+                "GROUP BY name, labels ORDER BY name, labels"))
+
+    def render(self) -> str:
+        """
+        Totals of every worker in Prometheus text format.
+        """
+        by_metric: Dict[str, List[str]] = {}
+        for name, labels, value in self.samples():
+            metric = name
+            for suffix in ('_bucket', '_sum', '_count'):
+                base = name[:-len(suffix)]
+                if name.endswith(suffix) and \
+                        METRICS.get(base, ('',))[0] == 'histogram':
+                    metric = base
+            sample = f"{name}{{{labels}}}" if labels else name
+            by_metric.setdefault(metric, []).append(
+                f"{sample} {_format_value(value)}")
+        lines = []
+        for metric, samples in by_metric.items():
+            kind, description = METRICS.get(metric, ('untyped', ''))
+            lines += [f"# HELP {metric} {description}",
+                      f"# TYPE {metric} {kind}", *samples]
+        return '\n'.join(lines) + '\n'
+
+    async def _run(self, interval: float) -> None:
+        """
+        Flush loop.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self.flush)
+            except sqlite3.Error as database_error:
+                logging.error(f"Could not flush metrics: {database_error}\n")
+
+    def start(self, interval: float = DEFAULT_FLUSH_INTERVAL) -> None:
+        """
+        Start flushing the samples in the running event loop.
+        """
+        if self._task is None and self._path is not None:
+            self._task = asyncio.get_running_loop().create_task(
+                self._run(interval))
+
+    async def stop(self) -> None:
+        """
+        Stop flushing, writing the latest samples.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.flush()
+
+
+_METRICS: Optional[MetricsRegistry] = None
+_METRICS_LOCK = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """
+    Return the registry of this worker, created on first use. Samples are
+    kept local when `metrics_enabled` from .env file is `0`.
+
+    Returns
+    -------
+    MetricsRegistry
+    """
+    global _METRICS
+    metrics = _METRICS
+    if metrics is not None and metrics.pid == os.getpid():
+        return metrics
+    with _METRICS_LOCK:
+        if _METRICS is None or _METRICS.pid != os.getpid():
+            path = None
+            if get_optional_config('metrics_enabled', '1') == '1':
+                path = database_path('metrics')
+            _METRICS = MetricsRegistry(path)
+        return _METRICS
+
+
+def record_rpc(method: str, seconds: float,
+               error_code: Optional[object] = None) -> None:
+    """
+    Record a RPC call with its latency, and error code if it failed.
+    """
+    metrics = get_metrics()
+    labels = (('method', method),)
+    metrics.inc('pyliquid_rpc_calls_total', labels)
+    metrics.observe('pyliquid_rpc_duration_seconds', labels, seconds)
+    if error_code is not None:
+        metrics.inc('pyliquid_rpc_errors_total',
+                    labels + (('code', str(error_code)),))
+
+
+def record_rpc_error(method: str, error_code: object) -> None:
+    """
+    Record an error of a RPC call already counted by `record_rpc`.
+    """
+    get_metrics().inc('pyliquid_rpc_errors_total',
+                      (('method', method), ('code', str(error_code))))
+
+
+def record_rpc_bytes(method: str, sent: int, received: int) -> None:
+    """
+    Record the size of a RPC request and its response.
+    """
+    metrics = get_metrics()
+    labels = (('method', method),)
+    metrics.inc('pyliquid_rpc_sent_bytes_total', labels, sent)
+    metrics.inc('pyliquid_rpc_received_bytes_total', labels, received)
+
+
+def record_rpc_rejected(priority: int) -> None:
+    """
+    Record a RPC call refused by admission control.
+    """
+    get_metrics().inc('pyliquid_rpc_rejected_total',
+                      (('priority', str(priority)),))
+
+
+def record_cli(command: str, seconds: float,
+               return_code: Optional[int] = None) -> None:
+    """
+    Record a node command with its duration, and return code if it failed.
+    """
+    metrics = get_metrics()
+    labels = (('command', command),)
+    metrics.inc('pyliquid_cli_calls_total', labels)
+    metrics.observe('pyliquid_cli_duration_seconds', labels, seconds)
+    if return_code is not None:
+        metrics.inc('pyliquid_cli_errors_total',
+                    labels + (('code', str(return_code)),))
+
+
+def record_http(method: str, route: str, status: int,
+                seconds: float) -> None:
+    """
+    Record a served HTTP request with its latency.
+    """
+    metrics = get_metrics()
+    metrics.inc('pyliquid_http_requests_total',
+                (('method', method), ('route', route),
+                 ('status', str(status))))
+    metrics.observe('pyliquid_http_request_duration_seconds',
+                    (('method', method), ('route', route)), seconds)
+
+
+class MetricsMiddleware():
+    """
+    ASGI middleware recording every HTTP request by route template, like
+    `/jobs/{job_id}`, so paths with ids don't make a series each.
+
+    Attributes
+    ----------
+    _app: ASGI application
+        Application being wrapped.
+    _routes: dict
+        Path template of each endpoint, built on first use.
+    """
+
+    def __init__(self, app) -> None:
+        self._app = app
+        self._routes = None
+
+    def _route(self, scope: dict) -> str:
+        endpoint = scope.get('endpoint')
+        if endpoint is None:
+            return 'unmatched'
+        if self._routes is None and 'app' in scope:
+            self._routes = {getattr(route, 'endpoint', None): route.path
+                            for route in scope['app'].routes}
+        return (self._routes or {}).get(endpoint, 'unmatched')
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http':
+            await self._app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_status(message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self._app(scope, receive, send_status)
+        finally:
+            # The router fills the endpoint in the same scope.
+            record_http(scope['method'], self._route(scope), status,
+                        time.perf_counter() - started)
@@ -1,5 +1,5 @@
 import os
-from typing import Union, List, Dict
+from typing import Union, List, Dict, Optional
 
 def get_configs(keys: Union[List[str], str]) \
     -> Union[str, Dict[str, str]]:
@@ -23,3 +23,46 @@ def get_configs(keys: Union[List[str], str]) \
         return env_vals or {}
     else:
         raise TypeError("The given type is not valid")
+
+
+def get_optional_config(key: str, default: str) -> str:
+    """
+    Load a single environment variable, falling back to a default value when
+    it's not defined in the .env file.
+
+    Parameters
+    ----------
+    key: str
+        Specific key to return from .env file.
+    default: str
+        Value to be used if the key is not set.
+
+    Returns
+    -------
+    str
+    """
+    return os.environ.get(key, default)
+
+
+def pid_alive(pid: Optional[int]) -> bool:
+    """
+    Check if a process of this host is still running.
+
+    Parameters
+    ----------
+    pid: int | None
+        Process id, `None` is never running.
+
+    Returns
+    -------
+    bool
+    """
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -0,0 +1,61 @@
+"""
+Local SQLite storage shared by the API workers, for state that has to
+survive restarts of the API.
+"""
+
+import os
+import sqlite3
+
+from pyliquid.utils.misc import get_optional_config
+
+DEFAULT_DATA_DIR = os.path.join(os.path.expanduser('~'), '.elements',
+                                'pyliquid')
+
+# Milliseconds a connection waits for a lock held by another worker.
+BUSY_TIMEOUT = 5000
+
+
+def database_path(name: str) -> str:
+    """
+    Path of a database inside `data_dir` from .env file.
+
+    Parameters
+    ----------
+    name: str
+        Name of the database, without extension.
+
+    Returns
+    -------
+    str
+    """
+    data_dir = get_optional_config('data_dir', DEFAULT_DATA_DIR)
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, f"{name}.sqlite3")
+
+
+def open_database(path: str, schema: str = '') -> sqlite3.Connection:
+    """
+    Open a database in WAL mode, so workers can read while another one
+    writes, and create its tables.
+
+    Parameters
+    ----------
+    path: str
+        Location of the database file, or `:memory:`.
+    schema: str, default = ''
+        SQL script with `CREATE ... IF NOT EXISTS` statements.
+
+    Returns
+    -------
+    sqlite3.Connection
+        Connection usable from any thread, callers serialize its use.
+    """
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT}")
+    connection.execute("PRAGMA journal_mode = WAL")
+    # Commits survive crashes of the API, only a power loss may lose the
+    # latest ones.
+    connection.execute("PRAGMA synchronous = NORMAL")
+    if schema:
+        connection.executescript(schema)
+    return connection
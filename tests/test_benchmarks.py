@@ -0,0 +1,64 @@
+"""
+Suite of tests for the offline benchmarks
+"""
+
+# General imports
+import asyncio
+import json
+# Module imports
+from benchmarks import load, report
+from benchmarks.mock_node import MockNode
+
+
+def test_mock_node_answers_wallet_calls():
+    """
+    Test the mock node keeps wallets and answers batches and errors.
+    """
+    node = MockNode(sizes={'listtransactions': 5}, wallets=1)
+
+    async def scenario():
+        created = json.loads(await node.answer(
+            "/", {"method": "createwallet", "params": ["w1"], "id": 1}))
+        assert created["result"] == {"name": "w1", "warning": ""}
+        replies = json.loads(await node.answer("/wallet/w1", [
+            {"method": "getbalance", "params": [], "id": 2},
+            {"method": "listtransactions", "params": ["*", 3, 0], "id": 3},
+            {"method": "loadwallet", "params": ["bench-0"], "id": 4},
+            {"method": "loadwallet", "params": ["w1"], "id": 5}]))
+        assert replies[0]["result"] == {"bitcoin": 0.0}
+        assert [tx["blockheight"] for tx in replies[1]["result"]] == [2, 3, 4]
+        assert replies[2]["error"] is None
+        assert replies[3]["error"]["code"] == -35
+    asyncio.run(scenario())
+    assert node.calls["loadwallet"] == 2
+
+
+def test_load_scenarios_run_without_errors(monkeypatch, tmp_path):
+    """
+    Test scenarios go trough the app and are summarized per level.
+    """
+    for key in ('rpc_port', 'rpc_user', 'rpc_password', 'data_dir',
+                'node_managed', 'rpc_nodes', 'metrics_enabled'):
+        monkeypatch.setenv(key, '')
+    node = MockNode(wallets=load.DEFAULT_WALLETS,
+                    wallet_prefix=load.WALLET_PREFIX)
+    scenarios = [load.SCENARIOS[name] for name in ("wallet_info", "tx_send",
+                                                   "batch")]
+    rows = asyncio.run(load.run_load(scenarios, [1, 4], 8, node))
+    assert [(row['scenario'], row['concurrency']) for row in rows] == [
+        ("wallet_info", 1), ("wallet_info", 4), ("tx_send", 1),
+        ("tx_send", 4), ("batch", 1), ("batch", 4)]
+    assert all(row['requests'] == 8 and row['errors'] == 0 for row in rows)
+    slower = [dict(row, throughput=row['throughput'] / 2) for row in rows]
+    assert len(report.compare(slower, rows)) == len(rows)
+    assert report.compare(rows, rows) == []
+
+
+def test_percentile():
+    """
+    Test nearest-rank percentiles.
+    """
+    samples = list(range(1, 101))
+    assert report.percentile(samples, 0.5) == 50
+    assert report.percentile(samples, 0.99) == 99
+    assert report.percentile([], 0.5) == 0.0
@@ -0,0 +1,97 @@
+"""
+Suite of tests for the address pool from subpackage liquid
+"""
+
+# General imports
+import asyncio
+# Module imports
+from pyliquid.liquid.addresses import SCHEMA, AddressPool
+from pyliquid.utils.storage import open_database
+
+
+class FakeWalletProxy():
+    """
+    Stand-in for a wallet-scoped `AsyncServiceProxy` deriving addresses.
+    """
+
+    def __init__(self):
+        self.derived = 0
+        self.round_trips = 0
+
+    async def getnewaddress(self):
+        self.round_trips += 1
+        self.derived += 1
+        return f"addr{self.derived}"
+
+    async def batch_(self, rpc_calls):
+        self.round_trips += 1
+        results = []
+        for _ in rpc_calls:
+            self.derived += 1
+            results.append({"result": f"addr{self.derived}", "error": None})
+        return results
+
+
+class FakeWallet():
+    def __init__(self, proxy):
+        self.proxy = proxy
+
+
+class FakeRegistry():
+    def __init__(self, proxy):
+        self.wallet = FakeWallet(proxy)
+
+    async def get(self, name):
+        return self.wallet
+
+
+def test_address_pool_never_reissues(tmp_path):
+    """
+    Test batched refills, in-memory issuance and persistence across
+    restarts.
+    """
+    path = str(tmp_path / "addresses.sqlite3")
+    proxy = FakeWalletProxy()
+    pool = AddressPool(FakeRegistry(proxy), open_database(path, SCHEMA),
+                       target=4, low_water=2)
+
+    async def scenario():
+        assert await pool.take('shop') == 'addr1'
+        assert await pool.refill('shop') == 4
+        assert proxy.round_trips == 2
+        issued = [await pool.take('shop') for _ in range(3)]
+        assert proxy.round_trips == 2
+        return issued
+    assert asyncio.run(scenario()) == ['addr2', 'addr3', 'addr4']
+
+    restarted = AddressPool(FakeRegistry(proxy),
+                            open_database(path, SCHEMA),
+                            target=4, low_water=2)
+    restarted.watch('shop')
+    assert restarted.available('shop') == 1
+    assert asyncio.run(restarted.take('shop')) == 'addr5'
+    # Shared with the other pool, which has none left either.
+    assert pool.available('shop') == 0
+    assert asyncio.run(pool.take('shop')) == 'addr6'
+
+
+def test_address_pool_is_shared_by_workers(tmp_path):
+    """
+    Test workers sharing the storage refill a wallet once between them,
+    and never hand out the same address.
+    """
+    path = str(tmp_path / "addresses.sqlite3")
+    proxy = FakeWalletProxy()
+    pools = [AddressPool(FakeRegistry(proxy), open_database(path, SCHEMA),
+                         target=4, low_water=2) for _ in range(3)]
+
+    async def scenario():
+        derived = await asyncio.gather(*[pool.refill('shop')
+                                         for pool in pools])
+        assert sorted(derived) == [0, 0, 4]
+        assert await pools[1].refill('shop') == 0
+        return await asyncio.gather(*[pools[index % 3].take('shop')
+                                      for index in range(4)])
+    issued = asyncio.run(scenario())
+    assert sorted(issued) == ['addr1', 'addr2', 'addr3', 'addr4']
+    assert proxy.derived == 4
@@ -0,0 +1,138 @@
+"""
+Suite of tests for module admission from subpackage liquid
+"""
+
+# General imports
+import asyncio
+import pytest
+# Module imports
+from pyliquid.liquid.admission import (PRIORITY_HIGH, PRIORITY_LOW,
+                                       AdmissionController, method_priority)
+from pyliquid.liquid.client import AsyncServiceProxy
+from pyliquid.liquid.nodes import CircuitBreaker, NodeEndpoint, NodeRouter
+from pyliquid.routers.share import unavailable
+from pyliquid.utils.exceptions import NodeSaturated
+
+
+class BusyNode():
+    """
+    Pool stand-in answering like a node with a full work queue.
+    """
+
+    def __init__(self, admission=None):
+        self.admission = admission
+        self.calls = 0
+
+    async def request(self, path, body):
+        self.calls += 1
+        return 503, {'content-type': 'text/html'}, b'Work queue depth exceeded'
+
+    async def close(self):
+        pass
+
+    @property
+    def proxy(self):
+        return AsyncServiceProxy(self)
+
+
+def test_method_priority():
+    """
+    Test sends go first and dashboard reads last.
+    """
+    assert method_priority('sendtoaddress') == PRIORITY_HIGH
+    assert method_priority('listtransactions') == PRIORITY_LOW
+    assert method_priority('getnewaddress') < method_priority('getbalance')
+
+
+def test_limit_adapts_to_latency(monkeypatch):
+    """
+    Test the limit grows with timely calls and is cut once per round trip
+    when they slow down.
+    """
+    now = [100.0]
+    monkeypatch.setattr('pyliquid.liquid.admission.time.monotonic',
+                        lambda: now[0])
+    controller = AdmissionController(8, initial_limit=2)
+    for _ in range(4):
+        controller._in_flight += 1
+        controller.release('getbalance', 0.01)
+    assert controller.limit == 3
+    controller._in_flight += 2
+    controller.release('getbalance', 0.5)
+    controller.release('getbalance', 0.5)
+    assert controller.limit == 1
+    now[0] += 1
+    controller._in_flight += 1
+    controller.release(overloaded=True)
+    assert controller.limit == 1 and controller.in_flight == 0
+
+
+def test_queue_by_priority_and_refusal():
+    """
+    Test waiting calls are admitted by priority, and refused when the queue
+    is full or they wait for too long.
+    """
+    async def scenario():
+        controller = AdmissionController(1, max_queued=2, queue_timeout=0.2)
+        order = []
+
+        async def call(method):
+            async with controller.admit(method):
+                order.append(method)
+                await asyncio.sleep(0.01)
+
+        await controller.acquire()
+        low = asyncio.ensure_future(call('listunspent'))
+        normal = asyncio.ensure_future(call('getnewaddress'))
+        await asyncio.sleep(0)
+        assert controller.queued == 2
+        # The newest call of a lower priority gives its place.
+        high = asyncio.ensure_future(call('sendtoaddress'))
+        await asyncio.sleep(0)
+        with pytest.raises(NodeSaturated) as full:
+            await controller.acquire(PRIORITY_LOW)
+        assert full.value.retry_after >= 1
+        controller.release()
+        await asyncio.gather(high, normal)
+        with pytest.raises(NodeSaturated):
+            await low
+        assert order == ['sendtoaddress', 'getnewaddress']
+
+        await controller.acquire()
+        with pytest.raises(NodeSaturated):
+            await controller.acquire()
+        assert controller.queued == 0
+    asyncio.run(scenario())
+
+
+def test_node_work_queue_exceeded():
+    """
+    Test a full work queue on the node is raised as `NodeSaturated`, cuts
+    the limit and sends the call to the next node of a router.
+    """
+    async def scenario():
+        busy = BusyNode(AdmissionController(4))
+        with pytest.raises(NodeSaturated):
+            await busy.proxy.getblockcount()
+        assert busy.admission.limit == 2 and busy.admission.in_flight == 0
+
+        other = BusyNode()
+        router = NodeRouter([
+            NodeEndpoint(name, role, pool, CircuitBreaker(1, 60))
+            for name, role, pool in (('a', 'primary', busy),
+                                     ('b', 'replica', other))])
+        with pytest.raises(NodeSaturated):
+            await router.proxy.getblockcount()
+        assert busy.calls == 2 and other.calls == 1
+        assert [node['state'] for node in router.status()] == \
+            ['closed', 'closed']
+    asyncio.run(scenario())
+
+
+def test_unavailable_response():
+    """
+    Test refused calls are answered as 503 with `Retry-After`.
+    """
+    error = unavailable(NodeSaturated("The node work queue is full", 3))
+    assert error.status_code == 503
+    assert error.headers == {"Retry-After": "3"}
@@ -0,0 +1,83 @@
+"""
+Suite of tests for the batch executor from subpackage liquid
+"""
+
+# General imports
+import asyncio
+import pytest
+# Module imports
+from pyliquid.liquid.batch import (MethodNotAllowed, build_batch,
+                                   execute_instructions, parse_arguments)
+from pyliquid.models import Instructions, Message
+
+
+class FakeBatchProxy():
+    """
+    Stand-in for `AsyncServiceProxy` answering batches from a dictionary.
+    """
+
+    def __init__(self, results: dict):
+        self.results = results
+        self.batches = []
+
+    async def batch_(self, rpc_calls):
+        self.batches.append(rpc_calls)
+        return [{"result": self.results[call[0]], "error": None}
+                if call[0] in self.results else
+                {"result": None, "error": {"code": -32601,
+                                           "message": "Method not found"}}
+                for call in rpc_calls]
+
+
+def test_parse_arguments():
+    """
+    Test conversion of argument strings into RPC params.
+    """
+    assert parse_arguments(None) == []
+    assert parse_arguments('["label", false]') == ["label", False]
+    assert parse_arguments('10') == [10]
+    assert parse_arguments('some_label') == ["some_label"]
+
+
+def test_build_batch():
+    """
+    Test that arguments are matched to their commands by index.
+    """
+    instructions = Instructions(seq=3, cmd=[(0, "getblockcount"),
+                                            (1, "getblockhash"),
+                                            (2, "loadwallet")],
+                                arg=[(0, None), (1, "5"), (2, "vault")])
+    assert build_batch(instructions) == [["getblockcount"],
+                                         ["getblockhash", 5],
+                                         ["loadwallet", "vault"]]
+
+
+def test_execute_instructions():
+    """
+    Test single round trip and per-command error reporting.
+    """
+    proxy = FakeBatchProxy({"getblockcount": 5, "uptime": 60})
+    message = Message(body=Instructions(seq=3, cmd=[(0, "getblockcount"),
+                                                    (1, "getbalance"),
+                                                    (2, "uptime")]))
+    results = asyncio.run(execute_instructions(proxy, message.body))
+    assert len(proxy.batches) == 1
+    assert [r.index for r in results] == [0, 1, 2]
+    assert results[0].result == 5 and results[0].error is None
+    assert results[1].error["code"] == -32601
+    assert results[2].result == 60
+
+
+def test_batch_refuses_methods():
+    """
+    Test commands outside the allowlist refuse the whole batch before it's
+    sent.
+    """
+    proxy = FakeBatchProxy({"getblockcount": 5})
+    message = Message(body=Instructions(seq=3, cmd=[(0, "getblockcount"),
+                                                    (1, "dumpprivkey"),
+                                                    (2, "stop")]))
+    with pytest.raises(MethodNotAllowed) as refused:
+        asyncio.run(execute_instructions(proxy, message.body))
+    assert str(refused.value).endswith("dumpprivkey, stop")
+    assert proxy.batches == []
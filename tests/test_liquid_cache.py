@@ -0,0 +1,80 @@
+"""
+Suite of tests for the wallet cache from subpackage liquid
+"""
+
+# General imports
+import asyncio
+import time
+# Module imports
+from pyliquid.liquid import cache
+from pyliquid.liquid.cache import WalletCache, cache_key, is_missing
+from pyliquid.liquid.operations import AsyncWallet
+
+
+class CountingProxy():
+    """
+    Stand-in for `AsyncServiceProxy` counting the calls per method.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def for_wallet(self, name):
+        return self
+
+    def __getattr__(self, name):
+        async def call(*args):
+            self.calls.append(name)
+            return {"method": name}
+        return call
+
+
+def test_cache_expiry_and_size():
+    """
+    Test per-method time to live and LRU bound.
+    """
+    wallet_cache = WalletCache(max_size=2, ttls={"getbalance": 0.05,
+                                                 "getwalletinfo": 10})
+    wallet_cache.set(cache_key("getbalance", "a", ()), 1)
+    wallet_cache.set(cache_key("getnewaddress", "a", ()), "addr")
+    assert wallet_cache.get(cache_key("getbalance", "a", ())) == 1
+    assert is_missing(wallet_cache.get(cache_key("getnewaddress", "a", ())))
+    time.sleep(0.06)
+    assert is_missing(wallet_cache.get(cache_key("getbalance", "a", ())))
+    for name in ("a", "b", "c"):
+        wallet_cache.set(cache_key("getwalletinfo", name, ()), name)
+    assert len(wallet_cache) == 2
+    assert is_missing(wallet_cache.get(cache_key("getwalletinfo", "a", ())))
+
+
+def test_cache_invalidation():
+    """
+    Test invalidation per wallet and on new block tips.
+    """
+    wallet_cache = WalletCache()
+    wallet_cache.set(cache_key("getbalance", "a", ()), 1)
+    wallet_cache.set(cache_key("getbalance", "b", ()), 2)
+    wallet_cache.invalidate("a")
+    assert is_missing(wallet_cache.get(cache_key("getbalance", "a", ())))
+    assert wallet_cache.get(cache_key("getbalance", "b", ())) == 2
+    wallet_cache.observe_tip("00ff")
+    assert len(wallet_cache) == 0
+
+
+def test_wallet_reads_through_cache(monkeypatch):
+    """
+    Test that repeated reads hit the node once until the wallet sends.
+    """
+    monkeypatch.setattr(cache, "_CACHE", WalletCache())
+    proxy = CountingProxy()
+    wallet = AsyncWallet(proxy, "vault")
+
+    async def scenario():
+        for _ in range(3):
+            await wallet.get_balance()
+            await wallet.get_wallet_info()
+        await wallet.send_to_address("addr", 1)
+        await wallet.get_balance()
+    asyncio.run(scenario())
+    assert proxy.calls == ["getbalance", "getwalletinfo", "sendtoaddress",
+                           "getbalance"]
@@ -0,0 +1,118 @@
+"""
+Suite of tests for module capture from subpackage liquid
+"""
+
+# General imports
+import asyncio
+import json
+from decimal import Decimal
+# Module imports
+from bitcoinrpc.authproxy import AuthServiceProxy, JSONRPCException  # type: ignore
+from pyliquid.liquid.capture import (MAGIC, ReplayHandler, read_capture,
+                                     replay_requests)
+from pyliquid.liquid.operations import AsyncWallet, Wallet
+from pyliquid.liquid.transport import LoopbackTransport
+
+
+def test_calls_are_captured(monkeypatch, tmp_path):
+    """
+    Test calls of both wallet flavours are appended with their bodies, and
+    truncated records are skipped.
+    """
+    path = tmp_path / "rpc.capture"
+    monkeypatch.setenv('rpc_capture', str(path))
+    transport = LoopbackTransport.from_results({
+        "getbalance": {"bitcoin": Decimal("0.5")},
+        "loadwallet": JSONRPCException({"code": -18,
+                                         "message": "Wallet not found"})})
+
+    async def scenario():
+        wallet = AsyncWallet(transport.proxy, "w1")
+        await wallet.proxy.getbalance()
+        await transport.proxy.batch_([["getbalance"], ["uptime"]])
+    asyncio.run(scenario())
+    wallet = Wallet(AuthServiceProxy("http://u:p@localhost",
+                                     connection=transport.connection()))
+    wallet.load_wallet("w2")
+
+    calls = list(read_capture(str(path)))
+    assert [call.method for call in calls] == ["getbalance", "batch",
+                                               "loadwallet"]
+    assert calls[0].path == "/wallet/w1"
+    assert json.loads(calls[0].response)["result"] == {"bitcoin": 0.5}
+    assert json.loads(calls[2].response)["error"]["code"] == -18
+    assert all(call.duration >= 0 for call in calls)
+
+    with open(path, 'ab') as recording:
+        recording.write(b"\x00" * 7)
+    assert len(list(read_capture(str(path)))) == 3
+    assert path.read_bytes().startswith(MAGIC)
+
+
+def test_sensitive_calls_are_redacted(monkeypatch, tmp_path):
+    """
+    Test keys and passphrases are left out of a recording, single or in a
+    batch, while the other calls are kept whole.
+    """
+    path = tmp_path / "rpc.capture"
+    monkeypatch.setenv('rpc_capture', str(path))
+    transport = LoopbackTransport.from_results({
+        "dumpprivkey": "cSecretKey", "walletpassphrase": None,
+        "getbalance": {"bitcoin": Decimal("0.5")}})
+
+    async def scenario():
+        await transport.proxy.dumpprivkey("addr")
+        await transport.proxy.batch_([["walletpassphrase", "hunter2", 60],
+                                      ["getbalance"]])
+    asyncio.run(scenario())
+
+    recording = path.read_bytes()
+    assert b"cSecretKey" not in recording and b"hunter2" not in recording
+    single, batch = list(read_capture(str(path)))
+    assert single.method == "dumpprivkey"
+    assert json.loads(single.request)["params"] == []
+    assert json.loads(single.response)["result"] is None
+    requests = json.loads(batch.request)
+    assert requests[0]["params"] == [] and requests[1]["method"] == "getbalance"
+    assert json.loads(batch.response)[1]["result"] == {"bitcoin": 0.5}
+
+
+def test_recordings_are_replayed(monkeypatch, tmp_path):
+    """
+    Test a recording answers matching requests in turn, with their ids.
+    """
+    path = tmp_path / "rpc.capture"
+    monkeypatch.setenv('rpc_capture', str(path))
+    balances = iter([Decimal("1.5"), Decimal("2.5")])
+    recorded = LoopbackTransport.from_results({
+        "getbalance": lambda *_: {"bitcoin": next(balances)},
+        "getblockcount": 7})
+
+    async def record():
+        proxy = recorded.proxy
+        await proxy.getbalance()
+        await proxy.getbalance()
+        await proxy.batch_([["getblockcount"]])
+    asyncio.run(record())
+    monkeypatch.delenv('rpc_capture')
+
+    calls = list(read_capture(str(path)))
+    replayed = LoopbackTransport(ReplayHandler(calls, speed=0))
+
+    async def replay():
+        proxy = replayed.proxy
+        assert await proxy.getbalance() == {"bitcoin": Decimal("1.5")}
+        assert await proxy.getbalance.raw_() == b'{"bitcoin":2.5}'
+        assert await proxy.getblockcount() == 7
+        assert (await proxy.batch_([["getbalance"]]))[0]["result"] == \
+            {"bitcoin": Decimal("1.5")}
+        try:
+            await proxy.uptime()
+            raise AssertionError("uptime was never recorded")
+        except JSONRPCException as json_exception:
+            assert json_exception.code == -32601
+        timings = await replay_requests(calls, replayed, speed=0)
+        assert [timing.method for timing in timings] == [
+            "getbalance", "getbalance", "batch"]
+        assert all(timing.error is None for timing in timings)
+    asyncio.run(replay())
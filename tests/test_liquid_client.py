@@ -0,0 +1,115 @@
+"""
+Suite of tests for the asynchronous RPC client from subpackage liquid
+"""
+
+# General imports
+import asyncio
+import json
+from decimal import Decimal
+import pytest
+# Module imports
+from bitcoinrpc.authproxy import JSONRPCException  # type: ignore
+from pyliquid.liquid.client import AsyncConnectionPool, raw_result
+from pyliquid.liquid.operations import AsyncWallet
+from pyliquid.routers.share import rpc_failure
+
+
+async def serve_rpc(results: dict, connections: list, path: str = None):
+    """
+    Start a minimal keep-alive JSON-RPC server answering from `results`,
+    listening on the Unix socket `path` if given.
+    """
+    async def handle(reader, writer):
+        connections.append(writer)
+        while True:
+            try:
+                head = await reader.readuntil(b'\r\n\r\n')
+            except asyncio.IncompleteReadError:
+                break
+            length = [int(line.split(b':')[1]) for line in head.split(b'\r\n')
+                      if line.lower().startswith(b'content-length')][0]
+            request = json.loads(await reader.readexactly(length))
+            if request['method'] in results:
+                reply = {"result": results[request['method']], "error": None}
+            else:
+                reply = {"result": None, "error": {"code": -32601,
+                                                   "message": "Method not found"}}
+            reply["id"] = request["id"]
+            body = json.dumps(reply).encode()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         + f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+    if path is not None:
+        return await asyncio.start_unix_server(handle, path)
+    return await asyncio.start_server(handle, '127.0.0.1', 0)
+
+
+def test_client_calls_and_reuses_connection():
+    """
+    Test remote calls, Decimal parsing and keep-alive reuse.
+    """
+    async def scenario():
+        connections = []
+        server = await serve_rpc({"getbalance": 1.5, "getblockcount": 7},
+                                 connections)
+        port = server.sockets[0].getsockname()[1]
+        pool = AsyncConnectionPool(f"http://u:p@127.0.0.1:{port}", size=2)
+        proxy = pool.proxy
+        assert await proxy.getbalance() == Decimal("1.5")
+        for _ in range(3):
+            assert await proxy.getblockcount() == 7
+        with pytest.raises(JSONRPCException):
+            await proxy.unknowncall()
+        assert len(connections) == 1
+        wallet = AsyncWallet(proxy)
+        # Errors of the node reach the caller instead of a `None` result.
+        with pytest.raises(JSONRPCException):
+            await wallet.get_wallet_info()
+        assert await wallet.get_balance() == Decimal("1.5")
+        await pool.close()
+        server.close()
+    asyncio.run(scenario())
+
+
+def test_rpc_failure_response():
+    """
+    Test node errors are answered as a missing wallet or a bad gateway.
+    """
+    missing = rpc_failure(JSONRPCException({"code": -18,
+                                            "message": "Not loaded"}))
+    assert missing.status_code == 404
+    failed = rpc_failure(JSONRPCException({"code": -6,
+                                           "message": "Insufficient funds"}))
+    assert (failed.status_code, failed.detail) == (502, "Insufficient funds")
+
+
+def test_raw_result_slicing():
+    """
+    Test the result is sliced out of node responses without decoding it.
+    """
+    node = b'{"result":[{"amount":0.00010000}],"error":null,"id":3}\n'
+    assert raw_result(node, 3) == b'[{"amount":0.00010000}]'
+    spaced = b'{"id": 4, "error": null, "result": {"a": "}"}}'
+    assert raw_result(spaced, 4) == b'{"a": "}"}'
+    failed = b'{"result":null,"error":{"code":-5,"message":"x"},"id":5}'
+    with pytest.raises(JSONRPCException) as error:
+        raw_result(failed, 5)
+    assert error.value.code == -5
+    with pytest.raises(JSONRPCException):
+        raw_result(b'{"error":null,"id":6}', 6)
+
+
+def test_client_raw_calls():
+    """
+    Test raw calls return the JSON text of the result.
+    """
+    async def scenario():
+        server = await serve_rpc({"getbalance": 1.5}, [])
+        port = server.sockets[0].getsockname()[1]
+        pool = AsyncConnectionPool(f"http://u:p@127.0.0.1:{port}")
+        assert await pool.proxy.getbalance.raw_() == b'1.5'
+        with pytest.raises(JSONRPCException):
+            await pool.proxy.unknowncall.raw_()
+        await pool.close()
+        server.close()
+    asyncio.run(scenario())
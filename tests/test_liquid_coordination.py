@@ -0,0 +1,95 @@
+"""
+Suite of tests for the wallet coordination from subpackage liquid
+"""
+
+# General imports
+import asyncio
+# Module imports
+from pyliquid.liquid import coordination
+from pyliquid.liquid.cache import get_wallet_cache
+from pyliquid.liquid.coordination import WalletBusy, WalletCoordinator
+from pyliquid.liquid.operations import AsyncWallet
+
+
+class SlowProxy():
+    """
+    Stand-in for `AsyncServiceProxy` counting slow calls.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def for_wallet(self, name):
+        return self
+
+    def __getattr__(self, name):
+        async def call(*args):
+            self.calls.append(name)
+            await asyncio.sleep(0.01)
+            return {"walletname": "w", "calls": len(self.calls)}
+        return call
+
+
+def test_reads_are_coalesced(monkeypatch):
+    """
+    Test concurrent identical reads share a single node call.
+    """
+    monkeypatch.setattr(coordination, '_COORDINATOR', WalletCoordinator())
+    get_wallet_cache().clear()
+
+    async def scenario():
+        proxy = SlowProxy()
+        wallet = AsyncWallet(proxy, "w")
+        outputs = await asyncio.gather(*[wallet.get_wallet_info()
+                                         for _ in range(10)])
+        assert proxy.calls == ["getwalletinfo"]
+        assert all(output is outputs[0] for output in outputs)
+    asyncio.run(scenario())
+    get_wallet_cache().clear()
+
+
+def test_coalesced_errors_are_shared():
+    """
+    Test every caller of a failed read gets its error.
+    """
+    async def scenario():
+        coordinator = WalletCoordinator()
+        calls = []
+
+        async def failing():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+        results = await asyncio.gather(
+            *[coordinator.coalesce("key", failing) for _ in range(3)],
+            return_exceptions=True)
+        assert len(calls) == 1
+        assert all(isinstance(result, ValueError) for result in results)
+    asyncio.run(scenario())
+
+
+def test_writes_are_serialized_and_bounded():
+    """
+    Test writes of a wallet run one at a time, in order, up to the bound.
+    """
+    async def scenario():
+        coordinator = WalletCoordinator(write_concurrency=1, max_queued=2)
+        order, running = [], []
+
+        async def write(index):
+            async with coordinator.writing("w"):
+                running.append(index)
+                assert len(running) == 1
+                await asyncio.sleep(0.01)
+                order.append(index)
+                running.remove(index)
+        results = await asyncio.gather(*[write(index) for index in range(4)],
+                                       return_exceptions=True)
+        assert order == [0, 1, 2]
+        assert isinstance(results[3], WalletBusy)
+        assert coordinator.queued("w") == 0
+        # Other wallets have their own queue.
+        async with coordinator.writing("w"):
+            async with coordinator.writing("other"):
+                assert coordinator.queued("other") == 1
+    asyncio.run(scenario())
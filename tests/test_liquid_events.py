@@ -0,0 +1,107 @@
+"""
+Suite of tests for the node event subsystem from subpackage liquid
+"""
+
+# General imports
+import asyncio
+import struct
+import zmq
+import zmq.asyncio
+# Module imports
+from pyliquid.liquid import events
+from pyliquid.liquid.cache import WalletCache, cache_key, is_missing
+from pyliquid.liquid.events import (EventBus, ZMQListener, decode_message,
+                                    subscribe_cache)
+from pyliquid.models.responses import NodeEvent
+
+BLOCK_HASH = bytes.fromhex("ab" * 32)
+
+
+def test_decode_message():
+    """
+    Test decoding of the multipart notifications.
+    """
+    event = decode_message([b"hashblock", BLOCK_HASH, struct.pack('<I', 7)])
+    assert event.topic == "hashblock"
+    assert event.body == "ab" * 32
+    assert event.sequence == 7
+
+
+def test_listener_fans_out_events():
+    """
+    Test a local ZMQ publisher standing in for the node.
+    """
+    async def scenario():
+        publisher = zmq.asyncio.Context.instance().socket(zmq.PUB)
+        port = publisher.bind_to_random_port("tcp://127.0.0.1")
+        bus = EventBus()
+        wallet_cache = WalletCache()
+        wallet_cache.set(cache_key("getbalance", "a", ()), 1)
+        subscribe_cache(bus, wallet_cache)
+        received = []
+
+        async def on_block(event):
+            received.append(event)
+        bus.subscribe("hashblock", on_block)
+        queue = bus.listen()
+        listener = ZMQListener(bus, {"hashblock": f"tcp://127.0.0.1:{port}"})
+        listener.start()
+        # Publish until the subscription is in place.
+        for sequence in range(100):
+            await publisher.send_multipart([b"hashblock", BLOCK_HASH,
+                                            struct.pack('<I', sequence)])
+            await asyncio.sleep(0.02)
+            if received:
+                break
+        await listener.stop()
+        publisher.close(linger=0)
+        assert received[0].body == "ab" * 32
+        assert (await queue.get()).topic == "hashblock"
+        assert is_missing(wallet_cache.get(cache_key("getbalance", "a", ())))
+    asyncio.run(scenario())
+
+
+def test_listener_survives_errors(monkeypatch):
+    """
+    Test the listener subscribes again after its loop failed.
+    """
+    monkeypatch.setattr(events, 'MIN_RECONNECT_DELAY', 0.01)
+
+    async def scenario():
+        publisher = zmq.asyncio.Context.instance().socket(zmq.PUB)
+        port = publisher.bind_to_random_port("tcp://127.0.0.1")
+        bus = EventBus()
+        publish = bus.publish
+        received = []
+
+        async def failing_once(event):
+            bus.publish = publish
+            raise RuntimeError("Broken bus")
+        bus.publish = failing_once
+        bus.subscribe("hashblock", received.append)
+        listener = ZMQListener(bus, {"hashblock": f"tcp://127.0.0.1:{port}"})
+        listener.start()
+        for sequence in range(100):
+            await publisher.send_multipart([b"hashblock", BLOCK_HASH,
+                                            struct.pack('<I', sequence)])
+            await asyncio.sleep(0.02)
+            if received:
+                break
+        assert received and not listener._task.done()
+        await listener.stop()
+        publisher.close(linger=0)
+    asyncio.run(scenario())
+
+
+def test_transactions_keep_unrelated_entries():
+    """
+    Test transaction events only drop the results depending on the mempool.
+    """
+    bus = EventBus()
+    wallet_cache = WalletCache()
+    subscribe_cache(bus, wallet_cache)
+    wallet_cache.set(cache_key("getbalance", "a", ()), 1)
+    wallet_cache.set(cache_key("listwalletdir", None, ()), ["a"])
+    asyncio.run(bus.publish(NodeEvent(topic="hashtx", body="cd" * 32)))
+    assert is_missing(wallet_cache.get(cache_key("getbalance", "a", ())))
+    assert wallet_cache.get(cache_key("listwalletdir", None, ())) == ["a"]
@@ -0,0 +1,52 @@
+"""
+Suite of tests for the node probe from subpackage liquid
+"""
+
+# General imports
+import asyncio
+# Module imports
+from pyliquid.liquid.health import NodeProbe
+
+
+class FakeProbeProxy():
+    """
+    Stand-in for `AsyncServiceProxy` answering health batches.
+    """
+
+    def __init__(self, chain_info=None, error=None):
+        self.chain_info = chain_info
+        self.error = error
+
+    async def batch_(self, rpc_calls):
+        if self.error:
+            raise self.error
+        return [{"result": self.chain_info, "error": None},
+                {"result": 120, "error": None}]
+
+
+def test_probe_reports_readiness():
+    """
+    Test readiness computed from sync progress.
+    """
+    chain = {"chain": "liquidregtest", "blocks": 10, "headers": 12,
+             "initialblockdownload": False, "verificationprogress": 0.9,
+             "bestblockhash": "00" * 32}
+    proxy = FakeProbeProxy(chain)
+    probe = NodeProbe(proxy)
+    assert not probe.status.alive
+    status = asyncio.run(probe.probe())
+    assert status.alive and not status.ready
+    assert status.uptime == 120
+    chain["blocks"] = 12
+    assert asyncio.run(probe.probe()).ready
+    assert probe.status.ready
+
+
+def test_probe_reports_dead_node():
+    """
+    Test that connection errors are reported as a dead node.
+    """
+    probe = NodeProbe(FakeProbeProxy(error=ConnectionRefusedError()))
+    status = asyncio.run(probe.probe())
+    assert not status.alive
+    assert status.error == "ConnectionRefusedError"
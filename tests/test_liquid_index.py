@@ -0,0 +1,128 @@
+"""
+Suite of tests for the local wallet index from subpackage liquid
+"""
+
+# General imports
+import asyncio
+from decimal import Decimal
+# Module imports
+from bitcoinrpc.authproxy import JSONRPCException  # type: ignore
+from pyliquid.liquid.index import SCHEMA, WalletIndex
+from pyliquid.liquid.operations import AsyncWallet
+from pyliquid.utils.storage import open_database
+
+
+class FakeNodeProxy():
+    """
+    Stand-in for the node, a single wallet receiving transactions.
+    """
+
+    def __init__(self):
+        self.tip = 'block1'
+        self.blocks = {'block1', 'block2'}
+        self.history = []
+        self.unspent = []
+        self.since = []
+        self.removed = []
+
+    def for_wallet(self, name):
+        return self
+
+    async def getbestblockhash(self):
+        return self.tip
+
+    async def listtransactions(self, label, count, skip, watchonly):
+        return self.history[max(len(self.history) - skip - count, 0):
+                            len(self.history) - skip]
+
+    async def getblockheader(self, block_hash):
+        if block_hash not in self.blocks:
+            raise JSONRPCException({"code": -5, "message": "Block not found"})
+        return {"hash": block_hash}
+
+    async def listsinceblock(self, block_hash, confirmations, watchonly,
+                             include_removed):
+        self.since.append(block_hash)
+        return {"transactions": self.history[-1:], "removed": self.removed,
+                "lastblock": self.tip}
+
+    async def listunspent(self, confirmations):
+        return self.unspent
+
+    async def listissuances(self):
+        return [{"txid": "tx0", "vin": 0, "asset": "gold", "token": "t",
+                 "assetamount": Decimal('100'), "tokenamount": Decimal('1'),
+                 "entropy": "e", "isreissuance": False}]
+
+    def receive(self, txid, asset, amount, height):
+        self.history.append({"txid": txid, "vout": 0, "category": "receive",
+                             "address": "addr", "asset": asset,
+                             "amount": amount, "blockheight": height,
+                             "time": height})
+        self.unspent.append({"txid": txid, "vout": 0, "address": "addr",
+                             "asset": asset, "amount": amount})
+
+
+class FakeRegistry():
+    def __init__(self, proxy):
+        self.proxy = proxy
+
+    async def get(self, name):
+        return AsyncWallet(self.proxy, name)
+
+
+def test_index_syncs_incrementally(tmp_path):
+    """
+    Test full and incremental syncs and the indexed queries.
+    """
+    node = FakeNodeProxy()
+    node.receive('tx0', 'gold', Decimal('100.00000001'), 1)
+    node.receive('tx1', 'bitcoin', Decimal('0.5'), 2)
+    index = WalletIndex(FakeRegistry(node),
+                        open_database(str(tmp_path / "index.sqlite3"),
+                                      SCHEMA))
+    index.watch('vault')
+    assert index.watched == ['vault'] and not index.is_synced('vault')
+    assert asyncio.run(index.sync('vault')) == 2
+    assert index.last_block('vault') == 'block1' and node.since == []
+
+    node.tip = 'block2'
+    node.receive('tx2', 'gold', Decimal('1'), 3)
+    assert asyncio.run(index.sync('vault')) == 1
+    assert node.since == ['block1']
+
+    assert [t['txid'] for t in index.transactions('vault')] == \
+        ['tx2', 'tx1', 'tx0']
+    assert [t['txid'] for t in index.transactions('vault', asset='gold',
+                                                  max_height=2)] == ['tx0']
+    assert index.balance('vault') == {'gold': Decimal('101.00000001'),
+                                      'bitcoin': Decimal('0.5')}
+    assert index.issuances('vault', asset='gold')[0]['assetamount'] == '100'
+
+
+def test_index_follows_reorganizations(tmp_path):
+    """
+    Test transactions of dropped blocks are removed, an unknown last block
+    syncs the wallet from scratch, and amounts keep their plain notation.
+    """
+    node = FakeNodeProxy()
+    node.receive('tx0', 'gold', Decimal('1E-8'), 1)
+    node.receive('tx1', 'gold', Decimal('2'), 2)
+    index = WalletIndex(FakeRegistry(node),
+                        open_database(':memory:', SCHEMA))
+    asyncio.run(index.sync('vault'))
+    assert index.utxos('vault')[0]['amount'] == '0.00000001'
+
+    # tx1 was only in the dropped block, tx2 is mined in the new one.
+    node.tip = 'block2'
+    node.removed = [node.history.pop()]
+    node.unspent.pop()
+    node.receive('tx2', 'gold', Decimal('3'), 2)
+    asyncio.run(index.sync('vault'))
+    assert [t['txid'] for t in index.transactions('vault')] == ['tx2', 'tx0']
+
+    node.blocks = set()
+    node.removed = []
+    assert asyncio.run(index.sync('vault')) == 2
+    assert node.since == ['block1']
+    assert [t['txid'] for t in index.transactions('vault')] == ['tx2', 'tx0']
@@ -0,0 +1,91 @@
+"""
+Suite of tests for the job queue from subpackage liquid
+"""
+
+# General imports
+import asyncio
+import threading
+import pytest
+# Module imports
+from pyliquid.liquid import jobs
+from pyliquid.liquid.jobs import SCHEMA, IdempotencyConflict, JobQueue
+from pyliquid.utils.storage import open_database
+
+
+def test_jobs_run_once_per_idempotency_key(tmp_path):
+    """
+    Test submitting, running and retrying jobs with idempotency keys.
+    """
+    queue = JobQueue(open_database(str(tmp_path / "jobs.sqlite3"), SCHEMA))
+    sent = []
+
+    async def send(params):
+        sent.append(params['amount'])
+        return f"tx{len(sent)}"
+
+    async def broken(params):
+        raise RuntimeError("node is down")
+    queue.register('tx.send', send)
+    queue.register('broken', broken)
+
+    first = queue.submit('tx.send', {'amount': '1'}, 'payout-1')
+    retried = queue.submit('tx.send', {'amount': '1'}, 'payout-1')
+    assert first['id'] == retried['id'] and first['status'] == 'pending'
+    with pytest.raises(IdempotencyConflict):
+        queue.submit('tx.send', {'amount': '2'}, 'payout-1')
+    failing = queue.submit('broken')
+
+    async def drain():
+        while await queue.run_next():
+            pass
+    asyncio.run(drain())
+    assert sent == ['1']
+    assert queue.get(first['id'])['result'] == 'tx1'
+    assert queue.submit('tx.send', {'amount': '1'}, 'payout-1')['status'] \
+        == 'done'
+    assert queue.get(failing['id'])['error'] == 'node is down'
+
+
+def test_jobs_submitted_from_threads_wake_workers(tmp_path, monkeypatch):
+    """
+    Test a job submitted outside the event loop starts right away rather
+    than on the next poll.
+    """
+    monkeypatch.setattr(jobs, 'POLL_INTERVAL', 60)
+    queue = JobQueue(open_database(str(tmp_path / "jobs.sqlite3"), SCHEMA))
+    done = None
+
+    async def echo(params):
+        done.set()
+        return params['value']
+    queue.register('echo', echo)
+
+    async def scenario():
+        nonlocal done
+        done = asyncio.Event()
+        queue.start()
+        # Let the workers find the queue empty and wait.
+        await asyncio.sleep(0.05)
+        submitted = []
+        thread = threading.Thread(target=lambda: submitted.append(
+            queue.submit('echo', {'value': 1})))
+        thread.start()
+        await asyncio.wait_for(done.wait(), 2)
+        thread.join()
+        await queue.stop()
+        return queue.get(submitted[0]['id'])
+    assert asyncio.run(scenario())['result'] == 1
+
+
+def test_jobs_interrupted_by_dead_workers(tmp_path):
+    """
+    Test that jobs left running by a dead worker are failed, not rerun.
+    """
+    database = open_database(str(tmp_path / "jobs.sqlite3"), SCHEMA)
+    queue = JobQueue(database)
+    job = queue.submit('tx.send', {'amount': '1'})
+    database.execute("UPDATE jobs SET status = 'running', worker = ?",
+                     (2 ** 22 + 1,))
+    database.commit()
+    assert queue.recover() == 1
+    assert queue.get(job['id'])['status'] == 'failed'
@@ -0,0 +1,148 @@
+"""
+Suite of tests for the node supervisor from subpackage liquid
+"""
+
+# General imports
+import asyncio
+# Module imports
+from bitcoinrpc.authproxy import JSONRPCException  # type: ignore
+from pyliquid.liquid.jobs import RESTART_JOB, SCHEMA, JobQueue
+from pyliquid.liquid.lifecycle import NodeSupervisor, wait_for_rpc
+from pyliquid.utils.storage import open_database
+
+
+class WarmingUpProxy():
+    """
+    Stand-in for `AsyncServiceProxy` that gets ready after a few calls.
+    """
+
+    def __init__(self, refused: int, warming: int):
+        self.answers = ['refused'] * refused + ['warming'] * warming
+
+    async def uptime(self):
+        answer = self.answers.pop(0) if self.answers else 'ready'
+        if answer == 'refused':
+            raise ConnectionRefusedError
+        if answer == 'warming':
+            raise JSONRPCException({"code": -28, "message": "Loading"})
+        return 1
+
+
+def test_wait_for_rpc():
+    """
+    Test readiness polling past refused connections and warm up.
+    """
+    proxy = WarmingUpProxy(refused=2, warming=2)
+    assert asyncio.run(wait_for_rpc(proxy, True, timeout=5))
+    assert not proxy.answers
+    assert not asyncio.run(wait_for_rpc(WarmingUpProxy(100, 0), True, 0.2))
+
+
+def test_single_controller(tmp_path):
+    """
+    Test that only one supervisor takes control of the node.
+    """
+    first = NodeSupervisor(WarmingUpProxy(0, 0), working_dir=str(tmp_path))
+    second = NodeSupervisor(WarmingUpProxy(0, 0), working_dir=str(tmp_path))
+    assert first._try_control()
+    assert not second._try_control()
+    first._release_control()
+    assert second._try_control()
+    second._release_control()
+
+
+def test_restart_jobs(tmp_path):
+    """
+    Test that restart jobs submitted to any worker are run by the controller.
+    """
+    database = str(tmp_path / "jobs.sqlite3")
+    queue = JobQueue(open_database(database, SCHEMA))
+    controller = NodeSupervisor(WarmingUpProxy(0, 0),
+                                working_dir=str(tmp_path), jobs=queue)
+    other = JobQueue(open_database(database, SCHEMA))
+    restarts = []
+
+    async def restart_node():
+        restarts.append(1)
+    controller.restart_node = restart_node
+    job = other.submit(RESTART_JOB)
+    assert not asyncio.run(other.run_next())
+    assert not asyncio.run(queue.run_next())
+    assert controller._try_control()
+    assert asyncio.run(queue.run_next())
+    assert restarts == [1]
+    assert other.get(job['id'])['status'] == 'done'
+    controller._release_control()
+
+
+class ChildNode():
+    """
+    Stand-in for both the node process and its RPC interface, exiting a
+    while after being asked to stop.
+    """
+
+    def __init__(self):
+        self.up = False
+        self.spawned = []
+
+    async def spawn(self, *args, **kwargs):
+        child = ChildProcess(len(self.spawned) + 1)
+        self.spawned.append(child)
+        asyncio.get_running_loop().call_later(0.01, setattr, self, 'up', True)
+        return child
+
+    async def uptime(self):
+        if not self.up:
+            raise ConnectionRefusedError
+        return 1
+
+    async def stop(self):
+        child = self.spawned[-1]
+        loop = asyncio.get_running_loop()
+
+        def exit():
+            self.up, child.returncode = False, 0
+            # Reaped a bit later, leaving room for the supervisor to run.
+            loop.call_later(0.05, child.exited.set)
+        loop.call_later(0.02, exit)
+
+
+class ChildProcess():
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.returncode = None
+        self.exited = asyncio.Event()
+
+    async def wait(self):
+        await self.exited.wait()
+        return self.returncode
+
+    def kill(self):
+        self.returncode = -9
+        self.exited.set()
+
+
+def test_restart_while_supervised(tmp_path, monkeypatch):
+    """
+    Test the supervision loop doesn't start another node while a restart
+    stops and starts it.
+    """
+    node = ChildNode()
+    monkeypatch.setattr('pyliquid.liquid.lifecycle.SUPERVISE_INTERVAL',
+                        0.001)
+    monkeypatch.setattr('asyncio.create_subprocess_exec', node.spawn)
+    supervisor = NodeSupervisor(node, working_dir=str(tmp_path))
+
+    async def scenario():
+        supervisor.start()
+        while supervisor.child_pid is None or not node.up:
+            await asyncio.sleep(0.01)
+        # Past the readiness polling of the first start.
+        await asyncio.sleep(0.3)
+        await supervisor.restart_node()
+        await asyncio.sleep(0.05)
+        await supervisor.stop()
+    asyncio.run(scenario())
+    assert [child.pid for child in node.spawned] == [1, 2]
+    assert supervisor.child_pid == 2
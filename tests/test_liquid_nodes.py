@@ -0,0 +1,172 @@
+"""
+Suite of tests for the multi-node router from subpackage liquid
+"""
+
+# General imports
+import asyncio
+import json
+import pytest
+# Module imports
+from bitcoinrpc.authproxy import JSONRPCException  # type: ignore
+from pyliquid.liquid.client import AsyncConnectionPool, AsyncServiceProxy
+from pyliquid.liquid.nodes import (CircuitBreaker, NodeEndpoint, NodeRouter,
+                                   NodesUnavailable, parse_nodes)
+from pyliquid.liquid.server import Service
+from tests.test_liquid_client import serve_rpc
+
+
+def endpoint(name, role, port, threshold=1):
+    return NodeEndpoint(name, role,
+                        AsyncConnectionPool(f"http://u:p@127.0.0.1:{port}"),
+                        CircuitBreaker(threshold, reset_timeout=60))
+
+
+def test_parse_nodes(monkeypatch):
+    """
+    Test node settings with shared and own credentials.
+    """
+    monkeypatch.setenv('rpc_port', '7041')
+    monkeypatch.setenv('rpc_user', 'u')
+    monkeypatch.setenv('rpc_password', 'p')
+    assert parse_nodes("primary@10.0.0.1, replica@10.0.0.2:7042,"
+                       "replica@http://a:b@10.0.0.3:7043") == [
+        ("10.0.0.1:7041", "primary", "http://u:p@10.0.0.1:7041"),
+        ("10.0.0.2:7042", "replica", "http://u:p@10.0.0.2:7042"),
+        ("10.0.0.3:7043", "replica", "http://a:b@10.0.0.3:7043")]
+    with pytest.raises(ValueError):
+        parse_nodes("replica@10.0.0.2")
+
+
+def test_get_proxy_with_custom_host(monkeypatch):
+    """
+    Test custom hosts are reached with the given credentials.
+    """
+    proxy = Service.get_proxy('10.0.0.2', {'rpc_user': 'a',
+                                           'rpc_password': 'b',
+                                           'rpc_port': '7041'})
+    assert proxy._AuthServiceProxy__url.hostname == '10.0.0.2'
+    assert proxy._AuthServiceProxy__url.username == 'a'
+    with pytest.raises(ValueError):
+        Service.get_proxy('http://a:b@10.0.0.2:7041', {'rpc_user': 'a'})
+
+
+def test_breaker_opens_and_recovers(monkeypatch):
+    """
+    Test the breaker opens after the threshold and allows a single trial.
+    """
+    now = [0.0]
+    monkeypatch.setattr('pyliquid.liquid.nodes.time.monotonic',
+                        lambda: now[0])
+    breaker = CircuitBreaker(threshold=2, reset_timeout=10)
+    breaker.failure()
+    assert breaker.allow()
+    breaker.failure()
+    assert breaker.state == 'open' and not breaker.allow()
+    now[0] = 10.0
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.success()
+    assert breaker.state == 'closed'
+
+
+def test_router_balances_pins_and_fails_over():
+    """
+    Test reads spread over nodes, wallet calls stay on the primary and
+    failing nodes are skipped.
+    """
+    async def scenario():
+        primary_calls, replica_calls = [], []
+        primary = await serve_rpc({"getblockcount": 1, "getbalance": 2,
+                                   "loadwallet": {}}, primary_calls)
+        replica = await serve_rpc({"getblockcount": 1}, replica_calls)
+        router = NodeRouter([
+            endpoint("primary", "primary",
+                     primary.sockets[0].getsockname()[1]),
+            endpoint("replica", "replica",
+                     replica.sockets[0].getsockname()[1])])
+        proxy = router.proxy
+        assert await asyncio.gather(*[proxy.getblockcount()
+                                      for _ in range(4)]) == [1] * 4
+        assert primary_calls and replica_calls
+        await proxy.loadwallet("w1")
+        assert router.owner("w1") == "primary"
+        assert await proxy.for_wallet("w1").getbalance() == 2
+        # Errors of the call itself don't count as node failures.
+        with pytest.raises(JSONRPCException):
+            await proxy.getrawtransaction("00")
+        assert all(node['state'] == 'closed' for node in router.status())
+
+        replica.close()
+        await replica.wait_closed()
+        for writer in replica_calls:
+            writer.close()
+        await router._endpoints[1].pool.close()
+        for _ in range(3):
+            assert await proxy.getblockcount() == 1
+        assert router.status()[1]['state'] == 'open'
+
+        primary.close()
+        await primary.wait_closed()
+        for writer in primary_calls:
+            writer.close()
+        await router._endpoints[0].pool.close()
+        with pytest.raises(NodesUnavailable):
+            await proxy.getblockcount()
+        await router.close()
+    asyncio.run(scenario())
+
+
+class WalletNode():
+    """
+    Primary stand-in holding some wallets, which can be taken down.
+    """
+
+    def __init__(self, wallets):
+        self.wallets = wallets
+        self.calls = []
+        self.down = False
+        self.admission = None
+
+    async def request(self, path, body):
+        if self.down:
+            raise ConnectionRefusedError("down")
+        request = json.loads(body)
+        self.calls.append((path, request['method']))
+        result = {"wallets": [{"name": name} for name in self.wallets]} \
+            if request['method'] == 'listwalletdir' else "txid"
+        return 200, {'content-type': 'application/json'}, json.dumps(
+            {"result": result, "error": None, "id": request['id']}).encode()
+
+    async def close(self):
+        pass
+
+    @property
+    def proxy(self):
+        return AsyncServiceProxy(self)
+
+
+def test_wallet_writes_stay_on_owner():
+    """
+    Test wallet calls go to the primary holding the wallet, and fail
+    instead of reaching a namesake wallet when it's down.
+    """
+    first, second = WalletNode(["w0"]), WalletNode(["w1"])
+    router = NodeRouter([
+        NodeEndpoint(name, "primary", node, CircuitBreaker(1, 60))
+        for name, node in (("first", first), ("second", second))])
+
+    async def scenario():
+        wallet = router.proxy.for_wallet("w1")
+        assert await wallet.sendtoaddress("addr", 1) == "txid"
+        assert router.owner("w1") == "second"
+        assert ("/wallet/w1", "sendtoaddress") in second.calls
+        assert not any(path == "/wallet/w1" for path, _ in first.calls)
+
+        second.down = True
+        with pytest.raises(NodesUnavailable):
+            await wallet.sendtoaddress("addr", 1)
+        assert not any(path == "/wallet/w1" for path, _ in first.calls)
+        # Not knowing where a wallet is isn't taken as it being new.
+        with pytest.raises(NodesUnavailable):
+            await router.proxy.for_wallet("w2").getbalance()
+    asyncio.run(scenario())
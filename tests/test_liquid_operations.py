@@ -0,0 +1,191 @@
+"""
+Suite of tests for the wallet operations from subpackage liquid
+"""
+
+# General imports
+import asyncio
+from decimal import Decimal
+# Module imports
+from bitcoinrpc.authproxy import JSONRPCException  # type: ignore
+from pyliquid.liquid import issuance
+from pyliquid.liquid.operations import AsyncPool, AsyncWallet, Pool, Wallet
+
+
+class FakeHistoryProxy():
+    """
+    Stand-in for a wallet proxy with a history growing while it's read.
+    """
+
+    def __init__(self, size):
+        self.history = [{"txid": f"tx{i}", "vout": 0, "category": "receive"}
+                        for i in range(size)]
+        self.calls = 0
+
+    def listtransactions(self, label, count, skip, watchonly):
+        self.calls += 1
+        if self.calls == 2:
+            # A transaction arrives between the first and second pages.
+            self.history.append({"txid": "late", "vout": 0,
+                                 "category": "receive"})
+        end = len(self.history) - skip
+        return self.history[max(end - count, 0):max(end, 0)]
+
+    def listsinceblock(self, block_hash, confirmations, watchonly):
+        return {"transactions": self.history[-2:], "lastblock": "tip"}
+
+
+class AsyncHistoryProxy(FakeHistoryProxy):
+    async def listtransactions(self, *args):
+        return FakeHistoryProxy.listtransactions(self, *args)
+
+    async def listsinceblock(self, *args):
+        return FakeHistoryProxy.listsinceblock(self, *args)
+
+
+def test_iter_transactions_pages_without_repeats():
+    """
+    Test paging newest first while new transactions shift the pages.
+    """
+    proxy = FakeHistoryProxy(7)
+    txids = [t['txid'] for t in Wallet(proxy).iter_transactions(page_size=3)]
+    assert txids == [f"tx{i}" for i in range(6, -1, -1)]
+    assert proxy.calls == 3
+
+
+def test_async_iter_transactions():
+    """
+    Test the asynchronous iteration, full and since a block.
+    """
+    proxy = AsyncHistoryProxy(5)
+    wallet = AsyncWallet(proxy)
+
+    async def collect(**kwargs):
+        return [t['txid'] async for t in wallet.iter_transactions(**kwargs)]
+    assert asyncio.run(collect(page_size=5)) == [f"tx{i}"
+                                                 for i in range(4, -1, -1)]
+    assert asyncio.run(collect(since_block='abc')) == ['late', 'tx4']
+
+
+class FakeIssuerProxy():
+    """
+    Stand-in for a wallet proxy issuing assets.
+    """
+
+    def __init__(self, fail_on=()):
+        self.issued = 0
+        self.fail_on = set(fail_on)
+        self.sent = []
+        self.in_flight = 0
+        self.most_in_flight = 0
+
+    async def batch_(self, rpc_calls):
+        method = rpc_calls[0][0]
+        if method == 'getnewaddress':
+            return [{"result": f"addr{i}", "error": None}
+                    for i in range(len(rpc_calls))]
+        return [{"result": {"bitcoin": "lbtc"}, "error": None},
+                {"result": [{"asset": "lbtc", "amount": Decimal('1'),
+                             "txid": "a", "vout": 0}], "error": None}]
+
+    async def sendmany(self, label, outputs):
+        self.sent.append(outputs)
+        return "split"
+
+    async def issueasset(self, amount, reissue):
+        self.issued += 1
+        index = self.issued
+        self.in_flight += 1
+        self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+        if amount in self.fail_on:
+            raise JSONRPCException({"code": -6, "message": "Insufficient"})
+        return {"txid": f"tx{index}", "vin": 0, "entropy": f"e{amount}",
+                "asset": f"asset{amount}", "token": f"token{amount}"}
+
+
+def test_async_issue_tokens(tmp_path, monkeypatch):
+    """
+    Test batch issuance with pre-split, per item errors and the registry,
+    issuing up to the given concurrency even if a wallet takes one write at
+    a time.
+    """
+    monkeypatch.setenv('data_dir', str(tmp_path))
+    monkeypatch.setattr(issuance, '_ISSUANCE_REGISTRY', None)
+    proxy = FakeIssuerProxy(fail_on=['2'])
+    pool = AsyncPool(AsyncWallet(proxy))
+    results = asyncio.run(pool.issue_tokens([('1', '1'), ('2', '1'),
+                                             ('3', '0')], 2))
+    assert [r.asset for r in results] == ['asset1', None, 'asset3']
+    assert results[1].error is not None
+    assert proxy.most_in_flight == 2
+    assert list(proxy.sent[0]) == ['addr0', 'addr1']
+    registry = issuance.get_issuance_registry()
+    assert registry.get('token3')['entropy'] == 'e3'
+    assert {r['asset'] for r in registry.list()} == {'asset1', 'asset3'}
+
+
+class SyncIssuerProxy():
+    """
+    Synchronous stand-in for a wallet proxy issuing assets, with a `batch_`
+    behaving like the one of `AuthServiceProxy`.
+    """
+
+    def __init__(self, fail_on=()):
+        self.issued = 0
+        self.fail_on = set(fail_on)
+        self.sent = []
+
+    def dumpassetlabels(self):
+        return {"bitcoin": "lbtc"}
+
+    def listunspent(self, min_conf):
+        return [{"asset": "lbtc", "amount": Decimal('1'), "txid": "a",
+                 "vout": 0}]
+
+    def batch_(self, rpc_calls):
+        methods = [rpc_call.pop(0) for rpc_call in rpc_calls]
+        assert set(methods) == {'getnewaddress'}
+        return [f"addr{i}" for i in range(len(methods))]
+
+    def sendmany(self, label, outputs):
+        self.sent.append(outputs)
+        return "split"
+
+    def issueasset(self, amount, reissue):
+        self.issued += 1
+        if amount in self.fail_on:
+            raise JSONRPCException({"code": -6, "message": "Insufficient"})
+        return {"txid": f"tx{self.issued}", "vin": 0, "entropy": f"e{amount}",
+                "asset": f"asset{amount}", "token": f"token{amount}"}
+
+
+def test_split_utxos(tmp_path, monkeypatch):
+    """
+    Test the split creates one output per missing issuance.
+    """
+    monkeypatch.setenv('data_dir', str(tmp_path))
+    proxy = SyncIssuerProxy()
+    pool = Pool(Wallet(proxy))
+    assert pool.split_utxos(3) == "split"
+    assert proxy.sent == [{"addr0": Decimal('0.0001'),
+                           "addr1": Decimal('0.0001')}]
+    assert pool.split_utxos(1) is None
+
+
+def test_issue_tokens(tmp_path, monkeypatch):
+    """
+    Test synchronous batch issuance with pre-split, per item errors and the
+    registry.
+    """
+    monkeypatch.setenv('data_dir', str(tmp_path))
+    monkeypatch.setattr(issuance, '_ISSUANCE_REGISTRY', None)
+    proxy = SyncIssuerProxy(fail_on=['2'])
+    results = Pool(Wallet(proxy)).issue_tokens([('1', '1'), ('2', '1'),
+                                                ('3', '0')])
+    assert [r.asset for r in results] == ['asset1', None, 'asset3']
+    assert [r.index for r in results] == [0, 1, 2]
+    assert results[1].error is not None
+    assert list(proxy.sent[0]) == ['addr0', 'addr1']
+    registry = issuance.get_issuance_registry()
+    assert {r['asset'] for r in registry.list()} == {'asset1', 'asset3'}
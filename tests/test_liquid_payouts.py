@@ -0,0 +1,175 @@
+"""
+Suite of tests for payout batching from subpackage liquid
+"""
+
+# General imports
+import asyncio
+from decimal import Decimal
+import pytest
+# Module imports
+from bitcoinrpc.authproxy import JSONRPCException  # type: ignore
+from pyliquid.liquid.operations import AsyncWallet
+from pyliquid.liquid import payouts
+from pyliquid.liquid.payouts import SCHEMA, PayoutBatcher
+from pyliquid.utils.storage import open_database
+
+
+class FakeSenderProxy():
+    """
+    Stand-in for a wallet proxy recording `sendmany` calls.
+    """
+
+    def __init__(self, fail=False, invalid=(), lost=False):
+        self.calls = []
+        self.fail = fail
+        self.invalid = set(invalid)
+        self.lost = lost
+        self.transactions = []
+
+    async def sendmany(self, *params):
+        self.calls.append(params)
+        if self.lost:
+            # Sent, but the connection drops before the answer.
+            self.transactions.append({"category": "send", "comment": params[3],
+                                      "txid": f"tx{len(self.calls)}"})
+            raise ConnectionResetError("Node closed the connection")
+        if self.fail:
+            raise JSONRPCException({"code": -6, "message": "Insufficient"})
+        if self.invalid & set(params[1]):
+            raise JSONRPCException({"code": -5, "message": "Invalid address"})
+        return f"tx{len(self.calls)}"
+
+    async def listtransactions(self, label, count):
+        return self.transactions[-count:]
+
+
+def batcher_for(proxy, database=':memory:', **kwargs):
+    return PayoutBatcher(AsyncWallet(proxy), open_database(database, SCHEMA),
+                         **kwargs)
+
+
+def test_payouts_flush_by_size_and_delay():
+    """
+    Test flushing on the output limit and on the delay, per asset.
+    """
+    proxy = FakeSenderProxy()
+    batcher = batcher_for(proxy, max_outputs=3, max_delay=0.05)
+
+    async def scenario():
+        full = await asyncio.gather(*[batcher.send(f"a{i}", '1')
+                                      for i in range(3)])
+        mixed = await asyncio.gather(batcher.send('a0', '0.5'),
+                                     batcher.send('a0', 0.25),
+                                     batcher.send('b0', 2, asset='gold'))
+        return full, mixed
+    full, mixed = asyncio.run(scenario())
+    assert full == ['tx1'] * 3
+    assert mixed[0] == mixed[1] and mixed[2] != mixed[0]
+    params = {call[1].get('a0', call[1].get('b0')): call
+              for call in proxy.calls[1:]}
+    assert params[Decimal('0.75')][:2] == ("", {'a0': Decimal('0.75')})
+    assert params[Decimal('2')][-1] == {'b0': 'gold'}
+
+
+def test_payouts_report_failures():
+    """
+    Test failures reaching every waiting payout and its status.
+    """
+    batcher = batcher_for(FakeSenderProxy(fail=True), max_delay=0.01)
+
+    async def scenario():
+        payout_id, _ = batcher.submit('a0', '1')
+        with pytest.raises(JSONRPCException):
+            await batcher.send('a1', '1')
+        await batcher.flush()
+        return payout_id
+    assert batcher.status(asyncio.run(scenario()))['status'] == 'failed'
+
+
+def test_payouts_with_unknown_outcome_are_reconciled(monkeypatch):
+    """
+    Test a batch whose answer was lost is `unknown` rather than failed,
+    until its transaction is found in the wallet by its comment.
+    """
+    proxy = FakeSenderProxy(lost=True)
+    batcher = batcher_for(proxy, max_delay=0.01)
+
+    async def scenario():
+        payout_id, _ = batcher.submit('a0', '1')
+        await batcher.flush()
+        assert batcher.status(payout_id)['status'] == 'unknown'
+        # Not in the wallet yet, so looked up again later.
+        sent = proxy.transactions.pop()
+        assert await batcher.reconcile() == 1
+        batcher._reconciling.cancel()
+        batcher._reconciling = None
+        proxy.transactions.append(sent)
+        assert await batcher.reconcile() == 0
+        return payout_id
+    payout_id = asyncio.run(scenario())
+    assert batcher.status(payout_id) == {'id': payout_id, 'status': 'sent',
+                                         'txid': 'tx1', 'error': None}
+    assert len(proxy.calls) == 1
+
+    batcher = batcher_for(FakeSenderProxy(lost=True), max_delay=0.01)
+    monkeypatch.setattr(payouts, 'RECONCILE_GRACE', -1)
+
+    async def missing():
+        payout_id, _ = batcher.submit('a0', '1')
+        await batcher.flush()
+        batcher._wallet.proxy.transactions.clear()
+        assert await batcher.reconcile() == 0
+        return payout_id
+    assert batcher.status(asyncio.run(missing()))['status'] == 'failed'
+
+
+def test_payouts_isolate_rejected_outputs():
+    """
+    Test a payout the node rejects fails alone, and invalid amounts are
+    refused before joining a batch.
+    """
+    proxy = FakeSenderProxy(invalid=['bad'])
+    batcher = batcher_for(proxy, max_outputs=4, max_delay=0.05)
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            batcher.submit('a0', '0.000000001')
+        with pytest.raises(ValueError):
+            batcher.submit('a0', 'all')
+        sent = [batcher.submit(address, '1')
+                for address in ('a0', 'a1', 'bad', 'a2')]
+        await batcher.flush()
+        return [payout_id for payout_id, _ in sent]
+    ids = asyncio.run(scenario())
+    outcomes = [batcher.status(payout_id) for payout_id in ids]
+    assert [outcome['status'] for outcome in outcomes] == \
+        ['sent', 'sent', 'failed', 'sent']
+    assert 'Invalid address' in outcomes[2]['error']
+    assert outcomes[0]['txid'] == outcomes[1]['txid'] != outcomes[3]['txid']
+
+
+def test_payouts_survive_restarts(tmp_path, monkeypatch):
+    """
+    Test payouts accepted by a worker that died are sent by the next one,
+    while the ones it was sending are unknown instead of paid twice.
+    """
+    database = str(tmp_path / "payouts.sqlite3")
+    crashed = batcher_for(FakeSenderProxy(), database, max_delay=60)
+
+    async def accept():
+        waiting, _ = crashed.submit('a0', '1')
+        crashed._update([crashed.submit('a1', '2')[0]], 'sending')
+        return waiting
+    waiting = asyncio.run(accept())
+    monkeypatch.setattr(payouts, 'pid_alive', lambda pid: False)
+    proxy = FakeSenderProxy()
+    restarted = batcher_for(proxy, database, max_delay=60)
+
+    async def recover():
+        assert restarted.recover() == 1
+        await restarted.flush()
+    asyncio.run(recover())
+    assert [call[:2] for call in proxy.calls] == [("", {'a0': Decimal('1')})]
+    assert restarted.status(waiting)['status'] == 'sent'
+    assert [row[0] for row in restarted._database.execute(
+        "SELECT status FROM payouts WHERE address = 'a1'")] == ['unknown']
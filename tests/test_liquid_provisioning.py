@@ -0,0 +1,106 @@
+"""
+Suite of tests for bulk wallet provisioning from subpackage liquid
+"""
+
+# General imports
+import asyncio
+# Module imports
+from bitcoinrpc.authproxy import JSONRPCException  # type: ignore
+from pyliquid.liquid.provisioning import existing_wallets, provision_wallets
+from pyliquid.models.requests import BulkWallets
+
+
+class FakeWalletProxy():
+    """
+    Stand-in for a wallet-scoped `AsyncServiceProxy`.
+    """
+
+    def __init__(self, node, name):
+        self.node = node
+        self.name = name
+
+    async def getaddressesbylabel(self, label):
+        addresses = self.node.addresses.get(self.name, [])
+        if not addresses:
+            raise JSONRPCException({"code": -11, "message": "No addresses"})
+        return {address: {"purpose": "receive"} for address in addresses}
+
+    async def batch_(self, rpc_calls):
+        if self.name in self.node.broken:
+            return [{"result": None, "error": {"code": -4, "message": "x"}}
+                    for _ in rpc_calls]
+        addresses = self.node.addresses.setdefault(self.name, [])
+        results = []
+        for _ in rpc_calls:
+            addresses.append(f"{self.name}/{len(addresses)}")
+            results.append({"result": addresses[-1], "error": None})
+        return results
+
+
+class FakeNodeProxy():
+    """
+    Stand-in for a node-level `AsyncServiceProxy` tracking concurrency.
+    """
+
+    def __init__(self, broken=()):
+        self.wallets = set()
+        self.loaded = set()
+        self.addresses = {}
+        self.broken = set(broken)
+        self.running = 0
+        self.peak = 0
+
+    def for_wallet(self, name):
+        return FakeWalletProxy(self, name)
+
+    async def listwalletdir(self):
+        return {"wallets": [{"name": name} for name in self.wallets]}
+
+    async def createwallet(self, name, *args):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        self.wallets.add(name)
+        self.loaded.add(name)
+
+    async def loadwallet(self, name):
+        if name in self.loaded:
+            raise JSONRPCException({"code": -35, "message": "loaded"})
+        self.loaded.add(name)
+
+    async def unloadwallet(self, name):
+        self.loaded.discard(name)
+
+
+def test_provisioning_is_bounded_and_resumable():
+    """
+    Test concurrency limit, per wallet failures and resuming a request.
+    """
+    node = FakeNodeProxy(broken=['shop-000002'])
+    bulk = BulkWallets(count=6, prefix='shop', addresses=3, concurrency=2)
+
+    tasks = []
+
+    async def run():
+        existing = await existing_wallets(node)
+        provisions = []
+        async for provision in provision_wallets(node, bulk, existing):
+            tasks.append(len(asyncio.all_tasks()))
+            provisions.append(provision)
+        return provisions
+
+    first = {provision.name: provision for provision in asyncio.run(run())}
+    assert len(first) == 6 and node.peak == 2
+    # The main task and one per concurrent wallet, never one per wallet.
+    assert max(tasks) <= 3
+    assert first['shop-000002'].status == 'failed'
+    assert first['shop-000000'].addresses == [f"shop-000000/{i}"
+                                              for i in range(3)]
+    assert not node.loaded
+
+    node.broken.clear()
+    second = {provision.name: provision for provision in asyncio.run(run())}
+    assert {p.status for p in second.values()} == {'existing'}
+    assert second['shop-000000'].addresses == first['shop-000000'].addresses
+    assert len(second['shop-000002'].addresses) == 3
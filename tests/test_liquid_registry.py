@@ -0,0 +1,134 @@
+"""
+Suite of tests for the wallet registry from subpackage liquid
+"""
+
+# General imports
+import asyncio
+import pytest
+# Module imports
+from bitcoinrpc.authproxy import JSONRPCException  # type: ignore
+from pyliquid.liquid.registry import WalletRegistry
+
+
+class FakeNodeProxy():
+    """
+    Stand-in for a node-level `AsyncServiceProxy` tracking loaded wallets.
+    """
+
+    def __init__(self, loaded, existing):
+        self.loaded = list(loaded)
+        self.existing = set(existing) | set(loaded)
+        self.calls = []
+
+    def for_wallet(self, name):
+        return FakeWalletProxy(self, name)
+
+    async def listwallets(self):
+        self.calls.append('listwallets')
+        return list(self.loaded)
+
+    async def loadwallet(self, name):
+        self.calls.append(('loadwallet', name))
+        if name not in self.existing:
+            raise JSONRPCException({"code": -18, "message": "not found"})
+        if name in self.loaded:
+            raise JSONRPCException({"code": -35, "message": "already loaded"})
+        self.loaded.append(name)
+        return {"name": name, "warning": ""}
+
+    async def unloadwallet(self, name):
+        self.calls.append(('unloadwallet', name))
+        self.loaded.remove(name)
+
+
+class FakeWalletProxy():
+    """
+    Wallet-scoped counterpart of `FakeNodeProxy`.
+    """
+
+    def __init__(self, node, name):
+        self.node = node
+        self.name = name
+
+    async def getwalletinfo(self):
+        self.node.calls.append(('getwalletinfo', self.name))
+        if self.name not in self.node.loaded:
+            raise JSONRPCException({"code": -18, "message": "not loaded"})
+        return {"walletname": self.name}
+
+    async def batch_(self, rpc_calls):
+        error = None if self.name in self.node.loaded else \
+            {"code": -18, "message": "not loaded"}
+        return [{"result": None if error else call[0], "error": error}
+                for call in rpc_calls]
+
+
+def test_registry_reuses_loaded_wallets():
+    """
+    Test seeding from `listwallets` and single load per wallet.
+    """
+    node = FakeNodeProxy(loaded=['', 'vault'], existing=['alice'])
+    registry = WalletRegistry(node, capacity=4)
+
+    async def scenario():
+        vault = await registry.get('vault')
+        assert vault.name == 'vault'
+        await asyncio.gather(*[registry.get('alice') for _ in range(5)])
+        await registry.get('alice')
+    asyncio.run(scenario())
+    assert node.calls == ['listwallets', ('loadwallet', 'alice')]
+
+
+def test_registry_unloads_least_recently_used():
+    """
+    Test LRU eviction, keeping the default wallet loaded.
+    """
+    node = FakeNodeProxy(loaded=[''], existing=['a', 'b', 'c'])
+    registry = WalletRegistry(node, capacity=2)
+
+    async def scenario():
+        await registry.get('a')
+        await registry.get('b')
+        await registry.get('a')
+        await registry.get('c')
+    asyncio.run(scenario())
+    assert ('unloadwallet', 'b') in node.calls
+    assert registry.loaded == ['', 'a', 'c']
+
+
+def test_registry_handles_already_loaded_and_missing():
+    """
+    Test that wallets loaded behind the registry back are not an error.
+    """
+    node = FakeNodeProxy(loaded=[''], existing=['a'])
+    registry = WalletRegistry(node)
+
+    async def scenario():
+        await registry.get('')
+        node.loaded.append('a')
+        assert (await registry.get('a')).name == 'a'
+        with pytest.raises(JSONRPCException):
+            await registry.get('missing')
+    asyncio.run(scenario())
+
+
+def test_registry_reloads_wallets_unloaded_by_other_workers():
+    """
+    Test a handle loads its wallet again after another worker unloaded it,
+    and retries the call once.
+    """
+    node = FakeNodeProxy(loaded=[''], existing=['a', 'b'])
+    first = WalletRegistry(node, capacity=1)
+    second = WalletRegistry(node, capacity=1)
+
+    async def scenario():
+        wallet = await first.get('a')
+        await second.get('b')
+        assert 'a' not in node.loaded
+        assert await wallet.proxy.getwalletinfo() == {"walletname": "a"}
+        await second.unload('a')
+        assert await wallet.proxy.batch_([["getbalance"]]) == \
+            [{"result": "getbalance", "error": None}]
+    asyncio.run(scenario())
+    assert node.calls.count(('loadwallet', 'a')) == 3
+    assert first.loaded == ['', 'a']
@@ -0,0 +1,234 @@
+"""
+Suite of tests for module sharding from subpackage liquid
+"""
+
+# General imports
+import asyncio
+import pytest
+# Module imports
+from bitcoinrpc.authproxy import AuthServiceProxy, JSONRPCException  # type: ignore
+from pyliquid.liquid.nodes import (CircuitBreaker, NodeEndpoint, NodeRouter,
+                                   ShardedProxy)
+from pyliquid.liquid.operations import Wallet
+from pyliquid.liquid.sharding import (SCHEMA, HashRing, PlacementMap,
+                                      WalletPlacement, rebalance)
+from pyliquid.liquid.transport import LoopbackTransport
+from pyliquid.utils.storage import open_database
+
+
+# Funds on chain, by descriptor and master blinding key able to spend and
+# unblind them.
+CHAIN = {("wpkh(xprv/0/*)#a", "blind"): 5}
+
+
+class ShardNode():
+    """
+    Node answering from a set of loaded wallets, recording every call.
+    """
+
+    def __init__(self, wallets):
+        self.wallets = set(wallets)
+        self.keys = {name: {"desc": "wpkh(xprv/0/*)#a", "blinding": "blind"}
+                     for name in wallets}
+        self.calls = []
+        self.imported = []
+        self.transport = LoopbackTransport(self.answer)
+
+    def answer(self, path, request):
+        method, params = request['method'], request.get('params', [])
+        wallet = path.rpartition('/wallet/')[2] if '/wallet/' in path \
+            else None
+        self.calls.append((wallet, method))
+        reply = {"result": None, "error": None, "id": request['id']}
+        if wallet is not None and wallet not in self.wallets:
+            reply["error"] = {"code": -18, "message": "Wallet not loaded"}
+        elif method == 'listwallets':
+            reply["result"] = sorted(self.wallets)
+        elif method == 'listwalletdir':
+            reply["result"] = {"wallets": [{"name": name}
+                                           for name in sorted(self.wallets)]}
+        elif method in ('createwallet', 'loadwallet'):
+            self.wallets.add(params[0])
+            reply["result"] = {"name": params[0]}
+        elif method == 'unloadwallet':
+            self.wallets.discard(params[0])
+        elif method == 'listdescriptors':
+            reply["result"] = {"descriptors": [
+                {"desc": self.keys[wallet]["desc"], "timestamp": 1,
+                 "active": True, "internal": False, "range": [0, 999],
+                 "next": 3}]}
+        elif method == 'dumpmasterblindingkey':
+            reply["result"] = self.keys[wallet]["blinding"]
+        elif method == 'importmasterblindingkey':
+            self.keys.setdefault(wallet, {})["blinding"] = params[0]
+        elif method == 'importdescriptors':
+            self.imported += params[0]
+            self.keys.setdefault(wallet, {})["desc"] = params[0][0]["desc"]
+            reply["result"] = [{"success": True}] * len(params[0])
+        elif method == 'getbalance':
+            keys = self.keys.get(wallet, {})
+            reply["result"] = {"bitcoin": CHAIN.get(
+                (keys.get("desc"), keys.get("blinding")), 0)}
+        else:
+            reply["result"] = wallet
+        return reply
+
+
+def placement_for(nodes):
+    return WalletPlacement(HashRing(nodes), PlacementMap(
+        open_database(':memory:', SCHEMA)))
+
+
+def sharded_router(nodes, placement):
+    return NodeRouter([NodeEndpoint(name, 'primary', node.transport,
+                                    CircuitBreaker(1, 60))
+                       for name, node in nodes.items()], placement)
+
+
+def test_ring_spreads_and_keeps_wallets():
+    """
+    Test wallets spread over every node, and a new node only takes some of
+    them.
+    """
+    wallets = [f"wallet-{index}" for index in range(1000)]
+    ring = HashRing(['a', 'b', 'c'])
+    before = {wallet: ring.node_for(wallet) for wallet in wallets}
+    counts = [list(before.values()).count(node) for node in 'abc']
+    assert min(counts) > 200
+    grown = HashRing(['c', 'b', 'a', 'd'])
+    moved = [wallet for wallet in wallets
+             if grown.node_for(wallet) != before[wallet]]
+    assert all(grown.node_for(wallet) == 'd' for wallet in moved)
+    assert 150 < len(moved) < 350
+
+
+def test_placement_is_sticky():
+    """
+    Test placed wallets stay on their node when nodes are added, until
+    rebalanced.
+    """
+    store = PlacementMap(open_database(':memory:', SCHEMA))
+    placement = WalletPlacement(HashRing(['a']), store)
+    assert placement.node_for('w1') == 'a'
+    # Looking a wallet up doesn't place it.
+    assert store.get('w1') is None
+    assert placement.place('w1') == 'a'
+    assert placement.adopt('w2', 'b') == 'b'
+    grown = WalletPlacement(HashRing(['a', 'b']), store)
+    assert grown.node_for('w1') == 'a'
+    assert grown.adopt('w2', 'a') == 'b'
+    plan = grown.plan()
+    assert all(source != target for _, source, target in plan)
+    assert {wallet for wallet, _, _ in plan} <= {'w1', 'w2'}
+
+
+def test_router_sends_wallets_to_their_node():
+    """
+    Test wallet calls reach the node holding the wallet, listings join
+    every node, and wallets moved by another process are looked up again.
+    """
+    nodes = {'a': ShardNode(['w1']), 'b': ShardNode(['w2'])}
+    placement = placement_for(list(nodes))
+    placement.adopt('w1', 'a')
+    placement.adopt('w2', 'b')
+    router = sharded_router(nodes, placement)
+
+    async def scenario():
+        assert await router.proxy.for_wallet('w2').getwalletinfo() == 'w2'
+        assert ('w2', 'getwalletinfo') in nodes['b'].calls
+        assert await router.proxy.listwallets() == ['w1', 'w2']
+        assert await router.proxy.listwalletdir.raw_() == \
+            b'{"wallets": [{"name": "w1"}, {"name": "w2"}]}'
+        with pytest.raises(JSONRPCException):
+            await router.proxy.for_wallet('w3').getwalletinfo()
+        assert placement._store.get('w3') is None
+        created = await router.proxy.createwallet('w3', False, False)
+        holder = placement._store.get('w3')
+        assert created == {"name": "w3"} and 'w3' in nodes[holder].wallets
+
+        # Moved by the rebalance of another process.
+        nodes['a'].wallets.discard('w1')
+        nodes['b'].wallets.add('w1')
+        placement._store.move('w1', 'b')
+        assert await router.proxy.for_wallet('w1').getwalletinfo() == 'w1'
+        assert router.owner('w1') == 'b'
+    asyncio.run(scenario())
+
+
+def test_rebalance_moves_descriptors():
+    """
+    Test a wallet is copied trough its descriptors and master blinding key,
+    keeping its balance, placed on its new node and unloaded from the old
+    one, and that workers with a stale placement don't load the old copy.
+    """
+    nodes = {'a': ShardNode([]), 'b': ShardNode([])}
+    store = PlacementMap(open_database(':memory:', SCHEMA))
+    placement = WalletPlacement(HashRing(['a', 'b']), store)
+    wallet = next(f"w{index}" for index in range(100)
+                  if placement.ring.node_for(f"w{index}") == 'b')
+    nodes['a'] = ShardNode([wallet])
+    placement.adopt(wallet, 'a')
+    stale = WalletPlacement(HashRing(['a', 'b']), store)
+    assert stale.node_for(wallet) == 'a'
+    proxies = {name: node.transport.proxy for name, node in nodes.items()}
+
+    outcomes = asyncio.run(rebalance(proxies, placement))
+    assert outcomes == [{'wallet': wallet, 'source': 'a', 'target': 'b',
+                         'descriptors': 1}]
+    assert placement.node_for(wallet) == 'b' and placement.plan() == []
+    assert wallet in nodes['b'].wallets and wallet not in nodes['a'].wallets
+    assert nodes['b'].imported == [
+        {"desc": "wpkh(xprv/0/*)#a", "timestamp": 1, "active": True,
+         "internal": False, "range": [0, 999], "next_index": 3}]
+    assert nodes['b'].keys[wallet] == nodes['a'].keys[wallet]
+
+    async def reload():
+        router = sharded_router(nodes, stale)
+        await router.proxy.loadwallet(wallet)
+        return await router.proxy.for_wallet(wallet).getbalance()
+    assert asyncio.run(reload()) == {"bitcoin": 5}
+    assert wallet not in nodes['a'].wallets
+
+
+def test_rebalance_checks_balances():
+    """
+    Test a copy that can't unblind the funds of the wallet is not placed.
+    """
+    nodes = {'a': ShardNode([]), 'b': ShardNode([])}
+    placement = placement_for(['a', 'b'])
+    wallet = next(f"w{index}" for index in range(100)
+                  if placement.ring.node_for(f"w{index}") == 'b')
+    nodes['a'] = ShardNode([wallet])
+    placement.adopt(wallet, 'a')
+    answer = nodes['b'].answer
+
+    def without_blinding(path, request):
+        if request['method'] == 'importmasterblindingkey':
+            request['params'] = ["other"]
+        return answer(path, request)
+    nodes['b'].transport = LoopbackTransport(without_blinding)
+    proxies = {name: node.transport.proxy for name, node in nodes.items()}
+
+    [outcome] = asyncio.run(rebalance(proxies, placement))
+    assert 'differs' in outcome['error']
+    assert placement.node_for(wallet) == 'a'
+    assert wallet in nodes['a'].wallets
+
+
+def test_sharded_proxy_routes_wallet():
+    """
+    Test a synchronous `Wallet` sends its calls to the node holding it.
+    """
+    nodes = {'a': ShardNode([]), 'b': ShardNode([])}
+    placement = placement_for(list(nodes))
+    proxy = ShardedProxy(
+        {name: 'http://u:p@localhost' for name in nodes}, placement,
+        proxies={name: AuthServiceProxy('http://u:p@localhost',
+                                        connection=node.transport.connection())
+                 for name, node in nodes.items()})
+    wallet = Wallet(proxy, 'c', 'w1', with_address=False)
+    holder = placement.node_for('w1')
+    assert 'w1' in nodes[holder].wallets
+    assert wallet.proxy.wallet == 'w1'
+    assert wallet.proxy._node(()) == holder
+    assert proxy.listwallets() == ['w1']
@@ -0,0 +1,121 @@
+"""
+Suite of tests for module transport from subpackage liquid
+"""
+
+# General imports
+import asyncio
+from decimal import Decimal
+import pytest
+# Module imports
+from bitcoinrpc.authproxy import AuthServiceProxy, JSONRPCException  # type: ignore
+from pyliquid.liquid.client import AsyncConnectionPool
+from pyliquid.liquid.connection import ConnectionPool
+from pyliquid.liquid.operations import AsyncWallet, Wallet
+from pyliquid.liquid.transport import LoopbackTransport, UnixHTTPConnection
+from tests.test_liquid_client import serve_rpc
+
+
+def test_loopback_answers_wallets():
+    """
+    Test both wallet flavours run against canned results.
+    """
+    transport = LoopbackTransport.from_results({
+        "getwalletinfo": {"walletname": "w1", "balance": {"bitcoin": 1.5}},
+        "listunspent": lambda min_conf: [{"confirmations": min_conf}],
+        "loadwallet": JSONRPCException({"code": -18,
+                                         "message": "Wallet not found"})})
+
+    async def scenario():
+        wallet = AsyncWallet(transport.proxy, "w1")
+        info = await wallet.get_wallet_info()
+        assert info["balance"]["bitcoin"] == Decimal("1.5")
+        assert await wallet.list_unspent(3) == [{"confirmations": 3}]
+        assert await wallet.list_unspent(3, raw=True) == \
+            b'[{"confirmations":3}]'
+        with pytest.raises(JSONRPCException) as missing:
+            await transport.proxy.loadwallet("w2")
+        assert missing.value.code == -18
+        responses = await transport.proxy.batch_([["getblockcount"]])
+        assert responses[0]["error"]["code"] == -32601
+    asyncio.run(scenario())
+
+    proxy = AuthServiceProxy("http://u:p@localhost",
+                             connection=transport.connection())
+    assert Wallet(proxy).get_wallet_info()["walletname"] == "w1"
+
+
+def test_unix_socket_transport(tmp_path):
+    """
+    Test both pools reach the node trough a Unix socket.
+    """
+    path = str(tmp_path / "node.sock")
+
+    async def scenario():
+        connections = []
+        server = await serve_rpc({"getblockcount": 7}, connections, path)
+        pool = AsyncConnectionPool("http://u:p@localhost", socket_path=path)
+        assert await pool.proxy.getblockcount() == 7
+        assert len(connections) == 1
+        await pool.close()
+        server.close()
+        await server.wait_closed()
+    asyncio.run(scenario())
+
+    connection = UnixHTTPConnection(path)
+    assert connection.socket_path == path
+    pool = ConnectionPool("http://u:p@localhost", socket_path=path)
+    proxy = pool._connect()
+    assert proxy._AuthServiceProxy__conn.socket_path == path
+
+
+def test_reused_connection_is_retried():
+    """
+    Test a request is sent again when the node closed a kept-alive
+    connection, but not when the pool has no retries.
+    """
+    async def scenario():
+        connections = []
+        server = await serve_rpc({"getblockcount": 7}, connections)
+        port = server.sockets[0].getsockname()[1]
+        for retries, fails in ((1, False), (0, True)):
+            pool = AsyncConnectionPool(f"http://u:p@127.0.0.1:{port}",
+                                       retries=retries)
+            assert await pool.proxy.getblockcount() == 7
+            # The node drops the connection, unnoticed until it's reused.
+            connections[-1].transport.abort()
+            pool._health_interval = float('inf')
+            pool._idle[-1].reader.at_eof = lambda: False
+            if fails:
+                with pytest.raises(ConnectionError):
+                    await pool.proxy.getblockcount()
+            else:
+                assert await pool.proxy.getblockcount() == 7
+            await pool.close()
+        server.close()
+        await server.wait_closed()
+    asyncio.run(scenario())
+
+
+def test_dropped_write_is_not_resent():
+    """
+    Test a write isn't sent again when the node closed a kept-alive
+    connection, since it may have run it already.
+    """
+    async def scenario():
+        connections = []
+        server = await serve_rpc({"getblockcount": 7, "sendtoaddress": "ab"},
+                                 connections)
+        port = server.sockets[0].getsockname()[1]
+        pool = AsyncConnectionPool(f"http://u:p@127.0.0.1:{port}", retries=1)
+        assert await pool.proxy.getblockcount() == 7
+        connections[-1].transport.abort()
+        pool._health_interval = float('inf')
+        pool._idle[-1].reader.at_eof = lambda: False
+        with pytest.raises(ConnectionError):
+            await pool.proxy.sendtoaddress("addr", 1)
+        # No new connection was opened to send it again.
+        assert len(connections) == 1
+        await pool.close()
+        server.close()
+        await server.wait_closed()
+    asyncio.run(scenario())
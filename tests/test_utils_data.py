@@ -25,3 +25,7 @@ def test_decimal_float_parser():
     assert expected_one == result_one
     assert expected_two == result_two
     assert expected_three == result_three
+    expected_four = {"first": [{"second": 1.5}, 2.0, "three"]}
+    result_four = parse_decimal_to_float({"first": [
+        {"second": Decimal("1.5")}, Decimal(2), "three"]})
+    assert expected_four == result_four
@@ -0,0 +1,88 @@
+"""
+Suite of tests for module encoding from subpackage utils
+"""
+
+# General imports
+import json
+from datetime import datetime
+from decimal import Decimal
+# Module imports
+from pyliquid.models.responses import SuccessGet
+from pyliquid.utils.encoding import (Amounts, DecimalJSONResponse,
+                                     encode_json, wrap_raw)
+
+
+def test_amounts_as_strings():
+    """
+    Test amounts keep every decimal when encoded as strings
+    """
+    content = {"balance": {"bitcoin": Decimal("0.00010000")},
+               "amounts": [Decimal("21000000.00000001"), 1, 1.5]}
+    assert json.loads(encode_json(content, 'string')) == \
+        {"balance": {"bitcoin": "0.00010000"},
+         "amounts": ["21000000.00000001", 1, 1.5]}
+
+
+def test_amounts_as_sats():
+    """
+    Test amounts become integer satoshis, leaving other decimals as strings
+    """
+    content = {"amount": Decimal("21000000.00000001"),
+               "fee": Decimal("-0.0000025"),
+               "progress": Decimal("0.999999999123")}
+    assert json.loads(encode_json(content, 'sats')) == \
+        {"amount": 2100000000000001, "fee": -250,
+         "progress": "0.999999999123"}
+
+
+def test_sats_only_for_amount_keys():
+    """
+    Test only the decimals under amount keys or in `Amounts` become
+    satoshis
+    """
+    content = {"balance": {"bitcoin": Decimal("0.5")},
+               "vout": [{"value": Decimal("1"), "n": 0}],
+               "relayfee_rate": Decimal("0.00001"),
+               "difficulty": Decimal("1"),
+               "by_asset": Amounts({"gold": Decimal("2")})}
+    assert json.loads(encode_json(content, 'sats')) == \
+        {"balance": {"bitcoin": 50000000},
+         "vout": [{"value": 100000000, "n": 0}],
+         "relayfee_rate": "0.00001", "difficulty": "1",
+         "by_asset": {"gold": 200000000}}
+
+
+def test_models_and_dates():
+    """
+    Test the payload of a response is encoded as a JSON object
+    """
+    model = SuccessGet(status=200, payload={"txid": "ab",
+                                            "amount": Decimal("1.5")})
+    response = DecimalJSONResponse({"status": model.status,
+                                    "payload": model,
+                                    "at": datetime(2022, 1, 1)})
+    assert json.loads(response.body) == {
+        "status": 200,
+        "payload": {"status": 200,
+                    "payload": {"txid": "ab", "amount": "1.5"}},
+        "at": "2022-01-01T00:00:00"}
+
+
+def test_raw_envelope():
+    """
+    Test raw node output is wrapped in the response envelope as is
+    """
+    assert json.loads(wrap_raw(200, b'{"amount":0.00010000}'),
+                      parse_float=Decimal) == \
+        {"status": 200, "payload": {"amount": Decimal("0.00010000")}}
+    assert json.loads(wrap_raw(200, None)) == {"status": 200, "payload": None}
+
+
+def test_raw_amounts_stay_exact():
+    """
+    Test `raw` amounts of responses that can't forward the node output are
+    exact strings rather than floats
+    """
+    content = {"amount": Decimal("21000000.00000001")}
+    assert json.loads(encode_json(content, 'raw')) == \
+        {"amount": "21000000.00000001"}
@@ -0,0 +1,120 @@
+"""
+Suite of tests for module metrics from subpackage utils
+"""
+
+# General imports
+import asyncio
+import os
+import subprocess
+from fastapi import FastAPI
+# Module imports
+from bitcoinrpc.authproxy import JSONRPCException  # type: ignore
+from pyliquid.liquid.wrappers import rpc_exec
+from pyliquid.utils import metrics
+from pyliquid.utils.metrics import MetricsMiddleware, MetricsRegistry
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen(['true'])
+    process.wait()
+    return process.pid
+
+
+def test_workers_are_aggregated(tmp_path):
+    """
+    Test samples of every worker are summed, including exited ones.
+    """
+    path = str(tmp_path / "metrics.sqlite3")
+    current, exited = MetricsRegistry(path), MetricsRegistry(path, dead_pid())
+    labels = (('method', 'getblock'),)
+    for registry in (current, exited):
+        registry.inc('pyliquid_rpc_calls_total', labels)
+        registry.observe('pyliquid_rpc_duration_seconds', labels, 0.02)
+    exited.observe('pyliquid_rpc_duration_seconds', labels, 3.0)
+    exited.flush()
+    text = current.render()
+    assert '# TYPE pyliquid_rpc_calls_total counter' in text
+    assert 'pyliquid_rpc_calls_total{method="getblock"} 2' in text
+    assert '# TYPE pyliquid_rpc_duration_seconds histogram' in text
+    assert 'pyliquid_rpc_duration_seconds_bucket{method="getblock",le="0.025"} 2' \
+        in text
+    assert 'pyliquid_rpc_duration_seconds_bucket{method="getblock",le="+Inf"} 3' \
+        in text
+    assert 'pyliquid_rpc_duration_seconds_count{method="getblock"} 3' in text
+    # Exited workers are folded, so the totals stay the same.
+    pids = {row[0] for row in current._database.execute(
+        "SELECT pid FROM samples")}
+    assert pids == {metrics.RETIRED_PID, os.getpid()}
+    assert current.render() == text
+
+
+def test_rpc_exec_records_calls(monkeypatch):
+    """
+    Test wrapped RPC calls are recorded by method and error code.
+    """
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics, '_METRICS', registry)
+
+    class FakeCaller():
+        def __init__(self, name, error=None):
+            self._service_name = name
+            self.error = error
+
+        def __call__(self):
+            if self.error:
+                raise self.error
+            return 1
+
+    @rpc_exec
+    def execute(_, caller, args):
+        return caller(*args)
+
+    execute(None, FakeCaller('getbalance'))
+    execute(None, FakeCaller('getbalance', JSONRPCException(
+        {'code': -18, 'message': 'Wallet not found'})))
+    samples = {(name, labels): value
+               for name, labels, value in registry.samples()}
+    assert samples[('pyliquid_rpc_calls_total', 'method="getbalance"')] == 2
+    assert samples[('pyliquid_rpc_errors_total',
+                    'method="getbalance",code="-18"')] == 1
+
+
+def test_middleware_records_route_templates(monkeypatch):
+    """
+    Test HTTP requests are recorded by route template and status.
+    """
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics, '_METRICS', registry)
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    async def request(path):
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            sent.append(message)
+        await app({'type': 'http', 'method': 'GET', 'path': path,
+                   'raw_path': path.encode(), 'query_string': b'',
+                   'headers': [], 'root_path': '', 'scheme': 'http',
+                   'server': ('test', 80), 'http_version': '1.1'},
+                  receive, send)
+        return sent[0]['status']
+
+    async def scenario():
+        assert await request("/items/1") == 200
+        assert await request("/items/2") == 200
+        assert await request("/missing") == 404
+    asyncio.run(scenario())
+    samples = {(name, labels): value
+               for name, labels, value in registry.samples()}
+    assert samples[('pyliquid_http_requests_total',
+                    'method="GET",route="/items/{item_id}",status="200"')] == 2
+    assert samples[('pyliquid_http_requests_total',
+                    'method="GET",route="unmatched",status="404"')] == 1